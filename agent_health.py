@@ -0,0 +1,217 @@
+"""
+Módulo de salud por agente: estimación de RTT, timeouts adaptativos y
+circuit breakers para que los agentes caídos no bloqueen el sondeo.
+"""
+import time
+import threading
+
+# Estados del circuit breaker
+CLOSED = "CERRADO"
+OPEN = "ABIERTO"
+HALF_OPEN = "SEMIABIERTO"
+
+
+class RttEstimator:
+    """
+    Estimador de RTT al estilo TCP (RFC 6298).
+    Mantiene SRTT/RTTVAR y deriva de ellos el timeout (RTO).
+    """
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial_timeout=1.0, min_timeout=0.2, max_timeout=5.0):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.backoff_factor = 1
+
+    def update(self, rtt):
+        """Incorpora una nueva muestra de RTT (en segundos)."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        # Una respuesta válida anula el backoff acumulado (algoritmo de Karn)
+        self.backoff_factor = 1
+
+    def backoff(self):
+        """Duplica el timeout tras un vencimiento, hasta el máximo."""
+        if self.timeout() < self.max_timeout:
+            self.backoff_factor *= 2
+
+    def timeout(self):
+        """Devuelve el timeout actual en segundos."""
+        if self.srtt is None:
+            rto = self.initial_timeout
+        else:
+            rto = self.srtt + self.K * self.rttvar
+        rto *= self.backoff_factor
+        return max(self.min_timeout, min(self.max_timeout, rto))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por agente.
+    Tras `failure_threshold` fallos seguidos se abre y solo deja pasar un
+    sondeo cada `open_interval` segundos (con backoff exponencial).
+    El sondeo de prueba (SEMIABIERTO) debe terminar con record_success,
+    record_failure o release; si no llega nada en `probe_timeout` segundos
+    se da por fallido y el circuito vuelve a ABIERTO.
+    """
+
+    def __init__(self, failure_threshold=3, open_interval=5.0, max_open_interval=300.0,
+                 probe_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.base_open_interval = open_interval
+        self.max_open_interval = max_open_interval
+        self.open_interval = open_interval
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probe_deadline = 0.0
+
+    def allow_request(self, now=None):
+        """Indica si se puede consultar al agente ahora."""
+        now = time.monotonic() if now is None else now
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and now >= self.probe_deadline:
+            # El sondeo de prueba se perdió sin registrar resultado
+            self.record_failure(now)
+        if self.state == OPEN and now >= self.open_until:
+            # Dejar pasar un único sondeo de prueba
+            self.state = HALF_OPEN
+            self.probe_deadline = now + self.probe_timeout
+            return True
+        return False
+
+    def release(self):
+        """
+        El sondeo permitido no llegó a hacerse (error local, cancelación):
+        devolver el turno de prueba sin contarlo como éxito ni como fallo.
+        """
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+
+    def record_success(self):
+        """El agente respondió: cerrar el circuito."""
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_interval = self.base_open_interval
+
+    def record_failure(self, now=None):
+        """El agente no respondió: abrir el circuito si corresponde."""
+        now = time.monotonic() if now is None else now
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            # El sondeo de prueba falló: volver a abrir con más espera
+            self.open_interval = min(self.open_interval * 2, self.max_open_interval)
+            self._open(now)
+        elif self.consecutive_failures >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.open_until = now + self.open_interval
+
+    def seconds_until_probe(self, now=None):
+        """Segundos que faltan para el próximo sondeo permitido."""
+        now = time.monotonic() if now is None else now
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_until - now)
+
+
+class AgentHealthRegistry:
+    """
+    Registro thread-safe del estado de salud de cada agente.
+    Combina RttEstimator y CircuitBreaker y limita el coste total
+    (timeout × intentos) que puede consumir un agente inalcanzable.
+    """
+
+    def __init__(self, retries=1, max_attempt_budget=3.0,
+                 initial_timeout=1.0, min_timeout=0.2, max_timeout=5.0,
+                 failure_threshold=3, open_interval=5.0, max_open_interval=300.0,
+                 probe_timeout=30.0):
+        self.retries = retries
+        self.max_attempt_budget = max_attempt_budget
+        self._rtt_args = (initial_timeout, min_timeout, max_timeout)
+        self._breaker_args = (failure_threshold, open_interval, max_open_interval, probe_timeout)
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def _get(self, agent):
+        entry = self._agents.get(agent)
+        if entry is None:
+            entry = (RttEstimator(*self._rtt_args), CircuitBreaker(*self._breaker_args))
+            self._agents[agent] = entry
+        return entry
+
+    def allow_request(self, agent):
+        """Indica si el agente puede consultarse en este ciclo."""
+        with self._lock:
+            return self._get(agent)[1].allow_request()
+
+    def timeout_for(self, agent):
+        """Timeout adaptativo (segundos) para un intento."""
+        with self._lock:
+            return self._get(agent)[0].timeout()
+
+    def retries_for(self, agent):
+        """Reintentos permitidos: ninguno si el agente viene fallando."""
+        with self._lock:
+            rtt, breaker = self._get(agent)
+            if breaker.state != CLOSED or breaker.consecutive_failures > 0:
+                return 0
+            # No superar el presupuesto máximo por agente
+            max_retries = int(self.max_attempt_budget / rtt.timeout()) - 1
+            return max(0, min(self.retries, max_retries))
+
+    def attempt_budget(self, agent):
+        """Tiempo máximo total (segundos) que puede costar el agente en un ciclo."""
+        timeout = self.timeout_for(agent)
+        return min(self.max_attempt_budget, timeout * (self.retries_for(agent) + 1))
+
+    def record_success(self, agent, rtt):
+        """Registra una respuesta con su RTT en segundos."""
+        with self._lock:
+            estimator, breaker = self._get(agent)
+            estimator.update(rtt)
+            breaker.record_success()
+
+    def record_failure(self, agent):
+        """Registra un timeout o error de transporte."""
+        with self._lock:
+            estimator, breaker = self._get(agent)
+            estimator.backoff()
+            breaker.record_failure()
+
+    def release(self, agent):
+        """Devuelve el sondeo de prueba de un agente que al final no se consultó."""
+        with self._lock:
+            self._get(agent)[1].release()
+
+    def seconds_until_probe(self, agent):
+        with self._lock:
+            return self._get(agent)[1].seconds_until_probe()
+
+    def snapshot(self):
+        """Devuelve una lista de dicts con el estado de cada agente."""
+        with self._lock:
+            rows = []
+            for agent, (rtt, breaker) in self._agents.items():
+                rows.append({
+                    'Agent': agent,
+                    'SRTT_ms': round(rtt.srtt * 1000, 1) if rtt.srtt is not None else None,
+                    'RTTVAR_ms': round(rtt.rttvar * 1000, 1) if rtt.rttvar is not None else None,
+                    'Timeout_s': round(rtt.timeout(), 3),
+                    'Circuit': breaker.state,
+                    'Failures': breaker.consecutive_failures
+                })
+            return rows
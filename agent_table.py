@@ -0,0 +1,199 @@
+"""
+Tabla virtualizada de agentes para la GUI.
+Solo existen en el Treeview las filas visibles; al desplazarse se reutilizan
+y entre refrescos solo se reescriben las celdas que cambiaron.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+# Columnas mostradas: (clave en los datos del agente, título, ancho, formato)
+COLUMNS = (
+    ('Agent', 'Agente', 90, '{}'),
+    ('Device_Type', 'Tipo', 150, '{}'),
+    ('Utilization_%', 'Util. %', 70, '{:.1f}'),
+    ('Error_Rate_%', 'Error %', 70, '{:.4f}'),
+    ('IN_Octets', 'IN Octetos', 110, '{:,}'),
+    ('OUT_Octets', 'OUT Octetos', 110, '{:,}'),
+    ('Status', 'Estado', 80, '{}'),
+    ('Anomaly', 'Anomalía', 90, '{}'),
+)
+
+# Refresco máximo de la tabla (ms)
+REFRESH_MS = 250
+
+
+class VirtualAgentTable:
+    """
+    Tabla ordenable y filtrable respaldada por el último snapshot de agentes.
+
+    Args:
+        parent: Widget contenedor
+        visible_rows: Número de filas que se dibujan a la vez
+        refresh_ms: Intervalo mínimo entre repintados
+    """
+
+    def __init__(self, parent, visible_rows=12, refresh_ms=REFRESH_MS):
+        self.frame = ttk.Frame(parent)
+        self.visible_rows = visible_rows
+        self.refresh_ms = refresh_ms
+
+        self._rows = []          # snapshot completo
+        self._view = []          # filas tras filtrar y ordenar
+        self._offset = 0
+        self._sort_key = None
+        self._sort_desc = False
+        self._filter = ""
+        self._dirty = False      # hay datos u opciones pendientes de aplicar
+        self._slot_values = [None] * visible_rows  # lo que muestra cada fila física
+
+        self._create_ui()
+        self.frame.after(self.refresh_ms, self._tick)
+
+    def _create_ui(self):
+        # Barra de filtro
+        filter_row = ttk.Frame(self.frame)
+        filter_row.pack(fill=tk.X, pady=(0, 3))
+        ttk.Label(filter_row, text="Filtro:").pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *_: self._set_filter(self.filter_var.get()))
+        ttk.Entry(filter_row, textvariable=self.filter_var, width=25).pack(side=tk.LEFT)
+        self.count_label = ttk.Label(filter_row, text="0 agentes", foreground='gray')
+        self.count_label.pack(side=tk.RIGHT)
+
+        body = ttk.Frame(self.frame)
+        body.pack(fill=tk.BOTH, expand=True)
+
+        keys = [key for key, _, _, _ in COLUMNS]
+        self.tree = ttk.Treeview(body, columns=keys, show='headings',
+                                 height=self.visible_rows, selectmode='browse')
+        for key, title, width, fmt in COLUMNS:
+            self.tree.heading(key, text=title, command=lambda k=key: self._set_sort(k))
+            # Texto a la izquierda, números a la derecha
+            self.tree.column(key, width=width, anchor='w' if fmt == '{}' else 'e')
+        self.tree.tag_configure('alert', foreground='#c0392b')
+        self.tree.tag_configure('anomaly', foreground='#d35400')
+
+        # Filas físicas fijas: se reutilizan al desplazarse
+        self._slots = [self.tree.insert('', tk.END, values=()) for _ in range(self.visible_rows)]
+
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_to(self._offset - 3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_to(self._offset + 3))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # --- API ---
+    def update(self, rows):
+        """Publica un nuevo snapshot; se pintará en el próximo refresco."""
+        self._rows = rows
+        self._dirty = True
+
+    # --- ORDEN Y FILTRO ---
+    def _set_sort(self, key):
+        if self._sort_key == key:
+            self._sort_desc = not self._sort_desc
+        else:
+            self._sort_key, self._sort_desc = key, False
+        for k, title, _, _ in COLUMNS:
+            arrow = (" ▼" if self._sort_desc else " ▲") if k == key else ""
+            self.tree.heading(k, text=title + arrow)
+        self._dirty = True
+
+    def _set_filter(self, text):
+        self._filter = text.strip().lower()
+        self._offset = 0
+        self._dirty = True
+
+    def _rebuild_view(self):
+        rows = self._rows
+        if self._filter:
+            f = self._filter
+            rows = [r for r in rows
+                    if f in str(r.get('Agent', '')).lower()
+                    or f in str(r.get('Device_Type', '')).lower()
+                    or f in str(r.get('Status', '')).lower()
+                    or f in str(r.get('Anomaly', '')).lower()]
+        else:
+            rows = list(rows)
+        if self._sort_key:
+            key = self._sort_key
+            rows.sort(key=lambda r: (r.get(key) is None, r.get(key, 0)), reverse=self._sort_desc)
+        self._view = rows
+        self._offset = max(0, min(self._offset, len(rows) - self.visible_rows))
+        self.count_label.config(text=f"{len(rows):,} de {len(self._rows):,} agentes")
+
+    # --- DESPLAZAMIENTO ---
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self._scroll_to(int(float(value) * len(self._view)))
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self._scroll_to(self._offset + int(value) * step)
+
+    def _on_wheel(self, event):
+        self._scroll_to(self._offset - (3 if event.delta > 0 else -3))
+        return 'break'
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(offset, len(self._view) - self.visible_rows))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    # --- PINTADO ---
+    def _tick(self):
+        """Refresco a ritmo fijo: agrupa todas las actualizaciones del intervalo."""
+        if self._dirty:
+            self._dirty = False
+            self._rebuild_view()
+            self._render()
+        self.frame.after(self.refresh_ms, self._tick)
+
+    def _render(self):
+        """Reescribe solo las celdas visibles que cambiaron."""
+        window = self._view[self._offset:self._offset + self.visible_rows]
+        for slot_index, iid in enumerate(self._slots):
+            if slot_index < len(window):
+                row = window[slot_index]
+                values = tuple(self._format(row.get(key), fmt) for key, _, _, fmt in COLUMNS)
+            else:
+                values = ('',) * len(COLUMNS)
+            previous = self._slot_values[slot_index]
+            if previous == values:
+                continue
+            if previous is None:
+                self.tree.item(iid, values=values)
+            else:
+                for (key, _, _, _), old, new in zip(COLUMNS, previous, values):
+                    if old != new:
+                        self.tree.set(iid, key, new)
+            tags = ()
+            if slot_index < len(window):
+                if window[slot_index].get('Status') == 'ALERTA':
+                    tags = ('alert',)
+                elif window[slot_index].get('Anomaly'):
+                    tags = ('anomaly',)
+            self.tree.item(iid, tags=tags)
+            self._slot_values[slot_index] = values
+
+        total = len(self._view)
+        if total:
+            first = self._offset / total
+            last = min(1.0, (self._offset + self.visible_rows) / total)
+            self.scrollbar.set(first, last)
+        else:
+            self.scrollbar.set(0, 1)
+
+    @staticmethod
+    def _format(value, fmt):
+        if value is None:
+            return ''
+        try:
+            return fmt.format(value)
+        except (ValueError, TypeError):
+            return str(value)
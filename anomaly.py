@@ -0,0 +1,184 @@
+"""
+Detección de anomalías en línea sobre las métricas de cada agente.
+Cada serie (agente × métrica) guarda dos líneas base EWMA, una rápida y
+una lenta, con su media y su varianza. La memoria es O(1) por serie y la
+actualización se vectoriza con NumPy para toda la flota en cada sondeo.
+
+- Pico: la muestra se aleja más de `threshold` desviaciones de la base rápida.
+- Deriva: la base rápida se separa de la lenta (degradación progresiva que
+  un umbral fijo no ve hasta que es tarde).
+
+Complementa a los umbrales fijos de Status: un enlace siempre cargado no
+alarma por su carga habitual, pero sí cuando cambia su comportamiento.
+"""
+import time
+
+import numpy as np
+
+from metrics import REGISTRY
+
+ANOMALIES = REGISTRY.counter('anomaly_flags_total', 'Muestras marcadas como anómalas').labels()
+UPDATE_SECONDS = REGISTRY.histogram('anomaly_update_seconds',
+                                    'Duración de cada actualización del detector').labels()
+SERIES = REGISTRY.gauge('anomaly_series', 'Series vigiladas por el detector de anomalías').labels()
+
+# Métrica vigilada -> nombre corto en la columna Anomaly
+DEFAULT_FIELDS = {'Utilization_%': 'Util', 'Error_Rate_%': 'Err'}
+# Desviación mínima de cada métrica, en sus unidades (puntos porcentuales): en
+# un enlace casi ocioso la varianza es ~0 y cualquier ruido daría z enormes
+DEFAULT_FLOORS = {'Utilization_%': 0.5, 'Error_Rate_%': 0.05}
+DEFAULT_FLOOR = 1e-3
+
+_SPIKE_MARKS = ('↓', '↑')
+_DRIFT_MARKS = ('↘', '↗')
+
+
+class EwmaBaseline:
+    """Media y varianza EWMA de muchas series en arrays contiguos (filas = series)."""
+
+    def __init__(self, n_fields, alpha, capacity=1024, floor=DEFAULT_FLOOR):
+        self.alpha = alpha
+        self.floor = np.broadcast_to(np.asarray(floor, dtype=np.float64), (n_fields,))
+        self.mean = np.zeros((capacity, n_fields))
+        self.var = np.zeros((capacity, n_fields))
+
+    def grow(self, capacity):
+        extra = capacity - len(self.mean)
+        if extra > 0:
+            pad = np.zeros((extra, self.mean.shape[1]))
+            self.mean = np.vstack((self.mean, pad))
+            self.var = np.vstack((self.var, pad))
+
+    def std(self, idx):
+        """Desviación con suelo por métrica: las series planas no dividen por cero."""
+        mean = self.mean[idx]
+        return np.maximum(np.sqrt(self.var[idx]), self.floor + 0.01 * np.abs(mean))
+
+    def update(self, idx, values, valid, count):
+        """
+        Incorpora una muestra por serie. Con pocas muestras el peso es
+        1/(n+1) (media acumulada): la base no arrastra el sesgo del primer valor.
+        """
+        alpha = np.maximum(self.alpha, 1.0 / (count + 1))[:, None]
+        mean = self.mean[idx]
+        var = self.var[idx]
+        diff = values - mean
+        incr = alpha * diff
+        self.mean[idx] = np.where(valid, mean + incr, mean)
+        self.var[idx] = np.where(valid, (1 - alpha) * (var + diff * incr), var)
+
+
+class AnomalyDetector:
+    """
+    Detector para toda la flota.
+
+    Args:
+        fields: {métrica: nombre corto} a vigilar en cada fila
+        key: Campo que identifica la serie (agente)
+        alpha, slow_alpha: Pesos de las bases rápida y lenta
+        threshold: Desviaciones para marcar un pico
+        drift_threshold: Errores estándar entre las bases para marcar deriva
+        warmup: Muestras antes de empezar a marcar
+        floors: {métrica: desviación mínima en sus unidades} (DEFAULT_FLOORS)
+    """
+
+    def __init__(self, fields=None, key='Agent', alpha=0.1, slow_alpha=0.01, threshold=4.0,
+                 drift_threshold=4.0, warmup=10, capacity=1024, floors=None):
+        self.fields = dict(fields or DEFAULT_FIELDS)
+        self.key = key
+        self.threshold = threshold
+        self.drift_threshold = drift_threshold
+        self.warmup = warmup
+        self.capacity = capacity
+        self.floors = dict(DEFAULT_FLOORS if floors is None else floors)
+        n = len(self.fields)
+        floor = [self.floors.get(f, DEFAULT_FLOOR) for f in self.fields]
+        self.fast = EwmaBaseline(n, alpha, capacity, floor)
+        self.slow = EwmaBaseline(n, slow_alpha, capacity, floor)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self._index = {}  # clave de la serie -> fila en los arrays
+
+    def __len__(self):
+        return len(self._index)
+
+    def reset(self):
+        self.__init__(self.fields, self.key, self.fast.alpha, self.slow.alpha, self.threshold,
+                      self.drift_threshold, self.warmup, self.capacity, self.floors)
+
+    def rows_for(self, keys):
+        """Fila de cada clave; las series nuevas se crean al vuelo."""
+        index = self._index
+        idx = np.fromiter((index.setdefault(k, len(index)) for k in keys), dtype=np.int64,
+                          count=len(keys))
+        if len(index) > len(self.count):
+            capacity = max(len(index), 2 * len(self.count))
+            self.fast.grow(capacity)
+            self.slow.grow(capacity)
+            self.count = np.concatenate((self.count, np.zeros(capacity - len(self.count), np.int64)))
+        SERIES.set(len(index))
+        return idx
+
+    def update(self, keys, values):
+        """
+        Añade una muestra por serie. `values` es (series × métricas) con NaN
+        donde falte el dato. Retorna (z del pico, z de la deriva), ambos a 0
+        durante el calentamiento de cada serie.
+        """
+        idx = self.rows_for(keys)
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        count = self.count[idx]
+
+        # Puntuar contra la base previa y después incorporar la muestra
+        std = self.fast.std(idx)
+        spike = (values - self.fast.mean[idx]) / std
+        # Error estándar de (media rápida - media lenta) si no hubiera cambio
+        a_fast = self.fast.alpha
+        n_slow = np.minimum(count, (2 - self.slow.alpha) / self.slow.alpha)
+        se = std * np.sqrt(a_fast / (2 - a_fast) + 1.0 / np.maximum(n_slow, 1))[:, None]
+        drift = (self.fast.mean[idx] - self.slow.mean[idx]) / se
+        cold = (count < self.warmup)[:, None] | ~valid
+        spike[cold] = 0.0
+        drift[cold] = 0.0
+
+        clean = np.where(valid, values, 0.0)
+        self.fast.update(idx, clean, valid, count)
+        self.slow.update(idx, clean, valid, count)
+        self.count[idx] = count + valid.any(axis=1)
+        return spike, drift
+
+    def annotate(self, rows):
+        """
+        Actualiza con un sondeo y añade a cada fila 'Anomaly' (p. ej.
+        'Util↑ Err↗', vacío si nada destaca) y 'Anomaly_Score' (mayor |z|).
+        Retorna cuántas filas quedaron marcadas.
+        """
+        if not rows:
+            return 0
+        start = time.perf_counter()
+        key = self.key
+        names = list(self.fields)
+        keys = [row[key] for row in rows]
+        values = np.array([[row.get(f, np.nan) for f in names] for row in rows], dtype=np.float64)
+        spike, drift = self.update(keys, values)
+
+        spiking = np.abs(spike) > self.threshold
+        drifting = np.abs(drift) > self.drift_threshold
+        flagged = spiking.any(axis=1) | drifting.any(axis=1)
+        score = np.round(np.maximum(np.abs(spike), np.abs(drift)).max(axis=1), 1)
+        short = list(self.fields.values())
+        for i, row in enumerate(rows):
+            row['Anomaly_Score'] = float(score[i])
+            row['Anomaly'] = ''
+        for i in np.flatnonzero(flagged):
+            marks = []
+            for j, name in enumerate(short):
+                if spiking[i, j]:
+                    marks.append(name + _SPIKE_MARKS[int(spike[i, j] > 0)])
+                elif drifting[i, j]:
+                    marks.append(name + _DRIFT_MARKS[int(drift[i, j] > 0)])
+            rows[i]['Anomaly'] = ' '.join(marks)
+        n_flagged = int(flagged.sum())
+        ANOMALIES.inc(n_flagged)
+        UPDATE_SECONDS.observe(time.perf_counter() - start)
+        return n_flagged
@@ -0,0 +1,350 @@
+"""
+API HTTP/JSON local de solo lectura servida junto al colector.
+Cada respuesta se serializa una vez por versión de los datos y se guarda
+con su ETag: los clientes que consultan cada segundo reciben la copia en
+caché o un 304 si envían If-None-Match. Los rangos de historial grandes
+se envían en streaming (Transfer-Encoding: chunked).
+
+Endpoints:
+    GET /api/snmp/latest     último snapshot SNMP
+    GET /api/rmon/latest     último snapshot RMON
+    GET /api/interfaces/latest  filas por interfaz del último recorrido de tablas
+    GET /api/alarms          alarmas RMON del último sondeo
+    GET /api/hosts           hosts descubiertos y top talkers RMON
+    GET /api/history?agent=&start=&end=   historial SNMP (ISO 8601)
+    GET /api/versions        versión actual de cada conjunto de datos
+
+Las rutas de snapshots aceptan ?after=N: si la versión actual no es
+posterior a N, la respuesta espera (hasta ?wait= segundos, 25 por
+defecto) a que se publique la siguiente. La espera es un Future del bucle
+que la publicación resuelve con call_soon_threadsafe: no ocupa hilos.
+"""
+import asyncio
+import json
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+from metrics import REGISTRY
+from records import json_default
+
+_REQUESTS = REGISTRY.counter('api_requests_total', 'Peticiones a la API HTTP')
+_CACHE_MISSES = REGISTRY.counter('api_cache_misses_total',
+                                 'Respuestas que hubo que serializar').labels()
+_REQUEST_SECONDS = REGISTRY.histogram('api_request_seconds', 'Latencia de la API HTTP').labels()
+
+# Filas de historial a partir de las cuales la respuesta va en streaming
+STREAM_THRESHOLD = 2000
+MAX_REQUEST_LINE = 8192
+# Espera máxima de una petición ?after=N
+MAX_LONG_POLL = 25.0
+# Consultas de historial distintas que se guardan serializadas
+HISTORY_CACHE_SIZE = 16
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, default=json_default).encode('utf-8')
+
+
+class ApiServer:
+    """
+    Servidor asyncio en un hilo propio.
+
+    Args:
+        logic: NetworkLogic del que se leen los datos
+        host, port: Dirección de escucha (solo local por defecto)
+    """
+
+    def __init__(self, logic, host="127.0.0.1", port=9109):
+        self.logic = logic
+        self.host = host
+        self.port = port
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._cache = {}  # ruta -> (versión, etag, cuerpo)
+        # (agente, inicio, fin) -> (versión SNMP, filas, bloques serializados por agente)
+        self._history_cache = {}
+        self._waiters = {}    # conjunto de datos -> Futures de peticiones ?after=N
+        self._listeners = {}  # conjunto de datos -> oyente registrado en logic
+        # ruta -> (conjuntos de datos de los que depende, productor(datos...))
+        self._routes = {
+            '/api/snmp/latest': (('snmp',), lambda snmp: snmp),
+            '/api/rmon/latest': (('rmon',), lambda rmon: rmon),
+            '/api/interfaces/latest': (('interfaces',), lambda rows: rows),
+            '/api/alarms': (('rmon',), lambda rmon: rmon.get('alarms', [])),
+            '/api/hosts': (('hosts', 'rmon'), self._hosts),
+        }
+
+    @staticmethod
+    def _hosts(hosts, rmon):
+        return {
+            'discovered': hosts,
+            'top_talkers': rmon.get('hosts', []),
+        }
+
+    # --- Ciclo de vida ---
+    def start(self):
+        """Arranca el servidor. Retorna False si el puerto no está disponible."""
+        started = threading.Event()
+        result = {}
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self._server = self.loop.run_until_complete(
+                    asyncio.start_server(self._handle, self.host, self.port))
+                result['ok'] = True
+            except OSError:
+                result['ok'] = False
+            started.set()
+            if result['ok']:
+                self._subscribe()
+                self.loop.run_forever()
+                self._unsubscribe()
+                # Cerrar las conexiones keep-alive que sigan abiertas
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+        self._thread = threading.Thread(target=run, name="api-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return result['ok']
+
+    def _subscribe(self):
+        """Oyentes que despiertan desde el hilo del productor a las esperas ?after=N."""
+        kinds = {kinds[0] for kinds, _ in self._routes.values()}
+        for kind in kinds:
+            def listener(snapshot, kind=kind):
+                try:
+                    self.loop.call_soon_threadsafe(self._wake, kind)
+                except RuntimeError:
+                    pass  # el bucle ya se cerró
+            self._listeners[kind] = listener
+            self.logic.subscribe_snapshots(kind, listener)
+
+    def _unsubscribe(self):
+        for kind, listener in self._listeners.items():
+            self.logic.unsubscribe_snapshots(kind, listener)
+        self._listeners = {}
+
+    def _wake(self, kind):
+        """Resuelve las esperas de `kind`. Solo desde el bucle."""
+        for future in self._waiters.pop(kind, ()):
+            if not future.done():
+                future.set_result(None)
+
+    def stop(self):
+        if self.loop and self._server:
+            def close():
+                self._server.close()
+                # Cancelar (no resolver) las esperas: la conexión se cierra sin respuesta
+                for waiters in self._waiters.values():
+                    for future in waiters:
+                        future.cancel()
+                self.loop.stop()
+            self.loop.call_soon_threadsafe(close)
+            self._thread.join(timeout=2)
+            self._server = None
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line or len(request_line) > MAX_REQUEST_LINE:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, 400, _dumps({'error': 'Petición mal formada'}))
+                    break
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                start = self.loop.time()
+                await self._dispatch(writer, method, target, headers, keep_alive)
+                _REQUEST_SECONDS.observe(self.loop.time() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, writer, method, target, headers, keep_alive):
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        _REQUESTS.labels(path=path if path in self._routes or path in
+                         ('/api/history', '/api/versions') else 'otros').inc()
+        if method not in ('GET', 'HEAD'):
+            await self._send(writer, 405, _dumps({'error': 'Solo GET'}), keep_alive=keep_alive)
+            return
+        head = method == 'HEAD'
+        try:
+            if path in self._routes:
+                kinds, producer = self._routes[path]
+                query = parse_qs(url.query)
+                if 'after' in query:
+                    await self._wait_after(kinds[0], query)
+                version, etag, body = self._cached(path, kinds, producer)
+            elif path == '/api/versions':
+                body = _dumps(self.logic.data_versions())
+                etag = None
+            elif path == '/api/history':
+                await self._history(writer, parse_qs(url.query), headers, keep_alive, head)
+                return
+            else:
+                await self._send(writer, 404, _dumps({'error': f'Ruta desconocida: {path}'}),
+                                 keep_alive=keep_alive)
+                return
+        except ValueError as e:
+            await self._send(writer, 400, _dumps({'error': str(e)}), keep_alive=keep_alive)
+            return
+        except Exception as e:
+            await self._send(writer, 500, _dumps({'error': str(e)}), keep_alive=keep_alive)
+            return
+
+        if etag and headers.get('if-none-match') == etag:
+            await self._send(writer, 304, b'', etag=etag, keep_alive=keep_alive)
+        else:
+            await self._send(writer, 200, body, etag=etag, keep_alive=keep_alive, head=head)
+
+    def _cached(self, path, kinds, producer):
+        """Cuerpo serializado de la ruta para la versión actual de sus datos."""
+        # Cada snapshot se toma una sola vez: versión y datos siempre concuerdan
+        snapshots = [self.logic.snapshot(kind) for kind in kinds]
+        version = tuple(snap.version for snap in snapshots)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached
+        _CACHE_MISSES.inc()
+        body = _dumps(producer(*(snap.data for snap in snapshots)))
+        tag = "-".join(map(str, version))
+        cached = (version, f'"{kinds[0]}-{tag}"', body)
+        self._cache[path] = cached
+        return cached
+
+    async def _wait_after(self, kind, query):
+        """Long-poll: espera sin hilos a una versión posterior a ?after=N."""
+        try:
+            after = int(query['after'][0])
+            wait = min(float(query.get('wait', [MAX_LONG_POLL])[0]), MAX_LONG_POLL)
+        except ValueError:
+            raise ValueError("after y wait deben ser numéricos")
+        # Registrar el Future antes de ceder el bucle: una publicación posterior
+        # a la comprobación siempre llega a _wake después
+        deadline = self.loop.time() + wait
+        server = self._server
+        while self.logic.data_version(kind) <= after and server and server.is_serving():
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            future = self.loop.create_future()
+            waiters = self._waiters.setdefault(kind, set())
+            waiters.add(future)
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                break
+            finally:
+                waiters.discard(future)
+
+    async def _history(self, writer, query, headers, keep_alive, head):
+        store = self.logic.snmp_history
+        agent = query.get('agent', [None])[0]
+        start = query.get('start', [None])[0]
+        end = query.get('end', [None])[0]
+        agents = store.agents()
+        if agent and agent not in agents:
+            await self._send(writer, 404, _dumps({'error': f'Agente desconocido: {agent}'}),
+                             keep_alive=keep_alive)
+            return
+        if agent:
+            agents = [agent]
+        # El historial solo crece con cada sondeo SNMP: la versión SNMP basta para el ETag
+        etag = f'"history-{self.logic.data_version("snmp")}-{agent}-{start}-{end}"'
+        if headers.get('if-none-match') == etag:
+            await self._send(writer, 304, b'', etag=etag, keep_alive=keep_alive)
+            return
+
+        count, parts = await self._history_parts(agents, agent, start, end)
+        if count < STREAM_THRESHOLD:
+            body = b'[' + b','.join(parts) + b']'
+            await self._send(writer, 200, body, etag=etag, keep_alive=keep_alive, head=head)
+            return
+
+        # Rango grande: enviar por bloques, un agente cada vez
+        writer.write(self._status_line(200, etag, keep_alive) +
+                     b'Transfer-Encoding: chunked\r\n\r\n')
+        if head:
+            await writer.drain()
+            return
+        first = True
+        for part in parts:
+            chunk = (b'[' if first else b',') + part
+            first = False
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            await writer.drain()
+        tail = b'[]' if first else b']'
+        writer.write(b'%x\r\n%s\r\n0\r\n\r\n' % (len(tail), tail))
+        await writer.drain()
+
+    async def _history_parts(self, agents, agent, start, end):
+        """
+        Filas del rango serializadas por agente (sin corchetes), una sola vez
+        por versión SNMP. La lectura del almacén va al pool del bucle para no
+        bloquear al resto de clientes.
+        """
+        version = self.logic.data_version('snmp')
+        key = (agent, start, end)
+        cached = self._history_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        _CACHE_MISSES.inc()
+        count, parts = await self.loop.run_in_executor(
+            None, self._read_history, agents, start, end)
+        # Las consultas de versiones anteriores ya no se van a servir
+        self._history_cache = {k: v for k, v in self._history_cache.items() if v[0] == version}
+        while len(self._history_cache) >= HISTORY_CACHE_SIZE:
+            self._history_cache.pop(next(iter(self._history_cache)))
+        self._history_cache[key] = (version, count, parts)
+        return count, parts
+
+    def _read_history(self, agents, start, end):
+        store = self.logic.snmp_history
+        count, parts = 0, []
+        for name in agents:
+            rows = store.rows(name, start, end)
+            if rows:
+                count += len(rows)
+                parts.append(_dumps(rows)[1:-1])
+        return count, parts
+
+    @staticmethod
+    def _status_line(status, etag=None, keep_alive=True):
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}",
+                 "Content-Type: application/json; charset=utf-8",
+                 "Cache-Control: no-cache",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        return ("\r\n".join(lines) + "\r\n").encode('latin-1')
+
+    async def _send(self, writer, status, body, etag=None, keep_alive=True, head=False):
+        writer.write(self._status_line(status, etag, keep_alive) +
+                     b'Content-Length: %d\r\n\r\n' % len(body))
+        if body and not head:
+            writer.write(body)
+        await writer.drain()
@@ -0,0 +1,273 @@
+"""
+Informe por lotes: gráficos de todos los agentes sin GUI.
+Cada agente del historial (HistoryStore guardado en disco) obtiene una
+figura con utilización, paquetes y alarmas, renderizada con el backend Agg
+de matplotlib en un pool de procesos, más un index.html con el resumen.
+
+Cada proceso construye la figura una sola vez (ejes, líneas, umbrales,
+formato de fechas) y para cada agente solo cambia los datos de los artistas
+y la guarda. No se usa pyplot: el backend TkAgg que elige visualizer.py para
+la GUI no se ve afectado.
+"""
+import html
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from history_store import HistoryStore
+from metrics import REGISTRY
+
+FIGURES = REGISTRY.counter('report_figures_total', 'Figuras de informe renderizadas').labels()
+REPORT_SECONDS = REGISTRY.histogram('report_duration_seconds', 'Duración de cada informe por lotes').labels()
+
+FORMATS = ('png', 'svg')
+DEFAULT_THRESHOLDS = {'utilization': 80.0, 'error_rate': 1.0}
+# Por debajo de este número de agentes no compensa arrancar procesos
+MIN_AGENTS_FOR_POOL = 16
+
+_UNSAFE = re.compile(r'[^\w.-]')
+
+
+def _file_name(agent, fmt):
+    return f"{_UNSAFE.sub('_', agent)}.{fmt}"
+
+
+class _AgentRenderer:
+    """Plantilla de figura reutilizada para todos los agentes de un proceso."""
+
+    def __init__(self, snmp_path, rmon_path, output_dir, fmt, dpi, thresholds):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        import matplotlib.dates as mdates
+
+        self.snmp = HistoryStore.load(snmp_path)
+        self.rmon = HistoryStore.load(rmon_path) if rmon_path else None
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.thresholds = thresholds
+        self._date2num = mdates.date2num
+
+        fig = self.fig = Figure(figsize=(10, 8), dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax_util, ax_pkts, ax_alarm = fig.subplots(3, 1)
+        fig.subplots_adjust(left=0.08, right=0.78, top=0.92, bottom=0.07, hspace=0.5)
+        self.title = fig.suptitle('', fontsize=13, fontweight='bold')
+        for ax in (ax_util, ax_pkts, ax_alarm):
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=3, maxticks=9))
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m %H:%M'))
+            ax.grid(True, alpha=0.3)
+
+        # Utilización con su umbral
+        self.util_line, = ax_util.plot([], [], color='tab:blue', linewidth=1.5)
+        ax_util.axhline(thresholds['utilization'], color='r', linestyle='--',
+                        label=f"Umbral ({thresholds['utilization']:.0f}%)")
+        ax_util.set_ylim(0, 100)
+        ax_util.set_ylabel('Utilización (%)')
+        ax_util.set_title('Utilización', fontsize=11)
+        ax_util.legend(loc='upper left', fontsize=8)
+
+        # Paquetes por segundo (IN/OUT) y reparto unicast/broadcast/multicast (RMON)
+        self.in_line, = ax_pkts.plot([], [], color='tab:green', linewidth=1.2, label='IN')
+        self.out_line, = ax_pkts.plot([], [], color='tab:purple', linewidth=1.2, label='OUT')
+        ax_pkts.set_ylabel('Paquetes/s')
+        ax_pkts.set_title('Paquetes', fontsize=11)
+        ax_pkts.legend(loc='upper left', fontsize=8)
+        self.ax_split = fig.add_axes((0.82, 0.40, 0.15, 0.2))
+        self.split_bars = self.ax_split.bar(['Uni', 'Broad', 'Multi'], [0, 0, 0],
+                                            color=['#ff9999', '#66b3ff', '#99ff99'])
+        self.ax_split.set_ylim(0, 100)
+        self.ax_split.set_title('Tráfico RMON (%)', fontsize=9)
+        self.ax_split.tick_params(labelsize=7)
+
+        # Tasa de error con su umbral y periodos en ALERTA
+        self.err_line, = ax_alarm.plot([], [], color='tab:orange', linewidth=1.2, label='Error (%)')
+        ax_alarm.axhline(thresholds['error_rate'], color='r', linestyle='--', linewidth=1)
+        ax_alarm.set_ylabel('Error (%)')
+        ax_alarm.set_title('Alarmas', fontsize=11)
+        ax_state = ax_alarm.twinx()
+        self.alarm_line, = ax_state.plot([], [], color='red', alpha=0.6, drawstyle='steps-post',
+                                         label='ALERTA')
+        ax_state.set_ylim(-0.05, 1.5)
+        ax_state.set_yticks([0, 1], ['OK', 'ALERTA'])
+        self.axes = (ax_util, ax_pkts, ax_alarm)
+
+    def render(self, agent, start=None, end=None):
+        """Actualiza la plantilla con los datos del agente, la guarda y retorna su resumen."""
+        cols = self.snmp.range(agent, start, end)
+        if cols is None or not len(cols['timestamp']):
+            return None
+        ts = cols['timestamp']
+        # Eje en hora local: se convierte la primera muestra y el resto se desplaza en días
+        x = self._date2num(datetime.fromtimestamp(ts[0])) + (ts - ts[0]) / 86400.0
+        labels = cols['labels']
+        alarm = np.array([labels[c] == 'ALERTA' for c in cols['Status']], dtype=np.float64)
+        anomalies = sum(1 for c in cols['Anomaly'] if labels[c])
+        util = cols['Utilization_%']
+
+        # Tasas a partir de contadores; los saltos atrás (reinicio, wrap) quedan en blanco
+        dt = np.diff(ts)
+        rates = []
+        for name in ('IN_Packets', 'OUT_Packets'):
+            delta = np.diff(cols[name]).astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rate = np.where((delta >= 0) & (dt > 0), delta / dt, np.nan)
+            rates.append(rate)
+
+        self.util_line.set_data(x, util)
+        self.in_line.set_data(x[1:], rates[0])
+        self.out_line.set_data(x[1:], rates[1])
+        self.err_line.set_data(x, cols['Error_Rate_%'])
+        self.alarm_line.set_data(x, alarm)
+        # Mismo periodo en los tres paneles (las tasas empiezan en la segunda muestra)
+        span = (x[0], x[-1]) if len(x) > 1 else (x[0] - 0.01, x[0] + 0.01)
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view(scalex=False, scaley=ax is not self.axes[0])
+            ax.set_xlim(*span)
+
+        split = self._traffic_split(agent)
+        self.ax_split.set_visible(split is not None)
+        for bar, value in zip(self.split_bars, split or (0, 0, 0)):
+            bar.set_height(value)
+
+        statics = cols['statics'][-1][1] if cols['statics'] else ()
+        device = dict(zip(self.snmp.schema.static, statics))
+        name = device.get('Device_Name') or ''
+        self.title.set_text(f"{agent}  {name}".strip())
+        file_name = _file_name(agent, self.fmt)
+        self.fig.savefig(os.path.join(self.output_dir, file_name), format=self.fmt)
+        FIGURES.inc()
+        return {
+            'agent': agent, 'file': file_name, 'device_name': name,
+            'device_type': device.get('Device_Type') or '', 'samples': int(len(ts)),
+            'util_avg': float(np.mean(util)), 'util_max': float(np.max(util)),
+            'alarm_pct': float(alarm.mean() * 100), 'anomalies': anomalies,
+            'first': float(ts[0]), 'last': float(ts[-1]),
+        }
+
+    def _traffic_split(self, agent):
+        """% unicast/broadcast/multicast de la última muestra RMON del agente."""
+        if self.rmon is None:
+            return None
+        row = self.rmon.latest(agent)
+        if not row or not row.get('Packets'):
+            return None
+        total = row['Packets']
+        broadcast, multicast = row['Broadcast_Pkts'], row['Multicast_Pkts']
+        return tuple(100.0 * v / total for v in (total - broadcast - multicast, broadcast, multicast))
+
+
+# --- Procesos del pool ---
+_renderer = None
+
+
+def _init_worker(*args):
+    global _renderer
+    _renderer = _AgentRenderer(*args)
+
+
+def _render_agent(job):
+    agent, start, end = job
+    return _renderer.render(agent, start, end)
+
+
+class ReportGenerator:
+    """
+    Genera el informe de todos los agentes de un historial SNMP guardado.
+
+    Args:
+        snmp_path: Historial SNMP (HistoryStore.save)
+        rmon_path: Historial RMON opcional para el reparto de tráfico
+        output_dir: Directorio del informe (por defecto reports/informe_<fecha>)
+        fmt: 'png' o 'svg'
+        workers: Procesos del pool (None = núcleos de la máquina)
+    """
+
+    def __init__(self, snmp_path, rmon_path=None, output_dir=None, fmt='png', workers=None, dpi=80,
+                 thresholds=None, log_callback=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato no soportado: {fmt}")
+        self.snmp_path = snmp_path
+        self.rmon_path = rmon_path
+        self.output_dir = output_dir or os.path.join(
+            'reports', f"informe_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self.fmt = fmt
+        self.workers = workers
+        self.dpi = dpi
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.log_callback = log_callback
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    def run(self, agents=None, start=None, end=None):
+        """Renderiza los agentes (todos por defecto) y escribe index.html. Retorna su ruta."""
+        began = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        if agents is None:
+            agents = HistoryStore.load(self.snmp_path).agents()
+        jobs = [(agent, start, end) for agent in agents]
+        init_args = (self.snmp_path, self.rmon_path, self.output_dir, self.fmt, self.dpi, self.thresholds)
+        workers = self.workers or os.cpu_count() or 1
+        if len(jobs) < MIN_AGENTS_FOR_POOL or workers == 1:
+            renderer = _AgentRenderer(*init_args)
+            summaries = [renderer.render(*job) for job in jobs]
+        else:
+            # spawn: la GUI tiene hilos y Tk, que no deben heredarse con fork
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=init_args) as pool:
+                summaries = list(pool.map(_render_agent, jobs,
+                                          chunksize=max(1, len(jobs) // (workers * 4))))
+        summaries = [s for s in summaries if s]
+        index = self._write_index(summaries, time.perf_counter() - began)
+        elapsed = time.perf_counter() - began
+        REPORT_SECONDS.observe(elapsed)
+        self._log(f"📑 Informe de {len(summaries)} agente(s) en {elapsed:.1f}s: {index}")
+        return index
+
+    def _write_index(self, summaries, elapsed):
+        summaries.sort(key=lambda s: (-s['alarm_pct'], -s['util_max'], s['agent']))
+        fmt_ts = lambda ts: datetime.fromtimestamp(ts).strftime('%d/%m/%Y %H:%M')
+        rows = []
+        for s in summaries:
+            alert = ' class="alert"' if s['alarm_pct'] else ''
+            rows.append(
+                f"<tr{alert}><td><a href=\"{html.escape(s['file'])}\">{html.escape(s['agent'])}</a></td>"
+                f"<td>{html.escape(s['device_name'])}</td><td>{html.escape(s['device_type'])}</td>"
+                f"<td>{s['samples']}</td><td>{s['util_avg']:.1f}</td><td>{s['util_max']:.1f}</td>"
+                f"<td>{s['alarm_pct']:.1f}</td><td>{s['anomalies']}</td>"
+                f"<td>{fmt_ts(s['first'])} – {fmt_ts(s['last'])}</td>"
+                f"<td><a href=\"{html.escape(s['file'])}\"><img loading=\"lazy\" width=\"240\" "
+                f"src=\"{html.escape(s['file'])}\"></a></td></tr>")
+        samples = sum(s['samples'] for s in summaries)
+        alarmed = sum(1 for s in summaries if s['alarm_pct'])
+        page = f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>Informe de agentes</title>
+<style>
+body {{ font-family: 'Segoe UI', sans-serif; margin: 20px; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; vertical-align: middle; }}
+th {{ background: #f0f0f0; }}
+tr.alert td {{ background: #fff0f0; }}
+</style></head><body>
+<h1>Informe de agentes</h1>
+<p>Generado el {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} en {elapsed:.1f}s ·
+{len(summaries)} agentes · {samples:,} muestras · {alarmed} con periodos en ALERTA ·
+umbrales: utilización {self.thresholds['utilization']:.0f}%, error {self.thresholds['error_rate']}%</p>
+<table>
+<tr><th>Agente</th><th>Nombre</th><th>Tipo</th><th>Muestras</th><th>Util. media (%)</th>
+<th>Util. máx. (%)</th><th>En ALERTA (%)</th><th>Anomalías</th><th>Periodo</th><th>Gráfico</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+        path = os.path.join(self.output_dir, 'index.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(page)
+        return path
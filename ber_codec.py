@@ -0,0 +1,337 @@
+"""
+Códec BER mínimo para SNMPv1/v2c (ruta rápida).
+Las peticiones GET/GETNEXT/GETBULK de cada sondeo se codifican una sola vez
+por conjunto de OIDs; en cada envío solo se parchea el request-id (un
+INTEGER de 4 bytes fijos) y, si cambia, la comunidad. Las respuestas se
+decodifican sobre un memoryview sin copiar el datagrama.
+"""
+import itertools
+import random
+import struct
+import threading
+
+from oid_table import (INTEGER, OCTET_STRING, OBJECT_IDENTIFIER, IP_ADDRESS, COUNTER32,
+                       GAUGE32, TIMETICKS, OPAQUE, COUNTER64)
+
+VERSION_1 = 0
+VERSION_2C = 1
+
+# Etiquetas de PDU
+GET = 0xA0
+GETNEXT = 0xA1
+RESPONSE = 0xA2
+SET = 0xA3
+GETBULK = 0xA5
+
+SEQUENCE = 0x30
+NULL = 0x05
+
+# Excepciones de varbind en SNMPv2
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+# Rango de request-id cuya codificación mínima ocupa exactamente 4 bytes
+REQUEST_ID_MIN = 0x00800000
+REQUEST_ID_MAX = 0x7FFFFFFF
+
+_UNSIGNED_TAGS = frozenset((COUNTER32, GAUGE32, TIMETICKS, COUNTER64))
+_REQUEST_ID = struct.Struct('>I')
+
+
+class BerError(ValueError):
+    """Datagrama mal formado o no soportado por el códec."""
+
+
+class VarbindException:
+    """Valor especial de SNMPv2 (noSuchObject, noSuchInstance, endOfMibView)."""
+    __slots__ = ('tag', 'name')
+
+    def __init__(self, tag, name):
+        self.tag = tag
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+    def __bool__(self):
+        return False
+
+
+NO_SUCH_OBJECT_VALUE = VarbindException(NO_SUCH_OBJECT, 'noSuchObject')
+NO_SUCH_INSTANCE_VALUE = VarbindException(NO_SUCH_INSTANCE, 'noSuchInstance')
+END_OF_MIB_VIEW_VALUE = VarbindException(END_OF_MIB_VIEW, 'endOfMibView')
+_EXCEPTIONS = {
+    NO_SUCH_OBJECT: NO_SUCH_OBJECT_VALUE,
+    NO_SUCH_INSTANCE: NO_SUCH_INSTANCE_VALUE,
+    END_OF_MIB_VIEW: END_OF_MIB_VIEW_VALUE,
+}
+
+
+# --- CODIFICACIÓN ---
+def _length(n):
+    if n < 0x80:
+        return bytes((n,))
+    body = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+    return bytes((0x80 | len(body),)) + body
+
+
+def _tlv(tag, content):
+    return bytes((tag,)) + _length(len(content)) + content
+
+
+def _encode_int(value, tag=INTEGER):
+    if tag in _UNSIGNED_TAGS:
+        # Sin signo: byte 0x00 delante si el bit alto queda activo
+        size = value.bit_length() // 8 + 1
+        return _tlv(tag, value.to_bytes(size, 'big'))
+    size = (value + (value < 0)).bit_length() // 8 + 1
+    return _tlv(tag, value.to_bytes(size, 'big', signed=True))
+
+
+def encode_oid(oid):
+    if len(oid) < 2:
+        raise BerError(f"OID demasiado corto: {oid}")
+    body = bytearray((oid[0] * 40 + oid[1],))
+    for arc in oid[2:]:
+        if arc < 0x80:
+            body.append(arc)
+            continue
+        chunk = []
+        while arc:
+            chunk.append(arc & 0x7F)
+            arc >>= 7
+        chunk.reverse()
+        body.extend(b | 0x80 for b in chunk[:-1])
+        body.append(chunk[-1])
+    return _tlv(OBJECT_IDENTIFIER, bytes(body))
+
+
+def encode_value(tag, value):
+    """Codifica un valor tipado para un SET (tag según oid_table)."""
+    if tag in (INTEGER, COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+        return _encode_int(int(value), tag)
+    if tag == OCTET_STRING:
+        return _tlv(tag, value.encode('utf-8') if isinstance(value, str) else bytes(value))
+    if tag == OBJECT_IDENTIFIER:
+        return encode_oid(value)
+    if tag == IP_ADDRESS:
+        return _tlv(tag, bytes(int(p) for p in value.split('.')) if isinstance(value, str) else bytes(value))
+    if tag == OPAQUE:
+        return _tlv(tag, bytes(value))
+    if tag == NULL:
+        return b'\x05\x00'
+    raise BerError(f"Tipo no soportado: {tag:#x}")
+
+
+def _varbind_list(varbinds):
+    body = b''.join(_tlv(SEQUENCE, encode_oid(oid) + value) for oid, value in varbinds)
+    return _tlv(SEQUENCE, body)
+
+
+def encode_message(pdu_type, request_id, varbinds, community='public', version=VERSION_2C,
+                   non_repeaters=0, max_repetitions=10):
+    """
+    Ruta general: codifica un mensaje completo.
+    `varbinds` es [(oid, (tag, valor))]; para lecturas basta [(oid, None)].
+    """
+    encoded = [(oid, b'\x05\x00' if tv is None else encode_value(*tv)) for oid, tv in varbinds]
+    if pdu_type == GETBULK:
+        fields = _encode_int(non_repeaters) + _encode_int(max_repetitions)
+    else:
+        fields = b'\x02\x01\x00\x02\x01\x00'
+    pdu = _tlv(pdu_type, _encode_int(request_id) + fields + _varbind_list(encoded))
+    return _tlv(SEQUENCE, _encode_int(version) + _tlv(OCTET_STRING, _community(community)) + pdu)
+
+
+def _community(community):
+    return community.encode('utf-8') if isinstance(community, str) else bytes(community)
+
+
+class RequestTemplate:
+    """
+    Petición de lectura precodificada para un conjunto fijo de OIDs.
+    render() copia la plantilla y escribe el request-id en su sitio; la
+    cabecera exterior se recalcula una vez por comunidad y se memoriza.
+    """
+
+    def __init__(self, oids, pdu_type=GET, version=VERSION_2C,
+                 non_repeaters=0, max_repetitions=10):
+        if pdu_type not in (GET, GETNEXT, GETBULK):
+            raise BerError("Solo GET, GETNEXT y GETBULK admiten plantilla")
+        if pdu_type == GETBULK and version == VERSION_1:
+            raise BerError("GETBULK requiere SNMPv2c")
+        self.oids = tuple(tuple(oid) for oid in oids)
+        self.pdu_type = pdu_type
+        self.version = version
+        self.max_repetitions = max_repetitions
+        if pdu_type == GETBULK:
+            fields = _encode_int(non_repeaters) + _encode_int(max_repetitions)
+        else:
+            fields = b'\x02\x01\x00\x02\x01\x00'
+        # Todo lo que va detrás del request-id dentro de la PDU
+        self._tail = fields + _varbind_list([(oid, b'\x05\x00') for oid in self.oids])
+        self._by_community = {}
+
+    def _build(self, community):
+        pdu_len = 6 + len(self._tail)
+        head = (_encode_int(self.version) + _tlv(OCTET_STRING, _community(community))
+                + bytes((self.pdu_type,)) + _length(pdu_len))
+        message_len = len(head) + pdu_len
+        prefix = bytes((SEQUENCE,)) + _length(message_len) + head + b'\x02\x04'
+        return prefix, len(prefix)
+
+    def render(self, request_id, community='public'):
+        """Datagrama listo para enviar con el request-id indicado."""
+        cached = self._by_community.get(community)
+        if cached is None:
+            cached = self._by_community[community] = self._build(community)
+        prefix, offset = cached
+        buf = bytearray(prefix + b'\0\0\0\0' + self._tail)
+        _REQUEST_ID.pack_into(buf, offset, request_id)
+        return buf
+
+
+class RequestIdAllocator:
+    """Request-ids de 4 bytes únicos y crecientes, con inicio aleatorio."""
+
+    def __init__(self, rng=None):
+        rng = rng or random.Random()
+        self._span = REQUEST_ID_MAX - REQUEST_ID_MIN + 1
+        self._counter = itertools.count(rng.randrange(self._span))
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            return REQUEST_ID_MIN + next(self._counter) % self._span
+
+
+# --- DECODIFICACIÓN ---
+def _read_tl(buf, pos, end):
+    """Lee etiqueta y longitud; devuelve (tag, inicio del contenido, fin)."""
+    if pos + 2 > end:
+        raise BerError("Datagrama truncado")
+    tag = buf[pos]
+    length = buf[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7F
+        if count == 0 or count > 4 or pos + count > end:
+            raise BerError("Longitud BER no soportada")
+        length = int.from_bytes(buf[pos:pos + count], 'big')
+        pos += count
+    stop = pos + length
+    if stop > end:
+        raise BerError("Datagrama truncado")
+    return tag, pos, stop
+
+
+def _read_int(buf, start, stop):
+    return int.from_bytes(buf[start:stop], 'big', signed=True)
+
+
+_oid_cache = {}
+
+
+def decode_oid(buf, start, stop):
+    key = bytes(buf[start:stop])
+    oid = _oid_cache.get(key)
+    if oid is not None:
+        return oid
+    first = key[0]
+    arcs = [first // 40, first % 40] if first < 80 else [2, first - 80]
+    value = 0
+    for b in key[1:]:
+        value = (value << 7) | (b & 0x7F)
+        if not b & 0x80:
+            arcs.append(value)
+            value = 0
+    oid = tuple(arcs)
+    if len(_oid_cache) < 65536:
+        _oid_cache[key] = oid
+    return oid
+
+
+class Response:
+    """
+    Respuesta decodificada. Los OCTET STRING son memoryviews sobre el
+    datagrama, que se conserva en `raw` (p. ej. para grabar el tráfico).
+    """
+    __slots__ = ('version', 'community', 'request_id', 'error_status', 'error_index', 'varbinds', 'rtt',
+                 'raw')
+
+    def __init__(self, version, community, request_id, error_status, error_index, varbinds, raw=None):
+        self.version = version
+        self.community = community
+        self.request_id = request_id
+        self.error_status = error_status
+        self.error_index = error_index
+        self.varbinds = varbinds
+        self.rtt = None
+        self.raw = raw
+
+
+def peek_request_id(data):
+    """Request-id de un datagrama sin decodificar los varbinds (para demultiplexar)."""
+    buf = memoryview(data)
+    end = len(buf)
+    _, pos, end = _read_tl(buf, 0, end)
+    _, _, pos = _read_tl(buf, pos, end)       # versión
+    _, _, pos = _read_tl(buf, pos, end)       # comunidad
+    _, pos, pdu_end = _read_tl(buf, pos, end)
+    _, start, stop = _read_tl(buf, pos, pdu_end)
+    return _read_int(buf, start, stop)
+
+
+def decode_response(data, numeric_only=False):
+    """
+    Decodifica una Response-PDU. Con numeric_only=True solo se devuelven
+    los varbinds enteros (INTEGER, contadores, Gauge, TimeTicks).
+    """
+    buf = memoryview(data)
+    tag, pos, end = _read_tl(buf, 0, len(buf))
+    if tag != SEQUENCE:
+        raise BerError("No es un mensaje SNMP")
+    tag, start, pos = _read_tl(buf, pos, end)
+    version = _read_int(buf, start, pos)
+    tag, start, pos = _read_tl(buf, pos, end)
+    community = bytes(buf[start:pos])
+    pdu_type, pos, pdu_end = _read_tl(buf, pos, end)
+    if pdu_type != RESPONSE:
+        raise BerError(f"PDU inesperada: {pdu_type:#x}")
+    _, start, pos = _read_tl(buf, pos, pdu_end)
+    request_id = _read_int(buf, start, pos)
+    _, start, pos = _read_tl(buf, pos, pdu_end)
+    error_status = _read_int(buf, start, pos)
+    _, start, pos = _read_tl(buf, pos, pdu_end)
+    error_index = _read_int(buf, start, pos)
+    tag, pos, list_end = _read_tl(buf, pos, pdu_end)
+
+    varbinds = []
+    append = varbinds.append
+    while pos < list_end:
+        _, vb_pos, vb_end = _read_tl(buf, pos, list_end)
+        _, start, stop = _read_tl(buf, vb_pos, vb_end)
+        oid = decode_oid(buf, start, stop)
+        tag, start, stop = _read_tl(buf, stop, vb_end)
+        pos = vb_end
+        if tag in _UNSIGNED_TAGS:
+            value = int.from_bytes(buf[start:stop], 'big')
+        elif tag == INTEGER:
+            value = _read_int(buf, start, stop)
+        elif numeric_only:
+            continue
+        elif tag in (OCTET_STRING, OPAQUE):
+            value = buf[start:stop]
+        elif tag == OBJECT_IDENTIFIER:
+            value = decode_oid(buf, start, stop)
+        elif tag == IP_ADDRESS:
+            value = '.'.join(str(b) for b in buf[start:stop])
+        elif tag in _EXCEPTIONS:
+            value = _EXCEPTIONS[tag]
+        elif tag == NULL:
+            value = None
+        else:
+            raise BerError(f"Tipo de valor no soportado: {tag:#x}")
+        append((oid, value))
+    return Response(version, community, request_id, error_status, error_index, varbinds, data)
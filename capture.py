@@ -0,0 +1,227 @@
+"""
+Grabación y reproducción del tráfico de sondeo.
+Un fichero de captura guarda, con su instante, cada sondeo tal como llegó:
+los datagramas de respuesta en crudo (o el error de cada agente) de los
+sondeos reales, o las filas generadas en el modo simulado. Es un flujo
+gzip de tramas:
+
+    CAP1 | long. cabecera | cabecera JSON | trama | trama | ...
+    trama = tipo (P/S) | desfase (s) | instante (epoch) | long. | contenido
+
+ReplayDriver vuelve a pasar las tramas por el mismo procesamiento que un
+sondeo en vivo (decodificación BER, tasas, alarmas, anomalías, historial
+y snapshot) a 1×, N× o a máxima velocidad, sin red y de forma
+determinista. Sirve para medir y perfilar la cadena con tráfico real.
+
+Las respuestas en crudo incluyen la comunidad SNMP: trate las capturas
+como cualquier otra traza de red.
+"""
+import gzip
+import json
+import struct
+import threading
+import time
+from datetime import datetime
+
+import ber_codec as ber
+from metrics import REGISTRY
+from records import json_default, SnmpSample
+
+MAGIC = b'CAP1'
+FORMAT_VERSION = 1
+
+POLL_FRAME = b'P'     # respuestas SNMP en crudo de un sondeo real
+SAMPLES_FRAME = b'S'  # filas de un sondeo simulado
+
+# Estado de cada agente en una trama de sondeo
+_OK, _TIMEOUT, _ERROR = 0, 1, 2
+
+_FRAME = struct.Struct('>cddI')
+_ENTRY = struct.Struct('>HBfI')
+
+_FRAMES = REGISTRY.counter('capture_frames_total', 'Tramas de captura grabadas y reproducidas')
+FRAMES_RECORDED = _FRAMES.labels(op='record')
+FRAMES_REPLAYED = _FRAMES.labels(op='replay')
+REPLAY_LAG = REGISTRY.gauge('capture_replay_lag_seconds',
+                            'Retraso de la reproducción respecto al ritmo pedido').labels()
+
+
+class CaptureWriter:
+    """Graba tramas en un fichero de captura. Seguro entre hilos."""
+
+    def __init__(self, path, compresslevel=6):
+        self.path = path
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._file = gzip.open(path, 'wb', compresslevel=compresslevel)
+        header = json.dumps({'version': FORMAT_VERSION, 'created': datetime.now().isoformat()}).encode()
+        self._file.write(MAGIC + struct.pack('>I', len(header)) + header)
+
+    def _write(self, kind, timestamp, payload):
+        with self._lock:
+            if self._file is None:
+                return
+            offset = time.monotonic() - self._start
+            self._file.write(_FRAME.pack(kind, offset, timestamp.timestamp(), len(payload)) + payload)
+            self.frames += 1
+        FRAMES_RECORDED.inc()
+
+    def poll(self, timestamp, results):
+        """Graba un sondeo real: {agente: Response o excepción}."""
+        parts = []
+        for target, result in results.items():
+            name = target.encode('utf-8')
+            if isinstance(result, Exception):
+                status = _TIMEOUT if isinstance(result, TimeoutError) else _ERROR
+                data, rtt = str(result).encode('utf-8'), 0.0
+            else:
+                status, data, rtt = _OK, bytes(result.raw), result.rtt or 0.0
+            parts.append(_ENTRY.pack(len(name), status, rtt, len(data)) + name + data)
+        self._write(POLL_FRAME, timestamp, b''.join(parts))
+
+    def samples(self, timestamp, rows):
+        """Graba las filas de un sondeo simulado."""
+        payload = json.dumps(rows, default=json_default, separators=(',', ':')).encode('utf-8')
+        self._write(SAMPLES_FRAME, timestamp, payload)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CaptureFrame:
+    """Trama leída: tipo, desfase desde el inicio de la grabación e instante original."""
+    __slots__ = ('kind', 'offset', 'timestamp', 'payload')
+
+    def __init__(self, kind, offset, timestamp, payload):
+        self.kind = kind
+        self.offset = offset
+        self.timestamp = timestamp
+        self.payload = payload
+
+    def results(self):
+        """{agente: Response o excepción}, como lo devuelve poll_many."""
+        results = {}
+        payload = memoryview(self.payload)
+        pos = 0
+        while pos < len(payload):
+            name_len, status, rtt, size = _ENTRY.unpack_from(payload, pos)
+            pos += _ENTRY.size
+            target = bytes(payload[pos:pos + name_len]).decode('utf-8')
+            pos += name_len
+            data = bytes(payload[pos:pos + size])
+            pos += size
+            if status == _OK:
+                try:
+                    result = ber.decode_response(data)
+                    result.rtt = rtt
+                except (ber.BerError, IndexError) as e:
+                    result = e
+            elif status == _TIMEOUT:
+                result = TimeoutError(data.decode('utf-8'))
+            else:
+                result = RuntimeError(data.decode('utf-8'))
+            results[target] = result
+        return results
+
+    def rows(self):
+        """Filas SnmpSample de una trama simulada."""
+        return [SnmpSample.from_dict(row) for row in json.loads(self.payload)]
+
+
+def read_capture(path):
+    """Itera las tramas (CaptureFrame) de un fichero de captura."""
+    with gzip.open(path, 'rb') as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path} no es una captura válida")
+        (size,) = struct.unpack('>I', f.read(4))
+        header = json.loads(f.read(size))
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Versión de captura no soportada: {header.get('version')}")
+        while True:
+            head = f.read(_FRAME.size)
+            if len(head) < _FRAME.size:
+                return
+            kind, offset, timestamp, length = _FRAME.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # grabación interrumpida a media trama
+            yield CaptureFrame(kind, offset, datetime.fromtimestamp(timestamp), payload)
+
+
+class ReplayStats:
+    """Resultado de una reproducción."""
+
+    def __init__(self):
+        self.frames = 0
+        self.responses = 0
+        self.rows = 0
+        self.elapsed = 0.0
+        self.busy = 0.0      # tiempo procesando (sin las esperas del ritmo)
+        self.max_lag = 0.0   # peor retraso respecto al ritmo pedido
+
+    def to_dict(self):
+        return {'frames': self.frames, 'responses': self.responses, 'rows': self.rows,
+                'elapsed_s': round(self.elapsed, 3), 'busy_s': round(self.busy, 3),
+                'rows_per_s': round(self.rows / self.busy, 1) if self.busy else 0.0,
+                'max_lag_s': round(self.max_lag, 3)}
+
+    def report(self):
+        d = self.to_dict()
+        return (f"{d['frames']} tramas, {d['responses']} respuestas, {d['rows']} filas en "
+                f"{d['elapsed_s']:.2f}s (procesando {d['busy_s']:.2f}s, {d['rows_per_s']:,.0f} filas/s, "
+                f"retraso máx. {d['max_lag_s']:.3f}s)")
+
+
+class ReplayDriver:
+    """
+    Reproduce una captura contra un NetworkLogic.
+
+    Args:
+        logic: NetworkLogic que procesa y publica los sondeos reproducidos
+        path: Fichero de captura
+        speed: 1 = ritmo original, N = N veces más rápido, 0 = sin esperas
+    """
+
+    def __init__(self, logic, path, speed=1.0, log_callback=None):
+        self.logic = logic
+        self.path = path
+        self.speed = speed
+        self.log_callback = log_callback
+
+    def run(self, task=None):
+        stats = ReplayStats()
+        start = time.monotonic()
+        first_offset = None
+        for frame in read_capture(self.path):
+            if task:
+                task.check_cancelled()
+            if first_offset is None:
+                first_offset = frame.offset
+            if self.speed:
+                due = start + (frame.offset - first_offset) / self.speed
+                now = time.monotonic()
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    stats.max_lag = max(stats.max_lag, now - due)
+                    REPLAY_LAG.set(now - due)
+            busy = time.perf_counter()
+            if frame.kind == POLL_FRAME:
+                results = frame.results()
+                stats.responses += len(results)
+                stats.rows += len(self.logic.process_poll_results(results, frame.timestamp))
+            elif frame.kind == SAMPLES_FRAME:
+                rows = frame.rows()
+                self.logic.publish_samples(rows, frame.timestamp)
+                stats.rows += len(rows)
+            stats.busy += time.perf_counter() - busy
+            stats.frames += 1
+            FRAMES_REPLAYED.inc()
+        stats.elapsed = time.monotonic() - start
+        if self.log_callback:
+            self.log_callback(f"⏯️ Reproducción de {self.path}: {stats.report()}")
+        return stats
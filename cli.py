@@ -0,0 +1,611 @@
+"""
+Interfaz de línea de comandos del monitor (modo sin GUI).
+Uso: python main.py <comando> [opciones]
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from snmp_logic import NetworkLogic
+from profiling import MODES
+from event_log import LEVELS
+from metrics import MetricsServer
+from api_server import ApiServer
+import ber_codec as ber
+
+
+def cmd_headless(args):
+    """Sondea periódicamente sin interfaz gráfica, con logs por consola."""
+    logic = NetworkLogic(lambda msg: print(msg, flush=True))
+    logic.configure_simulation(seed=args.seed,
+                               sleep_scale=0.0 if args.no_sleep else 1.0,
+                               summary_only=args.summary_only,
+                               vectorized=args.vectorized,
+                               failure_rate=args.failure_rate)
+
+    if args.metrics_port:
+        server = MetricsServer(port=args.metrics_port)
+        if server.start():
+            print(f"Métricas en http://127.0.0.1:{args.metrics_port}/metrics")
+
+    if args.api_port:
+        api = ApiServer(logic, port=args.api_port)
+        if api.start():
+            print(f"API en http://127.0.0.1:{args.api_port}/api/snmp/latest")
+
+    if logic.profiler.install_signal_handlers(args.profile_seconds):
+        print("Señales: SIGUSR1 = perfilar, SIGUSR2 = snapshot de memoria")
+    if args.profile:
+        logic.profiler.start_profile(args.profile, args.profile_mode)
+    if args.record:
+        logic.start_recording(args.record)
+    if args.event_log:
+        logic.start_event_log(args.event_log)
+    if args.memory_every:
+        logic.profiler.memory_snapshot()  # línea base
+
+    cycle = 0
+    try:
+        while args.cycles == 0 or cycle < args.cycles:
+            start = time.monotonic()
+            handles = [logic.run_snmp_test(args.ip, args.community, args.agents)]
+            if args.rmon:
+                handles.append(logic.run_rmon_test(args.ip, args.agents))
+            for handle in handles:
+                handle.wait()
+            cycle += 1
+            time.sleep(max(0.0, args.interval - (time.monotonic() - start)))
+            if args.memory_every and cycle % args.memory_every == 0:
+                logic.profiler.memory_snapshot()
+    except KeyboardInterrupt:
+        print("\nInterrumpido por el usuario.")
+        logic.shutdown()
+    logic.stop_recording()
+    logic.stop_event_log()
+
+    if args.save_history:
+        path = logic.snmp_history.save(args.save_history)
+        print(f"Historial SNMP ({len(logic.snmp_history):,} muestras) guardado en {path}")
+
+    # No salir con una sesión de perfilado a medias
+    while logic.profiler.active:
+        time.sleep(0.2)
+    return 0
+
+
+def cmd_poll(args):
+    """Sondeo SNMP real de una lista de agentes por el transporte multiplexado."""
+    logic = NetworkLogic(lambda msg: print(msg, flush=True))
+    if args.record:
+        logic.start_recording(args.record)
+    if args.event_log:
+        logic.start_event_log(args.event_log)
+    try:
+        for cycle in range(args.cycles):
+            if cycle:
+                time.sleep(args.interval)
+            rows = logic.run_snmp_poll(args.targets, args.community).result()
+            for row in rows[:args.show]:
+                print(f"  {row['Agent']:<22} {row['Device_Name']:<16} "
+                      f"util {row['Utilization_%']:6.2f}%  err {row['Error_Rate_%']:.4f}%  {row['Status']}"
+                      f"  {row.get('Anomaly') or ''}".rstrip())
+    except KeyboardInterrupt:
+        print("\nInterrumpido por el usuario.")
+    except Exception:
+        return 1  # el sondeo ya registró el error
+    finally:
+        logic.shutdown()
+    return 0
+
+
+def cmd_interfaces(args):
+    """Sondeo por interfaz: recorre ifTable/ifXTable de los agentes con GETBULK."""
+    logic = NetworkLogic(lambda msg: print(msg, flush=True))
+    logic.table_walker.max_bytes = args.max_bytes
+    if args.event_log:
+        logic.start_event_log(args.event_log)
+    try:
+        for cycle in range(args.cycles):
+            if cycle:
+                time.sleep(args.interval)
+            rows = logic.run_interface_poll(args.targets, args.community, rmon=args.rmon).result()
+            busiest = sorted(rows, key=lambda row: row['Utilization_%'], reverse=True)
+            for row in busiest[:args.show]:
+                print(f"  {row['Interface']:<28} {row['If_Name'] or '-':<14} {row['Oper_Status']:<6} "
+                      f"util {row['Utilization_%']:6.2f}%  err {row['Error_Rate_%']:.4f}%  {row['Status']}")
+    except KeyboardInterrupt:
+        print("\nInterrumpido por el usuario.")
+    except Exception:
+        return 1  # el sondeo ya registró el error
+    finally:
+        logic.shutdown()
+    return 0
+
+
+def cmd_scan(args):
+    """Descubre hosts de las redes locales: vecinos conocidos primero, ping al resto."""
+    import scanner
+    from snmp_transport import SnmpTransport
+
+    from host_enrichment import HostEnricher
+
+    transport = SnmpTransport()
+    enricher = HostEnricher(transport, args.community)
+    sessions = []
+    for target in args.snmp:
+        host, _, port = target.partition(':')
+        sessions.append(transport.session(host, args.community, int(port or 161)))
+    start = time.perf_counter()
+    result = []
+    try:
+        scanner.scan_network_subnet(
+            callback_found=lambda ip: print(f"  ✓ {ip}  ({(time.perf_counter() - start) * 1000:.1f} ms)",
+                                            flush=True),
+            callback_finish=result.extend,
+            probe=not args.no_probe, snmp_sessions=sessions,
+            log_callback=lambda msg: print(msg, flush=True),
+            enricher=enricher)
+        print(f"{len(result)} host(s) en {(time.perf_counter() - start) * 1000:.1f} ms")
+        enricher.enrich(result)
+        if not enricher.wait_idle(args.enrich_timeout):
+            print(f"(enriquecimiento incompleto tras {args.enrich_timeout:.0f}s)")
+        for ip in result:
+            info = enricher.lookup(ip)
+            print(f"  {ip:<22} {info.hostname or '-':<30} {info.sys_name or '-':<16} "
+                  f"{(info.sys_descr or '-')[:40]}")
+    finally:
+        enricher.shutdown()
+        transport.stop()
+    return 0
+
+
+def cmd_discover(args):
+    """Pipeline escaneo -> identificación -> sondeo continuo de lo que responda."""
+    from discovery_pipeline import DiscoveryPipeline
+
+    logic = NetworkLogic(lambda msg: print(msg, flush=True))
+    logic.enricher.community = args.community
+    if args.event_log:
+        logic.start_event_log(args.event_log)
+    pipeline = DiscoveryPipeline(logic, args.community, workers=args.workers,
+                                 queue_size=args.queue_size, interval=args.interval,
+                                 log_callback=logic.log_threadsafe)
+    try:
+        pipeline.start(extra_targets=args.targets, probe=not args.no_probe)
+        deadline = time.monotonic() + args.duration if args.duration else None
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        print("\nInterrumpido por el usuario.")
+    finally:
+        pipeline.stop()
+        logic.shutdown()
+    for row in logic.last_snmp_data:
+        print(f"  {row['Agent']:<22} {row['Device_Type'] or '-':<20} {row['Device_Name']:<16} "
+              f"util {row['Utilization_%']:6.2f}%  {row['Status']}")
+    return 0
+
+
+def cmd_replay(args):
+    """Reproduce una captura sin red para medir y perfilar el procesamiento."""
+    from data_export import DataExporter
+
+    logic = NetworkLogic(None if args.quiet else lambda msg: print(msg, flush=True))
+    if args.event_log:
+        logic.start_event_log(args.event_log)
+    if args.profile:
+        logic.profiler.start_profile(args.profile, args.profile_mode)
+    try:
+        stats = logic.run_replay(args.capture, args.speed).result()
+    except KeyboardInterrupt:
+        print("\nInterrumpido por el usuario.")
+        logic.shutdown()
+        return 1
+    print(stats.report())
+
+    rows = logic.last_snmp_data
+    if args.export and rows:
+        exporter = DataExporter()
+        export = exporter.export_snmp_to_csv if args.export == 'csv' else exporter.export_snmp_to_json
+        print(f"Exportado a: {export(rows, len(rows))}")
+    if args.save_history:
+        path = logic.snmp_history.save(args.save_history)
+        print(f"Historial SNMP ({len(logic.snmp_history):,} muestras) guardado en {path}")
+    while logic.profiler.active:
+        time.sleep(0.2)
+    logic.shutdown()
+    return 0
+
+
+def _speed(value):
+    """'max' o un factor >= 0 para --speed (0 = sin esperas)."""
+    if value == 'max':
+        return 0.0
+    speed = float(value)
+    if speed < 0:
+        raise argparse.ArgumentTypeError("la velocidad no puede ser negativa")
+    return speed
+
+
+def cmd_import(args):
+    """Importa las exportaciones al historial compacto, saltando lo ya importado."""
+    from history_import import HistoryImporter, ImportOrderError
+
+    importer = HistoryImporter(args.exports, args.store_dir, workers=args.workers,
+                               log_callback=lambda msg: print(msg, flush=True))
+    try:
+        importer.run(force=args.force)
+    except ImportOrderError as e:
+        print(f"❌ {e}")
+        return 1
+    for kind in ('snmp', 'rmon'):
+        agents = importer.agents(kind)
+        if agents:
+            print(f"{kind.upper()}: {len(agents)} agente(s), {sum(a[2] for a in agents.values()):,} muestras")
+    if args.show:
+        for kind in ('snmp', 'rmon'):
+            for row in importer.store(kind).rows(args.show):
+                print(f"  [{kind}] " + ", ".join(f"{k}={v}" for k, v in row.items()))
+    return 0
+
+
+def cmd_report(args):
+    """Renderiza sin GUI los gráficos de todos los agentes del historial y un index.html."""
+    from batch_report import ReportGenerator
+
+    snmp_path = os.path.join(args.store_dir, 'snmp.hst')
+    if not os.path.exists(snmp_path):
+        print(f"❌ No existe {snmp_path}: importe antes las exportaciones (import)")
+        return 1
+    rmon_path = os.path.join(args.store_dir, 'rmon.hst')
+    generator = ReportGenerator(snmp_path, rmon_path if os.path.exists(rmon_path) else None,
+                                output_dir=args.output, fmt=args.format, workers=args.workers,
+                                dpi=args.dpi, log_callback=lambda msg: print(msg, flush=True))
+    generator.run(agents=args.agent or None)
+    return 0
+
+
+def cmd_events(args):
+    """Eventos del registro filtrados por agente, periodo, nivel y métrica."""
+    import json
+    from event_log import query_events
+
+    count = 0
+    for event in query_events(args.dir, agent=args.agent, start=args.since, end=args.until,
+                              level=args.level, metric=args.metric, limit=args.limit):
+        count += 1
+        if args.json:
+            print(json.dumps(event, ensure_ascii=False))
+            continue
+        extra = ""
+        if 'metric' in event:
+            extra += f"  [{event['metric']}" + (f" = {event['value']}" if 'value' in event else "") + "]"
+        if 'duration' in event:
+            extra += f"  ({event['duration'] * 1000:.1f} ms)"
+        print(f"{event['time']}  {event['level']:<7} {event.get('agent') or '-':<22} {event['msg']}{extra}")
+    print(f"{count} evento(s)")
+    return 0
+
+
+def cmd_diff(args):
+    """Compara dos exportaciones (CSV en streaming o JSON) por agente."""
+    from snapshot_diff import diff_files, default_output
+    output = args.output or (default_output() if args.write else None)
+    try:
+        result, written = diff_files(args.old, args.new, key=args.key, top=args.top, output=output)
+    except (KeyError, ValueError) as e:
+        # Columna clave ausente en alguno de los ficheros
+        print(f"❌ {e}")
+        return 1
+    print(result.report())
+    if written:
+        print(f"\nDiferencias por agente guardadas en: {written}")
+    return 0
+
+
+def cmd_simulate(args):
+    """Genera un lote simulado N agentes × M intervalos y opcionalmente lo exporta."""
+    from simulation import FleetSimulator
+    from data_export import DataExporter
+
+    start = time.perf_counter()
+    fleet = FleetSimulator(args.agents, seed=args.seed, interval=args.interval)
+    batch = fleet.step(args.intervals, start_time=time.time())
+    elapsed = time.perf_counter() - start
+    samples = args.agents * args.intervals
+    print(f"{samples:,} muestras generadas en {elapsed * 1000:.1f} ms "
+          f"({samples / max(elapsed, 1e-9):,.0f} muestras/s)")
+
+    if args.export:
+        exporter = DataExporter()
+        thresholds = NetworkLogic(None).alarm_thresholds
+        rows = []
+        for m in range(args.intervals):
+            ts = datetime.fromtimestamp(batch.timestamps[m]).isoformat()
+            rows.extend(fleet.snmp_rows(batch, m, ts, thresholds))
+        if args.export == 'csv':
+            filename = exporter.export_snmp_to_csv(rows, args.agents)
+        else:
+            filename = exporter.export_snmp_to_json(rows, args.agents)
+        print(f"Exportado a: {filename}")
+    return 0
+
+
+def _pysnmp_message(pdu_type, request_id, varbinds, community, max_repetitions=10):
+    """Mensaje SNMPv2c construido con pysnmp (referencia para la validación)."""
+    from pyasn1.codec.ber import encoder
+    from pysnmp.proto import api
+    from pysnmp.proto import rfc1905
+    proto = api.PROTOCOL_MODULES[api.SNMP_VERSION_2C]
+    pdu_class = {ber.GET: proto.GetRequestPDU, ber.GETBULK: proto.GetBulkRequestPDU,
+                 ber.RESPONSE: proto.ResponsePDU}[pdu_type]
+    pdu = pdu_class()
+    if pdu_type == ber.GETBULK:
+        proto.apiBulkPDU.set_defaults(pdu)
+        proto.apiBulkPDU.set_max_repetitions(pdu, max_repetitions)
+    else:
+        proto.apiPDU.set_defaults(pdu)
+    proto.apiPDU.set_request_id(pdu, request_id)
+    proto.apiPDU.set_varbinds(pdu, [(proto.ObjectIdentifier(oid), value if value is not None else proto.Null(''))
+                                    for oid, value in varbinds])
+    msg = proto.Message()
+    proto.apiMessage.set_defaults(msg)
+    proto.apiMessage.set_community(msg, community)
+    proto.apiMessage.set_pdu(msg, pdu)
+    return encoder.encode(msg), proto, rfc1905
+
+
+def cmd_bench_ber(args):
+    """Valida el códec BER contra pysnmp y mide su rendimiento."""
+    import random
+    import socket
+    from pyasn1.codec.ber import decoder
+    from oid_table import get_table
+
+    rng = random.Random(args.seed)
+    table = get_table()
+    objects = [table.symbol(name) for name in ('ifInOctets', 'ifOutOctets', 'ifInUcastPkts',
+                                               'ifInErrors', 'ifHCInOctets', 'sysUpTime',
+                                               'ifDescr', 'sysObjectID')]
+    oids = [obj.oid + (rng.randint(1, 48),) for obj in objects]
+    ids = ber.RequestIdAllocator(rng)
+
+    # 1) Peticiones: misma codificación byte a byte que pysnmp
+    mismatches = 0
+    for pdu_type in (ber.GET, ber.GETBULK):
+        template = ber.RequestTemplate(oids, pdu_type, max_repetitions=args.max_repetitions)
+        for _ in range(args.checks):
+            rid = ids.next()
+            reference, _, _ = _pysnmp_message(pdu_type, rid, [(oid, None) for oid in oids],
+                                              args.community, args.max_repetitions)
+            if bytes(template.render(rid, args.community)) != reference:
+                mismatches += 1
+    print(f"Peticiones: {2 * args.checks} comparadas con pysnmp, {mismatches} diferencias")
+
+    # 2) Respuestas generadas por pysnmp y decodificadas por la ruta rápida
+    _, proto, rfc1905 = _pysnmp_message(ber.GET, 1, [], args.community)
+    factories = {
+        'Counter32': lambda: (proto.Counter32, rng.randrange(2 ** 32)),
+        'Counter64': lambda: (proto.Counter64, rng.randrange(2 ** 64)),
+        'Integer': lambda: (proto.Integer, rng.randint(-2 ** 31, 2 ** 31 - 1)),
+        'TimeTicks': lambda: (proto.TimeTicks, rng.randrange(2 ** 32)),
+        'Gauge32': lambda: (proto.Gauge32, rng.randrange(2 ** 32)),
+        'OctetString': lambda: (proto.OctetString, bytes(rng.randrange(256) for _ in range(rng.randint(0, 40)))),
+        'ObjectIdentifier': lambda: (proto.ObjectIdentifier, (1, 3, 6, 1, 4, 1, rng.randint(1, 70000), rng.randint(0, 300))),
+    }
+    responses = []
+    errors = 0
+    for _ in range(args.checks):
+        rid = ids.next()
+        expected = []
+        varbinds = []
+        for oid in oids:
+            kind = rng.choice(list(factories))
+            cls, value = factories[kind]()
+            expected.append((oid, value))
+            varbinds.append((oid, cls(value)))
+        varbinds.append(((1, 3, 6, 1, 2, 1, 99, 0), rfc1905.noSuchInstance))
+        expected.append(((1, 3, 6, 1, 2, 1, 99, 0), ber.NO_SUCH_INSTANCE_VALUE))
+        data, _, _ = _pysnmp_message(ber.RESPONSE, rid, varbinds, args.community)
+        responses.append(data)
+        decoded = ber.decode_response(data)
+        got = [(oid, bytes(v) if isinstance(v, memoryview) else v) for oid, v in decoded.varbinds]
+        if decoded.request_id != rid or got != expected:
+            errors += 1
+    print(f"Respuestas: {args.checks} decodificadas, {errors} discrepancias con pysnmp")
+
+    # 3) Rendimiento local de codificación/decodificación
+    template = ber.RequestTemplate(oids)
+    n = args.iterations
+    start = time.perf_counter()
+    for _ in range(n):
+        template.render(ids.next(), args.community)
+    fast_enc = n / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(n // 10):
+        _pysnmp_message(ber.GET, ids.next(), [(oid, None) for oid in oids], args.community)
+    ref_enc = (n // 10) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(n):
+        ber.decode_response(responses[i % len(responses)])
+    fast_dec = n / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(n // 10):
+        decoder.decode(responses[i % len(responses)], asn1Spec=proto.Message())
+    ref_dec = (n // 10) / (time.perf_counter() - start)
+    print(f"Codificación: {fast_enc:,.0f} msg/s (pysnmp {ref_enc:,.0f} msg/s, x{fast_enc / ref_enc:.0f})")
+    print(f"Decodificación: {fast_dec:,.0f} msg/s (pysnmp {ref_dec:,.0f} msg/s, x{fast_dec / ref_dec:.0f})")
+
+    # 4) Ida y vuelta contra un agente real (p. ej. snmpsim en 127.0.0.1:16161)
+    if args.target:
+        host, _, port = args.target.partition(':')
+        live = ber.RequestTemplate([table.oid('sysUpTime', 0), table.oid('ifInOctets', 1),
+                                    table.oid('ifOutOctets', 1), table.oid('ifInErrors', 1)])
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(2.0)
+        ok = 0
+        start = time.perf_counter()
+        try:
+            for _ in range(args.requests):
+                rid = ids.next()
+                sock.sendto(live.render(rid, args.community), (host, int(port or 161)))
+                response = ber.decode_response(sock.recv(65535), numeric_only=True)
+                ok += response.request_id == rid and response.error_status == 0
+        except (OSError, ber.BerError) as e:
+            print(f"Agente {args.target}: {e}")
+        finally:
+            sock.close()
+        elapsed = time.perf_counter() - start
+        print(f"Agente {args.target}: {ok}/{args.requests} respuestas válidas, "
+              f"{ok / max(elapsed, 1e-9):,.0f} peticiones/s")
+    return 1 if mismatches or errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Monitor de Red SNMP/RMON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("headless", help="Sondeo periódico sin GUI")
+    p.add_argument("--ip", default="127.0.0.1:16161")
+    p.add_argument("--community", default="public")
+    p.add_argument("--agents", type=int, default=3)
+    p.add_argument("--interval", type=float, default=10.0, help="Segundos entre ciclos")
+    p.add_argument("--cycles", type=int, default=0, help="Número de ciclos (0 = infinito)")
+    p.add_argument("--rmon", action="store_true", help="Incluir sondeo RMON en cada ciclo")
+    p.add_argument("--metrics-port", type=int, default=9108, help="0 para desactivar")
+    p.add_argument("--api-port", type=int, default=9109, help="API HTTP/JSON (0 para desactivar)")
+    p.add_argument("--profile", type=float, default=0,
+                   help="Perfilar los primeros N segundos")
+    p.add_argument("--profile-mode", choices=MODES, default="sampling")
+    p.add_argument("--profile-seconds", type=float, default=10,
+                   help="Duración del perfilado lanzado por SIGUSR1")
+    p.add_argument("--memory-every", type=int, default=0,
+                   help="Snapshot de memoria cada N ciclos (0 = nunca)")
+    p.add_argument("--seed", type=int, default=None, help="Semilla del simulador")
+    p.add_argument("--no-sleep", action="store_true", help="Sin esperas simuladas")
+    p.add_argument("--summary-only", action="store_true", help="Solo logs de resumen")
+    p.add_argument("--vectorized", action="store_true", help="Generar agentes en lote NumPy")
+    p.add_argument("--failure-rate", type=float, default=0.0,
+                   help="Probabilidad de que un agente simulado no responda")
+    p.add_argument("--save-history", default=None, help="Guardar el historial SNMP al terminar")
+    p.add_argument("--record", default=None, help="Grabar cada sondeo en un fichero de captura")
+    p.add_argument("--event-log", default=None, metavar="DIR", help="Registro de eventos JSON Lines en DIR")
+    p.set_defaults(func=cmd_headless)
+
+    p = sub.add_parser("poll", help="Sondeo SNMP real de varios agentes")
+    p.add_argument("targets", nargs="+", help="host o host:puerto")
+    p.add_argument("--community", default="public")
+    p.add_argument("--cycles", type=int, default=1)
+    p.add_argument("--interval", type=float, default=10.0)
+    p.add_argument("--show", type=int, default=20, help="Filas a mostrar por ciclo")
+    p.add_argument("--record", default=None, help="Grabar las respuestas en un fichero de captura")
+    p.add_argument("--event-log", default=None, metavar="DIR", help="Registro de eventos JSON Lines en DIR")
+    p.set_defaults(func=cmd_poll)
+
+    p = sub.add_parser("interfaces", help="Sondeo por interfaz con GETBULK (ifTable/ifXTable)")
+    p.add_argument("targets", nargs="+", help="host o host:puerto")
+    p.add_argument("--community", default="public")
+    p.add_argument("--cycles", type=int, default=1)
+    p.add_argument("--interval", type=float, default=10.0)
+    p.add_argument("--rmon", action="store_true", help="Añadir etherStatsTable a cada interfaz")
+    p.add_argument("--show", type=int, default=20, help="Interfaces más cargadas a mostrar por ciclo")
+    p.add_argument("--max-bytes", type=int, default=16384, help="Tamaño máximo de respuesta GETBULK")
+    p.add_argument("--event-log", default=None, metavar="DIR", help="Registro de eventos JSON Lines en DIR")
+    p.set_defaults(func=cmd_interfaces)
+
+    p = sub.add_parser("scan", help="Descubrir hosts de las redes locales")
+    p.add_argument("--no-probe", action="store_true",
+                   help="Sin barrido: solo vecinos conocidos (kernel, gateways, SNMP), "
+                        "con un ping a los no confirmados")
+    p.add_argument("--snmp", nargs="*", default=[],
+                   help="Agentes (host o host:puerto) cuya ipNetToMediaTable se consulta")
+    p.add_argument("--community", default="public")
+    p.add_argument("--enrich-timeout", type=float, default=5.0,
+                   help="Segundos de espera para nombres PTR y sysName")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("discover", help="Descubrir, identificar y sondear de forma continua")
+    p.add_argument("targets", nargs="*", help="Agentes adicionales (host:puerto)")
+    p.add_argument("--community", default="public")
+    p.add_argument("--interval", type=float, default=10.0, help="Segundos entre sondeos por agente")
+    p.add_argument("--duration", type=float, default=0, help="Segundos a ejecutar (0 = hasta Ctrl+C)")
+    p.add_argument("--workers", type=int, default=8, help="Hilos de identificación SNMP")
+    p.add_argument("--queue-size", type=int, default=32, help="Capacidad de la cola entre etapas")
+    p.add_argument("--no-probe", action="store_true", help="Solo vecinos conocidos, sin barrer la red")
+    p.add_argument("--event-log", default=None, metavar="DIR", help="Registro de eventos JSON Lines en DIR")
+    p.set_defaults(func=cmd_discover)
+
+    p = sub.add_parser("replay", help="Reproducir una captura de sondeos sin red")
+    p.add_argument("capture", help="Fichero grabado con --record")
+    p.add_argument("--speed", type=_speed, default=1.0,
+                   help="1 = ritmo original, N = N veces más rápido, 'max' = sin esperas")
+    p.add_argument("--quiet", action="store_true", help="Sin logs por sondeo (solo el resumen)")
+    p.add_argument("--export", choices=("csv", "json"), default=None, help="Exportar el último snapshot")
+    p.add_argument("--save-history", default=None, help="Guardar el historial SNMP al terminar")
+    p.add_argument("--profile", type=float, default=0, help="Perfilar N segundos desde el inicio")
+    p.add_argument("--profile-mode", choices=MODES, default="sampling")
+    p.add_argument("--event-log", default=None, metavar="DIR", help="Registro de eventos JSON Lines en DIR")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("events", help="Consultar el registro de eventos")
+    p.add_argument("--dir", default="logs", help="Directorio del registro")
+    p.add_argument("--agent", default=None)
+    p.add_argument("--since", default=None, help="Desde (ISO, p. ej. 2025-10-19T08:00)")
+    p.add_argument("--until", default=None, help="Hasta (ISO)")
+    p.add_argument("--level", choices=LEVELS, default=None, help="Nivel mínimo")
+    p.add_argument("--metric", default=None)
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--json", action="store_true", help="Líneas JSON tal cual")
+    p.set_defaults(func=cmd_events)
+
+    p = sub.add_parser("import", help="Importar exports/ al historial compacto")
+    p.add_argument("--exports", default="exports", help="Directorio de exportaciones")
+    p.add_argument("--store-dir", default="history", help="Directorio de historiales y manifiesto")
+    p.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, núcleos)")
+    p.add_argument("--force", action="store_true",
+                   help="Reconstruir el historial desde todas las exportaciones, en orden")
+    p.add_argument("--show", default=None, metavar="AGENTE", help="Mostrar las muestras de un agente")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("report", help="Informe gráfico de todos los agentes (sin GUI)")
+    p.add_argument("--store-dir", default="history", help="Directorio con snmp.hst y rmon.hst")
+    p.add_argument("--output", default=None, help="Directorio del informe (por defecto reports/informe_<fecha>)")
+    p.add_argument("--format", choices=("png", "svg"), default="png")
+    p.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, núcleos)")
+    p.add_argument("--dpi", type=int, default=80)
+    p.add_argument("--agent", action="append", default=[], help="Solo estos agentes (repetible)")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("diff", help="Diferencias entre dos exportaciones")
+    p.add_argument("old", help="Exportación anterior (.csv o .json)")
+    p.add_argument("new", help="Exportación nueva (.csv o .json)")
+    p.add_argument("--key", default="Agent")
+    p.add_argument("--top", type=int, default=10, help="Mayores cambios por campo")
+    p.add_argument("--write", action="store_true", help="Guardar el diff en exports/")
+    p.add_argument("--output", default=None, help="Ruta del CSV de diferencias")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("simulate", help="Generar un lote simulado de alto volumen")
+    p.add_argument("--agents", type=int, default=1000)
+    p.add_argument("--intervals", type=int, default=100)
+    p.add_argument("--interval", type=float, default=30.0, help="Segundos por intervalo")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--export", choices=("csv", "json"), default=None)
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser("bench-ber", help="Validar y medir el códec BER rápido")
+    p.add_argument("--community", default="public")
+    p.add_argument("--checks", type=int, default=500, help="Mensajes comparados con pysnmp")
+    p.add_argument("--iterations", type=int, default=20000)
+    p.add_argument("--max-repetitions", type=int, default=10)
+    p.add_argument("--target", default=None, help="host:puerto de un agente (snmpsim)")
+    p.add_argument("--requests", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(func=cmd_bench_ber)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -3,8 +3,15 @@ Módulo para exportar datos de monitoreo a CSV y JSON
 """
 import json
 import csv
+import time
 from datetime import datetime
 import os
+from metrics import REGISTRY
+from records import as_batch, json_default
+
+_EXPORTS = REGISTRY.counter('export_files_total', 'Archivos exportados')
+_EXPORT_BYTES = REGISTRY.counter('export_bytes_total', 'Bytes escritos por los exportadores')
+_EXPORT_SECONDS = REGISTRY.histogram('export_duration_seconds', 'Duración de cada exportación')
 
 class DataExporter:
     """Maneja la exportación de datos de monitoreo a diferentes formatos."""
@@ -13,6 +20,12 @@ class DataExporter:
         self.export_dir = "exports"
         self._ensure_export_dir()
     
+    def _record_export(self, fmt, filename, start):
+        """Registra métricas de una exportación terminada."""
+        _EXPORTS.labels(format=fmt).inc()
+        _EXPORT_BYTES.labels(format=fmt).inc(os.path.getsize(filename))
+        _EXPORT_SECONDS.labels(format=fmt).observe(time.perf_counter() - start)
+
     def _ensure_export_dir(self):
         """Crea el directorio de exportación si no existe."""
         if not os.path.exists(self.export_dir):
@@ -23,12 +36,13 @@ class DataExporter:
         Exporta datos SNMP a CSV.
         
         Args:
-            snmp_data: Lista de diccionarios con datos de cada agente
+            snmp_data: Filas de cada agente (SnmpSample o diccionarios)
             num_agents: Número de agentes
         
         Returns:
             str: Ruta del archivo creado
         """
+        start = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.export_dir}/snmp_export_{timestamp}.csv"
         
@@ -36,16 +50,18 @@ class DataExporter:
             'Agent', 'Device_Type', 'Device_Name', 'Uptime_Days',
             'Speed_Mbps', 'IN_Octets', 'OUT_Octets', 
             'IN_Packets', 'OUT_Packets', 'IN_Errors', 'OUT_Errors',
-            'Total_Data_GB', 'Utilization_%', 'Error_Rate_%', 'Status'
+            'Total_Data_GB', 'Utilization_%', 'Error_Rate_%', 'Status', 'Anomaly', 'timestamp'
         ]
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            # El instante de cada fila permite exportar varias muestras por agente
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
             writer.writeheader()
             
             for data in snmp_data:
                 writer.writerow(data)
         
+        self._record_export('csv', filename, start)
         return filename
     
     def export_snmp_to_json(self, snmp_data, num_agents):
@@ -53,12 +69,13 @@ class DataExporter:
         Exporta datos SNMP a JSON.
         
         Args:
-            snmp_data: Lista de diccionarios con datos de cada agente
+            snmp_data: Filas de cada agente (SnmpSample o diccionarios)
             num_agents: Número de agentes
         
         Returns:
             str: Ruta del archivo creado
         """
+        start = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.export_dir}/snmp_export_{timestamp}.json"
         
@@ -71,8 +88,9 @@ class DataExporter:
         }
         
         with open(filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(export_data, jsonfile, indent=2, ensure_ascii=False)
+            json.dump(export_data, jsonfile, indent=2, ensure_ascii=False, default=json_default)
         
+        self._record_export('json', filename, start)
         return filename
     
     def export_rmon_to_csv(self, rmon_data, num_agents):
@@ -86,6 +104,7 @@ class DataExporter:
         Returns:
             str: Ruta del archivo creado
         """
+        start = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.export_dir}/rmon_export_{timestamp}.csv"
         
@@ -112,6 +131,7 @@ class DataExporter:
             for alarm in rmon_data.get('alarms', []):
                 writer.writerow(alarm)
         
+        self._record_export('csv', filename, start)
         return filename
     
     def export_rmon_to_json(self, rmon_data, num_agents):
@@ -125,6 +145,7 @@ class DataExporter:
         Returns:
             str: Ruta del archivo creado
         """
+        start = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.export_dir}/rmon_export_{timestamp}.json"
         
@@ -136,8 +157,9 @@ class DataExporter:
         }
         
         with open(filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(export_data, jsonfile, indent=2, ensure_ascii=False)
+            json.dump(export_data, jsonfile, indent=2, ensure_ascii=False, default=json_default)
         
+        self._record_export('json', filename, start)
         return filename
     
     def export_comparison_to_csv(self, comparison_data):
@@ -150,6 +172,7 @@ class DataExporter:
         Returns:
             str: Ruta del archivo creado
         """
+        start = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.export_dir}/comparison_{timestamp}.csv"
         
@@ -161,20 +184,19 @@ class DataExporter:
             for row in comparison_data:
                 writer.writerow(row)
         
+        self._record_export('csv', filename, start)
         return filename
     
     def _calculate_snmp_summary(self, snmp_data):
-        """Calcula resumen de datos SNMP."""
-        total_octets = sum(d.get('IN_Octets', 0) + d.get('OUT_Octets', 0) for d in snmp_data)
-        total_packets = sum(d.get('IN_Packets', 0) + d.get('OUT_Packets', 0) for d in snmp_data)
-        total_errors = sum(d.get('IN_Errors', 0) + d.get('OUT_Errors', 0) for d in snmp_data)
-        avg_utilization = sum(d.get('Utilization_%', 0) for d in snmp_data) / len(snmp_data) if snmp_data else 0
+        """Calcula resumen de datos SNMP con operaciones por columna."""
+        batch = as_batch(snmp_data)
         
         return {
-            "total_data_gb": total_octets / 1e9,
-            "total_packets": total_packets,
-            "total_errors": total_errors,
-            "average_utilization": round(avg_utilization, 2),
-            "agents_optimal": sum(1 for d in snmp_data if d.get('Status') == 'ÓPTIMO'),
-            "agents_alert": sum(1 for d in snmp_data if d.get('Status') == 'ALERTA')
+            "total_data_gb": float(batch.sum('IN_Octets', 'OUT_Octets')) / 1e9,
+            "total_packets": int(batch.sum('IN_Packets', 'OUT_Packets')),
+            "total_errors": int(batch.sum('IN_Errors', 'OUT_Errors')),
+            "average_utilization": round(batch.mean('Utilization_%'), 2),
+            "agents_optimal": batch.count('Status', 'ÓPTIMO'),
+            "agents_alert": batch.count('Status', 'ALERTA'),
+            "agents_anomalous": batch.count_true('Anomaly')
         }
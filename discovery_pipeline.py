@@ -0,0 +1,276 @@
+"""
+Flujo automático descubrimiento -> identificación -> sondeo.
+Las etapas corren a la vez y se comunican por colas acotadas:
+
+    scanner  --(hosts)-->  fingerprint SNMP  --(agentes)-->  PollScheduler
+
+Cada host que responde se identifica (Device_Type a partir de sysObjectID
+y sysDescr) y se sondea en cuanto llega, sin esperar al final del barrido.
+Si la identificación va más lenta que el barrido, la cola llena frena a
+los hilos del escáner (backpressure) en lugar de acumular trabajo.
+"""
+import re
+import threading
+import time
+from queue import Queue, Empty, Full
+
+from metrics import REGISTRY
+from oid_table import get_table
+from ber_codec import VarbindException
+from host_enrichment import split_target
+import scanner
+
+_QUEUE_DEPTH = REGISTRY.gauge('pipeline_queue_depth', 'Elementos esperando en cada etapa del pipeline')
+FINGERPRINT_QUEUE = _QUEUE_DEPTH.labels(stage='fingerprint')
+_HOSTS = REGISTRY.counter('pipeline_hosts_total', 'Hosts que atraviesan cada etapa del pipeline')
+HOSTS_DISCOVERED = _HOSTS.labels(stage='discovered')
+HOSTS_IDENTIFIED = _HOSTS.labels(stage='identified')
+HOSTS_WITHOUT_SNMP = _HOSTS.labels(stage='no_snmp')
+FIRST_METRICS_SECONDS = REGISTRY.histogram('pipeline_first_metrics_seconds',
+                                           'Tiempo desde el inicio del pipeline hasta el primer sondeo').labels()
+
+# Número de empresa IANA (1.3.6.1.4.1.N) -> fabricante
+ENTERPRISES = {
+    9: 'Cisco', 11: 'HP', 43: '3Com', 311: 'Windows', 674: 'Dell', 2011: 'Huawei',
+    2021: 'Linux', 2636: 'Juniper', 4526: 'Netgear', 6486: 'Alcatel', 8072: 'Linux',
+    12356: 'Fortinet', 14823: 'Aruba', 14988: 'MikroTik', 25461: 'Palo Alto',
+    25506: 'HPE', 30065: 'Arista', 41112: 'Ubiquiti',
+}
+_VENDORS = tuple(dict.fromkeys(ENTERPRISES.values()))
+# Rol del equipo según sysDescr (el primero que coincide)
+_ROLES = (
+    ('Firewall', re.compile(r'firewall|fortigate|pan-os|asa\b|pfsense|opnsense', re.I)),
+    ('Access Point', re.compile(r'access point|\bap\b|unifi|airos|wireless', re.I)),
+    ('Switch', re.compile(r'switch|catalyst|procurve|aruba|\bcss\b|nexus', re.I)),
+    ('Router', re.compile(r'router|ios xr|routeros|junos|\bisr\b|edgeos', re.I)),
+    ('Impresora', re.compile(r'printer|laserjet|jetdirect', re.I)),
+    ('Server', re.compile(r'linux|windows|freebsd|ubuntu|debian|server', re.I)),
+)
+# Rol por defecto de cada fabricante si sysDescr no lo aclara
+_VENDOR_ROLES = {'Cisco': 'Router', 'HP': 'Switch', 'Palo Alto': 'Firewall', 'Fortinet': 'Firewall',
+                 'Ubiquiti': 'Access Point', 'Linux': 'Server', 'Windows': 'Server',
+                 'MikroTik': 'Router', 'Juniper': 'Router', 'Arista': 'Switch', 'Aruba': 'Switch'}
+_ENTERPRISE_PREFIX = (1, 3, 6, 1, 4, 1)
+
+FINGERPRINT_OBJECTS = (('sysObjectID', 0), ('sysDescr', 0), ('sysName', 0))
+
+
+def fingerprint(sys_object_id=None, sys_descr=None, sys_name=None):
+    """
+    Device_Type ('Router Cisco', 'Server Linux', ...) a partir de
+    sysObjectID y sysDescr (y sysName como último recurso). '' si no hay
+    nada que identificar.
+    """
+    vendor = None
+    if sys_object_id and tuple(sys_object_id[:6]) == _ENTERPRISE_PREFIX and len(sys_object_id) > 6:
+        vendor = ENTERPRISES.get(sys_object_id[6])
+    role = None
+    for text in (sys_descr, sys_name):
+        if text and role is None:
+            role = next((name for name, pattern in _ROLES if pattern.search(text)), None)
+    if vendor is None and sys_descr:
+        vendor = next((v for v in _VENDORS if v.lower() in sys_descr.lower()), None)
+    role = role or _VENDOR_ROLES.get(vendor)
+    return " ".join(part for part in (role or "Dispositivo", vendor) if part) if (role or vendor) else ''
+
+
+class PollScheduler:
+    """
+    Sondea periódicamente los agentes registrados. Un agente nuevo se
+    sondea enseguida (junto con los que lleguen en `batch_window`); después,
+    cada `interval` segundos. Cada sondeo fusiona sus filas en el snapshot.
+    """
+
+    def __init__(self, logic, community='public', interval=10.0, batch_window=0.2,
+                 log_callback=None):
+        self.logic = logic
+        self.community = community
+        self.interval = interval
+        self.batch_window = batch_window
+        self.log_callback = log_callback
+        self._due = {}  # agente -> próximo sondeo (monotonic)
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def targets(self):
+        return list(self._due)
+
+    def add(self, target):
+        """Registra un agente y adelanta su primer sondeo a ahora."""
+        with self._changed:
+            if target not in self._due:
+                self._due[target] = time.monotonic()
+                self._changed.notify()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="poll-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._changed:
+            self._changed.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _next_batch(self):
+        """Espera a que venza algún agente y devuelve los vencidos."""
+        with self._changed:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                due = [t for t, at in self._due.items() if at <= now]
+                if due:
+                    break
+                wait = min(self._due.values()) - now if self._due else None
+                self._changed.wait(wait)
+            else:
+                return []
+        # Agrupar los que lleguen justo detrás (p. ej. varios hosts del mismo barrido)
+        if self._stop.wait(self.batch_window):
+            return []
+        with self._changed:
+            now = time.monotonic()
+            due = [t for t, at in self._due.items() if at <= now]
+            for target in due:
+                self._due[target] = now + self.interval
+        return due
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                # Esperar el resultado mantiene un solo sondeo del planificador en curso
+                self.logic.run_snmp_poll(batch, self.community, merge=True).wait()
+            except Exception as e:
+                if self.log_callback:
+                    self.log_callback(f"⚠️ Planificador de sondeos: {e}")
+
+
+class DiscoveryPipeline:
+    """
+    Encadena escáner, identificación y planificador.
+
+    Args:
+        logic: NetworkLogic (transporte, enriquecimiento y sondeo)
+        community: Comunidad SNMP
+        workers: Hilos de la etapa de identificación
+        queue_size: Capacidad de la cola entre escáner e identificación
+        interval: Segundos entre sondeos de cada agente
+    """
+
+    def __init__(self, logic, community='public', workers=8, queue_size=32, interval=10.0,
+                 snmp_timeout=0.8, log_callback=None):
+        self.logic = logic
+        self.community = community
+        self.workers = workers
+        self.snmp_timeout = snmp_timeout
+        self.log_callback = log_callback
+        self.scheduler = PollScheduler(logic, community, interval, log_callback=log_callback)
+        self._queue = Queue(maxsize=queue_size)
+        self._threads = []
+        self._started_at = None
+        self._scan_done = threading.Event()
+        self._stop = threading.Event()
+        self._first_agent = threading.Lock()  # se toma con el primer agente identificado
+        table = get_table()
+        self._oids = [table.oid(name, index) for name, index in FINGERPRINT_OBJECTS]
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    def start(self, extra_targets=(), probe=True):
+        """
+        Arranca las tres etapas. `extra_targets` ('host:puerto') entran en la
+        identificación además de lo que encuentre el escáner.
+        """
+        self._started_at = time.monotonic()
+        self._stop.clear()
+        self._scan_done.clear()
+        self.scheduler.start()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._fingerprint_worker, name=f"fingerprint-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        for target in extra_targets:
+            self._put(target)
+        t = threading.Thread(target=scanner.scan_network_subnet, name="pipeline-scan", daemon=True,
+                             kwargs={'callback_found': self._put, 'callback_finish': self._on_scan_finish,
+                                     'probe': probe, 'log_callback': self.log_callback})
+        t.start()
+        self._threads.append(t)
+        self._log("🚀 Pipeline iniciado: escaneo -> identificación -> sondeo")
+        return self
+
+    def _put(self, target):
+        """Entrada de la etapa de identificación; bloquea si la cola está llena."""
+        HOSTS_DISCOVERED.inc()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(target, timeout=0.5)
+                FINGERPRINT_QUEUE.set(self._queue.qsize())
+                return
+            except Full:
+                continue
+
+    def _on_scan_finish(self, ips):
+        self._scan_done.set()
+        self._log(f"🔍 Barrido terminado: {len(ips)} host(s); en sondeo: {len(self.scheduler)}")
+
+    def _fingerprint_worker(self):
+        transport = self.logic.transport
+        table = get_table()
+        while not self._stop.is_set():
+            try:
+                target = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+            FINGERPRINT_QUEUE.set(self._queue.qsize())
+            host, port = split_target(target)
+            try:
+                session = transport.session(host, self.community, port,
+                                            timeout=self.snmp_timeout, retries=0)
+                fields = table.decode_varbinds(
+                    [(oid, value) for oid, value in session.get_many(self._oids)
+                     if value is not None and not isinstance(value, VarbindException)])
+            except Exception:
+                HOSTS_WITHOUT_SNMP.inc()
+                continue
+            fields['Device_Type'] = fingerprint(fields.get('Sys_Object_ID'), fields.get('Sys_Descr'),
+                                                fields.get('Device_Name'))
+            self.logic.enricher.record(target, fields)
+            HOSTS_IDENTIFIED.inc()
+            self._log(f"  🏷️ {target}: {fields['Device_Type'] or 'desconocido'} "
+                      f"({fields.get('Device_Name', '-')})")
+            if self._first_agent.acquire(blocking=False):
+                threading.Thread(target=self._report_first_metrics, daemon=True,
+                                 args=(self.logic.data_version('snmp'),)).start()
+            self.scheduler.add(target)
+
+    def _report_first_metrics(self, version):
+        """Registra el tiempo hasta las primeras métricas publicadas."""
+        snapshot = self.logic.wait_for_snapshot('snmp', version, timeout=30)
+        if snapshot.version > version:
+            elapsed = time.monotonic() - self._started_at
+            FIRST_METRICS_SECONDS.observe(elapsed)
+            self._log(f"📈 Primeras métricas a los {elapsed * 1000:.0f} ms")
+
+    def wait_scan(self, timeout=None):
+        return self._scan_done.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        self.scheduler.stop()
+        for t in self._threads:
+            t.join(timeout=1)
+        self._threads = []
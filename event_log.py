@@ -0,0 +1,295 @@
+"""
+Registro de eventos estructurado (JSON Lines) y persistente.
+Cada evento es una línea JSON con instante, nivel y mensaje, y opcionalmente
+agente, métrica, valor y duración:
+
+    {"ts": 1760855700.123, "time": "2025-10-19T08:35:00.123", "level": "warning",
+     "msg": "⚠️ 10.0.0.7:161: timeout", "agent": "10.0.0.7:161", "metric": "timeout"}
+
+Quien emite solo añade una tupla a una cola en memoria; un hilo escritor la
+vacía cada `flush_interval` y escribe el lote de una vez. El fichero activo
+(events.jsonl) rota por tamaño o antigüedad: se renombra con el periodo que
+cubre (events_<primero>_<último>.jsonl), se comprime con gzip y se borran
+los más antiguos. Las consultas por agente y tiempo descartan por nombre
+los ficheros fuera del periodo, sin abrirlos.
+"""
+import collections
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from metrics import REGISTRY
+from records import json_default
+
+LEVELS = ('debug', 'info', 'warning', 'error')
+_LEVEL_RANK = {level: rank for rank, level in enumerate(LEVELS)}
+_STAMP = "%Y%m%d_%H%M%S"
+
+_EVENTS = REGISTRY.counter('event_log_events_total', 'Eventos del registro estructurado')
+EVENTS_WRITTEN = _EVENTS.labels(result='written')
+EVENTS_DROPPED = _EVENTS.labels(result='dropped')
+ROTATIONS = REGISTRY.counter('event_log_rotations_total', 'Rotaciones del registro de eventos').labels()
+BATCH_SECONDS = REGISTRY.histogram('event_log_batch_seconds', 'Escritura de cada lote de eventos').labels()
+PENDING = REGISTRY.gauge('event_log_pending', 'Eventos en cola al empezar cada lote').labels()
+
+# Un codificador reutilizado evita reconstruirlo en cada json.dumps con opciones
+_ENCODER = json.JSONEncoder(ensure_ascii=False, default=json_default)
+
+
+def level_for_message(msg):
+    """Nivel de un mensaje de texto libre según su marca (❌, ⚠️, ⛔...)."""
+    if msg.startswith('❌') or msg.startswith('Error'):
+        return 'error'
+    if msg.startswith('⚠️') or msg.startswith('⛔'):
+        return 'warning'
+    return 'info'
+
+
+class EventLog:
+    """
+    Registro de eventos con escritura en segundo plano.
+
+    Args:
+        directory: Directorio de los ficheros de eventos
+        max_bytes: Tamaño a partir del cual rota el fichero activo
+        max_age: Segundos a partir de los cuales rota aunque no llegue al tamaño
+        backups: Ficheros rotados que se conservan (0 = todos)
+        compress: Comprimir con gzip los ficheros rotados
+        max_pending: Eventos en cola a partir de los cuales se descartan
+    """
+
+    def __init__(self, directory='logs', base_name='events', max_bytes=10 * 1024 * 1024, max_age=3600,
+                 backups=50, compress=True, flush_interval=0.5, max_pending=100000, log_callback=None):
+        self.directory = directory
+        self.base_name = base_name
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.log_callback = log_callback
+        self.path = os.path.join(directory, f"{base_name}.jsonl")
+        # deque.append es atómico: emitir no toma ningún lock
+        self._pending = collections.deque()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._first = self._last = None
+        self._second = (None, '')  # segundo -> texto ISO, compartido por los eventos del lote
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    # --- Emisión (hilos de sondeo, GUI...) ---
+    def emit(self, level, msg, agent=None, metric=None, value=None, duration=None, **fields):
+        """Encola un evento. No bloquea ni toca disco; si la cola está llena lo descarta."""
+        if len(self._pending) >= self.max_pending:
+            EVENTS_DROPPED.inc()
+            return
+        self._pending.append((time.time(), level, msg, agent, metric, value, duration, fields))
+
+    def log(self, msg):
+        """Evento a partir de un mensaje de log de texto libre."""
+        self.emit(level_for_message(msg), msg)
+
+    # --- Hilo escritor ---
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                self._log(f"❌ Registro de eventos: {e}")
+
+    def close(self):
+        """Escribe lo pendiente y cierra el fichero activo."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._write_lock:
+            self._write_pending()
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def flush(self):
+        """Escribe ahora los eventos en cola. Retorna cuántos."""
+        with self._write_lock:
+            return self._write_pending()
+
+    def _write_pending(self):
+        pending = self._pending
+        count = len(pending)
+        PENDING.set(count)
+        if not count:
+            return 0
+        start = time.perf_counter()
+        lines = []
+        encode = _ENCODER.encode
+        first_ts = pending[0][0]
+        for _ in range(count):
+            ts, level, msg, agent, metric, value, duration, fields = pending.popleft()
+            event = {'ts': round(ts, 3), 'time': self._iso(ts), 'level': level, 'msg': msg}
+            if agent is not None:
+                event['agent'] = agent
+            if metric is not None:
+                event['metric'] = metric
+            if value is not None:
+                event['value'] = value
+            if duration is not None:
+                event['duration'] = round(duration, 6)
+            if fields:
+                event.update(fields)
+            lines.append(encode(event))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        if self._file is None:
+            self._open()
+        elif self._size >= self.max_bytes or time.time() - self._first >= self.max_age:
+            self._rotate()
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        if self._first is None:
+            self._first = first_ts
+        self._last = ts
+        EVENTS_WRITTEN.inc(count)
+        BATCH_SECONDS.observe(time.perf_counter() - start)
+        return count
+
+    def _iso(self, ts):
+        second = int(ts)
+        if second != self._second[0]:
+            self._second = (second, datetime.fromtimestamp(second).isoformat())
+        return f"{self._second[1]}.{int((ts - second) * 1000):03d}"
+
+    def _open(self):
+        """Abre el fichero activo, continuando el que dejó una ejecución anterior."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+        self._first = self._last = None
+        if self._size:
+            with open(self.path, 'rb') as f:
+                try:
+                    self._first = json.loads(f.readline())['ts']
+                except (ValueError, KeyError):
+                    self._first = os.path.getmtime(self.path)
+            self._last = os.path.getmtime(self.path)
+
+    def _rotate(self):
+        """Renombra el fichero activo con su periodo, lo comprime y poda los antiguos."""
+        self._file.close()
+        self._file = None
+        stamp = (f"{datetime.fromtimestamp(self._first).strftime(_STAMP)}_"
+                 f"{datetime.fromtimestamp(self._last).strftime(_STAMP)}")
+        target = os.path.join(self.directory, f"{self.base_name}_{stamp}.jsonl")
+        suffix = 1
+        while os.path.exists(target) or os.path.exists(target + '.gz'):
+            target = os.path.join(self.directory, f"{self.base_name}_{stamp}-{suffix}.jsonl")
+            suffix += 1
+        os.replace(self.path, target)
+        if self.compress:
+            with open(target, 'rb') as src, gzip.open(target + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+        ROTATIONS.inc()
+        if self.backups:
+            for old in rotated_files(self.directory, self.base_name)[:-self.backups]:
+                os.remove(old[2])
+
+    # --- Consulta ---
+    def query(self, **filters):
+        """Como query_events sobre este registro, incluidos los eventos aún en cola."""
+        self.flush()
+        return query_events(self.directory, base_name=self.base_name, **filters)
+
+
+def rotated_files(directory, base_name='events'):
+    """[(primero, último, ruta)] de los ficheros rotados, del más antiguo al más reciente."""
+    pattern = re.compile(re.escape(base_name) + r'_(\d{8}_\d{6})_(\d{8}_\d{6})(?:-\d+)?\.jsonl(?:\.gz)?$')
+    files = []
+    for path in glob.glob(os.path.join(directory, f"{base_name}_*.jsonl*")):
+        match = pattern.match(os.path.basename(path))
+        if not match:
+            continue
+        try:
+            first, last = (datetime.strptime(g, _STAMP).timestamp() for g in match.groups())
+        except ValueError:
+            continue
+        files.append((first, last, path))
+    files.sort()
+    return files
+
+
+def _epoch(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+def query_events(directory='logs', agent=None, start=None, end=None, level=None, metric=None,
+                 base_name='events', limit=None):
+    """
+    Eventos que cumplen los filtros, en orden cronológico.
+
+    Args:
+        agent: Solo los de este agente
+        start, end: Periodo (epoch, datetime o ISO), extremos incluidos
+        level: Nivel mínimo ('warning' = avisos y errores)
+        metric: Solo los de esta métrica
+        limit: Como mucho los N primeros
+    """
+    start, end = _epoch(start), _epoch(end)
+    min_rank = _LEVEL_RANK[level] if level else 0
+    # Los nombres llevan segundos enteros: el último evento puede estar hasta 1 s después
+    paths = [path for first, last, path in rotated_files(directory, base_name)
+             if (start is None or last + 1 >= start) and (end is None or first <= end)]
+    current = os.path.join(directory, f"{base_name}.jsonl")
+    if os.path.exists(current):
+        paths.append(current)
+    # Filtro previo por texto: solo se decodifican las líneas que pueden coincidir
+    needle = json.dumps(agent, ensure_ascii=False) if agent is not None else None
+    found = 0
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if needle is not None and needle not in line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # línea a medio escribir
+                ts = event.get('ts', 0)
+                if (start is not None and ts < start) or (end is not None and ts > end):
+                    continue
+                if agent is not None and event.get('agent') != agent:
+                    continue
+                if metric is not None and event.get('metric') != metric:
+                    continue
+                if min_rank and _LEVEL_RANK.get(event.get('level'), 0) < min_rank:
+                    continue
+                yield event
+                found += 1
+                if limit and found >= limit:
+                    return
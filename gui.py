@@ -1,18 +1,38 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import os
+import tempfile
 import time
 import threading
-from snmp_logic import NetworkLogic
+import webbrowser
+from snmp_logic import NetworkLogic, SNMP_POLL_SECONDS, AGENTS_POLLED, TIMEOUTS, OPS_IN_FLIGHT
 from data_export import DataExporter
 from visualizer import DataVisualizer
 from threshold_config import ThresholdConfigDialog
+from metrics import REGISTRY
+from agent_table import VirtualAgentTable
+from task_runner import TaskRejected, CANCELLED, FAILED
 import scanner
+from discovery_pipeline import DiscoveryPipeline
+
+TK_LOOP_LAG = REGISTRY.histogram('gui_event_loop_lag_seconds',
+                                 'Retraso del bucle de eventos de Tk').labels()
+TK_LOG_BACKLOG = REGISTRY.gauge('gui_log_backlog',
+                                'Mensajes de log encolados pendientes de pintar').labels()
+
+# Intervalos (ms) del muestreo de lag y del refresco del panel de estado
+LAG_SAMPLE_MS = 250
+STATUS_REFRESH_MS = 1000
+
+# Por encima de este número de agentes el detalle va solo a la tabla
+DETAIL_LOG_MAX_AGENTS = 20
 
 class NetworkMonitorGUI:
-    def __init__(self, root):
+    def __init__(self, root, metrics_url=None):
         self.root = root
+        self.metrics_url = metrics_url
         self.root.title("Monitor de Red Avanzado (SNMP/RMON)")
-        self.root.geometry("750x650")
+        self.root.geometry("900x850")
         
         # Instanciar lógica y módulos
         self.logic = NetworkLogic(self.log_threadsafe)
@@ -21,6 +41,18 @@ class NetworkMonitorGUI:
         
         self._init_ui()
         self.log("Interfaz iniciada.")
+        if self.metrics_url:
+            self.log(f"Métricas del colector en {self.metrics_url}")
+        # Los logs de la lógica y los eventos por agente sobreviven al cierre
+        try:
+            self.logic.start_event_log('logs')
+        except OSError as e:
+            self.log(f"⚠️ Sin registro de eventos: {e}")
+
+        self._lag_expected = time.perf_counter() + LAG_SAMPLE_MS / 1000
+        self.root.after(LAG_SAMPLE_MS, self._sample_event_loop_lag)
+        self.root.after(STATUS_REFRESH_MS, self._refresh_metrics_panel)
+        self.root.after(self.agent_table.refresh_ms, self._sync_agent_table)
         
         if not self.logic.is_snmp_available():
             self.log("ALERTA: pysnmp no detectado.")
@@ -32,6 +64,20 @@ class NetworkMonitorGUI:
         style.configure('TButton', padding=6, background="#007bff", foreground="white")
         style.map('TButton', background=[('active', '#0056b3')])
         
+        # Menú de diagnóstico
+        menubar = tk.Menu(self.root)
+        diag_menu = tk.Menu(menubar, tearoff=0)
+        diag_menu.add_command(label="🔬 Perfilar 10 s (muestreo)",
+                              command=lambda: self.start_profile('sampling'))
+        diag_menu.add_command(label="🔬 Perfilar 10 s (cProfile)",
+                              command=lambda: self.start_profile('cprofile'))
+        diag_menu.add_separator()
+        diag_menu.add_command(label="🧠 Snapshot de memoria", command=self.memory_snapshot)
+        diag_menu.add_command(label="Detener trazado de memoria",
+                              command=self.logic.profiler.stop_memory_tracing)
+        menubar.add_cascade(label="Diagnóstico", menu=diag_menu)
+        self.root.config(menu=menubar)
+
         # Main Frame
         main_frame = ttk.Frame(self.root, padding="15")
         main_frame.pack(expand=True, fill=tk.BOTH)
@@ -52,6 +98,11 @@ class NetworkMonitorGUI:
         self.btn_scan = ttk.Button(input_frame, text="🔍", width=3, command=self._start_scan)
         self.btn_scan.pack(side=tk.LEFT, padx=2)
 
+        # Botón Auto: escanear, identificar y sondear de forma continua
+        self.btn_auto = ttk.Button(input_frame, text="🚀 Auto", width=8, command=self._toggle_pipeline)
+        self.btn_auto.pack(side=tk.LEFT, padx=2)
+        self.pipeline = None
+
         ttk.Label(input_frame, text="Comunidad:", font=("Segoe UI", 10, "bold")).pack(side=tk.LEFT, padx=5)
         self.entry_comm = ttk.Entry(input_frame, width=15)
         self.entry_comm.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
@@ -59,7 +110,7 @@ class NetworkMonitorGUI:
 
         # Control para número de agentes
         ttk.Label(input_frame, text="Agentes:", font=("Segoe UI", 10, "bold")).pack(side=tk.LEFT, padx=5)
-        self.spin_agents = ttk.Spinbox(input_frame, from_=1, to=10, width=5)
+        self.spin_agents = ttk.Spinbox(input_frame, from_=1, to=5000, width=6)
         self.spin_agents.pack(side=tk.LEFT, padx=5)
         self.spin_agents.set(3)
 
@@ -76,6 +127,9 @@ class NetworkMonitorGUI:
         self.btn_ping = ttk.Button(btn_frame, text="Eficiencia Ping", command=self.on_click_ping)
         self.btn_ping.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
 
+        self.btn_cancel = ttk.Button(btn_frame, text="⏹ Cancelar", width=12, command=self.on_click_cancel)
+        self.btn_cancel.pack(side=tk.LEFT, padx=5)
+
         # === FRAME DE EXPORTACIÓN Y VISUALIZACIÓN ===
         tools_frame = ttk.LabelFrame(main_frame, text="📊 Herramientas Avanzadas", padding="10")
         tools_frame.pack(fill=tk.X, pady=10)
@@ -92,6 +146,9 @@ class NetworkMonitorGUI:
         self.btn_export_json = ttk.Button(export_row, text="📋 JSON", width=12, command=self.export_json)
         self.btn_export_json.pack(side=tk.LEFT, padx=2)
 
+        self.btn_report = ttk.Button(export_row, text="📑 Informe", width=12, command=self.generate_report)
+        self.btn_report.pack(side=tk.LEFT, padx=2)
+
         # Fila 2: Visualización
         viz_row = ttk.Frame(tools_frame)
         viz_row.pack(fill=tk.X, pady=5)
@@ -116,9 +173,28 @@ class NetworkMonitorGUI:
         self.btn_config = ttk.Button(config_row, text="⚙️ Config. Umbrales", width=18, command=self.config_thresholds)
         self.btn_config.pack(side=tk.LEFT, padx=2)
 
+        self.btn_diff = ttk.Button(config_row, text="🔀 Cambios", width=12, command=self.show_poll_diff)
+        self.btn_diff.pack(side=tk.LEFT, padx=2)
+
+        self.btn_diff_files = ttk.Button(config_row, text="🔀 Comparar Exports", width=18, command=self.diff_exports)
+        self.btn_diff_files.pack(side=tk.LEFT, padx=2)
+
+        # === PANEL DE ESTADO DEL COLECTOR ===
+        metrics_frame = ttk.LabelFrame(main_frame, text="📡 Estado del Colector", padding="5")
+        metrics_frame.pack(fill=tk.X, pady=(0, 5))
+        self.metrics_label = ttk.Label(metrics_frame, text="Sin datos todavía", font=("Consolas", 8))
+        self.metrics_label.pack(anchor=tk.W)
+
+        # === TABLA DE AGENTES ===
+        table_frame = ttk.LabelFrame(main_frame, text="🖥️ Agentes (último sondeo SNMP)", padding="5")
+        table_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
+        self.agent_table = VirtualAgentTable(table_frame)
+        self.agent_table.pack(fill=tk.BOTH, expand=True)
+        self._table_source = None
+
         # === LOG ÁREA ===
         ttk.Label(main_frame, text="📝 Bitácora:", font=("Segoe UI", 9, "bold")).pack(anchor=tk.W)
-        self.txt_log = scrolledtext.ScrolledText(main_frame, height=18, state=tk.DISABLED, font=("Consolas", 9))
+        self.txt_log = scrolledtext.ScrolledText(main_frame, height=10, state=tk.DISABLED, font=("Consolas", 9))
         self.txt_log.pack(expand=True, fill=tk.BOTH)
 
         # === STATUS BAR ===
@@ -138,7 +214,42 @@ class NetworkMonitorGUI:
 
     def log_threadsafe(self, msg):
         """Callback seguro para hilos."""
-        self.root.after(0, self.log, msg)
+        TK_LOG_BACKLOG.inc()
+        self.root.after(0, self._log_queued, msg)
+
+    def _log_queued(self, msg):
+        """Pinta un mensaje encolado por log_threadsafe."""
+        TK_LOG_BACKLOG.dec()
+        self.log(msg)
+
+    # === AUTO-INSTRUMENTACIÓN ===
+    def _sample_event_loop_lag(self):
+        """Mide cuánto se retrasa un after() periódico respecto a lo previsto."""
+        now = time.perf_counter()
+        TK_LOOP_LAG.observe(max(0.0, now - self._lag_expected))
+        self._lag_expected = now + LAG_SAMPLE_MS / 1000
+        self.root.after(LAG_SAMPLE_MS, self._sample_event_loop_lag)
+
+    def _refresh_metrics_panel(self):
+        """Resume las métricas principales en el panel de estado."""
+        exports = REGISTRY.get('export_files_total')
+        text = (f"Agentes sondeados: {AGENTS_POLLED.value} | "
+                f"p95 SNMP: {SNMP_POLL_SECONDS.quantile(0.95) * 1000:.0f} ms | "
+                f"Timeouts: {TIMEOUTS.value} | "
+                f"En curso: {OPS_IN_FLIGHT.get()}\n"
+                f"Lag Tk p95: {TK_LOOP_LAG.quantile(0.95) * 1000:.0f} ms | "
+                f"Cola log: {TK_LOG_BACKLOG.get()} | "
+                f"Exportaciones: {exports.total() if exports else 0}")
+        self.metrics_label.config(text=text)
+        self.root.after(STATUS_REFRESH_MS, self._refresh_metrics_panel)
+
+    def _sync_agent_table(self):
+        """Pasa a la tabla el último snapshot SNMP si cambió."""
+        snapshot = self.logic.snapshot('snmp')
+        if snapshot.version != self._table_source:
+            self._table_source = snapshot.version
+            self.agent_table.update(list(snapshot.data))
+        self.root.after(self.agent_table.refresh_ms, self._sync_agent_table)
 
     def update_status(self, msg, color="green"):
         """Actualiza la barra de estado."""
@@ -150,8 +261,12 @@ class NetworkMonitorGUI:
         self.btn_scan.config(state=tk.DISABLED)
         self.log("Iniciando escaneo de red...")
         self.update_status("🔍 Escaneando...", "orange")
+        self.logic.enricher.community = self.entry_comm.get()
         t = threading.Thread(target=scanner.scan_network_subnet, 
-                             args=(self._on_ip_found, self._on_scan_finish), 
+                             args=(self._on_ip_found, self._on_scan_finish),
+                             kwargs={'log_callback': self.logic.log_threadsafe,
+                                     'enricher': self.logic.enricher,
+                                     'callback_enriched': self._on_host_enriched},
                              daemon=True)
         t.start()
 
@@ -159,51 +274,120 @@ class NetworkMonitorGUI:
         pass
 
     def _on_scan_finish(self, ips):
+        self.logic.set_discovered_hosts(ips)
+        self.logic.enricher.enrich(ips, self._on_host_enriched)
         self.root.after(0, lambda: self._update_combo(ips))
 
     def _update_combo(self, ips):
         self.log(f"Escaneo finalizado. Hosts encontrados: {len(ips)}")
-        self.combo_ip['values'] = ips
+        self._refresh_combo_labels()
         self.btn_scan.config(state=tk.NORMAL)
         self.update_status("✓ Listo")
 
+    def _on_host_enriched(self, info):
+        if info.name:
+            self.root.after(0, self._refresh_combo_labels)
+
+    def _refresh_combo_labels(self):
+        """Muestra 'ip — nombre' para los hosts ya enriquecidos."""
+        hosts = self.logic.discovered_hosts or ("127.0.0.1:16161",)
+        self.combo_ip['values'] = [self.logic.enricher.label(ip) for ip in hosts]
+
+    def _selected_target(self):
+        """Dirección seleccionada, sin el nombre que añade el enriquecimiento."""
+        return self.combo_ip.get().split(" — ")[0].strip()
+
+    def _toggle_pipeline(self):
+        """Arranca o detiene el flujo escaneo -> identificación -> sondeo."""
+        if self.pipeline:
+            pipeline, self.pipeline = self.pipeline, None
+            threading.Thread(target=pipeline.stop, daemon=True).start()
+            self.btn_auto.config(text="🚀 Auto")
+            self.log("⏹ Monitoreo automático detenido.")
+            return
+        comm = self.entry_comm.get()
+        self.logic.enricher.community = comm
+        self.pipeline = DiscoveryPipeline(self.logic, comm, log_callback=self.logic.log_threadsafe)
+        self.pipeline.start(extra_targets=[self._selected_target()])
+        self.btn_auto.config(text="⏹ Auto")
+
+    def stop_pipeline(self):
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+
     # === MÉTODOS DE MONITOREO ===
+    def _track_task(self, handle, button, label):
+        """Reactiva el botón en cuanto la operación termina y muestra su progreso."""
+        def on_progress(h):
+            done, total = h.progress
+            if total:
+                self.root.after(0, self.update_status, f"🔄 {label}: {done}/{total}", "blue")
+
+        def on_done(h):
+            self.root.after(0, self._on_task_done, h, button, label)
+
+        handle.add_progress_callback(on_progress)
+        handle.add_done_callback(on_done)
+
+    def _on_task_done(self, handle, button, label):
+        button.config(state=tk.NORMAL)
+        if handle.status == CANCELLED:
+            self.update_status(f"⏹ {label} cancelado", "orange")
+        elif handle.status == FAILED:
+            self.update_status(f"❌ {label} falló: {handle.error}", "red")
+        elif not self.logic.executor.active():
+            self.update_status("✓ Listo")
+
+    def _submit(self, button, label, run, *args):
+        """Lanza una operación y conecta su TaskHandle con la interfaz."""
+        try:
+            handle = run(*args)
+        except TaskRejected as e:
+            messagebox.showwarning("Operación en cola", str(e))
+            return
+        button.config(state=tk.DISABLED)
+        self.update_status(f"🔄 Ejecutando {label}...", "blue")
+        self._track_task(handle, button, label)
+
     def on_click_snmp(self):
-        ip = self.combo_ip.get()
+        ip = self._selected_target()
         comm = self.entry_comm.get()
         num_agents = int(self.spin_agents.get())
         if not ip: return
-        self.btn_snmp.config(state=tk.DISABLED)
-        self.update_status("🔄 Ejecutando SNMP...", "blue")
-        
-        self.logic.run_snmp_test(ip, comm, num_agents)
-        self.root.after(5000, lambda: [
-            self.btn_snmp.config(state=tk.NORMAL),
-            self.update_status("✓ Listo")
-        ])
+        # Flotas grandes: detalle solo en la tabla y generación vectorizada
+        large = num_agents > DETAIL_LOG_MAX_AGENTS
+        self.logic.simulation.summary_only = large
+        self.logic.simulation.vectorized = large
+        self._submit(self.btn_snmp, "SNMP", self.logic.run_snmp_test, ip, comm, num_agents)
 
     def on_click_ping(self):
-        ip = self.combo_ip.get()
+        ip = self._selected_target()
         if not ip: return
-        self.btn_ping.config(state=tk.DISABLED)
-        self.update_status("🔄 Ejecutando Ping...", "blue")
-        self.logic.run_ping_test(ip)
-        self.root.after(5000, lambda: [
-            self.btn_ping.config(state=tk.NORMAL),
-            self.update_status("✓ Listo")
-        ])
+        self._submit(self.btn_ping, "Ping", self.logic.run_ping_test, ip)
 
     def on_click_rmon(self):
-        ip = self.combo_ip.get()
+        ip = self._selected_target()
         num_agents = int(self.spin_agents.get())
         if not ip: return
-        self.btn_rmon.config(state=tk.DISABLED)
-        self.update_status("🔄 Ejecutando RMON...", "blue")
-        self.logic.run_rmon_test(ip, num_agents)
-        self.root.after(8000, lambda: [
-            self.btn_rmon.config(state=tk.NORMAL),
-            self.update_status("✓ Listo")
-        ])
+        self._submit(self.btn_rmon, "RMON", self.logic.run_rmon_test, ip, num_agents)
+
+    def on_click_cancel(self):
+        """Cancela todas las operaciones en curso."""
+        if self.logic.executor.active():
+            self.logic.cancel_all()
+            self.log("Cancelación solicitada.")
+
+    # === MÉTODOS DE DIAGNÓSTICO ===
+    def start_profile(self, mode, seconds=10):
+        """Lanza una sesión de perfilado sobre el colector en ejecución."""
+        if not self.logic.profiler.start_profile(seconds, mode):
+            messagebox.showwarning("Perfilado en curso",
+                "Ya hay una sesión de perfilado activa.\nEspera a que termine.")
+
+    def memory_snapshot(self):
+        """Toma un snapshot de memoria en segundo plano."""
+        threading.Thread(target=self.logic.profiler.memory_snapshot, daemon=True).start()
 
     # === MÉTODOS DE EXPORTACIÓN ===
     def export_csv(self):
@@ -313,6 +497,85 @@ class NetworkMonitorGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Error al mostrar comparación: {e}")
 
+    def show_poll_diff(self):
+        """Muestra qué cambió entre los dos últimos sondeos SNMP."""
+        result = self.logic.diff_last_polls()
+        if result is None:
+            messagebox.showwarning("Sin Datos",
+                "Se necesitan dos mediciones SNMP.\nEjecuta el monitoreo SNMP dos veces.")
+            return
+        self._show_diff_window("Cambios entre los dos últimos sondeos", result.report())
+        self.log(f"Diff de sondeos: {result.changed} agentes con cambios, "
+                 f"{len(result.transitions)} transiciones de estado.")
+
+    def diff_exports(self):
+        """Compara dos ficheros de exports/ elegidos por el usuario."""
+        from snapshot_diff import diff_files, default_output
+        kinds = [("Exportaciones", "*.csv *.json"), ("Todos", "*.*")]
+        old = filedialog.askopenfilename(title="Exportación anterior", initialdir=self.exporter.export_dir,
+                                         filetypes=kinds)
+        if not old:
+            return
+        new = filedialog.askopenfilename(title="Exportación nueva", initialdir=self.exporter.export_dir,
+                                         filetypes=kinds)
+        if not new:
+            return
+        self.update_status("🔄 Comparando exportaciones...", "blue")
+
+        def work():
+            try:
+                result, written = diff_files(old, new, output=default_output(self.exporter.export_dir))
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Error", f"Error al comparar: {e}")
+                self.root.after(0, self.update_status, "✓ Listo")
+                return
+            report = result.report()
+            if written:
+                report += f"\n\nDiferencias por agente guardadas en: {written}"
+            self.root.after(0, self._show_diff_window, "Comparación de exportaciones", report)
+            self.root.after(0, self.update_status, "✓ Listo")
+        threading.Thread(target=work, daemon=True).start()
+
+    def generate_report(self):
+        """Informe gráfico por agente del historial de la sesión, renderizado en segundo plano."""
+        if not len(self.logic.snmp_history):
+            messagebox.showwarning("Advertencia", "No hay historial SNMP.\nEjecute primero un sondeo SNMP.")
+            return
+        self.btn_report.config(state=tk.DISABLED)
+        self.update_status("🔄 Generando informe...", "blue")
+
+        def work():
+            from batch_report import ReportGenerator
+            from history_store import HistoryStore, RMON_SCHEMA
+            try:
+                with tempfile.TemporaryDirectory() as tmp:
+                    snmp_path = self.logic.snmp_history.save(os.path.join(tmp, 'snmp.hst'))
+                    rmon_path = None
+                    if self.logic.rmon_history:
+                        rmon = HistoryStore(RMON_SCHEMA)
+                        for entry in list(self.logic.rmon_history):
+                            rmon.append(entry['agents'], entry['timestamp'])
+                        rmon_path = rmon.save(os.path.join(tmp, 'rmon.hst'))
+                    index = ReportGenerator(snmp_path, rmon_path, thresholds=self.logic.alarm_thresholds,
+                                            log_callback=self.log_threadsafe).run()
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Error", f"Error al generar el informe: {e}")
+            else:
+                self.root.after(0, messagebox.showinfo, "Informe", f"Informe generado en:\n{index}")
+                webbrowser.open('file://' + os.path.abspath(index))
+            self.root.after(0, self.btn_report.config, {'state': tk.NORMAL})
+            self.root.after(0, self.update_status, "✓ Listo")
+        threading.Thread(target=work, daemon=True).start()
+
+    def _show_diff_window(self, title, report):
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        window.geometry("640x480")
+        text = scrolledtext.ScrolledText(window, font=("Consolas", 9), wrap=tk.NONE)
+        text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        text.insert(tk.END, report)
+        text.config(state=tk.DISABLED)
+
     def config_thresholds(self):
         """Abre diálogo de configuración de umbrales."""
         try:
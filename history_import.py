@@ -0,0 +1,314 @@
+"""
+Importación masiva de exportaciones (exports/) al historial compacto.
+Los ficheros snmp_export_* y rmon_export_* (CSV o JSON) se analizan en
+paralelo en un pool de procesos y sus filas entran en HistoryStore en un
+solo lote ordenado por tiempo, de modo que todo se puede consultar junto.
+
+Un manifiesto (ruta, mtime, tamaño y SHA-256 de cada fichero) evita
+reimportar: lo que no ha cambiado se descarta solo con un stat, sin leerlo,
+y un fichero copiado o tocado sin cambios se reconoce por su hash. El
+manifiesto guarda también un índice por agente (primera y última muestra,
+número de muestras) para saber qué hay sin abrir el historial.
+
+El historial solo admite muestras posteriores a las que ya tiene: importar
+una exportación más antigua que lo ya importado es un error
+(ImportOrderError) y `force` reconstruye el historial desde todas las
+exportaciones, en orden.
+"""
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from history_store import HistoryStore, SNMP_SCHEMA, RMON_SCHEMA
+from metrics import REGISTRY
+
+_FILES = REGISTRY.counter('history_import_files_total', 'Ficheros de exportación vistos por el importador')
+FILES_IMPORTED = _FILES.labels(result='imported')
+FILES_SKIPPED = _FILES.labels(result='unchanged')
+FILES_FAILED = _FILES.labels(result='error')
+ROWS_IMPORTED = REGISTRY.counter('history_import_rows_total', 'Filas añadidas al historial').labels()
+
+SCHEMAS = {'snmp': SNMP_SCHEMA, 'rmon': RMON_SCHEMA}
+MANIFEST_VERSION = 1
+
+_EXPORT_NAME = re.compile(r'^(snmp|rmon)_export_(\d{8}_\d{6})\.(csv|json)$')
+# Por debajo de este número de ficheros no compensa arrancar procesos
+MIN_FILES_FOR_POOL = 8
+
+
+class ImportOrderError(ValueError):
+    """Filas anteriores a lo ya guardado de su agente: el historial no admite insertar en medio."""
+
+
+def export_kind(path):
+    """('snmp'|'rmon', instante del nombre) de una exportación, o None si no lo es."""
+    match = _EXPORT_NAME.match(os.path.basename(path))
+    if not match:
+        return None
+    try:
+        return match.group(1), datetime.strptime(match.group(2), "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return None
+
+
+def _number(value, cast):
+    if value is None or value == '':
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return cast(float(value))
+
+
+def _typed(row, schema, timestamp):
+    """Fila con los tipos del esquema (los CSV traen todo como texto)."""
+    out = {schema.key: row.get(schema.key)}
+    for field in schema.static:
+        value = row.get(field)
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        out[field] = value
+    for field in schema.counters:
+        out[field] = _number(row.get(field), int)
+    for field in schema.gauges:
+        out[field] = _number(row.get(field), float)
+    for field in schema.labels:
+        out[field] = row.get(field) or None
+    out[schema.timestamp] = row.get(schema.timestamp) or timestamp
+    return out
+
+
+def parse_export(path):
+    """
+    Lee una exportación (se ejecuta en los procesos del pool). Retorna un
+    dict con kind, sha256 y las filas tipadas, o 'error' si no se pudo leer.
+    """
+    kind, timestamp = export_kind(path)
+    schema = SCHEMAS[kind]
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        text = content.decode('utf-8')
+        if path.endswith('.json'):
+            data = json.loads(text)
+            if kind == 'rmon':
+                data = data.get('data', data)
+            # El instante del sondeo pesa más que el de la exportación
+            timestamp = data.get('timestamp') or timestamp
+            raw_rows = data.get('agents', [])
+        else:
+            raw_rows = csv.DictReader(text.splitlines())
+        rows = [_typed(row, schema, timestamp) for row in raw_rows if row.get(schema.key)]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return {'path': path, 'kind': kind, 'error': str(e)}
+    return {'path': path, 'kind': kind, 'sha256': digest, 'rows': rows}
+
+
+class ImportStats:
+    """Resumen de una importación."""
+
+    def __init__(self):
+        self.scanned = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.imported = 0
+        self.failed = 0
+        self.rows = 0
+        self.duplicate_rows = 0
+        self.elapsed = 0.0
+
+    def report(self):
+        return (f"{self.scanned} fichero(s): {self.imported} importado(s), {self.unchanged} sin cambios, "
+                f"{self.duplicates} duplicado(s), {self.failed} con error; {self.rows:,} filas nuevas "
+                f"({self.duplicate_rows:,} repetidas) en {self.elapsed * 1000:.0f} ms")
+
+
+class HistoryImporter:
+    """
+    Importa exports/ a un historial por tipo (snmp.hst, rmon.hst) en `store_dir`.
+
+    Args:
+        export_dir: Directorio con las exportaciones
+        store_dir: Directorio de los historiales y del manifiesto
+        workers: Procesos del pool (None = núcleos de la máquina)
+    """
+
+    def __init__(self, export_dir='exports', store_dir='history', workers=None, log_callback=None):
+        self.export_dir = export_dir
+        self.store_dir = store_dir
+        self.workers = workers
+        self.log_callback = log_callback
+        self.manifest_path = os.path.join(store_dir, 'manifest.json')
+        self.manifest = self._load_manifest()
+        self.stores = {}
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'version': MANIFEST_VERSION, 'files': {}, 'index': {kind: {} for kind in SCHEMAS}}
+
+    def store_path(self, kind):
+        return os.path.join(self.store_dir, f"{kind}.hst")
+
+    def store(self, kind):
+        """HistoryStore de `kind`, cargado del disco la primera vez."""
+        if kind not in self.stores:
+            path = self.store_path(kind)
+            self.stores[kind] = HistoryStore.load(path) if os.path.exists(path) \
+                else HistoryStore(SCHEMAS[kind])
+        return self.stores[kind]
+
+    def _pending(self, stats, force=False):
+        """Exportaciones nuevas o modificadas (mtime o tamaño distintos)."""
+        files = self.manifest['files']
+        pending = []
+        for path in sorted(glob.glob(os.path.join(self.export_dir, '*_export_*'))):
+            if export_kind(path) is None:
+                continue
+            stats.scanned += 1
+            st = os.stat(path)
+            entry = files.get(path)
+            if not force and entry and entry['mtime'] == st.st_mtime and entry['size'] == st.st_size:
+                stats.unchanged += 1
+                FILES_SKIPPED.inc()
+                continue
+            pending.append((path, st))
+        return pending
+
+    def _parse(self, paths):
+        if len(paths) < MIN_FILES_FOR_POOL or self.workers == 1:
+            return [parse_export(path) for path in paths]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(parse_export, paths, chunksize=max(1, len(paths) // 64)))
+
+    def run(self, force=False):
+        """
+        Importa lo pendiente, guarda historiales y manifiesto. Retorna
+        ImportStats. Con `force` reconstruye los historiales desde todas las
+        exportaciones. Lanza ImportOrderError (sin tocar nada) si hay filas
+        anteriores a lo ya importado.
+        """
+        start = time.perf_counter()
+        stats = ImportStats()
+        if force:
+            self.manifest = {'version': MANIFEST_VERSION, 'files': {}, 'index': {kind: {} for kind in SCHEMAS}}
+            self.stores = {kind: HistoryStore(schema) for kind, schema in SCHEMAS.items()}
+        pending = self._pending(stats, force)
+        if pending:
+            results = self._parse([path for path, _ in pending])
+            known = {entry.get('sha256') for entry in self.manifest['files'].values()}
+            batches = {kind: [] for kind in SCHEMAS}
+            entries = {}
+            for (path, st), result in zip(pending, results):
+                entry = {'mtime': st.st_mtime, 'size': st.st_size, 'kind': result['kind']}
+                if 'error' in result:
+                    stats.failed += 1
+                    FILES_FAILED.inc()
+                    self._log(f"⚠️ {path}: {result['error']}")
+                    continue
+                entry['sha256'] = result['sha256']
+                if result['sha256'] in known:
+                    stats.duplicates += 1
+                    FILES_SKIPPED.inc()
+                else:
+                    known.add(result['sha256'])
+                    batches[result['kind']].extend(result['rows'])
+                    entry['rows'] = len(result['rows'])
+                    stats.imported += 1
+                    FILES_IMPORTED.inc()
+                entries[path] = entry
+            # Validar todos los lotes antes de modificar ningún historial
+            accepted = {kind: self._prepare(kind, rows) for kind, rows in batches.items() if rows}
+            for kind, (rows, times) in accepted.items():
+                self._append(kind, rows, times)
+                stats.rows += len(rows)
+                stats.duplicate_rows += len(batches[kind]) - len(rows)
+            self.manifest['files'].update(entries)
+            self._save()
+        stats.elapsed = time.perf_counter() - start
+        self._log(f"📥 Importación: {stats.report()}")
+        return stats
+
+    def _prepare(self, kind, rows):
+        """
+        Ordena un lote por tiempo y descarta las filas repetidas (mismo
+        agente e instante: la misma instantánea exportada en CSV y en JSON,
+        o ya guardada). Retorna (filas, {texto ISO: epoch}); lanza
+        ImportOrderError si alguna es anterior a lo ya guardado del agente.
+        """
+        schema = SCHEMAS[kind]
+        store = self.store(kind)
+        times = {}
+        for row in rows:
+            value = row[schema.timestamp]
+            if value not in times:
+                times[value] = datetime.fromisoformat(value).timestamp()
+        rows = sorted(rows, key=lambda row: times[row[schema.timestamp]])
+        last = {}
+        accepted = []
+        late = []
+        for row in rows:
+            agent = row[schema.key]
+            if agent not in last:
+                last[agent] = store.last_timestamp(agent)
+            ts = times[row[schema.timestamp]]
+            previous = last[agent]
+            if previous is not None and ts <= previous:
+                # Los instantes se guardan en microsegundos: iguales a esa precisión
+                if round(ts * 1e6) == round(previous * 1e6):
+                    continue
+                late.append(row)
+                continue
+            last[agent] = ts
+            accepted.append(row)
+        if late:
+            row = late[0]
+            raise ImportOrderError(
+                f"{len(late):,} fila(s) {kind.upper()} anteriores a lo ya importado (p. ej. "
+                f"{row[schema.key]} en {row[schema.timestamp]}); reconstruye el historial con --force")
+        return accepted, times
+
+    def _append(self, kind, rows, times):
+        """Añade un lote validado por _prepare y actualiza el índice por agente."""
+        schema = SCHEMAS[kind]
+        self.store(kind).append_many(rows)
+        ROWS_IMPORTED.inc(len(rows))
+        index = self.manifest['index'][kind]
+        for row in rows:
+            ts = times[row[schema.timestamp]]
+            first, _, samples = index.get(row[schema.key], (ts, ts, 0))
+            index[row[schema.key]] = (first, ts, samples + 1)
+
+    def _save(self):
+        for kind, store in self.stores.items():
+            store.save(self.store_path(kind))
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    # --- Consultas sobre el índice ---
+    def agents(self, kind='snmp', start=None, end=None):
+        """
+        Agentes con muestras en [start, end] (epoch en segundos) según el
+        índice: {agente: (primera, última, muestras)}.
+        """
+        return {agent: tuple(info) for agent, info in self.manifest['index'][kind].items()
+                if (start is None or info[1] >= start) and (end is None or info[0] <= end)}
@@ -0,0 +1,451 @@
+"""
+Almacén compacto de historial por agente.
+Separa los atributos estáticos o de cambio lento (internados una vez por
+agente y guardados solo cuando cambian) de las métricas de cada muestra,
+que se guardan como deltas zigzag-varint en bloques de tamaño fijo.
+La lectura de rangos decodifica cada bloque de golpe con NumPy.
+
+El almacén es genérico: un HistorySchema describe qué campo identifica al
+agente y cómo se guarda cada columna.
+"""
+import json
+import os
+import struct
+import threading
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b'HST1'
+CHUNK_SAMPLES = 256
+
+
+class HistorySchema:
+    """
+    Describe las columnas de un historial.
+
+    Args:
+        key: Campo que identifica al agente
+        static: Campos que casi nunca cambian (se internan por agente)
+        counters: Campos enteros (contadores, días...)
+        gauges: Dict campo -> decimales; se guardan como enteros escalados
+        labels: Campos categóricos por muestra (p. ej. Status)
+        timestamp: Campo con la marca de tiempo ISO de cada fila
+    """
+
+    def __init__(self, key, static=(), counters=(), gauges=None, labels=(), timestamp='timestamp'):
+        self.key = key
+        self.static = tuple(static)
+        self.counters = tuple(counters)
+        self.gauges = dict(gauges or {})
+        self.labels = tuple(labels)
+        self.timestamp = timestamp
+        # Todas las columnas por muestra se codifican como enteros
+        self.columns = (timestamp,) + self.counters + tuple(self.gauges) + self.labels
+        self._scales = {name: 10 ** decimals for name, decimals in self.gauges.items()}
+
+    def to_dict(self):
+        return {'key': self.key, 'static': list(self.static), 'counters': list(self.counters),
+                'gauges': self.gauges, 'labels': list(self.labels), 'timestamp': self.timestamp}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['key'], d['static'], d['counters'], d['gauges'], d['labels'], d['timestamp'])
+
+
+SNMP_SCHEMA = HistorySchema(
+    key='Agent',
+    static=('Device_Type', 'Device_Name', 'Speed_Mbps'),
+    counters=('Uptime_Days', 'IN_Octets', 'OUT_Octets', 'IN_Packets', 'OUT_Packets',
+              'IN_Errors', 'OUT_Errors'),
+    gauges={'Total_Data_GB': 2, 'Utilization_%': 2, 'Error_Rate_%': 4},
+    labels=('Status', 'Anomaly'),
+)
+
+# Estadísticas Ethernet RMON por agente (last_rmon_data['agents'])
+RMON_SCHEMA = HistorySchema(
+    key='Agent',
+    counters=('Drop_Events', 'Octets', 'Packets', 'Broadcast_Pkts', 'Multicast_Pkts',
+              'CRC_Errors', 'Collisions', 'Fragments'),
+)
+
+# Contadores por interfaz (InterfaceSample), una serie por 'agente/ifIndex'
+IF_SCHEMA = HistorySchema(
+    key='Interface',
+    static=('Agent', 'If_Index', 'If_Name', 'Speed_Mbps'),
+    counters=('IN_Octets', 'OUT_Octets', 'IN_Packets', 'OUT_Packets', 'IN_Errors', 'OUT_Errors'),
+    gauges={'Utilization_%': 2, 'Error_Rate_%': 4},
+    labels=('Oper_Status', 'Status', 'Anomaly'),
+)
+
+
+# --- Varints ---
+def _zigzag(n):
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def _put_varint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def decode_varints(data):
+    """Decodifica una secuencia de varints zigzag a un array int64 (vectorizado)."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shift = ((np.arange(len(b)) - starts[group]) * 7).astype(np.uint64)
+    raw = np.add.reduceat((b & 0x7F).astype(np.uint64) << shift, starts)
+    return ((raw >> np.uint64(1)) ^ (np.uint64(0) - (raw & np.uint64(1)))).view(np.int64)
+
+
+def encode_varints(values):
+    """Inverso de decode_varints: enteros -> bytes de varints zigzag (vectorizado)."""
+    v = np.asarray(values, dtype=np.int64)
+    if not len(v):
+        return b''
+    z = ((v << 1) ^ (v >> 63)).view(np.uint64)
+    lengths = np.ones(len(z), dtype=np.int64)
+    for k in range(1, 10):
+        lengths += z >= np.uint64(1 << (7 * k))
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(starts[-1] + lengths[-1]), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        more = lengths > k
+        byte = (z[more] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= (lengths[more] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[more] + k] = byte
+    return out.tobytes()
+
+
+class _Chunk:
+    """Bloque de hasta CHUNK_SAMPLES muestras: valores base + deltas por columna."""
+    __slots__ = ('count', 'first_ts', 'last_ts', 'base', 'last', 'data')
+
+    def __init__(self, values):
+        self.count = 1
+        self.first_ts = self.last_ts = values[0]
+        self.base = values
+        self.last = values
+        self.data = [bytearray() for _ in values]
+
+    def append(self, values):
+        for buf, value, previous in zip(self.data, values, self.last):
+            _put_varint(buf, _zigzag(value - previous))
+        self.last = values
+        self.last_ts = values[0]
+        self.count += 1
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """Bloque a partir de una matriz (muestras, columnas) de enteros."""
+        chunk = cls(tuple(matrix[0].tolist()))
+        chunk.count = len(matrix)
+        chunk.last = tuple(matrix[-1].tolist())
+        chunk.last_ts = chunk.last[0]
+        deltas = np.diff(matrix, axis=0)
+        chunk.data = [bytearray(encode_varints(deltas[:, i])) for i in range(matrix.shape[1])]
+        return chunk
+
+    def seal(self):
+        self.data = [bytes(buf) for buf in self.data]
+
+    def nbytes(self):
+        return sum(len(buf) for buf in self.data) + 8 * len(self.base)
+
+    def decode(self):
+        """Matriz (columnas, muestras) con los valores absolutos."""
+        out = np.empty((len(self.base), self.count), dtype=np.int64)
+        out[:, 0] = self.base
+        for i, buf in enumerate(self.data):
+            np.cumsum(decode_varints(buf), out=out[i, 1:])
+            out[i, 1:] += self.base[i]
+        return out
+
+
+class _Series:
+    __slots__ = ('statics', 'chunks', 'count')
+
+    def __init__(self):
+        self.statics = []  # [(índice de muestra, tupla de valores)]
+        self.chunks = []
+        self.count = 0
+
+
+class HistoryStore:
+    """
+    Historial comprimido de filas de agentes.
+    Thread-safe: un colector puede añadir mientras otro hilo lee rangos.
+    """
+
+    def __init__(self, schema=SNMP_SCHEMA, chunk_samples=CHUNK_SAMPLES):
+        self.schema = schema
+        self.chunk_samples = chunk_samples
+        self._series = {}
+        self._label_values = []   # código -> texto
+        self._label_codes = {}
+        self._lock = threading.Lock()
+        self._ts_cache = (None, 0)
+
+    def __len__(self):
+        return sum(s.count for s in self._series.values())
+
+    def agents(self):
+        return list(self._series)
+
+    # --- Escritura ---
+    def _timestamp_us(self, value):
+        if isinstance(value, datetime):
+            return round(value.timestamp() * 1_000_000)
+        cached, us = self._ts_cache
+        if value != cached:
+            us = round(datetime.fromisoformat(value).timestamp() * 1_000_000)
+            self._ts_cache = (value, us)
+        return us
+
+    def _label_code(self, value):
+        code = self._label_codes.get(value)
+        if code is None:
+            code = self._label_codes[value] = len(self._label_values)
+            self._label_values.append(value)
+        return code
+
+    def _series_for(self, row):
+        """Serie del agente de `row`, registrando sus estáticos si cambiaron."""
+        schema = self.schema
+        series = self._series.get(row[schema.key])
+        if series is None:
+            series = self._series[row[schema.key]] = _Series()
+        static = tuple(row.get(f) for f in schema.static)
+        if not series.statics or series.statics[-1][1] != static:
+            series.statics.append((series.count, static))
+        return series
+
+    def _values(self, row, timestamp):
+        """Columnas de una muestra codificadas como enteros."""
+        schema = self.schema
+        scales = schema._scales
+        values = [self._timestamp_us(row.get(schema.timestamp) or timestamp)]
+        values.extend(int(row.get(f) or 0) for f in schema.counters)
+        values.extend(round((row.get(f) or 0) * scales[f]) for f in schema.gauges)
+        values.extend(self._label_code(row.get(f)) for f in schema.labels)
+        return tuple(values)
+
+    def _matrix(self, rows, timestamp):
+        """Como _values para muchas filas, columna a columna: matriz (muestras, columnas)."""
+        schema = self.schema
+        columns = [[self._timestamp_us(row.get(schema.timestamp) or timestamp) for row in rows]]
+        for f in schema.counters:
+            columns.append([int(row.get(f) or 0) for row in rows])
+        for f, scale in schema._scales.items():
+            columns.append(np.round(np.array([row.get(f) or 0 for row in rows], dtype=np.float64) * scale))
+        for f in schema.labels:
+            columns.append([self._label_code(row.get(f)) for row in rows])
+        return np.column_stack([np.asarray(c, dtype=np.int64) for c in columns])
+
+    def append(self, rows, timestamp=None):
+        """
+        Añade una ronda de filas. `timestamp` (datetime o ISO) se usa para
+        las filas que no traen su propio campo de marca de tiempo.
+        """
+        with self._lock:
+            for row in rows:
+                series = self._series_for(row)
+                values = self._values(row, timestamp)
+                chunk = series.chunks[-1] if series.chunks else None
+                if chunk is None or chunk.count >= self.chunk_samples:
+                    if chunk is not None:
+                        chunk.seal()
+                    series.chunks.append(_Chunk(values))
+                else:
+                    chunk.append(values)
+                series.count += 1
+
+    def append_many(self, rows, timestamp=None):
+        """
+        Como append, para lotes grandes (p. ej. importaciones): agrupa las
+        filas por agente y codifica cada bloque completo de una vez con NumPy.
+        Las filas de cada agente deben venir en orden de tiempo.
+        """
+        key = self.schema.key
+        by_agent = {}
+        for row in rows:
+            by_agent.setdefault(row[key], []).append(row)
+        with self._lock:
+            for agent_rows in by_agent.values():
+                for row in agent_rows:
+                    series = self._series_for(row)
+                    series.count += 1
+                values = self._matrix(agent_rows, timestamp)
+                # Completar fila a fila el bloque abierto; el resto, en bloque
+                chunk = series.chunks[-1] if series.chunks else None
+                start = 0
+                if chunk is not None and chunk.count < self.chunk_samples:
+                    start = min(self.chunk_samples - chunk.count, len(values))
+                    for v in values[:start].tolist():
+                        chunk.append(tuple(v))
+                if start < len(values):
+                    if chunk is not None:
+                        chunk.seal()
+                    matrix = values[start:]
+                    first_new = len(series.chunks)
+                    for lo in range(0, len(matrix), self.chunk_samples):
+                        series.chunks.append(_Chunk.from_matrix(matrix[lo:lo + self.chunk_samples]))
+                    # Solo los bloques nuevos; el último queda abierto
+                    for chunk in series.chunks[first_new:-1]:
+                        chunk.seal()
+
+    # --- Lectura ---
+    def _to_us(self, value):
+        if value is None or isinstance(value, (int, float)):
+            return value
+        return self._timestamp_us(value)
+
+    def range(self, agent, start=None, end=None):
+        """
+        Columnas de un agente entre `start` y `end` (incluidos) como arrays
+        NumPy: 'timestamp' en segundos epoch, contadores int64, gauges
+        float64 y etiquetas como array de códigos más 'labels' con sus textos.
+        """
+        start_us, end_us = self._to_us(start), self._to_us(end)
+        with self._lock:
+            series = self._series.get(agent)
+            if series is None:
+                return None
+            chunks = [c for c in series.chunks
+                      if (start_us is None or c.last_ts >= start_us)
+                      and (end_us is None or c.first_ts <= end_us)]
+            offset = sum(c.count for c in series.chunks[:series.chunks.index(chunks[0])]) if chunks else 0
+            matrix = np.concatenate([c.decode() for c in chunks], axis=1) if chunks else \
+                np.zeros((len(self.schema.columns), 0), dtype=np.int64)
+            statics = list(series.statics)
+            labels = list(self._label_values)
+
+        ts = matrix[0]
+        lo = 0 if start_us is None else int(np.searchsorted(ts, start_us, 'left'))
+        hi = len(ts) if end_us is None else int(np.searchsorted(ts, end_us, 'right'))
+        matrix = matrix[:, lo:hi]
+        schema = self.schema
+        result = {'timestamp': matrix[0] / 1e6, 'sample_index': np.arange(offset + lo, offset + hi)}
+        row = 1
+        for name in schema.counters:
+            result[name] = matrix[row]
+            row += 1
+        for name, scale in schema._scales.items():
+            result[name] = matrix[row] / scale
+            row += 1
+        for name in schema.labels:
+            result[name] = matrix[row]
+            row += 1
+        result['labels'] = labels
+        result['statics'] = statics
+        return result
+
+    def rows(self, agent, start=None, end=None):
+        """Reconstruye las filas originales (dicts) de un rango."""
+        cols = self.range(agent, start, end)
+        if cols is None:
+            return []
+        schema = self.schema
+        statics = cols['statics']
+        labels = cols['labels']
+        version = 0
+        out = []
+        series = {name: cols[name].tolist() for name in schema.counters + tuple(schema.gauges) + schema.labels}
+        for i, (ts, index) in enumerate(zip(cols['timestamp'].tolist(), cols['sample_index'].tolist())):
+            while version + 1 < len(statics) and statics[version + 1][0] <= index:
+                version += 1
+            row = {schema.key: agent}
+            row.update(zip(schema.static, statics[version][1]))
+            for name in schema.counters:
+                row[name] = series[name][i]
+            for name in schema.gauges:
+                row[name] = series[name][i]
+            for name in schema.labels:
+                row[name] = labels[series[name][i]]
+            row[schema.timestamp] = datetime.fromtimestamp(ts).isoformat()
+            out.append(row)
+        return out
+
+    def last_timestamp(self, agent):
+        """Instante (epoch en segundos) de la última muestra del agente, o None."""
+        with self._lock:
+            series = self._series.get(agent)
+            return series.chunks[-1].last_ts / 1e6 if series and series.chunks else None
+
+    def latest(self, agent):
+        """Última fila guardada del agente."""
+        rows = self.rows(agent, start=self._series[agent].chunks[-1].last_ts) \
+            if agent in self._series else []
+        return rows[-1] if rows else None
+
+    # --- Tamaño y persistencia ---
+    def nbytes(self):
+        """Bytes usados por las muestras codificadas (sin contar estáticos)."""
+        with self._lock:
+            return sum(c.nbytes() for s in self._series.values() for c in s.chunks)
+
+    def save(self, path):
+        """Guarda el historial en un fichero binario (cabecera JSON + bloques)."""
+        blobs = []
+        offset = 0
+        agents = {}
+        with self._lock:
+            for agent, series in self._series.items():
+                chunks = []
+                for chunk in series.chunks:
+                    lengths = []
+                    for buf in chunk.data:
+                        blobs.append(bytes(buf))
+                        lengths.append(len(buf))
+                    chunks.append({'count': chunk.count, 'base': list(chunk.base),
+                                   'last': list(chunk.last), 'offset': offset, 'lengths': lengths})
+                    offset += sum(lengths)
+                agents[agent] = {'statics': series.statics, 'chunks': chunks}
+            header = json.dumps({'schema': self.schema.to_dict(), 'chunk_samples': self.chunk_samples,
+                                 'labels': self._label_values, 'agents': agents}).encode('utf-8')
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, 'wb') as f:
+            f.write(MAGIC + struct.pack('>I', len(header)) + header)
+            for blob in blobs:
+                f.write(blob)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path} no es un historial válido")
+            (size,) = struct.unpack('>I', f.read(4))
+            header = json.loads(f.read(size))
+            blob = f.read()
+        store = cls(HistorySchema.from_dict(header['schema']), header['chunk_samples'])
+        store._label_values = header['labels']
+        store._label_codes = {v: i for i, v in enumerate(store._label_values)}
+        for agent, info in header['agents'].items():
+            series = store._series[agent] = _Series()
+            series.statics = [(index, tuple(values)) for index, values in info['statics']]
+            for c in info['chunks']:
+                chunk = _Chunk(tuple(c['base']))
+                chunk.count = c['count']
+                chunk.last = tuple(c['last'])
+                chunk.last_ts = chunk.last[0]
+                pos = c['offset']
+                chunk.data = []
+                for length in c['lengths']:
+                    chunk.data.append(bytearray(blob[pos:pos + length]))
+                    pos += length
+                series.chunks.append(chunk)
+                series.count += chunk.count
+            for chunk in series.chunks[:-1]:
+                chunk.seal()
+        return store
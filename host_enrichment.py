@@ -0,0 +1,229 @@
+"""
+Enriquecimiento de hosts descubiertos: nombre DNS inverso (PTR) y
+sysName/sysDescr por SNMP.
+Las consultas van a un pool acotado de resolutores y nunca bloquean el
+descubrimiento. Los resultados, también los fallos, se guardan en una caché
+con TTL compartida por el escáner y el sondeo. Así, la misma consulta lenta
+no se repite en cada escaneo.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import REGISTRY
+from oid_table import get_table
+from ber_codec import VarbindException
+
+_LOOKUPS = REGISTRY.counter('enrichment_lookups_total', 'Consultas de enriquecimiento por tipo y resultado')
+PTR_OK = _LOOKUPS.labels(kind='ptr', result='ok')
+PTR_FAILED = _LOOKUPS.labels(kind='ptr', result='error')
+SNMP_OK = _LOOKUPS.labels(kind='snmp', result='ok')
+SNMP_FAILED = _LOOKUPS.labels(kind='snmp', result='error')
+CACHE_HITS = REGISTRY.counter('enrichment_cache_hits_total',
+                              'Consultas evitadas por la caché (incluye fallos cacheados)').labels()
+PENDING = REGISTRY.gauge('enrichment_pending', 'Consultas de enriquecimiento en curso').labels()
+
+_MISSING = object()
+# Campos de sistema que se guardan por agente
+_CACHED_FIELDS = ('Device_Name', 'Sys_Descr', 'Device_Type')
+
+
+class TtlCache:
+    """
+    Caché clave -> valor con caducidad. Los fallos se guardan con su propio
+    TTL (más corto) para no repetir una consulta lenta que ya falló.
+    """
+
+    def __init__(self, ttl=600.0, negative_ttl=120.0, maxsize=4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # clave -> (caduca, valor, ok)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Valor vigente (también un fallo cacheado: None) o `default`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, ok=True):
+        expires = time.monotonic() + (self.ttl if ok else self.negative_ttl)
+        with self._lock:
+            self._entries[key] = (expires, value, ok)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class HostInfo:
+    """Lo que se sabe de un host: nombre PTR y datos SNMP (None si falló o falta)."""
+    __slots__ = ('target', 'hostname', 'sys_name', 'sys_descr', 'device_type')
+
+    def __init__(self, target, hostname=None, sys_name=None, sys_descr=None, device_type=None):
+        self.target = target
+        self.hostname = hostname
+        self.sys_name = sys_name
+        self.sys_descr = sys_descr
+        self.device_type = device_type
+
+    @property
+    def name(self):
+        return self.sys_name or self.hostname
+
+    def to_dict(self):
+        return {'target': self.target, 'hostname': self.hostname,
+                'sys_name': self.sys_name, 'sys_descr': self.sys_descr,
+                'device_type': self.device_type}
+
+    def __repr__(self):
+        return f"HostInfo({self.target}, {self.name})"
+
+
+def split_target(target):
+    """'host' o 'host:puerto' -> (host, puerto)."""
+    host, _, port = target.partition(':')
+    return host, int(port or 161)
+
+
+class HostEnricher:
+    """
+    Enriquecimiento asíncrono con un pool acotado.
+
+    Args:
+        transport: SnmpTransport compartido para las consultas sysName/sysDescr
+        community: Comunidad SNMP usada al enriquecer
+        workers: Tamaño del pool de resolutores
+        ttl, negative_ttl: Vigencia de aciertos y de fallos en la caché
+    """
+
+    def __init__(self, transport, community='public', workers=8, ttl=600.0, negative_ttl=120.0,
+                 snmp_timeout=0.8):
+        self.transport = transport
+        self.community = community
+        self.snmp_timeout = snmp_timeout
+        self.cache = TtlCache(ttl, negative_ttl)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        table = get_table()
+        self._system_oids = [table.oid('sysName', 0), table.oid('sysDescr', 0)]
+
+    # --- Lectura (nunca bloquea) ---
+    def lookup(self, target):
+        """HostInfo con lo que haya en caché para `target`."""
+        host, _ = split_target(target)
+        snmp = self.cache.get(('snmp', target)) or {}
+        return HostInfo(target, self.cache.get(('ptr', host)), snmp.get('Device_Name'),
+                        snmp.get('Sys_Descr'), snmp.get('Device_Type'))
+
+    def label(self, target):
+        """Texto para listas: 'ip — nombre' si se conoce el nombre."""
+        name = self.lookup(target).name
+        return f"{target} — {name}" if name else target
+
+    # --- Consultas ---
+    def enrich(self, targets, callback=None):
+        """
+        Programa las consultas que falten en caché para `targets`. Retorna
+        enseguida; `callback(HostInfo)` se llama (desde el pool) al terminar
+        cada consulta.
+        """
+        for target in targets:
+            host, _ = split_target(target)
+            for key, job in ((('ptr', host), self._resolve_ptr),
+                             (('snmp', target), self._resolve_snmp)):
+                if key in self.cache:
+                    CACHE_HITS.inc()
+                    continue
+                with self._lock:
+                    if key in self._pending:
+                        continue
+                    self._pending.add(key)
+                PENDING.inc()
+                try:
+                    future = self._pool.submit(self._run, key, job, target, callback)
+                except RuntimeError:
+                    # Pool cerrado al salir de la aplicación
+                    self._done(key)
+                    return
+                # Si shutdown() la cancela antes de empezar, _run no llega a liberarla
+                future.add_done_callback(
+                    lambda f, key=key: f.cancelled() and self._done(key))
+
+    def _run(self, key, job, target, callback):
+        try:
+            job(target)
+        finally:
+            self._done(key)
+        if callback:
+            callback(self.lookup(target))
+
+    def _done(self, key):
+        with self._lock:
+            self._pending.discard(key)
+            if not self._pending:
+                self._idle.notify_all()
+        PENDING.dec()
+
+    def wait_idle(self, timeout=None):
+        """Espera a que no quede ninguna consulta en curso. Retorna False si venció el timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def _resolve_ptr(self, target):
+        host, _ = split_target(target)
+        try:
+            name = socket.gethostbyaddr(host)[0]
+        except (OSError, UnicodeError):
+            name = None
+        if name == host:
+            name = None
+        (PTR_OK if name else PTR_FAILED).inc()
+        self.cache.put(('ptr', host), name, ok=name is not None)
+
+    def _resolve_snmp(self, target):
+        host, port = split_target(target)
+        try:
+            session = self.transport.session(host, self.community, port,
+                                             timeout=self.snmp_timeout, retries=0)
+            varbinds = session.get_many(self._system_oids)
+        except Exception:
+            varbinds = ()
+        fields = get_table().decode_varbinds(
+            [(oid, value) for oid, value in varbinds
+             if value is not None and not isinstance(value, VarbindException)])
+        if self.record(target, fields):
+            SNMP_OK.inc()
+        else:
+            SNMP_FAILED.inc()
+            self.cache.put(('snmp', target), None, ok=False)
+
+    def record(self, target, fields):
+        """Guarda en caché campos de sistema leídos en otro sitio (p. ej. el sondeo)."""
+        relevant = {k: v for k, v in fields.items() if k in _CACHED_FIELDS and v}
+        if not relevant:
+            return False
+        merged = dict(self.cache.get(('snmp', target)) or {})
+        merged.update(relevant)
+        self.cache.put(('snmp', target), merged, ok=True)
+        return True
+
+    def shutdown(self):
+        """Cierra el pool; las consultas aún en cola se cancelan y dejan de contar como pendientes."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,10 @@
+import sys
 import tkinter as tk
 import atexit
 from gui import NetworkMonitorGUI
 from agent_manager import SNMPAgentManager
+from metrics import MetricsServer
+from api_server import ApiServer
 
 def main():
     # 1. Iniciar el Agente SNMP en segundo plano (Puerto 16161 para evitar admin)
@@ -14,17 +17,42 @@ def main():
     # Asegurar que se cierre al salir
     atexit.register(agent.stop_agent)
 
-    # 2. Iniciar la GUI
+    # 2. Exponer métricas del colector (formato Prometheus)
+    metrics_server = MetricsServer(port=9108)
+    metrics_url = None
+    if metrics_server.start():
+        metrics_url = f"http://127.0.0.1:{metrics_server.port}/metrics"
+    else:
+        print("ADVERTENCIA: No se pudo iniciar el endpoint de métricas (¿puerto 9108 ocupado?).")
+
+    # 3. Iniciar la GUI
     root = tk.Tk()
-    app = NetworkMonitorGUI(root)
+    app = NetworkMonitorGUI(root, metrics_url)
+
+    # 4. API HTTP/JSON de consulta sobre los datos del colector
+    api_server = ApiServer(app.logic, port=9109)
+    if api_server.start():
+        app.log(f"API de consulta en http://127.0.0.1:{api_server.port}/api/snmp/latest")
+    else:
+        print("ADVERTENCIA: No se pudo iniciar la API HTTP (¿puerto 9109 ocupado?).")
     
     # Manejar cierre de ventana explícito
     def on_close():
+        app.stop_pipeline()
+        app.logic.shutdown()
+        api_server.stop()
         agent.stop_agent()
+        metrics_server.stop()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_close)
+    # SIGUSR1/SIGUSR2 lanzan perfilado o snapshot de memoria (solo POSIX)
+    app.logic.profiler.install_signal_handlers()
     root.mainloop()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Modo línea de comandos (sin GUI)
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""
+Módulo de auto-instrumentación del monitor.
+Contadores, gauges e histogramas de latencia de bajo coste, expuestos en
+formato de texto Prometheus mediante un pequeño servidor HTTP local.
+
+Registrar un evento es una suma de enteros (contador) o una búsqueda
+binaria sobre los límites de los buckets (histograma) bajo un lock propio
+de cada serie: `+=` no es atómico entre hilos y sin él se perderían
+incrementos. Los locks no se comparten, así que apenas hay contención.
+"""
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Buckets por defecto para latencias (segundos)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(text, quote=True):
+    """Escapado del formato de texto: \\, salto de línea y (en etiquetas) comillas."""
+    text = str(text).replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quote else text
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Valor instantáneo; opcionalmente calculado por una función al leerlo."""
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self.fn = fn
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def get(self):
+        return self.fn() if self.fn else self.value
+
+
+class Histogram:
+    """Histograma de buckets fijos (acumulativos al exportar)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """(counts, sum, count) coherentes entre sí."""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def time(self):
+        """Context manager que observa la duración del bloque."""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Estimación del cuantil q (0-1) por el límite superior del bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        acc = 0
+        for bound, n in zip(self.bounds, self.counts):
+            acc += n
+            if acc >= target:
+                return bound
+        return float('inf')
+
+
+class _Timer:
+    __slots__ = ('hist', 'start')
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricFamily:
+    """Familia de métricas con el mismo nombre y distintas etiquetas."""
+
+    def __init__(self, name, help_text, kind, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(sorted(labels.items()))
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    # Atajos para la serie sin etiquetas
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def total(self):
+        """Suma de todas las series (contadores y gauges)."""
+        children = list(self._children.values())
+        if self.kind == 'histogram':
+            return sum(c.count for c in children)
+        if self.kind == 'gauge':
+            return sum(c.get() for c in children)
+        return sum(c.value for c in children)
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {_escape(self.help, quote=False)}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for key, child in list(self._children.items()):
+            if self.kind == 'histogram':
+                counts, total, count = child.snapshot()
+                acc = 0
+                for bound, n in zip(child.bounds + (float('inf'),), counts):
+                    acc += n
+                    le = ('le', _format_value(float(bound)))
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {acc}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+            else:
+                value = child.get() if self.kind == 'gauge' else child.value
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+
+
+class MetricsRegistry:
+    """Registro de familias de métricas."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, help_text, kind, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(name, help_text, kind, factory)
+                self._families[name] = family
+            return family
+
+    def counter(self, name, help_text=""):
+        return self._family(name, help_text, 'counter', Counter)
+
+    def gauge(self, name, help_text="", fn=None):
+        return self._family(name, help_text, 'gauge', lambda: Gauge(fn))
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._family(name, help_text, 'histogram', lambda: Histogram(buckets))
+
+    def get(self, name):
+        return self._families.get(name)
+
+    def render(self):
+        """Texto en formato de exposición Prometheus (0.0.4)."""
+        lines = []
+        for family in list(self._families.values()):
+            family.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+# Registro global compartido por todos los módulos
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """Servidor HTTP local que expone /metrics en un hilo aparte."""
+
+    def __init__(self, registry=REGISTRY, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+
+    def start(self):
+        """Arranca el servidor. Retorna False si el puerto no está disponible."""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Sin ruido en consola
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError:
+            return False
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return True
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
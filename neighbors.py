@@ -0,0 +1,260 @@
+"""
+Descubrimiento de hosts sin sondear la red.
+Antes de hacer ping a nada, el kernel ya conoce buena parte de los hosts
+vivos: tabla de vecinos (`ip -j neigh` o /proc/net/arp), interfaces y
+rutas locales (gateways). Los agentes SNMP aportan además su propia
+ipNetToMediaTable. El escáner solo sondea activamente lo que queda.
+"""
+import ipaddress
+import json
+import platform
+import re
+import socket
+import struct
+import subprocess
+
+from oid_table import get_table, IP_NET_TO_MEDIA_ENTRY
+
+# Estados NUD del kernel: alcanzabilidad confirmada / entrada válida pero sin
+# confirmar (las cachés ARP conservan entradas durante horas: se sondean una vez).
+# FAILED e INCOMPLETE no dicen nada de ahora: esas direcciones se sondean como el resto
+LIVE_STATES = frozenset({'REACHABLE', 'PERMANENT'})
+UNCONFIRMED_STATES = frozenset({'STALE', 'DELAY', 'PROBE', 'NOARP'})
+
+# Redes mayores se recortan a la /24 de la IP local (como el escáner original)
+MAX_NETWORK_HOSTS = 1024
+
+# ipNetToMediaType: invalid(2) marca entradas borradas; static(4) son fijas
+_MEDIA_INVALID = 2
+_MEDIA_STATIC = 4
+_ARP_FLAG_COMPLETE = 0x2
+_SIOCGIFADDR = 0x8915
+_SIOCGIFNETMASK = 0x891b
+_ARP_LINE = re.compile(r'(\d{1,3}(?:\.\d{1,3}){3})\D+?([0-9a-fA-F]{1,2}(?:[:-][0-9a-fA-F]{1,2}){5})')
+
+
+class LocalNetwork:
+    """Red IPv4 de una interfaz local."""
+    __slots__ = ('iface', 'address', 'network', 'is_default')
+
+    def __init__(self, iface, address, prefixlen, is_default=False):
+        self.iface = iface
+        self.address = ipaddress.IPv4Address(address)
+        self.network = ipaddress.IPv4Network(f"{address}/{prefixlen}", strict=False)
+        self.is_default = is_default
+
+    def scan_network(self):
+        """Red a recorrer: la propia o, si es muy grande, su /24."""
+        if self.network.num_addresses > MAX_NETWORK_HOSTS:
+            return ipaddress.IPv4Network(f"{self.address}/24", strict=False)
+        return self.network
+
+    def hosts(self):
+        return [str(ip) for ip in self.scan_network().hosts() if ip != self.address]
+
+    def __contains__(self, ip):
+        return ipaddress.IPv4Address(ip) in self.scan_network()
+
+    def __repr__(self):
+        return f"LocalNetwork({self.iface}, {self.address}/{self.network.prefixlen})"
+
+
+class Neighbor:
+    """Host conocido sin sondeo: IP, MAC, interfaz, estado y fuente."""
+    __slots__ = ('ip', 'mac', 'iface', 'state', 'source')
+
+    def __init__(self, ip, mac=None, iface=None, state='REACHABLE', source='kernel'):
+        self.ip = ip
+        self.mac = mac
+        self.iface = iface
+        self.state = state
+        self.source = source
+
+    @property
+    def alive(self):
+        return self.state in LIVE_STATES
+
+    def __repr__(self):
+        return f"Neighbor({self.ip}, {self.mac}, {self.state}, {self.source})"
+
+
+def _ip_json(*args):
+    """Salida JSON de iproute2 (`ip -j ...`), o None si no está disponible."""
+    try:
+        res = subprocess.run(['ip', '-j', *args], capture_output=True, timeout=2)
+        if res.returncode != 0:
+            return None
+        return json.loads(res.stdout or b'[]')
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def _read_lines(path):
+    try:
+        with open(path) as f:
+            return f.read().splitlines()[1:]
+    except OSError:
+        return None
+
+
+# --- Interfaces y rutas ---
+def default_routes():
+    """[(interfaz, gateway)] de las rutas por defecto."""
+    routes = _ip_json('-4', 'route', 'show', 'default')
+    if routes is not None:
+        return [(r.get('dev'), r.get('gateway')) for r in routes]
+    result = []
+    for line in _read_lines('/proc/net/route') or ():
+        fields = line.split()
+        if len(fields) >= 3 and fields[1] == '00000000':
+            gateway = socket.inet_ntoa(struct.pack('<I', int(fields[2], 16)))
+            result.append((fields[0], gateway if gateway != '0.0.0.0' else None))
+    return result
+
+
+def _ioctl_address(iface, request):
+    import fcntl
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        packed = struct.pack('256s', iface.encode()[:15])
+        return socket.inet_ntoa(fcntl.ioctl(s.fileno(), request, packed)[20:24])
+
+
+def _linux_networks_without_iproute():
+    """Interfaces vía ioctl para sistemas Linux sin el comando `ip`."""
+    networks = []
+    for _, iface in socket.if_nameindex():
+        try:
+            address = _ioctl_address(iface, _SIOCGIFADDR)
+            netmask = _ioctl_address(iface, _SIOCGIFNETMASK)
+        except OSError:
+            continue
+        prefixlen = ipaddress.IPv4Network(f"0.0.0.0/{netmask}").prefixlen
+        networks.append((iface, address, prefixlen))
+    return networks
+
+
+def local_networks():
+    """
+    Redes IPv4 de todas las interfaces activas (sin loopback). La interfaz
+    de la ruta por defecto va primero.
+    """
+    raw = []
+    addrs = _ip_json('-4', 'addr', 'show', 'up')
+    if addrs is not None:
+        for link in addrs:
+            if 'LOOPBACK' in link.get('flags', ()):
+                continue
+            for info in link.get('addr_info', ()):
+                if info.get('family') == 'inet' and info.get('scope') != 'host':
+                    raw.append((link.get('ifname'), info['local'], info['prefixlen']))
+    elif platform.system().lower() == 'linux':
+        raw = _linux_networks_without_iproute()
+    else:
+        # Windows/macOS: direcciones del nombre del equipo, /24 supuesta
+        try:
+            infos = socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET)
+        except OSError:
+            infos = []
+        for address in dict.fromkeys(info[4][0] for info in infos):
+            raw.append((None, address, 24))
+
+    default_ifaces = {iface for iface, _ in default_routes()}
+    networks = [LocalNetwork(iface, address, prefixlen, iface in default_ifaces)
+                for iface, address, prefixlen in raw
+                if not ipaddress.IPv4Address(address).is_loopback
+                and not ipaddress.IPv4Address(address).is_link_local]
+    networks.sort(key=lambda n: not n.is_default)
+    return networks
+
+
+# --- Vecinos ---
+def kernel_neighbors():
+    """Vecinos IPv4 que conoce el sistema, con su estado NUD."""
+    neighbors = []
+    entries = _ip_json('-4', 'neigh', 'show')
+    if entries is not None:
+        for entry in entries:
+            state = (entry.get('state') or ['REACHABLE'])[0]
+            neighbors.append(Neighbor(entry['dst'], entry.get('lladdr'), entry.get('dev'),
+                                      state, 'neigh'))
+        return neighbors
+
+    lines = _read_lines('/proc/net/arp')
+    if lines is not None:
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 6:
+                continue
+            complete = int(fields[2], 16) & _ARP_FLAG_COMPLETE
+            neighbors.append(Neighbor(fields[0], fields[3] if complete else None, fields[5],
+                                      'STALE' if complete else 'INCOMPLETE', 'arp'))
+        return neighbors
+
+    # Windows/macOS: `arp -a`
+    try:
+        output = subprocess.run(['arp', '-a'], capture_output=True, text=True, timeout=2).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return neighbors
+    for ip, mac in _ARP_LINE.findall(output):
+        neighbors.append(Neighbor(ip, mac.replace('-', ':').lower(), None, 'STALE', 'arp'))
+    return neighbors
+
+
+def snmp_neighbors(session):
+    """Vecinos según la ipNetToMediaTable de un agente (SnmpSession)."""
+    table = get_table()
+    rows = {}
+    for oid, value in session.walk(IP_NET_TO_MEDIA_ENTRY):
+        obj, instance = table.resolve(oid)
+        if obj is None:
+            continue
+        if obj.field == 'Arp_MAC' and isinstance(value, (bytes, bytearray, memoryview)):
+            # Una MAC puede ser UTF-8 válido por casualidad: siempre en hexadecimal
+            # (el decodificador BER entrega los OCTET STRING como memoryview)
+            value = bytes(value).hex(':')
+        else:
+            value = obj.decode(value)
+        rows.setdefault(instance, {})[obj.field] = value
+    neighbors = []
+    for instance, row in rows.items():
+        if len(instance) != 5 or row.get('Arp_Type') == _MEDIA_INVALID:
+            continue
+        ip = '.'.join(map(str, instance[1:]))
+        # La tabla no dice la antigüedad de las entradas dinámicas: sin confirmar
+        state = 'PERMANENT' if row.get('Arp_Type') == _MEDIA_STATIC else 'STALE'
+        neighbors.append(Neighbor(ip, row.get('Arp_MAC'), row.get('Arp_If_Index'),
+                                  state, f"snmp:{session.peer[0]}"))
+    return neighbors
+
+
+def known_hosts(networks, snmp_sessions=(), log_callback=None):
+    """
+    Clasifica lo que ya se sabe de las redes locales sin sondear.
+    Retorna (vivos confirmados {ip: Neighbor}, sin confirmar {ip: Neighbor}):
+    los segundos merecen un sondeo antes que el resto de la red.
+    """
+    alive, unconfirmed = {}, {}
+
+    def consider(neighbor):
+        if not any(neighbor.ip in net for net in networks):
+            return
+        if neighbor.alive:
+            alive.setdefault(neighbor.ip, neighbor)
+            unconfirmed.pop(neighbor.ip, None)
+        elif neighbor.state in UNCONFIRMED_STATES and neighbor.ip not in alive:
+            unconfirmed.setdefault(neighbor.ip, neighbor)
+
+    for neighbor in kernel_neighbors():
+        consider(neighbor)
+    for _, gateway in default_routes():
+        if gateway:
+            # Una ruta no prueba que el gateway responda
+            consider(Neighbor(gateway, state='STALE', source='route'))
+    for session in snmp_sessions:
+        try:
+            for neighbor in snmp_neighbors(session):
+                consider(neighbor)
+        except Exception as e:
+            if log_callback:
+                log_callback(f"⚠️ ipNetToMediaTable de {session.peer[0]}: {e}")
+    return alive, unconfirmed
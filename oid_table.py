@@ -0,0 +1,386 @@
+"""
+Tabla precompilada de OIDs para los objetos MIB que usa el monitor.
+Resuelve varbinds a nuestros nombres de campo (IN_Octets, CRC_Errors, ...)
+y convierte sus valores sin compilar MIBs ni cargar el MIB builder de pysnmp.
+
+Cubre SNMPv2-MIB (grupo system), IF-MIB (ifTable/ifXTable) y los grupos
+etherStats, history, hosts y alarm de RMON-MIB. Los OIDs son tuplas de
+enteros; el índice se construye la primera vez que se usa.
+"""
+import threading
+from functools import lru_cache
+
+# Tipos SMI con su etiqueta BER (coincide con el código de tipo de .snmprec)
+INTEGER = 0x02
+OCTET_STRING = 0x04
+OBJECT_IDENTIFIER = 0x06
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+
+TYPE_NAMES = {
+    INTEGER: 'INTEGER',
+    OCTET_STRING: 'OCTET STRING',
+    OBJECT_IDENTIFIER: 'OBJECT IDENTIFIER',
+    IP_ADDRESS: 'IpAddress',
+    COUNTER32: 'Counter32',
+    GAUGE32: 'Gauge32',
+    TIMETICKS: 'TimeTicks',
+    OPAQUE: 'Opaque',
+    COUNTER64: 'Counter64',
+}
+
+SYSTEM = (1, 3, 6, 1, 2, 1, 1)
+IF_ENTRY = (1, 3, 6, 1, 2, 1, 2, 2, 1)
+IFX_ENTRY = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1)
+IP_NET_TO_MEDIA_ENTRY = (1, 3, 6, 1, 2, 1, 4, 22, 1)
+ETHER_STATS_ENTRY = (1, 3, 6, 1, 2, 1, 16, 1, 1, 1)
+HISTORY_CONTROL_ENTRY = (1, 3, 6, 1, 2, 1, 16, 2, 1, 1)
+ETHER_HISTORY_ENTRY = (1, 3, 6, 1, 2, 1, 16, 2, 2, 1)
+ALARM_ENTRY = (1, 3, 6, 1, 2, 1, 16, 3, 1, 1)
+HOST_ENTRY = (1, 3, 6, 1, 2, 1, 16, 4, 2, 1)
+
+# (base, columna, símbolo MIB, campo del monitor, tipo)
+# Los campos coinciden con las claves de last_snmp_data / last_rmon_data;
+# los objetos sin equivalente usan su símbolo MIB como campo.
+_DEFINITIONS = (
+    # SNMPv2-MIB::system (escalares, instancia .0)
+    (SYSTEM, 1, 'sysDescr', 'Sys_Descr', OCTET_STRING),
+    (SYSTEM, 2, 'sysObjectID', 'Sys_Object_ID', OBJECT_IDENTIFIER),
+    (SYSTEM, 3, 'sysUpTime', 'Uptime_Ticks', TIMETICKS),
+    (SYSTEM, 4, 'sysContact', 'Sys_Contact', OCTET_STRING),
+    (SYSTEM, 5, 'sysName', 'Device_Name', OCTET_STRING),
+    (SYSTEM, 6, 'sysLocation', 'Sys_Location', OCTET_STRING),
+    (SYSTEM, 7, 'sysServices', 'Sys_Services', INTEGER),
+
+    # IF-MIB::ifTable
+    (IF_ENTRY, 1, 'ifIndex', 'If_Index', INTEGER),
+    (IF_ENTRY, 2, 'ifDescr', 'If_Descr', OCTET_STRING),
+    (IF_ENTRY, 3, 'ifType', 'If_Type', INTEGER),
+    (IF_ENTRY, 4, 'ifMtu', 'If_Mtu', INTEGER),
+    (IF_ENTRY, 5, 'ifSpeed', 'If_Speed_bps', GAUGE32),
+    (IF_ENTRY, 6, 'ifPhysAddress', 'If_Phys_Address', OCTET_STRING),
+    (IF_ENTRY, 7, 'ifAdminStatus', 'If_Admin_Status', INTEGER),
+    (IF_ENTRY, 8, 'ifOperStatus', 'If_Oper_Status', INTEGER),
+    (IF_ENTRY, 9, 'ifLastChange', 'If_Last_Change', TIMETICKS),
+    (IF_ENTRY, 10, 'ifInOctets', 'IN_Octets', COUNTER32),
+    (IF_ENTRY, 11, 'ifInUcastPkts', 'IN_Packets', COUNTER32),
+    (IF_ENTRY, 12, 'ifInNUcastPkts', 'IN_NUcast_Packets', COUNTER32),
+    (IF_ENTRY, 13, 'ifInDiscards', 'IN_Discards', COUNTER32),
+    (IF_ENTRY, 14, 'ifInErrors', 'IN_Errors', COUNTER32),
+    (IF_ENTRY, 15, 'ifInUnknownProtos', 'IN_Unknown_Protos', COUNTER32),
+    (IF_ENTRY, 16, 'ifOutOctets', 'OUT_Octets', COUNTER32),
+    (IF_ENTRY, 17, 'ifOutUcastPkts', 'OUT_Packets', COUNTER32),
+    (IF_ENTRY, 18, 'ifOutNUcastPkts', 'OUT_NUcast_Packets', COUNTER32),
+    (IF_ENTRY, 19, 'ifOutDiscards', 'OUT_Discards', COUNTER32),
+    (IF_ENTRY, 20, 'ifOutErrors', 'OUT_Errors', COUNTER32),
+    (IF_ENTRY, 21, 'ifOutQLen', 'OUT_Queue_Len', GAUGE32),
+
+    # IF-MIB::ifXTable (contadores de 64 bits)
+    (IFX_ENTRY, 1, 'ifName', 'If_Name', OCTET_STRING),
+    (IFX_ENTRY, 2, 'ifInMulticastPkts', 'IN_Multicast_Packets', COUNTER32),
+    (IFX_ENTRY, 3, 'ifInBroadcastPkts', 'IN_Broadcast_Packets', COUNTER32),
+    (IFX_ENTRY, 4, 'ifOutMulticastPkts', 'OUT_Multicast_Packets', COUNTER32),
+    (IFX_ENTRY, 5, 'ifOutBroadcastPkts', 'OUT_Broadcast_Packets', COUNTER32),
+    (IFX_ENTRY, 6, 'ifHCInOctets', 'IN_Octets', COUNTER64),
+    (IFX_ENTRY, 7, 'ifHCInUcastPkts', 'IN_Packets', COUNTER64),
+    (IFX_ENTRY, 8, 'ifHCInMulticastPkts', 'IN_Multicast_Packets', COUNTER64),
+    (IFX_ENTRY, 9, 'ifHCInBroadcastPkts', 'IN_Broadcast_Packets', COUNTER64),
+    (IFX_ENTRY, 10, 'ifHCOutOctets', 'OUT_Octets', COUNTER64),
+    (IFX_ENTRY, 11, 'ifHCOutUcastPkts', 'OUT_Packets', COUNTER64),
+    (IFX_ENTRY, 12, 'ifHCOutMulticastPkts', 'OUT_Multicast_Packets', COUNTER64),
+    (IFX_ENTRY, 13, 'ifHCOutBroadcastPkts', 'OUT_Broadcast_Packets', COUNTER64),
+    (IFX_ENTRY, 15, 'ifHighSpeed', 'Speed_Mbps', GAUGE32),
+    (IFX_ENTRY, 18, 'ifAlias', 'If_Alias', OCTET_STRING),
+
+    # IP-MIB::ipNetToMediaTable (tabla ARP del agente)
+    (IP_NET_TO_MEDIA_ENTRY, 1, 'ipNetToMediaIfIndex', 'Arp_If_Index', INTEGER),
+    (IP_NET_TO_MEDIA_ENTRY, 2, 'ipNetToMediaPhysAddress', 'Arp_MAC', OCTET_STRING),
+    (IP_NET_TO_MEDIA_ENTRY, 3, 'ipNetToMediaNetAddress', 'Arp_Address', IP_ADDRESS),
+    (IP_NET_TO_MEDIA_ENTRY, 4, 'ipNetToMediaType', 'Arp_Type', INTEGER),
+
+    # RMON-MIB::etherStatsTable
+    (ETHER_STATS_ENTRY, 1, 'etherStatsIndex', 'Stats_Index', INTEGER),
+    (ETHER_STATS_ENTRY, 2, 'etherStatsDataSource', 'Data_Source', OBJECT_IDENTIFIER),
+    (ETHER_STATS_ENTRY, 3, 'etherStatsDropEvents', 'Drop_Events', COUNTER32),
+    (ETHER_STATS_ENTRY, 4, 'etherStatsOctets', 'Octets', COUNTER32),
+    (ETHER_STATS_ENTRY, 5, 'etherStatsPkts', 'Packets', COUNTER32),
+    (ETHER_STATS_ENTRY, 6, 'etherStatsBroadcastPkts', 'Broadcast_Pkts', COUNTER32),
+    (ETHER_STATS_ENTRY, 7, 'etherStatsMulticastPkts', 'Multicast_Pkts', COUNTER32),
+    (ETHER_STATS_ENTRY, 8, 'etherStatsCRCAlignErrors', 'CRC_Errors', COUNTER32),
+    (ETHER_STATS_ENTRY, 9, 'etherStatsUndersizePkts', 'Undersize_Pkts', COUNTER32),
+    (ETHER_STATS_ENTRY, 10, 'etherStatsOversizePkts', 'Oversize_Pkts', COUNTER32),
+    (ETHER_STATS_ENTRY, 11, 'etherStatsFragments', 'Fragments', COUNTER32),
+    (ETHER_STATS_ENTRY, 12, 'etherStatsJabbers', 'Jabbers', COUNTER32),
+    (ETHER_STATS_ENTRY, 13, 'etherStatsCollisions', 'Collisions', COUNTER32),
+    (ETHER_STATS_ENTRY, 20, 'etherStatsOwner', 'Owner', OCTET_STRING),
+    (ETHER_STATS_ENTRY, 21, 'etherStatsStatus', 'Entry_Status', INTEGER),
+
+    # RMON-MIB::historyControlTable
+    (HISTORY_CONTROL_ENTRY, 1, 'historyControlIndex', 'History_Control_Index', INTEGER),
+    (HISTORY_CONTROL_ENTRY, 2, 'historyControlDataSource', 'Data_Source', OBJECT_IDENTIFIER),
+    (HISTORY_CONTROL_ENTRY, 3, 'historyControlBucketsRequested', 'Buckets_Requested', INTEGER),
+    (HISTORY_CONTROL_ENTRY, 4, 'historyControlBucketsGranted', 'Buckets_Granted', INTEGER),
+    (HISTORY_CONTROL_ENTRY, 5, 'historyControlInterval', 'History_Interval', INTEGER),
+    (HISTORY_CONTROL_ENTRY, 6, 'historyControlOwner', 'Owner', OCTET_STRING),
+    (HISTORY_CONTROL_ENTRY, 7, 'historyControlStatus', 'Entry_Status', INTEGER),
+
+    # RMON-MIB::etherHistoryTable
+    (ETHER_HISTORY_ENTRY, 1, 'etherHistoryIndex', 'History_Index', INTEGER),
+    (ETHER_HISTORY_ENTRY, 2, 'etherHistorySampleIndex', 'Sample_Index', INTEGER),
+    (ETHER_HISTORY_ENTRY, 3, 'etherHistoryIntervalStart', 'Interval_Start', TIMETICKS),
+    (ETHER_HISTORY_ENTRY, 4, 'etherHistoryDropEvents', 'Drop_Events', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 5, 'etherHistoryOctets', 'Octets', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 6, 'etherHistoryPkts', 'Packets', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 7, 'etherHistoryBroadcastPkts', 'Broadcast_Pkts', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 8, 'etherHistoryMulticastPkts', 'Multicast_Pkts', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 9, 'etherHistoryCRCAlignErrors', 'CRC_Errors', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 10, 'etherHistoryUndersizePkts', 'Undersize_Pkts', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 11, 'etherHistoryOversizePkts', 'Oversize_Pkts', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 12, 'etherHistoryFragments', 'Fragments', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 13, 'etherHistoryJabbers', 'Jabbers', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 14, 'etherHistoryCollisions', 'Collisions', COUNTER32),
+    (ETHER_HISTORY_ENTRY, 15, 'etherHistoryUtilization', 'Utilization_Hundredths', INTEGER),
+
+    # RMON-MIB::alarmTable
+    (ALARM_ENTRY, 1, 'alarmIndex', 'Alarm_Index', INTEGER),
+    (ALARM_ENTRY, 2, 'alarmInterval', 'Alarm_Interval', INTEGER),
+    (ALARM_ENTRY, 3, 'alarmVariable', 'Alarm_Variable', OBJECT_IDENTIFIER),
+    (ALARM_ENTRY, 4, 'alarmSampleType', 'Alarm_Sample_Type', INTEGER),
+    (ALARM_ENTRY, 5, 'alarmValue', 'Current_Value', INTEGER),
+    (ALARM_ENTRY, 6, 'alarmStartupAlarm', 'Alarm_Startup', INTEGER),
+    (ALARM_ENTRY, 7, 'alarmRisingThreshold', 'Threshold', INTEGER),
+    (ALARM_ENTRY, 8, 'alarmFallingThreshold', 'Falling_Threshold', INTEGER),
+    (ALARM_ENTRY, 11, 'alarmOwner', 'Owner', OCTET_STRING),
+    (ALARM_ENTRY, 12, 'alarmStatus', 'Entry_Status', INTEGER),
+
+    # RMON-MIB::hostTable
+    (HOST_ENTRY, 1, 'hostAddress', 'MAC', OCTET_STRING),
+    (HOST_ENTRY, 3, 'hostIndex', 'Host_Index', INTEGER),
+    (HOST_ENTRY, 4, 'hostInPkts', 'Pkts_IN', COUNTER32),
+    (HOST_ENTRY, 5, 'hostOutPkts', 'Pkts_OUT', COUNTER32),
+    (HOST_ENTRY, 6, 'hostInOctets', 'Octets_IN', COUNTER32),
+    (HOST_ENTRY, 7, 'hostOutOctets', 'Octets_OUT', COUNTER32),
+    (HOST_ENTRY, 8, 'hostOutErrors', 'Errors_OUT', COUNTER32),
+    (HOST_ENTRY, 9, 'hostOutBroadcastPkts', 'Broadcast_OUT', COUNTER32),
+    (HOST_ENTRY, 10, 'hostOutMulticastPkts', 'Multicast_OUT', COUNTER32),
+)
+
+
+class MibObject:
+    """Objeto MIB resuelto: OID del objeto (sin instancia), símbolo, campo y tipo."""
+    __slots__ = ('oid', 'symbol', 'field', 'syntax', 'decode')
+
+    def __init__(self, oid, symbol, field, syntax):
+        self.oid = oid
+        self.symbol = symbol
+        self.field = field
+        self.syntax = syntax
+        self.decode = _DECODERS[syntax]
+
+    def __repr__(self):
+        return f"MibObject({self.symbol}, {'.'.join(map(str, self.oid))})"
+
+
+# --- Conversión de valores ---
+# Aceptan valores crudos (int/bytes/tupla) u objetos de pysnmp.
+def _to_int(value):
+    return int(value)
+
+
+def _to_text(value):
+    if hasattr(value, 'asOctets'):
+        value = value.asOctets()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+        try:
+            return raw.decode('utf-8')
+        except UnicodeDecodeError:
+            return raw.hex(':')
+    return str(value)
+
+
+def _to_oid(value):
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, str):
+        return parse_oid(value)
+    return tuple(value)
+
+
+def _to_ip(value):
+    if hasattr(value, 'asOctets'):
+        value = value.asOctets()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '.'.join(str(b) for b in bytes(value))
+    return str(value)
+
+
+_DECODERS = {
+    INTEGER: _to_int,
+    OCTET_STRING: _to_text,
+    OBJECT_IDENTIFIER: _to_oid,
+    IP_ADDRESS: _to_ip,
+    COUNTER32: _to_int,
+    GAUGE32: _to_int,
+    TIMETICKS: _to_int,
+    OPAQUE: bytes,
+    COUNTER64: _to_int,
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_oid(text):
+    """'1.3.6.1.2.1.1.5.0' -> (1, 3, 6, 1, 2, 1, 1, 5, 0)."""
+    return tuple(int(part) for part in text.strip('.').split('.'))
+
+
+def format_oid(oid):
+    return '.'.join(map(str, oid))
+
+
+class OidTable:
+    """
+    Índice de objetos MIB por OID.
+    resolve() busca el prefijo más largo probando solo las longitudes de
+    OID presentes en la tabla (un puñado de búsquedas en dict) y memoriza
+    los OIDs de instancia ya vistos.
+    """
+
+    def __init__(self, definitions=_DEFINITIONS, cache_size=65536):
+        self._by_oid = {}
+        self._by_symbol = {}
+        self._by_field = {}
+        for base, column, symbol, field, syntax in definitions:
+            obj = MibObject(base + (column,), symbol, field, syntax)
+            self._by_oid[obj.oid] = obj
+            self._by_symbol[symbol] = obj
+            # Si un campo aparece en varias MIBs gana la primera (ifTable antes que ifXTable)
+            self._by_field.setdefault(field, []).append(obj)
+        self._lengths = sorted({len(oid) for oid in self._by_oid}, reverse=True)
+        self._cache = {}
+        self._cache_size = cache_size
+
+    def __len__(self):
+        return len(self._by_oid)
+
+    def resolve(self, oid):
+        """
+        Devuelve (MibObject, instancia) para un OID de instancia, o
+        (None, oid) si no pertenece a ningún objeto conocido.
+        """
+        hit = self._cache.get(oid)
+        if hit is not None:
+            return hit
+        if isinstance(oid, str):
+            oid = parse_oid(oid)
+        result = (None, oid)
+        by_oid = self._by_oid
+        for length in self._lengths:
+            obj = by_oid.get(oid[:length])
+            if obj is not None:
+                result = (obj, oid[length:])
+                break
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[oid] = result
+        return result
+
+    def symbol(self, name):
+        """MibObject por símbolo MIB ('ifInOctets')."""
+        return self._by_symbol[name]
+
+    def objects_for_field(self, field):
+        """Objetos que alimentan un campo del monitor (p. ej. IN_Octets: 32 y 64 bits)."""
+        return list(self._by_field.get(field, ()))
+
+    def oid(self, name, *instance):
+        """OID de instancia a partir de un símbolo: oid('ifInOctets', 1)."""
+        return self._by_symbol[name].oid + instance
+
+    def decode(self, oid, value):
+        """(campo, instancia, valor convertido); campo None si el OID es desconocido."""
+        obj, instance = self.resolve(oid)
+        if obj is None:
+            return None, instance, value
+        return obj.field, instance, obj.decode(value)
+
+    def decode_varbinds(self, varbinds):
+        """
+        Convierte [(oid, valor), ...] en {campo: valor}, para consultas de
+        una sola fila. Los contadores de 64 bits tienen prioridad sobre los
+        de 32 bits del mismo campo. Los OIDs desconocidos y los valores
+        ausentes (noSuchObject, noSuchInstance...) se ignoran.
+        """
+        from ber_codec import VarbindException  # ber_codec importa este módulo
+        row = {}
+        high = set()
+        for oid, value in varbinds:
+            if value is None or isinstance(value, VarbindException):
+                continue
+            obj, _ = self.resolve(oid)
+            if obj is None:
+                continue
+            field = obj.field
+            if obj.syntax == COUNTER64:
+                high.add(field)
+            elif field in high:
+                continue
+            row[field] = obj.decode(value)
+        return row
+
+    def decode_table(self, varbinds):
+        """Convierte un recorrido de tabla en {instancia: {campo: valor}}."""
+        from ber_codec import VarbindException
+        rows = {}
+        for oid, value in varbinds:
+            if value is None or isinstance(value, VarbindException):
+                continue
+            obj, instance = self.resolve(oid)
+            if obj is not None:
+                rows.setdefault(instance, {})[obj.field] = obj.decode(value)
+        return rows
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_table():
+    """Tabla compartida, construida en el primer uso."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = OidTable()
+    return _table
+
+
+def load_snmprec(path):
+    """
+    Lee un fichero .snmprec de snmpsim ('oid|tipo|valor' por línea) y
+    devuelve [(oid, tipo, valor)] con los valores ya convertidos.
+    """
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            oid_text, tag, value = line.split('|', 2)
+            # Los tipos con sufijo 'x' vienen en hexadecimal
+            hex_value = tag.endswith('x')
+            tag = int(tag.rstrip('x'))
+            if hex_value:
+                value = bytes.fromhex(value)
+            if tag in (INTEGER, COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+                value = int(value)
+            elif tag == OBJECT_IDENTIFIER:
+                value = parse_oid(value)
+            elif tag == OCTET_STRING and isinstance(value, str):
+                value = value.encode('utf-8')
+            records.append((parse_oid(oid_text), tag, value))
+    return records
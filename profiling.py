@@ -0,0 +1,248 @@
+"""
+Módulo de perfilado bajo demanda para el colector en ejecución.
+Permite activar, sin reiniciar, un perfilador de muestreo de pilas o cProfile
+durante N segundos y tomar snapshots de tracemalloc con diferencias.
+Los informes se escriben en el directorio de exportación.
+"""
+import cProfile
+import io
+import linecache
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+MODES = ('sampling', 'cprofile')
+
+
+class SamplingProfiler:
+    """
+    Perfilador de muestreo: cada `interval` segundos captura las pilas de
+    todos los hilos con sys._current_frames(). Coste casi nulo para el
+    código perfilado y válido para cualquier hilo.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()      # pila colapsada -> muestras
+        self.self_counts = Counter() # función -> muestras en la cima
+        self.total_counts = Counter()
+        self.samples = 0
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self, seconds):
+        """Muestrea durante `seconds` segundos (bloqueante)."""
+        own = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                if not names:
+                    continue
+                names.reverse()
+                self.stacks[";".join(names)] += 1
+                self.self_counts[names[-1]] += 1
+                for name in set(names):
+                    self.total_counts[name] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def report(self, top=30):
+        lines = [f"Perfil por muestreo: {self.samples} muestras "
+                 f"(intervalo {self.interval * 1000:.1f} ms)", ""]
+        total = max(1, sum(self.self_counts.values()))
+        lines.append(f"{'Propio %':>9} {'Total %':>9}  Función")
+        for name, count in self.self_counts.most_common(top):
+            lines.append(f"{count / total * 100:9.1f} "
+                         f"{self.total_counts[name] / total * 100:9.1f}  {name}")
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self):
+        """Pilas en formato colapsado (compatible con flamegraph.pl/speedscope)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilerController:
+    """
+    Orquesta las sesiones de perfilado y los snapshots de memoria.
+    Thread-safe: solo permite una sesión de CPU a la vez.
+    """
+
+    def __init__(self, log_callback=None, export_dir="exports"):
+        self.log_callback = log_callback
+        self.export_dir = export_dir
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._active = None           # modo de la sesión en curso
+        self._profiled_running = 0    # operaciones bajo cProfile en curso
+        self._cprofile_stats = None   # pstats.Stats acumulado de la sesión
+        self._memory_baseline = None
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    def _path(self, prefix, ext):
+        if not os.path.exists(self.export_dir):
+            os.makedirs(self.export_dir)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.export_dir, f"{prefix}_{timestamp}.{ext}")
+
+    @property
+    def active(self):
+        return self._active
+
+    # --- CPU ---
+    def start_profile(self, seconds=10, mode='sampling'):
+        """
+        Inicia una sesión de perfilado en segundo plano.
+        Retorna False si ya hay una en curso.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Modo de perfilado desconocido: {mode}")
+        with self._lock:
+            if self._active:
+                return False
+            self._active = mode
+            self._cprofile_stats = None
+        self._log(f"🔬 Perfilado '{mode}' iniciado durante {seconds}s...")
+        t = threading.Thread(target=self._run_session, args=(seconds, mode), daemon=True)
+        t.start()
+        return True
+
+    def _run_session(self, seconds, mode):
+        try:
+            if mode == 'sampling':
+                profiler = SamplingProfiler()
+                profiler.run(seconds)
+                report_file = self._path("profile_sampling", "txt")
+                with open(report_file, 'w', encoding='utf-8') as f:
+                    f.write(profiler.report())
+                with open(report_file.replace('.txt', '.collapsed'), 'w', encoding='utf-8') as f:
+                    f.write(profiler.collapsed())
+            else:
+                time.sleep(seconds)
+                # Cerrar la ventana y esperar a las operaciones ya perfiladas
+                with self._lock:
+                    self._active = 'cprofile-closing'
+                    self._idle.wait_for(lambda: self._profiled_running == 0, timeout=120)
+                report_file = self._write_cprofile_report()
+            self._log(f"🔬 Perfil guardado en: {report_file}")
+        except Exception as e:
+            self._log(f"Error durante el perfilado: {e}")
+        finally:
+            with self._lock:
+                self._active = None
+
+    def wrap(self, func):
+        """
+        Envuelve el objetivo de un hilo de trabajo. Si al arrancar hay una
+        sesión cProfile activa, la operación se ejecuta bajo cProfile y sus
+        estadísticas se acumulan en la sesión.
+        """
+        def runner(*args, **kwargs):
+            with self._lock:
+                profiled = self._active == 'cprofile'
+                if profiled:
+                    self._profiled_running += 1
+            if not profiled:
+                return func(*args, **kwargs)
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    if self._cprofile_stats is None:
+                        self._cprofile_stats = pstats.Stats(profile)
+                    else:
+                        self._cprofile_stats.add(profile)
+                    self._profiled_running -= 1
+                    self._idle.notify_all()
+        return runner
+
+    def _write_cprofile_report(self):
+        report_file = self._path("profile_cprofile", "txt")
+        with self._lock:
+            stats = self._cprofile_stats
+            self._cprofile_stats = None
+        with open(report_file, 'w', encoding='utf-8') as f:
+            if stats is None:
+                f.write("Ninguna operación se ejecutó durante la ventana de perfilado.\n")
+                return report_file
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats('cumulative').print_stats(40)
+            f.write(buffer.getvalue())
+        stats.dump_stats(report_file.replace('.txt', '.pstats'))
+        return report_file
+
+    # --- MEMORIA ---
+    def memory_snapshot(self, top=25):
+        """
+        Toma un snapshot de tracemalloc y lo compara con el anterior.
+        La primera llamada activa el trazado y solo fija la línea base.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._memory_baseline = tracemalloc.take_snapshot()
+            self._log("🧠 Trazado de memoria activado (línea base tomada).")
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        report_file = self._path("memory", "txt")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(f"Memoria trazada: {current / 1e6:.2f} MB (pico {peak / 1e6:.2f} MB)\n\n")
+            f.write(f"Top {top} diferencias respecto al snapshot anterior:\n")
+            for stat in snapshot.compare_to(self._memory_baseline, 'lineno')[:top]:
+                f.write(f"  {stat}\n")
+            f.write(f"\nTop {top} asignaciones actuales:\n")
+            for stat in snapshot.statistics('traceback')[:top]:
+                f.write(f"  {stat}\n")
+                for line in stat.traceback.format()[-4:]:
+                    f.write(f"      {line}\n")
+        self._memory_baseline = snapshot
+        self._log(f"🧠 Snapshot de memoria guardado en: {report_file}")
+        return report_file
+
+    def stop_memory_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._memory_baseline = None
+            self._log("🧠 Trazado de memoria detenido.")
+
+    # --- SEÑALES ---
+    def install_signal_handlers(self, seconds=10):
+        """
+        SIGUSR1 perfila `seconds` segundos por muestreo; SIGUSR2 toma un
+        snapshot de memoria. Debe llamarse desde el hilo principal.
+        No disponible en Windows.
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+        # Nada de esto va dentro del manejador: start_profile toma self._lock, que no
+        # es reentrante (la señal puede llegar con el lock tomado), y el snapshot puede tardar
+        signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(
+            target=self.start_profile, args=(seconds,), daemon=True).start())
+        signal.signal(signal.SIGUSR2, lambda *_: threading.Thread(
+            target=self.memory_snapshot, daemon=True).start())
+        return True
@@ -0,0 +1,215 @@
+"""
+Registros compactos para las muestras por agente (SNMP y RMON).
+Cada muestra guarda sus valores en __slots__ en lugar de un dict con una
+clave de texto por campo, así que ocupa una fracción de la memoria. Se
+sigue accediendo como a un dict (rec['Utilization_%'], rec.get(...),
+keys(), items()), de modo que el exportador CSV, la tabla, los gráficos
+y el diff funcionan sin cambios.
+SampleBatch agrupa las muestras de un sondeo y expone sus columnas como
+arrays NumPy, para que los agregados sean operaciones por columna.
+"""
+from operator import attrgetter
+
+import numpy as np
+
+_MISSING = object()
+
+# Orden de los campos = orden de los argumentos posicionales del registro
+SNMP_FIELDS = ('Agent', 'Device_Type', 'Device_Name', 'Uptime_Days', 'Speed_Mbps',
+               'IN_Octets', 'OUT_Octets', 'IN_Packets', 'OUT_Packets', 'IN_Errors', 'OUT_Errors',
+               'Total_Data_GB', 'Utilization_%', 'Error_Rate_%', 'Status', 'timestamp',
+               'Anomaly', 'Anomaly_Score')
+RMON_FIELDS = ('Agent', 'Drop_Events', 'Octets', 'Packets', 'Broadcast_Pkts', 'Multicast_Pkts',
+               'CRC_Errors', 'Collisions', 'Fragments')
+# Una fila por interfaz (ifTable/ifXTable); los campos RMON solo si el agente tiene etherStats
+IF_FIELDS = ('Interface', 'Agent', 'If_Index', 'If_Name', 'Oper_Status', 'Speed_Mbps', 'Counter_Bits',
+             'IN_Octets', 'OUT_Octets', 'IN_Packets', 'OUT_Packets', 'IN_Errors', 'OUT_Errors',
+             'IN_bps', 'OUT_bps', 'Utilization_%', 'Error_Rate_%', 'Status', 'timestamp',
+             'Drop_Events', 'Broadcast_Pkts', 'Multicast_Pkts', 'CRC_Errors', 'Collisions',
+             'Anomaly', 'Anomaly_Score')
+
+
+def _slot_name(field):
+    """'Utilization_%' -> 'utilization_pct' (nombre de atributo válido)."""
+    return field.replace('%', 'pct').lower()
+
+
+def _make_init(slots):
+    """
+    __init__ posicional con una asignación por slot (como namedtuple o
+    dataclasses): unas 5 veces más rápido que recorrer los slots en un bucle.
+    """
+    args = ", ".join(f"{slot}=_MISSING" for slot in slots)
+    body = "".join(f"    if {slot} is not _MISSING: self.{slot} = {slot}\n" for slot in slots)
+    namespace = {'_MISSING': _MISSING}
+    exec(f"def __init__(self, {args}):\n{body}    self._extra = None\n", namespace)
+    return namespace['__init__']
+
+
+class Record:
+    """
+    Base de los registros: interfaz de dict sobre __slots__. Los campos
+    no asignados no existen (como una clave ausente); los que no están en
+    FIELDS van a un dict aparte que solo se crea si hace falta.
+    """
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    _SLOTS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._SLOTS = {field: _slot_name(field) for field in cls.FIELDS}
+        cls.__init__ = _make_init(cls.__slots__)
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls()
+        for key, value in data.items():
+            record[key] = value
+        return record
+
+    # --- Interfaz de dict ---
+    def __getitem__(self, key):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        """Vista ordenada y con operaciones de conjunto, como dict.keys()."""
+        keys = dict.fromkeys(f for f, slot in self._SLOTS.items() if hasattr(self, slot))
+        if self._extra:
+            keys.update(dict.fromkeys(self._extra))
+        return keys.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+
+class SnmpSample(Record):
+    """Muestra SNMP de un agente (una fila de last_snmp_data)."""
+    FIELDS = SNMP_FIELDS
+    __slots__ = tuple(_slot_name(f) for f in SNMP_FIELDS)
+
+
+class RmonSample(Record):
+    """Estadísticas RMON de un agente (una fila de last_rmon_data['agents'])."""
+    FIELDS = RMON_FIELDS
+    __slots__ = tuple(_slot_name(f) for f in RMON_FIELDS)
+
+
+class InterfaceSample(Record):
+    """Muestra de una interfaz de un agente ('Interface' = 'agente/ifIndex')."""
+    FIELDS = IF_FIELDS
+    __slots__ = tuple(_slot_name(f) for f in IF_FIELDS)
+
+
+class SampleBatch(tuple):
+    """
+    Muestras de un sondeo: una tupla inmutable de registros que además
+    expone cada campo como columna NumPy (calculada una vez y cacheada).
+    """
+
+    def column(self, field, dtype=None):
+        """Columna de `field`; con dtype float los huecos valen NaN."""
+        cache = self.__dict__.setdefault('_columns', {})
+        key = (field, dtype)
+        if key not in cache:
+            cache[key] = np.array(self._values(field), dtype=dtype)
+        return cache[key]
+
+    def _values(self, field):
+        """Valores de `field` leyendo el slot directamente si todas las filas son del mismo tipo."""
+        first = self[0] if self else None
+        slot = first._SLOTS.get(field) if isinstance(first, Record) else None
+        if slot is not None:
+            try:
+                return list(map(attrgetter(slot), self))
+            except AttributeError:
+                pass
+        return [r.get(field) for r in self]
+
+    def numeric(self, field):
+        """Columna numérica: entera si todos los valores lo son, si no float con NaN en los huecos."""
+        col = self.column(field)
+        return col if col.dtype != object else self.column(field, np.float64)
+
+    def sum(self, *fields):
+        """Suma de uno o varios campos numéricos, sin contar los huecos (0 si no hay muestras)."""
+        return sum(np.nansum(self.numeric(f)) for f in fields) if self else 0
+
+    def mean(self, field):
+        return float(np.nanmean(self.numeric(field))) if self else 0.0
+
+    def count(self, field, value):
+        """Muestras cuyo `field` vale `value`."""
+        return int((self.column(field) == value).sum()) if self else 0
+
+    def count_true(self, field):
+        """Muestras cuyo `field` no está vacío."""
+        return sum(map(bool, self.column(field))) if self else 0
+
+    def to_dicts(self):
+        return [r.to_dict() if isinstance(r, Record) else dict(r) for r in self]
+
+
+def as_batch(rows):
+    """SampleBatch a partir de cualquier secuencia de filas (registros o dicts)."""
+    return rows if isinstance(rows, SampleBatch) else SampleBatch(rows)
+
+
+def json_default(obj):
+    """`default` para json.dump: registros como dict, NumPy como nativo, resto como texto."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
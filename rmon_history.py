@@ -0,0 +1,382 @@
+"""
+Módulo de recolección del grupo History de RMON (RFC 2819).
+Descubre o configura historyControlTable y lee etherHistoryTable de forma
+incremental, usando el índice de muestra como cursor.
+
+El colector trabaja sobre una "sesión" con la siguiente interfaz de
+corrutinas (la de snmp_transport.SnmpSession):
+    aget(oid) -> valor
+    awalk(prefix, start=None) -> lista de (oid, valor) dentro de `prefix`,
+                                 a partir del OID siguiente a `start`
+    aset(pairs) -> None, con pairs = [(oid, valor), ...]
+Los OIDs son tuplas de enteros. Los agentes se consultan a la vez con
+apoll_many() dentro del bucle del transporte.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from oid_table import SYSTEM, IF_ENTRY, HISTORY_CONTROL_ENTRY, ETHER_HISTORY_ENTRY
+
+SYS_UPTIME = SYSTEM + (3, 0)
+IF_INDEX = IF_ENTRY + (1,)
+
+# historyControlEntry
+HC_DATA_SOURCE = 2
+HC_BUCKETS_REQUESTED = 3
+HC_BUCKETS_GRANTED = 4
+HC_INTERVAL = 5
+HC_OWNER = 6
+HC_STATUS = 7
+
+# etherHistoryEntry (índices: etherHistoryIndex.etherHistorySampleIndex)
+EH_INTERVAL_START = 3
+EH_DROP_EVENTS = 4
+EH_OCTETS = 5
+EH_PKTS = 6
+EH_BROADCAST = 7
+EH_MULTICAST = 8
+EH_CRC_ERRORS = 9
+EH_COLLISIONS = 14
+EH_UTILIZATION = 15
+
+# Columnas que se leen en cada consulta y su nombre en la muestra
+SAMPLE_COLUMNS = {
+    EH_INTERVAL_START: 'interval_start',
+    EH_DROP_EVENTS: 'drop_events',
+    EH_OCTETS: 'octets',
+    EH_PKTS: 'packets',
+    EH_BROADCAST: 'broadcast',
+    EH_MULTICAST: 'multicast',
+    EH_CRC_ERRORS: 'crc_errors',
+    EH_COLLISIONS: 'collisions',
+    EH_UTILIZATION: 'utilization',
+}
+
+# EntryStatus (RMON-MIB)
+STATUS_VALID = 1
+STATUS_CREATE_REQUEST = 2
+STATUS_UNDER_CREATION = 3
+
+
+class RmonHistoryStore:
+    """
+    Almacén de muestras de historial por (agente, historyControlIndex).
+    Las muestras se fusionan por índice (sin duplicados) con su marca de
+    tiempo real y se conservan como máximo `max_samples` por serie.
+    """
+
+    def __init__(self, max_samples=720):
+        self.max_samples = max_samples
+        self._series = {}
+
+    def merge(self, agent, control_index, samples, restart=False):
+        """
+        Añade muestras nuevas; devuelve cuántas se incorporaron. Con
+        `restart` (el agente reinició o su índice de muestra volvió a
+        empezar) se admiten índices menores que los ya guardados.
+        """
+        series = self._series.get((agent, control_index))
+        if series is None:
+            series = deque(maxlen=self.max_samples)
+            self._series[(agent, control_index)] = series
+        last = series[-1]['sample_index'] if series and not restart else 0
+        added = 0
+        for sample in samples:
+            if sample['sample_index'] > last:
+                series.append(sample)
+                last = sample['sample_index']
+                added += 1
+        return added
+
+    def samples(self, agent, control_index=None):
+        """Muestras de un agente (todas sus series si no se indica índice)."""
+        rows = []
+        for (a, idx), series in self._series.items():
+            if a == agent and (control_index is None or idx == control_index):
+                rows.extend(series)
+        rows.sort(key=lambda s: s['timestamp'])
+        return rows
+
+    def as_plot_rows(self, last_n=None):
+        """
+        Agrega todas las series por inicio de intervalo en el formato que
+        espera DataVisualizer.plot_utilization_history.
+        """
+        buckets = {}
+        for series in self._series.values():
+            for sample in series:
+                key = sample['timestamp']
+                b = buckets.setdefault(key, [0, 0, 0.0, 0])
+                b[0] += sample['octets']
+                b[1] += sample['packets']
+                b[2] += sample['utilization']
+                b[3] += 1
+        keys = sorted(buckets)
+        if last_n:
+            keys = keys[-last_n:]
+        # Con fecha: el historial puede cruzar la medianoche
+        return [{
+            'timestamp': key.isoformat(sep=' '),
+            'octets': buckets[key][0],
+            'packets': buckets[key][1],
+            'utilization': round(buckets[key][2] / buckets[key][3], 1)
+        } for key in keys]
+
+
+class EtherHistoryCollector:
+    """
+    Colector incremental de etherHistoryTable.
+    Por cada agente recuerda el último etherHistorySampleIndex leído y en
+    la siguiente consulta solo recorre las filas posteriores a ese cursor.
+
+    El cursor vuelve a cero si el agente reinicia (sysUpTime retrocede) o si
+    el índice de muestra vuelve a empezar (p. ej. la entrada de control se
+    recreó): tras dos intervalos sin filas nuevas se comprueba el índice más
+    reciente de la tabla y, si es menor que el cursor, se relee desde el
+    principio.
+    """
+
+    def __init__(self, store, interval=30, buckets=50, owner='monitor', clock=time.time):
+        self.store = store
+        self.interval = interval
+        self.buckets = buckets
+        self.owner = owner
+        self.clock = clock  # instante actual (epoch) para fechar las muestras
+        self._controls = {}  # agente -> (historyControlIndex, intervalo)
+        self._cursors = {}   # (agente, historyControlIndex) -> último sampleIndex
+        self._uptimes = {}   # agente -> último sysUpTime leído
+        self._last_new = {}  # (agente, historyControlIndex) -> instante de la última fila nueva
+
+    async def adiscover(self, agent, session, if_index=1):
+        """
+        Busca una entrada válida de historyControlTable para la interfaz.
+        Si no existe, la crea con el intervalo configurado.
+        Devuelve (historyControlIndex, intervalo en segundos).
+        """
+        data_source = IF_INDEX + (if_index,)
+        entries = {}
+        for oid, value in await session.awalk(HISTORY_CONTROL_ENTRY):
+            column, index = oid[len(HISTORY_CONTROL_ENTRY)], oid[-1]
+            entries.setdefault(index, {})[column] = value
+
+        candidates = [
+            (entry.get(HC_INTERVAL, 0), index)
+            for index, entry in entries.items()
+            if tuple(entry.get(HC_DATA_SOURCE, ())) == data_source
+            and entry.get(HC_STATUS) == STATUS_VALID
+        ]
+        if candidates:
+            # Preferir el intervalo más corto disponible
+            interval, index = min(candidates)
+        else:
+            index = max(entries, default=0) + 1
+            await self._acreate_control(session, index, data_source)
+            interval = self.interval
+
+        self._controls[agent] = (index, interval)
+        return index, interval
+
+    async def _acreate_control(self, session, index, data_source):
+        def col(c):
+            return HISTORY_CONTROL_ENTRY + (c, index)
+        await session.aset([(col(HC_STATUS), STATUS_CREATE_REQUEST)])
+        await session.aset([
+            (col(HC_DATA_SOURCE), data_source),
+            (col(HC_BUCKETS_REQUESTED), self.buckets),
+            (col(HC_INTERVAL), self.interval),
+            (col(HC_OWNER), self.owner),
+        ])
+        await session.aset([(col(HC_STATUS), STATUS_VALID)])
+
+    async def apoll(self, agent, session, if_index=1):
+        """
+        Lee solo las muestras nuevas del agente y las fusiona en el almacén.
+        Devuelve la lista de muestras nuevas.
+        """
+        # Reloj del agente para convertir intervalStart en hora real
+        uptime_ticks = await session.aget(SYS_UPTIME)
+        now = datetime.fromtimestamp(self.clock())
+        previous_uptime = self._uptimes.get(agent)
+        self._uptimes[agent] = uptime_ticks
+        restart = previous_uptime is not None and uptime_ticks < previous_uptime
+        if restart:
+            # Reinicio: la entrada de control puede haber desaparecido con él
+            self._controls.pop(agent, None)
+            self._cursors = {k: v for k, v in self._cursors.items() if k[0] != agent}
+
+        if agent not in self._controls:
+            await self.adiscover(agent, session, if_index)
+        control_index, interval = self._controls[agent]
+        key = (agent, control_index)
+        cursor = self._cursors.get(key, 0)
+
+        rows = await self._aread_rows(session, control_index, cursor)
+        if not rows and cursor:
+            stalled = self.clock() - self._last_new.get(key, self.clock())
+            if stalled > 2 * interval and await self._anewest_index(session, control_index) < cursor:
+                restart = True
+                cursor = 0
+                rows = await self._aread_rows(session, control_index, cursor)
+
+        samples = []
+        for sample_index in sorted(rows):
+            row = rows[sample_index]
+            if len(row) != len(SAMPLE_COLUMNS):
+                continue  # fila incompleta (bucket sobrescrito durante la lectura)
+            age = (uptime_ticks - row.pop('interval_start')) / 100.0
+            row['sample_index'] = sample_index
+            # Redondear al segundo para alinear buckets de distintos agentes
+            row['timestamp'] = (now - timedelta(seconds=age, microseconds=-500000)).replace(microsecond=0)
+            # etherHistoryUtilization viene en centésimas de porcentaje
+            row['utilization'] = row['utilization'] / 100.0
+            samples.append(row)
+
+        if samples:
+            self._cursors[key] = samples[-1]['sample_index']
+            self._last_new[key] = self.clock()
+            self.store.merge(agent, control_index, samples, restart=restart)
+        elif key not in self._last_new:
+            self._last_new[key] = self.clock()
+        return samples
+
+    async def apoll_many(self, targets):
+        """
+        Consulta a la vez varios agentes: `targets` es {agente: (sesión,
+        ifIndex)}. Devuelve {agente: muestras nuevas o excepción}.
+        """
+        agents = list(targets)
+        results = await asyncio.gather(*(self.apoll(agent, *targets[agent]) for agent in agents),
+                                       return_exceptions=True)
+        return dict(zip(agents, results))
+
+    @staticmethod
+    async def _aread_rows(session, control_index, cursor):
+        """Columnas de las filas posteriores a `cursor`: {sampleIndex: {campo: valor}}."""
+        rows = {}
+        for column, name in SAMPLE_COLUMNS.items():
+            prefix = ETHER_HISTORY_ENTRY + (column, control_index)
+            for oid, value in await session.awalk(prefix, start=prefix + (cursor,)):
+                rows.setdefault(oid[-1], {})[name] = value
+        return rows
+
+    @staticmethod
+    async def _anewest_index(session, control_index):
+        """Mayor etherHistorySampleIndex presente (0 si la tabla está vacía)."""
+        prefix = ETHER_HISTORY_ENTRY + (EH_INTERVAL_START, control_index)
+        return max((oid[-1] for oid, _ in await session.awalk(prefix)), default=0)
+
+
+class SimulatedRmonAgent:
+    """
+    Sesión simulada con historyControlTable y etherHistoryTable en memoria.
+    Genera un bucket por intervalo transcurrido, alineado al reloj de pared,
+    y arranca con `prefill` buckets de historial ya disponibles. `clock`
+    sustituye a time.time() para reproducir el historial con una semilla.
+    """
+
+    def __init__(self, speed_mbps=1000, prefill=5, rng=None, clock=time.time):
+        self.speed_mbps = speed_mbps
+        self.prefill = prefill
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.boot = self.clock() - self.rng.randint(3600, 86400)
+        self.controls = {}
+        self.buckets = {}       # control -> {sampleIndex: fila}
+        self._first_start = {}  # control -> inicio del primer bucket
+        self._generated = {}    # control -> último sampleIndex generado
+
+    def _uptime(self):
+        return int((self.clock() - self.boot) * 100)
+
+    def get(self, oid):
+        if oid == SYS_UPTIME:
+            return self._uptime()
+        raise KeyError(oid)
+
+    def set(self, pairs):
+        for oid, value in pairs:
+            column, index = oid[len(HISTORY_CONTROL_ENTRY)], oid[-1]
+            entry = self.controls.setdefault(index, {})
+            entry[column] = value
+            if column == HC_STATUS and value == STATUS_VALID:
+                entry[HC_BUCKETS_GRANTED] = entry.get(HC_BUCKETS_REQUESTED, 50)
+                self._start_sampling(index)
+
+    def _start_sampling(self, index):
+        interval = self.controls[index][HC_INTERVAL]
+        # Alinear al reloj para que agentes distintos compartan buckets
+        first = (self.clock() // interval - self.prefill) * interval
+        self.buckets[index] = {}
+        self._first_start[index] = first
+        self._generated[index] = 0
+
+    def _refresh(self, index):
+        entry = self.controls[index]
+        interval = entry[HC_INTERVAL]
+        table = self.buckets[index]
+        first = self._first_start[index]
+        completed = int((self.clock() - first) // interval)
+        for sample_index in range(self._generated[index] + 1, completed + 1):
+            start = first + (sample_index - 1) * interval
+            util = self.rng.uniform(15.0, 85.0)
+            octets = int(self.speed_mbps * 1e6 / 8 * interval * util / 100)
+            pkts = octets // self.rng.randint(400, 1200)
+            table[sample_index] = {
+                EH_INTERVAL_START: int((start - self.boot) * 100),
+                EH_DROP_EVENTS: self.rng.randint(0, 5),
+                EH_OCTETS: octets % 2 ** 32,
+                EH_PKTS: pkts,
+                EH_BROADCAST: pkts // 50,
+                EH_MULTICAST: pkts // 100,
+                EH_CRC_ERRORS: self.rng.randint(0, 3),
+                EH_COLLISIONS: self.rng.randint(0, 3),
+                EH_UTILIZATION: int(util * 100),
+            }
+        self._generated[index] = max(self._generated[index], completed)
+        # Respetar bucketsGranted como un buffer circular
+        granted = entry.get(HC_BUCKETS_GRANTED, 50)
+        for old in [k for k in table if k <= completed - granted]:
+            del table[old]
+
+    # Interfaz de corrutinas del colector (el simulador nunca espera)
+    async def aget(self, oid):
+        return self.get(oid)
+
+    async def awalk(self, prefix, start=None):
+        return list(self.walk(prefix, start))
+
+    async def aset(self, pairs):
+        self.set(pairs)
+
+    def walk(self, prefix, start=None):
+        if prefix[:len(HISTORY_CONTROL_ENTRY)] == HISTORY_CONTROL_ENTRY:
+            rows = sorted(
+                (HISTORY_CONTROL_ENTRY + (column, index), value)
+                for index, entry in self.controls.items()
+                for column, value in entry.items()
+            )
+        elif prefix[:len(ETHER_HISTORY_ENTRY)] == ETHER_HISTORY_ENTRY and \
+                len(prefix) < len(ETHER_HISTORY_ENTRY) + 2:
+            rows = []
+            for index in self.buckets:  # solo entradas válidas (no las que están en creación)
+                self._refresh(index)
+                for sample_index, row in self.buckets[index].items():
+                    for column, value in row.items():
+                        rows.append((ETHER_HISTORY_ENTRY + (column, index, sample_index), value))
+            rows.sort()
+        elif prefix[:len(ETHER_HISTORY_ENTRY)] == ETHER_HISTORY_ENTRY:
+            # Recorrido de una columna: solo las filas de esa columna, en orden
+            column, index = prefix[len(ETHER_HISTORY_ENTRY):][:2]
+            if index not in self.buckets:
+                return
+            self._refresh(index)
+            base = ETHER_HISTORY_ENTRY + (column, index)
+            rows = ((base + (sample_index,), row[column])
+                    for sample_index, row in sorted(self.buckets[index].items()))
+        else:
+            return
+        for oid, value in rows:
+            if oid[:len(prefix)] == prefix and (start is None or oid > start):
+                yield oid, value
@@ -0,0 +1,251 @@
+"""
+Módulo Top-N de hosts para la tabla hostTable de RMON.
+Procesa las entradas como un flujo, calcula deltas por intervalo para cada
+MAC y conserva solo los N hosts con más tráfico.
+"""
+import heapq
+import random
+
+COUNTER32_MAX = 2 ** 32
+
+# Criterios de ordenación disponibles
+RANK_KEYS = ('octets', 'packets')
+
+
+def counter_delta(current, previous, wrap=COUNTER32_MAX):
+    """Delta entre dos lecturas de un contador, tolerando el desborde."""
+    if previous is None:
+        return current
+    if current >= previous:
+        return current - previous
+    return current + wrap - previous
+
+
+def _host_row(rank, mac, pkts_in, pkts_out, octets):
+    return {
+        'Host': rank,
+        'MAC': mac,
+        'Pkts_IN': pkts_in,
+        'Pkts_OUT': pkts_out,
+        'Traffic_MB': round(octets / 1e6, 2)
+    }
+
+
+class TopNHostTracker:
+    """
+    Top-N exacto con heap acotado.
+    Cada entrada del flujo es una tupla
+    (mac, in_pkts, out_pkts, in_octets, out_octets) con contadores acumulados
+    tal como los devuelve hostTable. Selección en O(N log K) con un heap de
+    K elementos; los deltas exigen guardar la lectura anterior de cada MAC,
+    así que la memoria es O(MACs de la tabla). Si la tabla supera
+    `max_hosts`, el tracker pasa al modo de memoria acotada
+    (HeavyHitterHostTracker) sembrado con las últimas lecturas.
+    Una MAC vista por primera vez solo fija su línea base: sus contadores
+    acumulados no son tráfico del intervalo.
+    """
+
+    def __init__(self, n=5, rank_by='octets', max_hosts=None):
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"Criterio no soportado: {rank_by}")
+        self.n = n
+        self.rank_by = rank_by
+        self.max_hosts = max_hosts
+        self._previous = {}
+        self._fallback = None
+
+    def process(self, entries):
+        """Consume el flujo de un intervalo y devuelve los N hosts principales."""
+        if self._fallback is not None:
+            return self._fallback.process(entries)
+        heap = []
+        previous = self._previous
+        current = {}
+        for mac, in_pkts, out_pkts, in_octets, out_octets in entries:
+            last = previous.get(mac)
+            current[mac] = (in_pkts, out_pkts, in_octets, out_octets)
+            if last is None:
+                continue
+            d_in_pkts = counter_delta(in_pkts, last[0])
+            d_out_pkts = counter_delta(out_pkts, last[1])
+            d_octets = counter_delta(in_octets, last[2]) + counter_delta(out_octets, last[3])
+
+            score = d_octets if self.rank_by == 'octets' else d_in_pkts + d_out_pkts
+            item = (score, mac, d_in_pkts, d_out_pkts, d_octets)
+            if len(heap) < self.n:
+                heapq.heappush(heap, item)
+            elif score > heap[0][0]:
+                heapq.heappushpop(heap, item)
+
+        # Los hosts que desaparecen de la tabla se olvidan
+        self._previous = current
+        if self.max_hosts and len(current) > self.max_hosts:
+            self._fallback = HeavyHitterHostTracker(self.n, self.rank_by)
+            self._fallback.seed(current)
+            self._previous = {}
+        ranked = sorted(heap, reverse=True)
+        return [_host_row(i, mac, p_in, p_out, octs)
+                for i, (_, mac, p_in, p_out, octs) in enumerate(ranked, 1)]
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch de ancho `width` y profundidad `depth`.
+    Con `update_max` guarda el máximo visto por celda, lo que permite
+    estimar (por exceso) la última lectura de un contador acumulado.
+    """
+
+    def __init__(self, width=2048, depth=4, seed=0):
+        self.width = width
+        self.depth = depth
+        rnd = random.Random(seed)
+        self._salts = [rnd.getrandbits(64) for _ in range(depth)]
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _cells(self, key):
+        for row, salt in zip(self._rows, self._salts):
+            yield row, hash((salt, key)) % self.width
+
+    def add(self, key, value=1):
+        for row, idx in self._cells(key):
+            row[idx] += value
+
+    def update_max(self, key, value):
+        for row, idx in self._cells(key):
+            if value > row[idx]:
+                row[idx] = value
+
+    def estimate(self, key):
+        return min(row[idx] for row, idx in self._cells(key))
+
+
+class SpaceSaving:
+    """
+    Algoritmo Space-Saving (Metwally et al.) con K contadores.
+    Cuando llega un elemento nuevo y no hay hueco, reemplaza al de menor
+    cuenta heredando su valor como error máximo.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}   # clave -> [cuenta, error]
+        self._heap = []    # (cuenta, clave) con entradas obsoletas perezosas
+
+    def add(self, key, weight):
+        entry = self.counts.get(key)
+        if entry is not None:
+            entry[0] += weight
+        elif len(self.counts) < self.k:
+            entry = self.counts[key] = [weight, 0]
+        else:
+            min_count, min_key = self._pop_min()
+            del self.counts[min_key]
+            entry = self.counts[key] = [min_count + weight, min_count]
+        heapq.heappush(self._heap, (entry[0], key))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(c, k) for k, (c, _) in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            entry = self.counts.get(key)
+            if entry is not None and entry[0] == count:
+                return count, key
+
+    def top(self, n):
+        return heapq.nlargest(n, self.counts.items(), key=lambda kv: kv[1][0])
+
+
+class HeavyHitterHostTracker:
+    """
+    Modo de memoria acotada para segmentos demasiado grandes.
+    Las lecturas anteriores se guardan en un Count-Min sketch (estimación por
+    exceso, por lo que el delta es una cota inferior) y el ranking del
+    intervalo se obtiene con Space-Saving sobre `capacity` contadores.
+    Memoria O(width × depth + capacity), independiente del número de MACs.
+
+    El sketch guarda lecturas "desenrolladas" (crecientes aunque el Counter32
+    dé la vuelta): una lectura más de media vuelta por debajo de la estimación
+    se toma como desborde; por debajo en menos, como sobreestimación del
+    sketch (delta 0). Una MAC sin lectura previa (estimación 0) solo fija su
+    línea base.
+    """
+
+    def __init__(self, n=5, rank_by='octets', capacity=None, width=4096, depth=4):
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"Criterio no soportado: {rank_by}")
+        self.n = n
+        self.rank_by = rank_by
+        self.capacity = capacity or max(10 * n, 64)
+        self._width = width
+        self._depth = depth
+        self._sketches = None
+
+    def _ensure_sketches(self):
+        if self._sketches is None:
+            self._sketches = [CountMinSketch(self._width, self._depth, seed=i) for i in range(4)]
+        return self._sketches
+
+    def seed(self, readings):
+        """Fija las líneas base a partir de {mac: (in_pkts, out_pkts, in_octets, out_octets)}."""
+        sketches = self._ensure_sketches()
+        for mac, values in readings.items():
+            for value, sketch in zip(values, sketches):
+                sketch.update_max(mac, value)
+
+    @staticmethod
+    def _unwrap(value, estimate, wrap=COUNTER32_MAX):
+        """Lectura desenrollada más cercana a la estimación previa (>= salvo sobreestimación)."""
+        unwrapped = estimate - estimate % wrap + value
+        if unwrapped < estimate - wrap // 2:
+            unwrapped += wrap
+        return unwrapped
+
+    def process(self, entries):
+        """Consume el flujo de un intervalo y devuelve los N hosts principales."""
+        sketches = self._ensure_sketches()
+        summary = SpaceSaving(self.capacity)
+        details = {}
+
+        for mac, in_pkts, out_pkts, in_octets, out_octets in entries:
+            estimates = [sketch.estimate(mac) for sketch in sketches]
+            if not any(estimates):
+                # Primera lectura: solo línea base
+                for value, sketch in zip((in_pkts, out_pkts, in_octets, out_octets), sketches):
+                    sketch.update_max(mac, value)
+                continue
+            readings = [self._unwrap(value, estimate) for value, estimate
+                        in zip((in_pkts, out_pkts, in_octets, out_octets), estimates)]
+            deltas = tuple(max(0, value - estimate) for value, estimate in zip(readings, estimates))
+            for value, sketch in zip(readings, sketches):
+                sketch.update_max(mac, value)
+
+            d_octets = deltas[2] + deltas[3]
+            score = d_octets if self.rank_by == 'octets' else deltas[0] + deltas[1]
+            if score <= 0:
+                continue
+            summary.add(mac, score)
+            if mac in summary.counts:
+                details[mac] = (deltas[0], deltas[1], d_octets)
+            # Conservar solo los detalles de las claves monitorizadas
+            if len(details) > 2 * self.capacity:
+                details = {k: v for k, v in details.items() if k in summary.counts}
+
+        rows = []
+        for i, (mac, _) in enumerate(summary.top(self.n), 1):
+            p_in, p_out, octs = details.get(mac, (0, 0, 0))
+            rows.append(_host_row(i, mac, p_in, p_out, octs))
+        return rows
+
+
+def make_host_tracker(n=5, rank_by='octets', mode='exact', **kwargs):
+    """
+    Crea un tracker exacto ('exact', admite max_hosts) o de memoria acotada
+    ('sketch').
+    """
+    if mode == 'exact':
+        return TopNHostTracker(n, rank_by, **kwargs)
+    if mode == 'sketch':
+        return HeavyHitterHostTracker(n, rank_by, **kwargs)
+    raise ValueError(f"Modo de tracker desconocido: {mode}")
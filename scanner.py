@@ -1,21 +1,32 @@
-import socket
 import subprocess
 import platform
 import threading
+import time
+import ipaddress
 from queue import Queue
+from metrics import REGISTRY
+import neighbors
+
+SCAN_SECONDS = REGISTRY.histogram('scanner_scan_duration_seconds',
+                                  'Duración de un escaneo completo de subred').labels()
+PROBE_SECONDS = REGISTRY.histogram('scanner_probe_seconds',
+                                   'Duración de cada sondeo ping').labels()
+HOSTS_PROBED = REGISTRY.counter('scanner_hosts_probed_total', 'Direcciones sondeadas').labels()
+HOSTS_FOUND = REGISTRY.counter('scanner_hosts_found_total', 'Hosts que respondieron').labels()
+SCAN_QUEUE_DEPTH = REGISTRY.gauge('scanner_queue_depth',
+                                  'Direcciones pendientes en la cola del escaneo').labels()
+_HOSTS_KNOWN = REGISTRY.counter('scanner_hosts_known_total',
+                                'Hosts vivos conocidos sin sondeo, por fuente')
+HOSTS_UNCONFIRMED = REGISTRY.counter('scanner_hosts_unconfirmed_total',
+                                     'Vecinos sin confirmar (STALE, gateway...) sondeados una vez').labels()
+
+# Hilos de ping para las direcciones que quedan sin resolver
+MAX_PROBE_WORKERS = 50
 
 def get_local_ip():
-    """Detecta la IP local de la máquina (que sale a internet)."""
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    try:
-        # No se conecta realmente, solo deduce la interfaz de salida
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-    except Exception:
-        local_ip = "127.0.0.1"
-    finally:
-        s.close()
-    return local_ip
+    """IP local de la interfaz de la ruta por defecto (o la primera activa)."""
+    networks = neighbors.local_networks()
+    return str(networks[0].address) if networks else "127.0.0.1"
 
 def get_subnet_base(ip):
     """Devuelve la base de la subred (ej. '192.168.1.'). Asume /24."""
@@ -49,55 +60,88 @@ def ping_host(ip):
     except Exception:
         return False
 
-def scan_network_subnet(callback_found=None, callback_finish=None):
+def scan_network_subnet(callback_found=None, callback_finish=None, probe=True,
+                        snmp_sessions=(), log_callback=None, enricher=None, callback_enriched=None):
     """
-    Escanea la subred local (254 hosts) usando hilos.
+    Descubre los hosts de las redes locales (todas las interfaces).
+    Primero toma lo que ya se sabe sin sondear (vecinos del kernel en
+    REACHABLE/PERMANENT y entradas fijas de la ipNetToMediaTable de
+    `snmp_sessions`); los vecinos sin confirmar (STALE, gateways, entradas
+    dinámicas de los agentes) reciben un ping cada uno y, si `probe`, se
+    hace ping también al resto de direcciones.
+    Con `enricher` (HostEnricher), cada host encontrado se enriquece en
+    segundo plano sin frenar el escaneo.
     callback_found(ip): Se llama cuando se encuentra un host.
     callback_finish(list_ips): Se llama al terminar.
+    callback_enriched(HostInfo): Se llama al resolver el nombre de un host.
     """
-    local_ip = get_local_ip()
-    base = get_subnet_base(local_ip)
-    
-    if not base or local_ip.startswith("127."):
+    scan_start = time.perf_counter()
+    networks = neighbors.local_networks()
+
+    if not networks:
         if callback_finish: callback_finish(["127.0.0.1"])
         return
 
     found_ips = []
-    
+    lock = threading.Lock()
+
+    def found(ip):
+        with lock:
+            found_ips.append(ip)
+        if callback_found: callback_found(ip)
+        if enricher: enricher.enrich([ip], callback_enriched)
+
+    # Etapa 1: hosts confirmados sin enviar nada a la red
+    alive, unconfirmed = neighbors.known_hosts(networks, snmp_sessions, log_callback)
+    for ip, neighbor in alive.items():
+        _HOSTS_KNOWN.labels(source=neighbor.source.split(':')[0]).inc()
+        HOSTS_FOUND.inc()
+        found(ip)
+
+    # Etapa 2: sondeo activo, primero de los vecinos sin confirmar y, si
+    # `probe`, del resto de direcciones (sin las propias IPs)
+    own = {str(net.address) for net in networks}
+    remaining = [ip for ip in unconfirmed if ip not in own]
+    HOSTS_UNCONFIRMED.inc(len(remaining))
+    if probe:
+        remaining.extend(ip for net in networks for ip in net.hosts()
+                         if ip not in alive and ip not in own)
+    remaining = list(dict.fromkeys(remaining))
+    if log_callback:
+        log_callback(f"🔎 {len(alive)} host(s) confirmados sin sondeo en {len(networks)} red(es); "
+                     f"por sondear: {len(remaining)} ({len(unconfirmed)} sin confirmar)")
+
     def worker(q):
         while True:
             ip = q.get()
             if ip is None: break
-            if ping_host(ip):
-                found_ips.append(ip)
-                if callback_found: callback_found(ip)
+            SCAN_QUEUE_DEPTH.set(q.qsize())
+            probe_start = time.perf_counter()
+            is_alive = ping_host(ip)
+            PROBE_SECONDS.observe(time.perf_counter() - probe_start)
+            HOSTS_PROBED.inc()
+            if is_alive:
+                HOSTS_FOUND.inc()
+                found(ip)
             q.task_done()
 
-    # Lanzar 50 hilos para que sea rápido
-    queue = Queue()
-    threads = []
-    for _ in range(50):
-        t = threading.Thread(target=worker, args=(queue,), daemon=True)
-        t.start()
-        threads.append(t)
+    if remaining:
+        queue = Queue()
+        workers = min(MAX_PROBE_WORKERS, len(remaining))
+        for _ in range(workers):
+            threading.Thread(target=worker, args=(queue,), daemon=True).start()
+        for ip in remaining:
+            queue.put(ip)
+        queue.join()
+        for _ in range(workers):
+            queue.put(None)
 
-    # Encolar IPs 1..254
-    for i in range(1, 255):
-        queue.put(f"{base}{i}")
+    found_ips.sort(key=ipaddress.IPv4Address)
 
-    # Esperar
-    queue.join()
-    
-    # Parar hilos
-    for _ in range(50):
-        queue.put(None)
-    
-    # Ordenar y añadir localhost al final si se desea
-    found_ips.sort(key=lambda ip: int(ip.split('.')[-1]))
-    
     # Asegurar que incluimos el localhost simulado
     if "127.0.0.1" not in found_ips:
         found_ips.insert(0, "127.0.0.1:16161")
-    
+
+    SCAN_SECONDS.observe(time.perf_counter() - scan_start)
     if callback_finish:
         callback_finish(found_ips)
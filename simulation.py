@@ -0,0 +1,219 @@
+"""
+Módulo de simulación determinista de alto volumen.
+Genera con NumPy, en un solo lote, N agentes × M intervalos de contadores
+monótonos y coherentes entre sí (octetos, paquetes, errores, RMON).
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+from records import SnmpSample, RmonSample
+
+DEVICE_TYPES = ["Router Cisco", "Switch HP", "Firewall Palo Alto",
+                "Access Point Ubiquiti", "Server Linux"]
+SPEEDS_MBPS = (100, 1000, 10000)
+
+
+class SimulationConfig:
+    """
+    Parámetros del modo simulado de NetworkLogic.
+
+    Args:
+        seed: Semilla para reproducir exactamente la misma secuencia
+        sleep_scale: Factor sobre las esperas "realistas" (0 = sin esperas)
+        summary_only: Registrar solo los resúmenes, no cada campo por agente
+        vectorized: Generar todos los agentes en un lote NumPy
+        failure_rate: Probabilidad de que un agente no responda en un ciclo
+                      (ejercita timeouts y circuitos; solo sin `vectorized`)
+    """
+
+    def __init__(self, seed=None, sleep_scale=1.0, summary_only=False, vectorized=False, failure_rate=0.0):
+        self.seed = seed
+        self.sleep_scale = sleep_scale
+        self.summary_only = summary_only
+        self.vectorized = vectorized
+        self.failure_rate = failure_rate
+
+
+class SimulationClock:
+    """
+    Reloj del modo simulado. Sin semilla sigue al reloj de pared; con
+    semilla arranca alineado a `interval` y solo avanza con tick(), un
+    intervalo por ciclo, para que la misma semilla produzca el mismo
+    historial sin depender de cuánto tarde cada ciclo.
+    """
+
+    def __init__(self, seeded=False, interval=30.0):
+        self.seeded = seeded
+        self.interval = interval
+        self._now = (time.time() // interval) * interval
+
+    def time(self):
+        """Segundos desde epoch, como time.time()."""
+        return self._now if self.seeded else time.time()
+
+    def tick(self):
+        """Avanza un intervalo (solo con semilla)."""
+        if self.seeded:
+            self._now += self.interval
+
+
+class SimulationBatch:
+    """
+    Resultado de FleetSimulator.step: arrays de forma (M, N).
+    Los contadores son acumulados; `utilization` y `error_rate` se
+    calculan sobre los deltas de cada intervalo.
+    """
+
+    def __init__(self, columns, timestamps):
+        self.columns = columns
+        self.timestamps = timestamps
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def shape(self):
+        return self.columns['in_octets'].shape
+
+
+class FleetSimulator:
+    """
+    Flota simulada de `num_agents` agentes con estado persistente:
+    cada llamada a step() continúa los contadores donde quedaron.
+    """
+
+    def __init__(self, num_agents, seed=None, interval=30.0):
+        self.num_agents = num_agents
+        self.interval = interval
+        self.rng = np.random.default_rng(seed)
+        rng, n = self.rng, num_agents
+
+        # Atributos estáticos por agente
+        self.device_type = rng.integers(0, len(DEVICE_TYPES), n)
+        self.speed_mbps = rng.choice(SPEEDS_MBPS, n)
+        self.uptime_s = rng.integers(1, 366, n).astype(np.int64) * 86400
+        self.base_util = rng.uniform(0.25, 0.85, n)
+        self.out_ratio = rng.uniform(0.5, 1.0, n)
+        self.pkt_size = rng.uniform(400, 1200, n)
+        self.err_prob = rng.uniform(0, 2e-5, n)
+        self.bcast_frac = rng.uniform(0.002, 0.02, n)
+        self.mcast_frac = rng.uniform(0.001, 0.01, n)
+
+        # Contadores acumulados (arrancan con valores de un equipo ya en marcha)
+        self.state = {
+            'in_octets': rng.integers(1_000_000_000, 5_000_000_000, n),
+            'out_octets': rng.integers(800_000_000, 4_000_000_000, n),
+            'in_packets': rng.integers(500_000, 2_000_000, n),
+            'out_packets': rng.integers(400_000, 1_800_000, n),
+            'in_errors': rng.integers(0, 100, n),
+            'out_errors': rng.integers(0, 80, n),
+            'drop_events': rng.integers(5, 50, n),
+            'broadcast': rng.integers(10_000, 50_000, n),
+            'multicast': rng.integers(5_000, 25_000, n),
+            'crc_errors': rng.integers(0, 100, n),
+            'collisions': rng.integers(0, 50, n),
+            'fragments': rng.integers(0, 25, n),
+        }
+        self.elapsed = 0.0
+
+    def step(self, intervals=1, start_time=0.0):
+        """
+        Avanza `intervals` intervalos y devuelve un SimulationBatch (M, N).
+        `start_time` es el epoch del primer intervalo generado.
+        """
+        rng, m, n = self.rng, intervals, self.num_agents
+        capacity = self.speed_mbps * 1e6 / 8 * self.interval  # octetos por intervalo
+
+        util = np.clip(self.base_util + rng.normal(0, 0.08, (m, n)), 0.01, 0.99)
+        d_in_oct = (util * capacity).astype(np.int64)
+        d_out_oct = (util * capacity * self.out_ratio).astype(np.int64)
+        d_in_pkt = (d_in_oct / self.pkt_size).astype(np.int64)
+        d_out_pkt = (d_out_oct / self.pkt_size).astype(np.int64)
+        d_in_err = rng.binomial(d_in_pkt, self.err_prob)
+        d_out_err = rng.binomial(d_out_pkt, self.err_prob)
+        d_pkts = d_in_pkt + d_out_pkt
+
+        deltas = {
+            'in_octets': d_in_oct,
+            'out_octets': d_out_oct,
+            'in_packets': d_in_pkt,
+            'out_packets': d_out_pkt,
+            'in_errors': d_in_err,
+            'out_errors': d_out_err,
+            'drop_events': rng.poisson(0.5, (m, n)),
+            'broadcast': (d_pkts * self.bcast_frac).astype(np.int64),
+            'multicast': (d_pkts * self.mcast_frac).astype(np.int64),
+            'crc_errors': rng.binomial(d_pkts, self.err_prob / 2),
+            'collisions': rng.poisson(0.2, (m, n)),
+            'fragments': rng.poisson(0.1, (m, n)),
+        }
+
+        columns = {}
+        for name, delta in deltas.items():
+            cumulative = self.state[name] + np.cumsum(delta, axis=0)
+            self.state[name] = cumulative[-1]
+            columns[name] = cumulative
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err_rate = np.where(d_pkts > 0, (d_in_err + d_out_err) / d_pkts * 100, 0.0)
+        # Totales de cada intervalo, para los buckets de historial RMON
+        columns['bucket_octets'] = d_in_oct + d_out_oct
+        columns['bucket_packets'] = d_pkts
+        for name in ('drop_events', 'broadcast', 'multicast', 'crc_errors', 'collisions'):
+            columns[f'bucket_{name}'] = deltas[name]
+        columns['utilization'] = util * 100
+        columns['error_rate'] = err_rate
+        columns['uptime_s'] = self.uptime_s + (self.elapsed + self.interval * np.arange(1, m + 1))[:, None].astype(np.int64)
+        self.elapsed += self.interval * m
+
+        timestamps = start_time + self.interval * np.arange(m)
+        return SimulationBatch(columns, timestamps)
+
+    def snmp_rows(self, batch, row, timestamp, thresholds, prefix="Agent"):
+        """Convierte una fila del lote en la lista de SnmpSample de last_snmp_data."""
+        c = batch.columns
+        util = c['utilization'][row]
+        err = c['error_rate'][row]
+        optimal = (util < thresholds['utilization']) & (err < thresholds['error_rate'])
+        in_oct, out_oct = c['in_octets'][row], c['out_octets'][row]
+        total_gb = (in_oct + out_oct) / 1e9
+        columns = (in_oct.tolist(), out_oct.tolist(),
+                   c['in_packets'][row].tolist(), c['out_packets'][row].tolist(),
+                   c['in_errors'][row].tolist(), c['out_errors'][row].tolist(),
+                   np.round(total_gb, 2).tolist(), np.round(util, 2).tolist(),
+                   np.round(err, 4).tolist(), optimal.tolist(),
+                   (c['uptime_s'][row] // 86400).tolist(),
+                   self.speed_mbps.tolist(), self.device_type.tolist())
+        return [SnmpSample(f"{prefix}-{i}", DEVICE_TYPES[dt], f"DEVICE-{i:02d}.local", up, sp,
+                           io, oo, ip, op, ie, oe, gb, u, e, "ÓPTIMO" if ok else "ALERTA", timestamp)
+                for i, (io, oo, ip, op, ie, oe, gb, u, e, ok, up, sp, dt) in enumerate(zip(*columns), 1)]
+
+    def history_bucket(self, batch, row):
+        """
+        Bucket de etherHistory de toda la flota para una fila del lote, en el
+        formato de EtherHistoryCollector: sumas de la flota y utilización
+        media, sin recorrer los agentes uno a uno.
+        """
+        c = batch.columns
+        steps = round(self.elapsed / self.interval)
+        sample = {
+            'sample_index': steps - len(batch.timestamps) + row + 1,
+            'timestamp': datetime.fromtimestamp(float(batch.timestamps[row])).replace(microsecond=0),
+            'utilization': round(float(c['utilization'][row].mean()), 2),
+        }
+        for name in ('octets', 'packets', 'drop_events', 'broadcast', 'multicast', 'crc_errors', 'collisions'):
+            sample[name] = int(c[f'bucket_{name}'][row].sum())
+        return sample
+
+    def rmon_rows(self, batch, row, prefix="Agent"):
+        """Convierte una fila del lote en la lista de RmonSample de last_rmon_data['agents']."""
+        c = batch.columns
+        columns = ((c['in_octets'][row] + c['out_octets'][row]).tolist(),
+                   (c['in_packets'][row] + c['out_packets'][row]).tolist(),
+                   c['drop_events'][row].tolist(), c['broadcast'][row].tolist(),
+                   c['multicast'][row].tolist(), c['crc_errors'][row].tolist(),
+                   c['collisions'][row].tolist(), c['fragments'][row].tolist())
+        return [RmonSample(f"{prefix}-{i}", drops, octs, pkts, bc, mc, crc, coll, frag)
+                for i, (octs, pkts, drops, bc, mc, crc, coll, frag) in enumerate(zip(*columns), 1)]
@@ -0,0 +1,88 @@
+"""
+Publicación de snapshots inmutables y versionados.
+El productor construye cada resultado en privado y lo publica con un único
+intercambio de referencia; los lectores toman `current` sin bloqueos ni
+copias y siempre ven un snapshot completo. Quien necesite el siguiente
+puede esperarlo con wait_for_next() o registrar un oyente con
+add_listener() para enterarse sin dedicarle un hilo.
+"""
+import threading
+import time
+
+
+class Snapshot:
+    """
+    Resultado publicado. No debe modificarse tras publicarse: ni `data`
+    ni las filas que contiene.
+    """
+    __slots__ = ('kind', 'version', 'data', 'published_at')
+
+    def __init__(self, kind, version, data):
+        self.kind = kind
+        self.version = version
+        self.data = data
+        self.published_at = time.time()
+
+    def __repr__(self):
+        return f"Snapshot({self.kind}, v{self.version})"
+
+
+class SnapshotPublisher:
+    """
+    Última versión de un conjunto de datos. Las listas se publican como
+    tuplas para que nadie las amplíe por error.
+    """
+
+    def __init__(self, kind, empty=()):
+        self.kind = kind
+        self._current = Snapshot(kind, 0, empty)
+        self._previous = self._current
+        self._changed = threading.Condition()
+        self._listeners = []
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def previous(self):
+        """Snapshot inmediatamente anterior al actual."""
+        return self._previous
+
+    def publish(self, data):
+        """Publica `data` como nueva versión y despierta a quien la espere."""
+        if isinstance(data, list):
+            data = tuple(data)
+        with self._changed:
+            snapshot = Snapshot(self.kind, self._current.version + 1, data)
+            self._previous = self._current
+            self._current = snapshot
+            self._changed.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(snapshot)
+        return snapshot
+
+    def add_listener(self, callback):
+        """
+        Llama a `callback(snapshot)` tras cada publicación, desde el hilo
+        del productor: debe ser rápido y no bloquear.
+        """
+        with self._changed:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._changed:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def wait_for_next(self, version, timeout=None):
+        """
+        Espera a que se publique una versión posterior a `version`.
+        Devuelve el snapshot actual (el mismo si venció el timeout).
+        """
+        if self._current.version > version:
+            return self._current
+        with self._changed:
+            self._changed.wait_for(lambda: self._current.version > version, timeout)
+            return self._current
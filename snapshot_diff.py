@@ -0,0 +1,281 @@
+"""
+Motor de diferencias entre snapshots de agentes.
+Une dos snapshots por la clave del agente con un índice hash, calcula los
+deltas por campo y las transiciones de estado, y ordena los mayores
+cambios. Las exportaciones CSV grandes se comparan en streaming: del
+fichero antiguo solo se indexa clave -> posición en disco.
+"""
+import csv
+import heapq
+import json
+import os
+from datetime import datetime
+
+STATUS_FIELD = 'Status'
+
+
+def _number(value):
+    """Convierte a número si se puede (los CSV traen texto)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+class AgentChange:
+    """Cambios de un agente entre dos snapshots."""
+    __slots__ = ('key', 'deltas', 'changed', 'transition')
+
+    def __init__(self, key, deltas, changed, transition):
+        self.key = key
+        self.deltas = deltas          # campo -> (anterior, nuevo, delta)
+        self.changed = changed        # campos no numéricos: campo -> (anterior, nuevo)
+        self.transition = transition  # (estado anterior, estado nuevo) o None
+
+    def to_row(self, key_field='Agent'):
+        row = {key_field: self.key}
+        if self.transition:
+            row['Status_Change'] = f"{self.transition[0]} -> {self.transition[1]}"
+        for field, (old, new, delta) in self.deltas.items():
+            if delta:
+                row[f"{field}_delta"] = round(delta, 4) if isinstance(delta, float) else delta
+        for field, (old, new) in self.changed.items():
+            row[f"{field}_change"] = f"{old} -> {new}"
+        return row
+
+
+class SnapshotDiff:
+    """
+    Resultado de una comparación. Mantiene solo lo necesario para el
+    informe: los `top` mayores cambios por campo y las transiciones.
+    """
+
+    def __init__(self, key='Agent', top=10):
+        self.key = key
+        self.top = top
+        self.added = []
+        self.removed = []
+        self.transitions = []   # (clave, anterior, nuevo)
+        self.compared = 0
+        self.changed = 0
+        self._top_by_field = {}  # campo -> heap de (|delta|, clave, anterior, nuevo, delta)
+
+    def _add(self, change):
+        self.compared += 1
+        if change.transition:
+            self.transitions.append((change.key, *change.transition))
+        any_change = bool(change.transition or change.changed)
+        for field, (old, new, delta) in change.deltas.items():
+            if not delta:
+                continue
+            any_change = True
+            heap = self._top_by_field.setdefault(field, [])
+            item = (abs(delta), change.key, old, new, delta)
+            if len(heap) < self.top:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+        self.changed += any_change
+
+    def biggest(self, field):
+        """Mayores cambios absolutos de un campo: [(clave, anterior, nuevo, delta)]."""
+        heap = self._top_by_field.get(field, [])
+        return [(k, old, new, d) for _, k, old, new, d in sorted(heap, reverse=True)]
+
+    def fields(self):
+        return list(self._top_by_field)
+
+    def report(self):
+        """Resumen legible del diff."""
+        lines = [f"Agentes comparados: {self.compared:,}  con cambios: {self.changed:,}",
+                 f"Nuevos: {len(self.added):,}  desaparecidos: {len(self.removed):,}"]
+        if self.added:
+            lines.append("  + " + ", ".join(map(str, self.added[:self.top])))
+        if self.removed:
+            lines.append("  - " + ", ".join(map(str, self.removed[:self.top])))
+        if self.transitions:
+            lines.append(f"\nTransiciones de estado ({len(self.transitions)}):")
+            for key, old, new in self.transitions[:self.top]:
+                icon = "⚠️" if new == "ALERTA" else "✅"
+                lines.append(f"  {icon} {key}: {old} -> {new}")
+        for field in self.fields():
+            lines.append(f"\nMayores cambios en {field}:")
+            for key, old, new, delta in self.biggest(field):
+                sign = "+" if delta > 0 else ""
+                fmt = "{:,.4f}" if isinstance(delta, float) else "{:,}"
+                lines.append(f"  {key}: {fmt.format(old)} -> {fmt.format(new)} "
+                             f"({sign}{fmt.format(delta)})")
+        return "\n".join(lines)
+
+
+def compare_rows(key, old, new, fields=None):
+    """AgentChange entre dos filas del mismo agente."""
+    deltas, changed = {}, {}
+    for field in (fields or new.keys()):
+        if field == key or field == 'timestamp' or field not in old:
+            continue
+        a, b = old.get(field), new.get(field)
+        na, nb = _number(a), _number(b)
+        if na is not None and nb is not None:
+            deltas[field] = (na, nb, nb - na)
+        elif a != b and field != STATUS_FIELD:
+            changed[field] = (a, b)
+    transition = None
+    if old.get(STATUS_FIELD) != new.get(STATUS_FIELD):
+        transition = (old.get(STATUS_FIELD), new.get(STATUS_FIELD))
+    return AgentChange(new[key], deltas, changed, transition)
+
+
+def diff_snapshots(old_rows, new_rows, key='Agent', fields=None, top=10, on_change=None):
+    """
+    Compara dos listas de filas uniéndolas por `key` con un índice hash.
+    `on_change(AgentChange)` se llama por cada agente presente en ambas.
+    """
+    result = SnapshotDiff(key, top)
+    index = {row[key]: row for row in old_rows}
+    seen = set()
+    for row in new_rows:
+        k = row[key]
+        seen.add(k)
+        previous = index.get(k)
+        if previous is None:
+            result.added.append(k)
+            continue
+        change = compare_rows(key, previous, row, fields)
+        result._add(change)
+        if on_change:
+            on_change(change)
+    result.removed = [k for k in index if k not in seen]
+    return result
+
+
+# --- Ficheros ---
+class _CsvIndex:
+    """Índice clave -> desplazamiento de la línea en un CSV (modo binario)."""
+
+    def __init__(self, path, key, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self._file = open(path, 'rb')
+        header = self._file.readline().decode(encoding).lstrip('﻿')
+        self.fieldnames = next(csv.reader([header]))
+        if key not in self.fieldnames:
+            self._file.close()
+            raise ValueError(f"{path}: no tiene la columna '{key}'")
+        key_pos = self.fieldnames.index(key)
+        self.offsets = {}
+        while True:
+            offset = self._file.tell()
+            line = self._file.readline()
+            if not line:
+                break
+            if line.strip():
+                values = next(csv.reader([line.decode(encoding)]))
+                self.offsets[values[key_pos]] = offset
+
+    def row(self, key):
+        offset = self.offsets.get(key)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        values = next(csv.reader([self._file.readline().decode(self.encoding)]))
+        return dict(zip(self.fieldnames, values))
+
+    def close(self):
+        self._file.close()
+
+
+def _iter_rows(path, encoding='utf-8'):
+    """Filas de una exportación: CSV en streaming o JSON (lista 'agents')."""
+    if path.lower().endswith('.json'):
+        with open(path, encoding=encoding) as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            yield from data
+        else:
+            # snmp_export_*.json guarda 'agents'; rmon_export_*.json, 'data' -> 'agents'
+            yield from data.get('agents') or data.get('data', {}).get('agents', [])
+        return
+    with open(path, newline='', encoding=encoding) as f:
+        yield from csv.DictReader(f)
+
+
+def _fieldnames(path, encoding='utf-8'):
+    """Columnas de una exportación: cabecera del CSV o unión de las claves del JSON."""
+    if path.lower().endswith('.json'):
+        fields = {}
+        for row in _iter_rows(path, encoding):
+            fields.update(dict.fromkeys(row))
+        return list(fields)
+    with open(path, newline='', encoding=encoding) as f:
+        return next(csv.reader(f), [])
+
+
+def _row_key(row, key, path):
+    """Clave de una fila como texto (igual en CSV y JSON), con error claro si falta."""
+    try:
+        return str(row[key])
+    except KeyError:
+        raise ValueError(f"{path}: no tiene la columna '{key}'") from None
+
+
+def diff_files(old_path, new_path, key='Agent', top=10, output=None):
+    """
+    Compara dos exportaciones. Si el antiguo es CSV solo se guarda su índice
+    clave -> posición; el nuevo se recorre fila a fila. Con `output` se
+    escriben en CSV, en streaming, las filas de cambios de cada agente.
+    Devuelve (SnapshotDiff, ruta del CSV de salida o None).
+    """
+    if old_path.lower().endswith('.json'):
+        old_index = {_row_key(row, key, old_path): row for row in _iter_rows(old_path)}
+        lookup, close, old_keys = old_index.get, (lambda: None), old_index.keys
+    else:
+        csv_index = _CsvIndex(old_path, key)
+        lookup, close, old_keys = csv_index.row, csv_index.close, csv_index.offsets.keys
+
+    result = SnapshotDiff(key, top)
+    writer = None
+    out_file = None
+    seen = set()
+    try:
+        for row in _iter_rows(new_path):
+            k = _row_key(row, key, new_path)
+            seen.add(k)
+            previous = lookup(k)
+            if previous is None:
+                result.added.append(k)
+                continue
+            change = compare_rows(key, previous, row)
+            result._add(change)
+            if output and (change.transition or change.changed or
+                           any(d for _, _, d in change.deltas.values())):
+                if writer is None:
+                    out_file = open(output, 'w', newline='', encoding='utf-8')
+                    # Cabecera con las columnas de ambos ficheros: cualquier fila
+                    # posterior puede traer cambios en campos que esta no tiene
+                    compared = [f for f in dict.fromkeys(_fieldnames(old_path) + _fieldnames(new_path))
+                                if f not in (key, 'timestamp', STATUS_FIELD)]
+                    fields = [key, 'Status_Change'] + [f"{f}_delta" for f in compared] + \
+                        [f"{f}_change" for f in compared]
+                    writer = csv.DictWriter(out_file, fieldnames=fields, extrasaction='ignore')
+                    writer.writeheader()
+                writer.writerow(change.to_row(key))
+        result.removed = [k for k in old_keys() if k not in seen]
+    finally:
+        close()
+        if out_file:
+            out_file.close()
+    return result, (output if writer is not None else None)
+
+
+def default_output(export_dir="exports"):
+    if not os.path.exists(export_dir):
+        os.makedirs(export_dir)
+    return os.path.join(export_dir, f"diff_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
@@ -1,10 +1,59 @@
+import asyncio
 import time
 import subprocess
 import platform
 import re
 import random
-from threading import Thread
 from datetime import datetime
+from agent_health import AgentHealthRegistry
+from rmon_hosts import make_host_tracker
+from rmon_history import RmonHistoryStore, EtherHistoryCollector, SimulatedRmonAgent
+from metrics import REGISTRY
+from profiling import ProfilerController
+from simulation import SimulationConfig, SimulationClock, FleetSimulator
+from task_runner import TaskExecutor, TaskCancelled
+from rmon_hosts import counter_delta
+from oid_table import get_table
+from snmp_transport import SnmpTransport
+from history_store import HistoryStore, SNMP_SCHEMA, IF_SCHEMA
+from snapshot_diff import diff_snapshots
+from snapshot import SnapshotPublisher
+from host_enrichment import HostEnricher
+from anomaly import AnomalyDetector
+from records import SnmpSample, RmonSample, InterfaceSample, SampleBatch
+from capture import CaptureWriter, ReplayDriver
+from event_log import EventLog
+from table_walk import TableWalker, OPER_STATUS
+
+# Métricas del colector (hijos pre-resueltos para no pagar la búsqueda por evento)
+_POLL_DURATION = REGISTRY.histogram('monitor_poll_duration_seconds',
+                                    'Duración de cada operación de monitoreo')
+SNMP_POLL_SECONDS = _POLL_DURATION.labels(op='snmp')
+RMON_POLL_SECONDS = _POLL_DURATION.labels(op='rmon')
+PING_SECONDS = _POLL_DURATION.labels(op='ping')
+AGENT_QUERY_SECONDS = REGISTRY.histogram('monitor_agent_query_seconds',
+                                         'Latencia de consulta por agente').labels()
+AGENTS_POLLED = REGISTRY.counter('monitor_agents_polled_total',
+                                 'Agentes consultados con éxito').labels()
+TIMEOUTS = REGISTRY.counter('monitor_timeouts_total',
+                            'Consultas sin respuesta o abortadas por timeout').labels()
+CIRCUIT_SKIPS = REGISTRY.counter('monitor_circuit_open_skips_total',
+                                 'Consultas omitidas por circuito abierto').labels()
+OPS_IN_FLIGHT = REGISTRY.gauge('monitor_operations_in_flight',
+                               'Operaciones de monitoreo en curso').labels()
+
+# Tamaño máximo del segmento simulado en la hostTable
+MAX_MOCK_HOSTS = 20000
+# MACs a partir de las cuales el Top-N de hosts pasa a memoria acotada
+MAX_EXACT_HOSTS = 100000
+
+# Segundos que espera ping entre ecos (valor por defecto en Linux y Windows)
+PING_INTERVAL = 1.0
+
+# Objetos leídos en cada sondeo real (interfaz 1)
+POLL_OBJECTS = (('sysName', 0), ('sysUpTime', 0), ('ifSpeed', 1),
+                ('ifInOctets', 1), ('ifOutOctets', 1), ('ifInUcastPkts', 1),
+                ('ifOutUcastPkts', 1), ('ifInErrors', 1), ('ifOutErrors', 1))
 
 class NetworkLogic:
     """
@@ -13,11 +62,22 @@ class NetworkLogic:
     """
     def __init__(self, log_callback):
         self.log_callback = log_callback
-        self.last_snmp_data = []  # Almacenar últimos datos SNMP
-        self.last_rmon_data = {}  # Almacenar últimos datos RMON
-        self.snmp_history = []    # Historial de mediciones SNMP
+        # Últimos resultados publicados como snapshots inmutables y versionados:
+        # cada sondeo se construye en privado y se publica al terminar
+        self._publishers = {
+            'snmp': SnapshotPublisher('snmp', ()),
+            'rmon': SnapshotPublisher('rmon', {}),
+            'hosts': SnapshotPublisher('hosts', ()),  # Último resultado del escaneo de red
+            'interfaces': SnapshotPublisher('interfaces', ()),  # Filas por interfaz (GETBULK)
+        }
+        self.snmp_history = HistoryStore(SNMP_SCHEMA)  # Historial SNMP comprimido por agente
+        self.interface_history = HistoryStore(IF_SCHEMA)  # Historial por 'agente/ifIndex'
         self.rmon_history = []    # Historial de mediciones RMON
         
+        # Anomalías por agente (líneas base EWMA), complemento de los umbrales fijos
+        self.anomaly_detector = AnomalyDetector()
+        self.interface_anomaly_detector = AnomalyDetector(key='Interface')  # Una serie por interfaz
+
         # Umbrales de alarma configurables
         self.alarm_thresholds = {
             'utilization': 80.0,
@@ -26,92 +86,360 @@ class NetworkLogic:
             'collisions': 100
         }
 
+        # Salud por agente: RTT, timeouts adaptativos y circuit breakers
+        self.agent_health = AgentHealthRegistry()
+
+        # Top-N de hosts RMON; 'sketch' para segmentos muy grandes
+        self.host_tracker = make_host_tracker(n=5, mode='exact', max_hosts=MAX_EXACT_HOSTS)
+        self._mock_host_counters = {}
+
+        # Historial RMON (etherHistoryTable) leído de forma incremental: de los
+        # agentes reales en los recorridos con --rmon y de los simulados, con
+        # el reloj del simulador
+        self.sim_clock = SimulationClock()
+        self.rmon_history_store = RmonHistoryStore()
+        self.history_collector = EtherHistoryCollector(self.rmon_history_store)
+        self._mock_history_collector = EtherHistoryCollector(self.rmon_history_store,
+                                                             clock=self.sim_clock.time)
+        self._mock_rmon_sessions = {}
+
+        # Perfilado bajo demanda (CPU y memoria)
+        self.profiler = ProfilerController(self.log_threadsafe)
+
+        # Parámetros del modo simulado (semilla, esperas, nivel de log)
+        # SNMP y RMON usan flujos aleatorios y flotas propios: un sondeo de uno
+        # no altera la secuencia del otro
+        self.simulation = SimulationConfig()
+        self._rng = random.Random()
+        self._rmon_rng = random.Random()
+        self._fleets = {}  # 'snmp' | 'rmon' -> FleetSimulator
+
+        # Pool compartido: como mucho un sondeo SNMP y uno RMON a la vez
+        self.executor = TaskExecutor(max_workers=8, limits={'snmp': 1, 'rmon': 1, 'ping': 4})
+
+        # Transporte UDP compartido para los sondeos reales (se arranca al usarlo)
+        self.transport = SnmpTransport()
+        self._poll_previous = {}  # agente -> lectura anterior para calcular tasas
+
+        # Nombres PTR y sysName/sysDescr en caché, compartida por escáner y sondeo
+        self.enricher = HostEnricher(self.transport)
+
+        # Recorrido de ifTable/ifXTable/etherStats con GETBULK (max-repetitions por agente)
+        self.table_walker = TableWalker(self.transport, log_callback=self.log_threadsafe)
+        self._if_previous = {}  # 'agente/ifIndex' -> (instante, contadores) para las tasas
+
+        # Grabación opcional del tráfico de sondeo (CaptureWriter)
+        self.recorder = None
+
+        # Registro de eventos estructurado opcional (EventLog)
+        self.event_log = None
+
     def is_snmp_available(self):
         return True  # Siempre disponible en modo simulado
 
     def run_snmp_test(self, ip, community, num_agents=1):
-        """Lanza el test SNMP simulado en un hilo aparte."""
-        t = Thread(target=self._execute_snmp_mock, args=(ip, community, num_agents), daemon=True)
-        t.start()
+        """Lanza el test SNMP simulado en segundo plano. Retorna un TaskHandle."""
+        return self.executor.submit('snmp', self.profiler.wrap(self._execute_snmp_mock),
+                                    ip, community, num_agents)
 
     def run_ping_test(self, ip):
-        """Lanza el test Ping en un hilo aparte."""
-        t = Thread(target=self._execute_ping_test, args=(ip,), daemon=True)
-        t.start()
+        """Lanza el test Ping en segundo plano. Retorna un TaskHandle."""
+        return self.executor.submit('ping', self.profiler.wrap(self._execute_ping_test), ip)
 
     def run_rmon_test(self, ip, num_agents=1):
-        """Lanza el test RMON simulado en un hilo aparte."""
-        t = Thread(target=self._execute_rmon_mock, args=(ip, num_agents), daemon=True)
-        t.start()
+        """Lanza el test RMON simulado en segundo plano. Retorna un TaskHandle."""
+        return self.executor.submit('rmon', self.profiler.wrap(self._execute_rmon_mock),
+                                    ip, num_agents)
+
+    def run_snmp_poll(self, targets, community, merge=False):
+        """
+        Sondeo SNMP real de `targets` ('host' o 'host:puerto') por el
+        transporte multiplexado. Con `merge`, las filas sustituyen solo las de
+        esos agentes en el snapshot publicado. Retorna un TaskHandle.
+        """
+        return self.executor.submit('snmp', self.profiler.wrap(self._execute_snmp_poll),
+                                    list(targets), community, merge)
+
+    def run_interface_poll(self, targets, community, rmon=False):
+        """
+        Sondeo por interfaz de `targets` recorriendo ifTable/ifXTable (y
+        etherStatsTable si `rmon`) con GETBULK. Retorna un TaskHandle cuyo
+        resultado son las filas InterfaceSample publicadas.
+        """
+        return self.executor.submit('snmp', self.profiler.wrap(self._execute_interface_poll),
+                                    targets, community, rmon)
+
+    def run_replay(self, path, speed=1.0):
+        """
+        Reproduce una captura por la misma cadena que un sondeo en vivo
+        (1 = ritmo original, N = N veces más rápido, 0 = sin esperas).
+        Retorna un TaskHandle cuyo resultado es un ReplayStats.
+        """
+        driver = ReplayDriver(self, path, speed, self.log_threadsafe)
+        return self.executor.submit('snmp', self.profiler.wrap(driver.run))
+
+    # --- Grabación del tráfico ---
+    def start_recording(self, path):
+        """Empieza a grabar cada sondeo (real o simulado) en `path`."""
+        self.stop_recording()
+        self.recorder = CaptureWriter(path)
+        self.log_threadsafe(f"⏺️ Grabando sondeos en {path}")
+
+    def stop_recording(self):
+        """Cierra la captura en curso. Retorna las tramas grabadas."""
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return 0
+        recorder.close()
+        self.log_threadsafe(f"⏹️ Captura cerrada: {recorder.frames} sondeo(s) en {recorder.path}")
+        return recorder.frames
+
+    # --- Registro de eventos ---
+    def start_event_log(self, directory='logs', **options):
+        """Guarda en `directory` (JSON Lines) los logs y los eventos por agente."""
+        self.stop_event_log()
+        self.event_log = EventLog(directory, log_callback=self.log_callback, **options).start()
+        self.log_threadsafe(f"🗒️ Registro de eventos en {self.event_log.path}")
+
+    def stop_event_log(self):
+        """Escribe lo pendiente y cierra el registro de eventos."""
+        event_log, self.event_log = self.event_log, None
+        if event_log is not None:
+            event_log.close()
+
+    def event(self, level, msg, **fields):
+        """Evento estructurado (agent, metric, value, duration...) sin pasar por el log de texto."""
+        if self.event_log is not None:
+            self.event_log.emit(level, msg, **fields)
+
+    def _sample_events(self, rows, key='Agent'):
+        """Eventos de las filas en alerta o con anomalías de un sondeo."""
+        if self.event_log is None:
+            return
+        thresholds = self.alarm_thresholds
+        for row in rows:
+            agent = row[key]
+            if row['Status'] == "ALERTA":
+                util, err = row['Utilization_%'], row['Error_Rate_%']
+                metric, value = ('Utilization_%', util) if util >= thresholds['utilization'] \
+                    else ('Error_Rate_%', err)
+                self.event_log.emit('warning', f"{agent} en ALERTA: {metric} = {value}",
+                                    agent=agent, metric=metric, value=value)
+            if row.get('Anomaly'):
+                self.event_log.emit('info', f"{agent}: anomalía {row['Anomaly']}", agent=agent,
+                                    metric='Anomaly', value=row.get('Anomaly_Score'))
+
+    # --- Snapshots publicados ---
+    @property
+    def last_snmp_data(self):
+        """Filas del último sondeo SNMP (tupla inmutable)."""
+        return self._publishers['snmp'].current.data
+
+    @property
+    def previous_snmp_data(self):
+        """Filas del sondeo SNMP anterior (para diffs)."""
+        return self._publishers['snmp'].previous.data
+
+    @property
+    def last_interface_data(self):
+        """Filas por interfaz del último recorrido de tablas (tupla inmutable)."""
+        return self._publishers['interfaces'].current.data
+
+    @property
+    def last_rmon_data(self):
+        return self._publishers['rmon'].current.data
+
+    @property
+    def discovered_hosts(self):
+        return self._publishers['hosts'].current.data
+
+    def snapshot(self, kind):
+        """
+        Snapshot actual de 'snmp', 'rmon', 'hosts' o 'interfaces'. Versión y datos van
+        juntos: quien necesite ambos debe tomarlos de aquí una sola vez.
+        """
+        return self._publishers[kind].current
+
+    def wait_for_snapshot(self, kind, version, timeout=None):
+        """Espera a que se publique una versión posterior a `version`."""
+        return self._publishers[kind].wait_for_next(version, timeout)
+
+    def subscribe_snapshots(self, kind, callback):
+        """Registra `callback(snapshot)` para cada publicación de `kind`."""
+        self._publishers[kind].add_listener(callback)
+
+    def unsubscribe_snapshots(self, kind, callback):
+        self._publishers[kind].remove_listener(callback)
+
+    def data_version(self, kind):
+        return self._publishers[kind].current.version
+
+    def data_versions(self):
+        return {kind: pub.current.version for kind, pub in self._publishers.items()}
+
+    def set_discovered_hosts(self, hosts):
+        """Registra el resultado del último escaneo de red."""
+        self._publishers['hosts'].publish(list(hosts))
+
+    def diff_last_polls(self, top=10):
+        """Diferencias entre los dos últimos sondeos SNMP (None si falta alguno)."""
+        publisher = self._publishers['snmp']
+        current, previous = publisher.current, publisher.previous
+        if not previous.data or not current.data or previous is current:
+            return None
+        return diff_snapshots(previous.data, current.data, top=top)
+
+    def cancel_all(self):
+        """Solicita la cancelación de todas las operaciones en curso."""
+        self.executor.cancel_all()
+
+    def shutdown(self):
+        """Cancela lo pendiente y libera el pool de hilos."""
+        self.executor.shutdown(wait=False)
+        self.stop_recording()
+        self.stop_event_log()
+        self.enricher.shutdown()
+        self.transport.stop()
 
     def update_alarm_thresholds(self, thresholds):
         """Actualiza los umbrales de alarma."""
         self.alarm_thresholds.update(thresholds)
 
+    def configure_simulation(self, seed=None, sleep_scale=1.0, summary_only=False, vectorized=False,
+                             failure_rate=0.0):
+        """
+        Configura el modo simulado y reinicia su estado.
+        Con la misma semilla, la secuencia de mediciones es reproducible.
+        """
+        self.simulation = SimulationConfig(seed, sleep_scale, summary_only, vectorized, failure_rate)
+        self._rng = random.Random(seed)
+        self._rmon_rng = random.Random(None if seed is None else f"{seed}/rmon")
+        self._fleets = {}
+        self.sim_clock = SimulationClock(seeded=seed is not None)
+        self.rmon_history_store = RmonHistoryStore()
+        self.history_collector = EtherHistoryCollector(self.rmon_history_store)
+        self._mock_history_collector = EtherHistoryCollector(self.rmon_history_store,
+                                                             clock=self.sim_clock.time)
+        self._mock_host_counters = {}
+        self.host_tracker = make_host_tracker(n=5, mode='exact', max_hosts=MAX_EXACT_HOSTS)
+        self._mock_rmon_sessions = {}
+        self.anomaly_detector.reset()
+        self.interface_anomaly_detector.reset()
+
+    def _sim_sleep(self, seconds):
+        """Espera "realista" del simulador, escalada (0 = sin esperas)."""
+        if self.simulation.sleep_scale > 0:
+            time.sleep(seconds * self.simulation.sleep_scale)
+
+    def _log_detail(self, msg):
+        """Log de detalle por agente/campo; se omite en modo solo-resumen."""
+        if not self.simulation.summary_only:
+            self.log_threadsafe(msg)
+
+    def _get_fleet(self, kind, num_agents):
+        """Flota vectorizada persistente ('snmp' o 'rmon') para que los contadores sean monótonos."""
+        fleet = self._fleets.get(kind)
+        if fleet is None or fleet.num_agents != num_agents:
+            rng = self._rmon_rng if kind == 'rmon' else self._rng
+            fleet = self._fleets[kind] = FleetSimulator(num_agents, seed=rng.getrandbits(64))
+        return fleet
+
     # --- IMPLEMENTACIÓN SNMP SIMULADO ---
-    def _execute_snmp_mock(self, ip_str, community, num_agents=1):
+    def _execute_snmp_mock(self, ip_str, community, num_agents=1, task=None):
         """Simula consulta SNMP con datos mock para demostración académica."""
+        OPS_IN_FLIGHT.inc()
+        poll_start = time.perf_counter()
         try:
             self.log_threadsafe(f"Iniciando Monitoreo SNMP a {ip_str}...")
             self.log_threadsafe(f"NOTA: Datos simulados para {num_agents} agente(s)")
             self.log_threadsafe("=" * 50)
-            time.sleep(0.5)
+            self._sim_sleep(0.5)
 
-            # Limpiar y preparar datos
-            self.last_snmp_data = []
+            # Las filas se construyen en privado y se publican al terminar
+            rows = []
             timestamp = datetime.now()
 
             # Generar datos para cada agente
-            for agent_num in range(1, num_agents + 1):
-                self.log_threadsafe(f"\n🖥️  AGENTE #{agent_num} - Dispositivo-{agent_num:02d}")
-                self.log_threadsafe("-" * 40)
+            if self.simulation.vectorized:
+                fleet = self._get_fleet('snmp', num_agents)
+                batch = fleet.step(1, timestamp.timestamp())
+                rows = fleet.snmp_rows(batch, 0, timestamp.isoformat(),
+                                       self.alarm_thresholds)
+                AGENTS_POLLED.inc(num_agents)
+                agent_range = ()
+            else:
+                agent_range = range(1, num_agents + 1)
+
+            for agent_num in agent_range:
+                if task:
+                    task.check_cancelled()
+                    task.report_progress(agent_num - 1, num_agents)
+                agent_key = f"{ip_str}/Agent-{agent_num}"
+                if not self.agent_health.allow_request(agent_key):
+                    wait = self.agent_health.seconds_until_probe(agent_key)
+                    self.log_threadsafe(f"\n⛔ AGENTE #{agent_num}: circuito abierto, "
+                                        f"próximo sondeo en {wait:.0f}s")
+                    CIRCUIT_SKIPS.inc()
+                    continue
+                query_start = time.monotonic()
+                if self.simulation.failure_rate and self._rng.random() < self.simulation.failure_rate:
+                    # Agente que no responde: agota su timeout y cuenta para el circuito
+                    self._sim_sleep(self.agent_health.timeout_for(agent_key))
+                    self.agent_health.record_failure(agent_key)
+                    TIMEOUTS.inc()
+                    self.log_threadsafe(f"\n⚠️ AGENTE #{agent_num}: sin respuesta (simulado)")
+                    self.event('warning', "Sin respuesta (simulado)", agent=agent_key, metric='timeout')
+                    continue
+
+                self._log_detail(f"\n🖥️  AGENTE #{agent_num} - Dispositivo-{agent_num:02d}")
+                self._log_detail("-" * 40)
                 
                 # Información del sistema
                 device_types = ["Router Cisco", "Switch HP", "Firewall Palo Alto", 
                                "Access Point Ubiquiti", "Server Linux"]
-                device_type = random.choice(device_types)
-                uptime_days = random.randint(1, 365)
+                device_type = self._rng.choice(device_types)
+                uptime_days = self._rng.randint(1, 365)
                 
-                self.log_threadsafe(f"  Tipo: {device_type}")
-                self.log_threadsafe(f"  Nombre: DEVICE-{agent_num:02d}.local")
-                self.log_threadsafe(f"  Uptime: {uptime_days} días")
+                self._log_detail(f"  Tipo: {device_type}")
+                self._log_detail(f"  Nombre: DEVICE-{agent_num:02d}.local")
+                self._log_detail(f"  Uptime: {uptime_days} días")
                 
                 # Estadísticas de interfaz
-                time.sleep(0.3)
-                self.log_threadsafe("\n  📊 Estadísticas de Interfaz:")
+                self._sim_sleep(0.3)
+                self._log_detail("\n  📊 Estadísticas de Interfaz:")
                 
-                speed_mbps = random.choice([100, 1000, 10000])
-                in_octets = random.randint(1000000000, 5000000000)
-                out_octets = random.randint(800000000, 4000000000)
-                in_packets = random.randint(500000, 2000000)
-                out_packets = random.randint(400000, 1800000)
-                in_errors = random.randint(0, 100)
-                out_errors = random.randint(0, 80)
+                speed_mbps = self._rng.choice([100, 1000, 10000])
+                in_octets = self._rng.randint(1000000000, 5000000000)
+                out_octets = self._rng.randint(800000000, 4000000000)
+                in_packets = self._rng.randint(500000, 2000000)
+                out_packets = self._rng.randint(400000, 1800000)
+                in_errors = self._rng.randint(0, 100)
+                out_errors = self._rng.randint(0, 80)
                 
-                self.log_threadsafe(f"    Velocidad: {speed_mbps} Mbps")
-                self.log_threadsafe(f"    IN - Octetos: {in_octets:,} ({in_octets/1e9:.2f} GB)")
-                self.log_threadsafe(f"    OUT - Octetos: {out_octets:,} ({out_octets/1e9:.2f} GB)")
-                self.log_threadsafe(f"    IN - Paquetes: {in_packets:,}")
-                self.log_threadsafe(f"    OUT - Paquetes: {out_packets:,}")
-                self.log_threadsafe(f"    Errores IN/OUT: {in_errors}/{out_errors}")
+                self._log_detail(f"    Velocidad: {speed_mbps} Mbps")
+                self._log_detail(f"    IN - Octetos: {in_octets:,} ({in_octets/1e9:.2f} GB)")
+                self._log_detail(f"    OUT - Octetos: {out_octets:,} ({out_octets/1e9:.2f} GB)")
+                self._log_detail(f"    IN - Paquetes: {in_packets:,}")
+                self._log_detail(f"    OUT - Paquetes: {out_packets:,}")
+                self._log_detail(f"    Errores IN/OUT: {in_errors}/{out_errors}")
                 
                 # Cálculos de eficiencia
                 total_data_gb = (in_octets + out_octets) / 1e9
-                util_percent = random.uniform(25.0, 85.0)
+                util_percent = self._rng.uniform(25.0, 85.0)
                 err_rate = ((in_errors + out_errors) / (in_packets + out_packets)) * 100 if (in_packets + out_packets) > 0 else 0
                 
-                self.log_threadsafe(f"\n  📈 Análisis de Rendimiento:")
-                self.log_threadsafe(f"    Tráfico Total: {total_data_gb:.2f} GB")
-                self.log_threadsafe(f"    Utilización: {util_percent:.1f}%")
-                self.log_threadsafe(f"    Tasa de Error: {err_rate:.4f}%")
+                self._log_detail(f"\n  📈 Análisis de Rendimiento:")
+                self._log_detail(f"    Tráfico Total: {total_data_gb:.2f} GB")
+                self._log_detail(f"    Utilización: {util_percent:.1f}%")
+                self._log_detail(f"    Tasa de Error: {err_rate:.4f}%")
                 
                 # Estado de la red
                 status_icon = "✅" if util_percent < self.alarm_thresholds['utilization'] and err_rate < self.alarm_thresholds['error_rate'] else "⚠️"
                 status = "ÓPTIMO" if util_percent < self.alarm_thresholds['utilization'] and err_rate < self.alarm_thresholds['error_rate'] else "ALERTA"
-                self.log_threadsafe(f"    Estado: {status_icon} {status}")
+                self._log_detail(f"    Estado: {status_icon} {status}")
                 
                 # Almacenar datos
-                agent_data = {
+                agent_data = SnmpSample.from_dict({
                     'Agent': f"Agent-{agent_num}",
                     'Device_Type': device_type,
                     'Device_Name': f"DEVICE-{agent_num:02d}.local",
@@ -128,37 +456,334 @@ class NetworkLogic:
                     'Error_Rate_%': round(err_rate, 4),
                     'Status': status,
                     'timestamp': timestamp.isoformat()
-                }
-                self.last_snmp_data.append(agent_data)
+                })
+                rows.append(agent_data)
                 
-                time.sleep(0.3)
+                self._sim_sleep(0.3)
+                query_time = time.monotonic() - query_start
+                self.agent_health.record_success(agent_key, query_time)
+                AGENT_QUERY_SECONDS.observe(query_time)
+                AGENTS_POLLED.inc()
             
-            # Agregar al historial
-            self.snmp_history.append({
-                'timestamp': timestamp,
-                'num_agents': num_agents,
-                'data': self.last_snmp_data.copy()
-            })
+            if self.recorder:
+                self.recorder.samples(timestamp, rows)
+            anomalies = self.publish_samples(rows, timestamp)
             
             # Resumen global
             self.log_threadsafe("\n" + "=" * 50)
             self.log_threadsafe("📋 RESUMEN GLOBAL SNMP:")
             self.log_threadsafe(f"  ✓ Agentes monitoreados: {num_agents}")
+            self.log_threadsafe(f"  ✓ Anomalías detectadas: {anomalies}")
             self.log_threadsafe(f"  ✓ Comunidad: {community}")
             self.log_threadsafe(f"  ✓ Protocolo: SNMPv2c")
             self.log_threadsafe("=" * 50)
             
+        except TaskCancelled:
+            self.log_threadsafe("⏹ Monitoreo SNMP cancelado.")
         except Exception as e:
             self.log_threadsafe(f"Error en simulación SNMP: {e}")
-        
-        self.log_threadsafe("FIN Monitoreo SNMP.\n")
+            raise
+        finally:
+            self.log_threadsafe("FIN Monitoreo SNMP.\n")
+            elapsed = time.perf_counter() - poll_start
+            SNMP_POLL_SECONDS.observe(elapsed)
+            self.event('info', "Sondeo SNMP simulado", metric='snmp_poll', value=num_agents, duration=elapsed)
+            OPS_IN_FLIGHT.dec()
+        if task:
+            task.report_progress(num_agents, num_agents)
+        return self.last_snmp_data
+
+    # --- IMPLEMENTACIÓN SNMP REAL ---
+    def _execute_snmp_poll(self, targets, community, merge=False, task=None):
+        """Consulta todos los agentes a la vez desde un único socket UDP."""
+        OPS_IN_FLIGHT.inc()
+        poll_start = time.perf_counter()
+        sessions = {}  # sesión -> agente, solo los que el circuito dejó pasar
+        try:
+            self.log_threadsafe(f"Iniciando sondeo SNMP real de {len(targets)} agente(s)...")
+            table = get_table()
+            oids = [table.oid(name, index) for name, index in POLL_OBJECTS]
+
+            self.transport.resolve_many(target.partition(':')[0] for target in targets)
+            for target in targets:
+                host, _, port = target.partition(':')
+                if not self.agent_health.allow_request(target):
+                    CIRCUIT_SKIPS.inc()
+                    self.event('warning', "Circuito abierto", agent=target, metric='circuit')
+                    self._log_detail(f"⛔ {target}: circuito abierto, próximo sondeo en "
+                                     f"{self.agent_health.seconds_until_probe(target):.0f}s")
+                    continue
+                try:
+                    session = self.transport.session(
+                        host, community, int(port or 161),
+                        timeout=self.agent_health.timeout_for(target),
+                        retries=self.agent_health.retries_for(target))
+                except OSError as e:
+                    # Nombre que no resuelve o dirección inválida: cuenta como fallo
+                    self.agent_health.record_failure(target)
+                    self.log_threadsafe(f"❌ {target}: {e}")
+                    continue
+                sessions[session] = target
+            if task:
+                task.check_cancelled()
+
+            timestamp = datetime.now()
+            results = self.transport.poll_many(list(sessions), oids)
+            results = {sessions[session]: result for session, result in results.items()}
+            if self.recorder:
+                self.recorder.poll(timestamp, results)
+            self.process_poll_results(results, timestamp, merge, expected=len(targets))
+        except TaskCancelled:
+            self.log_threadsafe("⏹ Sondeo SNMP cancelado.")
+        except Exception as e:
+            self.log_threadsafe(f"Error en sondeo SNMP: {e}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - poll_start
+            SNMP_POLL_SECONDS.observe(elapsed)
+            self.event('info', "Sondeo SNMP real", metric='snmp_poll', value=len(targets), duration=elapsed)
+            # Sondeos de prueba que no llegaron a registrar resultado (cancelación, error)
+            for target in sessions.values():
+                self.agent_health.release(target)
+            OPS_IN_FLIGHT.dec()
+        return self.last_snmp_data
+
+    def process_poll_results(self, results, timestamp, merge=False, expected=None):
+        """
+        Procesa las respuestas de un sondeo ({agente: Response o excepción}):
+        salud, tasas, alarmas, anomalías, historial y snapshot. Lo comparten
+        el sondeo en vivo y la reproducción de capturas. Retorna las filas.
+        """
+        table = get_table()
+        rows = []
+        for target, result in results.items():
+            if isinstance(result, Exception):
+                self.agent_health.record_failure(target)
+                if isinstance(result, TimeoutError):
+                    TIMEOUTS.inc()
+                self.log_threadsafe(f"⚠️ {target}: {result}")
+                self.event('warning', str(result), agent=target,
+                           metric='timeout' if isinstance(result, TimeoutError) else 'error')
+                continue
+            self.agent_health.record_success(target, result.rtt)
+            AGENT_QUERY_SECONDS.observe(result.rtt)
+            self.event('debug', "Respuesta SNMP", agent=target, metric='rtt', duration=result.rtt)
+            AGENTS_POLLED.inc()
+            try:
+                fields = table.decode_varbinds(result.varbinds)
+                self.enricher.record(target, fields)
+                rows.append(self._poll_row(target, fields, timestamp))
+            except (TypeError, ValueError) as e:
+                # Una respuesta inesperada de un agente no debe tirar el sondeo de los demás
+                self.log_threadsafe(f"⚠️ {target}: respuesta no válida ({e})")
+                self.event('warning', f"Respuesta no válida: {e}", agent=target, metric='error')
+
+        anomalies = self.anomaly_detector.annotate(rows)
+        self.snmp_history.append(rows, timestamp)
+        self._sample_events(rows)
+        alerts = sum(1 for r in rows if r['Status'] == "ALERTA")
+        self.log_threadsafe(f"📋 Sondeo SNMP: {len(rows)}/{expected or len(results)} agentes respondieron, "
+                            f"{alerts} en alerta, {anomalies} con anomalías")
+        published = rows
+        if merge:
+            # Los agentes no sondeados conservan su última fila (sondeos escalonados)
+            polled = {row['Agent'] for row in rows}
+            published = [row for row in self.last_snmp_data if row['Agent'] not in polled] + rows
+        self._publishers['snmp'].publish(SampleBatch(published))
+        return rows
+
+    def publish_samples(self, rows, timestamp):
+        """Anomalías, historial y publicación de las filas de un sondeo simulado."""
+        anomalies = self.anomaly_detector.annotate(rows)
+        self.snmp_history.append(rows, timestamp)
+        self._sample_events(rows)
+        self._publishers['snmp'].publish(SampleBatch(rows))
+        return anomalies
+
+    def _poll_row(self, target, fields, timestamp):
+        """Fila de last_snmp_data a partir de los campos decodificados de un agente."""
+        ticks = fields.get('Uptime_Ticks', 0)
+        speed_bps = fields.get('If_Speed_bps', 0)
+        counters = tuple(fields.get(k, 0) for k in ('IN_Octets', 'OUT_Octets', 'IN_Packets',
+                                                    'OUT_Packets', 'IN_Errors', 'OUT_Errors'))
+        previous = self._poll_previous.get(target)
+        self._poll_previous[target] = (ticks, counters)
+
+        util_percent = err_rate = 0.0
+        if previous and ticks > previous[0]:
+            elapsed = (ticks - previous[0]) / 100.0
+            d = [counter_delta(c, p) for c, p in zip(counters, previous[1])]
+            if speed_bps:
+                util_percent = min(100.0, max(d[0], d[1]) * 8 / (elapsed * speed_bps) * 100)
+            if d[2] + d[3]:
+                err_rate = (d[4] + d[5]) / (d[2] + d[3]) * 100
+        ok = util_percent < self.alarm_thresholds['utilization'] and err_rate < self.alarm_thresholds['error_rate']
+        info = self.enricher.lookup(target)
+        return SnmpSample(target, info.device_type or '', fields.get('Device_Name') or info.name or '',
+                          ticks // 8640000, speed_bps // 1000000, *counters,
+                          round((counters[0] + counters[1]) / 1e9, 2), round(util_percent, 2),
+                          round(err_rate, 4), "ÓPTIMO" if ok else "ALERTA", timestamp.isoformat())
+
+    def _execute_interface_poll(self, targets, community, rmon=False, task=None):
+        """Recorre las tablas de interfaces de todos los agentes a la vez."""
+        OPS_IN_FLIGHT.inc()
+        poll_start = time.perf_counter()
+        sessions = {}  # sesión -> agente, solo los que el circuito dejó pasar
+        try:
+            self.log_threadsafe(f"Recorriendo ifTable/ifXTable{'/etherStats' if rmon else ''} "
+                                f"de {len(targets)} agente(s) con GETBULK...")
+            self.transport.resolve_many(target.partition(':')[0] for target in targets)
+            for target in targets:
+                host, _, port = target.partition(':')
+                if not self.agent_health.allow_request(target):
+                    CIRCUIT_SKIPS.inc()
+                    self.event('warning', "Circuito abierto", agent=target, metric='circuit')
+                    continue
+                try:
+                    session = self.transport.session(
+                        host, community, int(port or 161),
+                        timeout=self.agent_health.timeout_for(target),
+                        retries=self.agent_health.retries_for(target))
+                except OSError as e:
+                    # Nombre que no resuelve o dirección inválida: cuenta como fallo
+                    self.agent_health.record_failure(target)
+                    self.log_threadsafe(f"❌ {target}: {e}")
+                    continue
+                sessions[session] = target
+            if task:
+                task.check_cancelled()
+
+            timestamp = datetime.now()
+            results = self.table_walker.walk_interfaces(sessions, rmon)
+            rows = []
+            requests = 0
+            for session, result in results.items():
+                target = sessions[session]
+                if isinstance(result, Exception):
+                    self.agent_health.record_failure(target)
+                    if isinstance(result, TimeoutError):
+                        TIMEOUTS.inc()
+                    self.log_threadsafe(f"⚠️ {target}: {result}")
+                    self.event('warning', str(result), agent=target,
+                               metric='timeout' if isinstance(result, TimeoutError) else 'error')
+                    continue
+                self.agent_health.record_success(target, result.rtt or 0.0)
+                AGENTS_POLLED.inc()
+                requests += result.requests
+                self._log_detail(f"  {target}: {len(result.rows)} interfaces en {result.requests} "
+                                 f"petición(es) GETBULK, {result.bytes / 1024:.1f} kB, "
+                                 f"{result.elapsed * 1000:.0f} ms (contadores de {result.counter_bits} bits)")
+                self.event('info', "Recorrido de interfaces", agent=target, metric='if_walk',
+                           value=result.requests, duration=result.elapsed)
+                for if_index in sorted(result.rows):
+                    rows.append(self._interface_row(target, if_index, result.rows[if_index],
+                                                    result.counter_bits, timestamp))
+
+            if rmon:
+                # etherHistoryTable de la primera interfaz de cada agente que respondió
+                history_targets = {sessions[session]: (session, min(result.rows))
+                                   for session, result in results.items()
+                                   if not isinstance(result, Exception) and result.rows}
+                if task:
+                    task.check_cancelled()
+                self._collect_rmon_history(history_targets)
+
+            anomalies = self.interface_anomaly_detector.annotate(rows)
+            self.interface_history.append(rows, timestamp)
+            self._sample_events(rows, key='Interface')
+            alerts = sum(1 for r in rows if r['Status'] == "ALERTA")
+            self.log_threadsafe(f"📋 Interfaces: {len(rows)} en {len(results)} agente(s), {alerts} en alerta, "
+                                f"{anomalies} con anomalías, {requests} petición(es) GETBULK")
+            self._publishers['interfaces'].publish(SampleBatch(rows))
+        except TaskCancelled:
+            self.log_threadsafe("⏹ Recorrido de interfaces cancelado.")
+        except Exception as e:
+            self.log_threadsafe(f"Error en recorrido de interfaces: {e}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - poll_start
+            SNMP_POLL_SECONDS.observe(elapsed)
+            self.event('info', "Recorrido de interfaces", metric='if_poll', value=len(targets), duration=elapsed)
+            for target in sessions.values():
+                self.agent_health.release(target)
+            OPS_IN_FLIGHT.dec()
+        return self.last_interface_data
+
+    def _interface_row(self, target, if_index, fields, counter_bits, timestamp):
+        """InterfaceSample a partir de los campos recorridos de una interfaz."""
+        key = f"{target}/{if_index}"
+        counters = tuple(fields.get(k, 0) for k in ('IN_Octets', 'OUT_Octets', 'IN_Packets',
+                                                    'OUT_Packets', 'IN_Errors', 'OUT_Errors'))
+        now = timestamp.timestamp()
+        previous = self._if_previous.get(key)
+        self._if_previous[key] = (now, counters)
+        speed_mbps = fields.get('Speed_Mbps') or fields.get('If_Speed_bps', 0) // 1000000
+
+        in_bps = out_bps = util_percent = err_rate = 0.0
+        if previous and now > previous[0]:
+            elapsed = now - previous[0]
+            # Octetos y paquetes en 64 bits con ifXTable; los errores siempre son Counter32
+            wrap = 2 ** counter_bits
+            d = [counter_delta(c, p, wrap if i < 4 else 2 ** 32)
+                 for i, (c, p) in enumerate(zip(counters, previous[1]))]
+            in_bps, out_bps = d[0] * 8 / elapsed, d[1] * 8 / elapsed
+            if speed_mbps:
+                util_percent = min(100.0, max(in_bps, out_bps) / (speed_mbps * 1e6) * 100)
+            if d[2] + d[3]:
+                err_rate = (d[4] + d[5]) / (d[2] + d[3]) * 100
+        ok = util_percent < self.alarm_thresholds['utilization'] and err_rate < self.alarm_thresholds['error_rate']
+        row = InterfaceSample(key, target, if_index, fields.get('If_Name') or fields.get('If_Descr') or '',
+                              OPER_STATUS.get(fields.get('If_Oper_Status'), 'unknown'), speed_mbps,
+                              counter_bits, *counters, round(in_bps), round(out_bps),
+                              round(util_percent, 2), round(err_rate, 4), "ÓPTIMO" if ok else "ALERTA",
+                              timestamp.isoformat())
+        for field in ('Drop_Events', 'Broadcast_Pkts', 'Multicast_Pkts', 'CRC_Errors', 'Collisions'):
+            if field in fields:
+                row[field] = fields[field]
+        return row
+
+    def _collect_rmon_history(self, targets):
+        """Buckets nuevos de etherHistory de agentes reales ({agente: (sesión, ifIndex)})."""
+        if not targets:
+            return 0
+        results = self.transport.run(self.history_collector.apoll_many(targets))
+        new_buckets = 0
+        for target, result in results.items():
+            if isinstance(result, Exception):
+                # Sin grupo History o sin permiso para crear la entrada de control
+                self._log_detail(f"  {target}: sin historial RMON ({result})")
+                continue
+            new_buckets += len(result)
+        self.log_threadsafe(f"📈 Historial RMON: {new_buckets} bucket(s) nuevo(s) de "
+                            f"{len(targets)} agente(s)")
+        return new_buckets
 
     # --- IMPLEMENTACIÓN PING ---
-    def _execute_ping_test(self, ip):
+    def _execute_ping_test(self, ip, task=None):
+        OPS_IN_FLIGHT.inc()
+        poll_start = time.perf_counter()
+        allowed = False
         try:
             self.log_threadsafe(f"Haciendo PING a {ip}...")
-            param = '-n' if platform.system().lower() == 'windows' else '-c'
-            cmd = ['ping', param, '4', ip]
+            allowed = self.agent_health.allow_request(ip)
+            if not allowed:
+                wait = self.agent_health.seconds_until_probe(ip)
+                self.log_threadsafe(f"⛔ {ip}: circuito abierto, próximo sondeo en {wait:.0f}s")
+                CIRCUIT_SKIPS.inc()
+                return
+
+            # Timeout por eco derivado del RTT del agente. ping espera PING_INTERVAL
+            # entre ecos, así que el coste total es ese intervalo por eco más la
+            # espera del último (-W de Linux admite solo segundos enteros)
+            count = 4
+            timeout = self.agent_health.timeout_for(ip)
+            if platform.system().lower() == 'windows':
+                echo_wait = timeout
+                cmd = ['ping', '-n', str(count), '-w', str(int(timeout * 1000)), ip]
+            else:
+                echo_wait = max(1, round(timeout))
+                cmd = ['ping', '-c', str(count), '-W', str(echo_wait), ip]
+            budget = (count - 1) * PING_INTERVAL + max(echo_wait, self.agent_health.attempt_budget(ip))
             
             si = None
             if platform.system().lower() == 'windows':
@@ -166,7 +791,15 @@ class NetworkLogic:
                 si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
             
             proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=si)
-            out, err = proc.communicate()
+            try:
+                out, err = proc.communicate(timeout=budget)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                self.agent_health.record_failure(ip)
+                TIMEOUTS.inc()
+                self.log_threadsafe(f"Ping abortado: sin respuesta en {budget:.1f}s")
+                return
             
             if proc.returncode == 0:
                 self.log_threadsafe("Ping exitoso.")
@@ -174,27 +807,46 @@ class NetworkLogic:
                 if loss: self.log_threadsafe(f"Pérdida: {loss.group(1)}%")
                 
                 avg = re.search(r"(Media|Average) = (\d+)ms", out)
-                if avg: self.log_threadsafe(f"Latencia Media: {avg.group(2)}ms")
-                else: self.log_threadsafe("Ver output crudo para latencia.")
+                avg_unix = re.search(r"= [\d.]+/([\d.]+)/", out)
+                if avg:
+                    self.log_threadsafe(f"Latencia Media: {avg.group(2)}ms")
+                    self.agent_health.record_success(ip, float(avg.group(2)) / 1000)
+                elif avg_unix:
+                    self.log_threadsafe(f"Latencia Media: {avg_unix.group(1)}ms")
+                    self.agent_health.record_success(ip, float(avg_unix.group(1)) / 1000)
+                else:
+                    self.log_threadsafe("Ver output crudo para latencia.")
+                    self.agent_health.record_success(ip, timeout / 2)
             else:
+                self.agent_health.record_failure(ip)
+                TIMEOUTS.inc()
                 self.log_threadsafe(f"Ping falló: {err or out}")
 
         except Exception as e:
             self.log_threadsafe(f"Error Ping: {e}")
-        
-        self.log_threadsafe("FIN Ping.\n")
+            raise
+        finally:
+            if allowed:
+                self.agent_health.release(ip)
+            self.log_threadsafe("FIN Ping.\n")
+            PING_SECONDS.observe(time.perf_counter() - poll_start)
+            OPS_IN_FLIGHT.dec()
 
     # --- IMPLEMENTACIÓN RMON SIMULADO ---
-    def _execute_rmon_mock(self, ip_str, num_agents=1):
+    def _execute_rmon_mock(self, ip_str, num_agents=1, task=None):
         """Simula consulta RMON con datos mock para demostración académica."""
+        OPS_IN_FLIGHT.inc()
+        poll_start = time.perf_counter()
         try:
             self.log_threadsafe(f"Iniciando Monitoreo RMON a {ip_str}...")
             self.log_threadsafe(f"NOTA: Datos simulados para {num_agents} agente(s)")
             self.log_threadsafe("=" * 50)
-            time.sleep(0.5)
+            self._sim_sleep(0.5)
 
-            timestamp = datetime.now()
-            self.last_rmon_data = {
+            # Con semilla el tiempo RMON avanza un intervalo por ciclo
+            self.sim_clock.tick()
+            timestamp = datetime.fromtimestamp(self.sim_clock.time())
+            rmon_data = {
                 'timestamp': timestamp.isoformat(),
                 'num_agents': num_agents,
                 'agents': [],
@@ -204,97 +856,109 @@ class NetworkLogic:
                 'summary': {}
             }
 
-            # Datos agregados para todos los agentes
-            total_drop_events = 0
-            total_octets = 0
-            total_pkts = 0
-            total_errors = 0
-            
             # === RMON Grupo 1: Estadísticas Ethernet (por agente) ===
-            self.log_threadsafe("\n📊 RMON Grupo 1: Estadísticas Ethernet")
+            self._log_detail("\n📊 RMON Grupo 1: Estadísticas Ethernet")
             
-            for agent_num in range(1, num_agents + 1):
-                self.log_threadsafe(f"\n  🖥️  Agente #{agent_num}:")
-                
-                drop_events = random.randint(5, 50)
-                octets = random.randint(500000000, 2000000000)
-                pkts = random.randint(1000000, 5000000)
-                broadcast_pkts = random.randint(10000, 50000)
-                multicast_pkts = random.randint(5000, 25000)
-                crc_errors = random.randint(0, 100)
-                collisions = random.randint(0, 50)
-                fragments = random.randint(0, 25)
+            if self.simulation.vectorized:
+                fleet = self._get_fleet('rmon', num_agents)
+                batch = fleet.step(1, timestamp.timestamp())
+                rmon_data['agents'] = fleet.rmon_rows(batch, 0)
+                fleet_bucket = fleet.history_bucket(batch, 0)
+                agent_range = ()
+            else:
+                agent_range = range(1, num_agents + 1)
+
+            for agent_num in agent_range:
+                if task:
+                    task.check_cancelled()
+                    task.report_progress(agent_num - 1, num_agents)
+                self._log_detail(f"\n  🖥️  Agente #{agent_num}:")
                 
-                total_drop_events += drop_events
-                total_octets += octets
-                total_pkts += pkts
-                total_errors += (crc_errors + collisions)
+                drop_events = self._rmon_rng.randint(5, 50)
+                octets = self._rmon_rng.randint(500000000, 2000000000)
+                pkts = self._rmon_rng.randint(1000000, 5000000)
+                broadcast_pkts = self._rmon_rng.randint(10000, 50000)
+                multicast_pkts = self._rmon_rng.randint(5000, 25000)
+                crc_errors = self._rmon_rng.randint(0, 100)
+                collisions = self._rmon_rng.randint(0, 50)
+                fragments = self._rmon_rng.randint(0, 25)
                 
-                self.log_threadsafe(f"    Eventos de descarte: {drop_events}")
-                self.log_threadsafe(f"    Octetos: {octets:,} bytes ({octets/1e9:.2f} GB)")
-                self.log_threadsafe(f"    Paquetes: {pkts:,}")
-                self.log_threadsafe(f"    Broadcast: {broadcast_pkts:,} | Multicast: {multicast_pkts:,}")
-                self.log_threadsafe(f"    Errores CRC: {crc_errors} | Colisiones: {collisions}")
+                self._log_detail(f"    Eventos de descarte: {drop_events}")
+                self._log_detail(f"    Octetos: {octets:,} bytes ({octets/1e9:.2f} GB)")
+                self._log_detail(f"    Paquetes: {pkts:,}")
+                self._log_detail(f"    Broadcast: {broadcast_pkts:,} | Multicast: {multicast_pkts:,}")
+                self._log_detail(f"    Errores CRC: {crc_errors} | Colisiones: {collisions}")
                 
                 # Almacenar datos del agente
-                self.last_rmon_data['agents'].append({
-                    'Agent': f"Agent-{agent_num}",
-                    'Drop_Events': drop_events,
-                    'Octets': octets,
-                    'Packets': pkts,
-                    'Broadcast_Pkts': broadcast_pkts,
-                    'Multicast_Pkts': multicast_pkts,
-                    'CRC_Errors': crc_errors,
-                    'Collisions': collisions,
-                    'Fragments': fragments
-                })
+                rmon_data['agents'].append(RmonSample(
+                    f"Agent-{agent_num}", drop_events, octets, pkts, broadcast_pkts,
+                    multicast_pkts, crc_errors, collisions, fragments))
                 
-                time.sleep(0.3)
+                self._sim_sleep(0.3)
+
+            # Datos agregados para todos los agentes (operaciones por columna)
+            agents = rmon_data['agents'] = SampleBatch(rmon_data['agents'])
+            total_drop_events = int(agents.sum('Drop_Events'))
+            total_octets = int(agents.sum('Octets'))
+            total_pkts = int(agents.sum('Packets'))
+            total_errors = int(agents.sum('CRC_Errors', 'Collisions'))
             
             # === RMON Grupo 2: Historial ===
-            time.sleep(0.5)
-            self.log_threadsafe("\n📈 RMON Grupo 2: Historial de Tráfico")
-            self.log_threadsafe("  Últimas 5 muestras (intervalos de 30s):\n")
+            self._sim_sleep(0.5)
+            self._log_detail("\n📈 RMON Grupo 2: Historial de Tráfico")
             
-            for i in range(5, 0, -1):
-                sample_octets = random.randint(1000000, 5000000) * num_agents
-                sample_pkts = random.randint(5000, 25000) * num_agents
-                sample_util = random.uniform(15.0, 85.0)
-                timestamp_sample = f"T-{i*30}s"
-                
-                self.log_threadsafe(f"  [{timestamp_sample}] "
-                                   f"Octets: {sample_octets:,}, "
-                                   f"Pkts: {sample_pkts:,}, "
-                                   f"Util: {sample_util:.1f}%")
-                
-                self.last_rmon_data['history'].append({
-                    'timestamp': timestamp_sample,
-                    'octets': sample_octets,
-                    'packets': sample_pkts,
-                    'utilization': round(sample_util, 1)
-                })
+            if self.simulation.vectorized:
+                # Un bucket agregado de toda la flota por ciclo, generado en lote
+                # (una flota nueva, p. ej. con otro número de agentes, empieza por el índice 1)
+                new_buckets = self.rmon_history_store.merge(f"{ip_str}/flota", 1, [fleet_bucket],
+                                                            restart=fleet_bucket['sample_index'] == 1)
+            else:
+                # Solo se leen los buckets posteriores al último visto por agente
+                targets = {}
+                for agent_num in range(1, num_agents + 1):
+                    agent_key = f"{ip_str}/Agent-{agent_num}"
+                    session = self._mock_rmon_sessions.get(agent_key)
+                    if session is None:
+                        session = SimulatedRmonAgent(rng=random.Random(self._rmon_rng.getrandbits(64)),
+                                                     clock=self.sim_clock.time)
+                        self._mock_rmon_sessions[agent_key] = session
+                    targets[agent_key] = (session, 1)
+                if task:
+                    task.check_cancelled()
+                results = asyncio.run(self._mock_history_collector.apoll_many(targets))
+                new_buckets = sum(len(samples) for samples in results.values())
+            
+            history = self.rmon_history_store.as_plot_rows(last_n=60)
+            self._log_detail(f"  Buckets nuevos: {new_buckets} "
+                            f"(intervalos de {self._mock_history_collector.interval}s)\n")
+            for sample in history[-5:]:
+                self._log_detail(f"  [{sample['timestamp']}] "
+                                f"Octets: {sample['octets']:,}, "
+                                f"Pkts: {sample['packets']:,}, "
+                                f"Util: {sample['utilization']:.1f}%")
+            rmon_data['history'] = history
             
             # === RMON Grupo 3: Alarmas ===
-            time.sleep(0.5)
-            self.log_threadsafe("\n⚠️  RMON Grupo 3: Alarmas Configuradas\n")
+            self._sim_sleep(0.5)
+            self._log_detail("\n⚠️  RMON Grupo 3: Alarmas Configuradas\n")
             
             alarm_scenarios = [
                 ("Utilización Alta", f"> {self.alarm_thresholds['utilization']}%", 
-                 random.choice(["Normal", "ALERTA"]), random.uniform(45, 90)),
+                 self._rmon_rng.choice(["Normal", "ALERTA"]), self._rmon_rng.uniform(45, 90)),
                 ("Tasa de Errores", f"> {self.alarm_thresholds['error_rate']}%", 
-                 random.choice(["Normal", "Normal", "WARNING"]), random.uniform(0.1, 1.5)),
+                 self._rmon_rng.choice(["Normal", "Normal", "WARNING"]), self._rmon_rng.uniform(0.1, 1.5)),
                 ("Paquetes Broadcast", f"> {self.alarm_thresholds['broadcast']}/s", 
-                 "Normal", random.randint(1000, 9000)),
+                 "Normal", self._rmon_rng.randint(1000, 9000)),
                 ("Colisiones", f"> {self.alarm_thresholds['collisions']}/min", 
-                 random.choice(["Normal", "Normal", "Normal", "WARNING"]), random.randint(10, 150))
+                 self._rmon_rng.choice(["Normal", "Normal", "Normal", "WARNING"]), self._rmon_rng.randint(10, 150))
             ]
             
             for alarm_name, threshold, status, current_val in alarm_scenarios:
                 status_icon = "✓" if status == "Normal" else "⚠"
-                self.log_threadsafe(f"  {status_icon} {alarm_name}: {status} "
-                                   f"(Umbral: {threshold}, Actual: {current_val:.1f})")
+                self._log_detail(f"  {status_icon} {alarm_name}: {status} "
+                                f"(Umbral: {threshold}, Actual: {current_val:.1f})")
                 
-                self.last_rmon_data['alarms'].append({
+                rmon_data['alarms'].append({
                     'Alarm_Name': alarm_name,
                     'Threshold': threshold,
                     'Status': status,
@@ -302,44 +966,35 @@ class NetworkLogic:
                 })
             
             # === RMON Grupo 4: Hosts detectados ===
-            time.sleep(0.5)
-            self.log_threadsafe("\n💻 RMON Grupo 4: Top Hosts por Tráfico\n")
+            self._sim_sleep(0.5)
+            self._log_detail("\n💻 RMON Grupo 4: Top Hosts por Tráfico\n")
             
-            # Mostrar hasta 5 hosts o num_agents*2, lo que sea menor
-            num_hosts = min(5, num_agents * 2)
-            for i in range(1, num_hosts + 1):
-                mac = f"00:1A:2B:{random.randint(0,255):02X}:{random.randint(0,255):02X}:{random.randint(0,255):02X}"
-                pkts_in = random.randint(10000, 100000)
-                pkts_out = random.randint(10000, 100000)
-                octets_total = random.randint(50000000, 500000000)
-                
-                self.log_threadsafe(f"  Host {i} (MAC: {mac})")
-                self.log_threadsafe(f"    Pkts IN: {pkts_in:,}, OUT: {pkts_out:,}")
-                self.log_threadsafe(f"    Tráfico: {octets_total/1e6:.2f} MB")
-                
-                self.last_rmon_data['hosts'].append({
-                    'Host': i,
-                    'MAC': mac,
-                    'Pkts_IN': pkts_in,
-                    'Pkts_OUT': pkts_out,
-                    'Traffic_MB': round(octets_total/1e6, 2)
-                })
+            # Recorrer la hostTable como flujo y quedarse con el Top-N
+            hosts = self.host_tracker.process(self._mock_host_table(num_agents))
+            for host in hosts:
+                self._log_detail(f"  Host {host['Host']} (MAC: {host['MAC']})")
+                self._log_detail(f"    Pkts IN: {host['Pkts_IN']:,}, OUT: {host['Pkts_OUT']:,}")
+                self._log_detail(f"    Tráfico: {host['Traffic_MB']:.2f} MB")
+            if not hosts:
+                self._log_detail("  (primera lectura de la hostTable: línea base para los deltas)")
+            rmon_data['hosts'] = hosts
             
             # === Resumen Final ===
             efficiency = 100 - ((total_drop_events + total_errors) / total_pkts * 100)
             active_alarms = sum(1 for _, _, status, _ in alarm_scenarios if status != "Normal")
             
-            self.last_rmon_data['summary'] = {
+            rmon_data['summary'] = {
                 'efficiency': round(efficiency, 2),
                 'total_packets': total_pkts,
                 'total_volume_gb': round(total_octets/1e9, 2),
                 'active_alarms': active_alarms
             }
             
-            # Agregar al historial
-            self.rmon_history.append(self.last_rmon_data.copy())
+            # Agregar al historial y publicar el snapshot
+            self.rmon_history.append(rmon_data)
+            self._publishers['rmon'].publish(rmon_data)
             
-            time.sleep(0.3)
+            self._sim_sleep(0.3)
             self.log_threadsafe("\n" + "=" * 50)
             self.log_threadsafe("📋 RESUMEN GLOBAL RMON:")
             self.log_threadsafe(f"  ✓ Agentes monitoreados: {num_agents}")
@@ -349,12 +1004,45 @@ class NetworkLogic:
             self.log_threadsafe(f"  ⚠  Alarmas activas: {active_alarms}/4")
             self.log_threadsafe("=" * 50)
             
+        except TaskCancelled:
+            self.log_threadsafe("⏹ Monitoreo RMON cancelado.")
         except Exception as e:
             self.log_threadsafe(f"Error en simulación RMON: {e}")
-        
-        self.log_threadsafe("FIN Monitoreo RMON.\n")
+            raise
+        finally:
+            self.log_threadsafe("FIN Monitoreo RMON.\n")
+            RMON_POLL_SECONDS.observe(time.perf_counter() - poll_start)
+            OPS_IN_FLIGHT.dec()
+        if task:
+            task.report_progress(num_agents, num_agents)
+        return self.last_rmon_data
+
+    def _mock_host_table(self, num_agents):
+        """
+        Genera las filas simuladas de hostTable (MAC y contadores acumulados).
+        Los contadores crecen de forma monótona entre consultas y unos pocos
+        hosts concentran la mayor parte del tráfico.
+        """
+        counters = self._mock_host_counters
+        num_hosts = min(200 * num_agents, MAX_MOCK_HOSTS)
+        for i in range(num_hosts):
+            mac = f"00:1A:2B:{(i >> 16) & 0xFF:02X}:{(i >> 8) & 0xFF:02X}:{i & 0xFF:02X}"
+            weight = self._rmon_rng.paretovariate(1.2)
+            prev = counters.get(mac, (0, 0, 0, 0))
+            pkts_in = int(weight * self._rmon_rng.randint(100, 1000))
+            pkts_out = int(weight * self._rmon_rng.randint(100, 1000))
+            row = (
+                (prev[0] + pkts_in) % 2 ** 32,
+                (prev[1] + pkts_out) % 2 ** 32,
+                (prev[2] + pkts_in * self._rmon_rng.randint(64, 1500)) % 2 ** 32,
+                (prev[3] + pkts_out * self._rmon_rng.randint(64, 1500)) % 2 ** 32,
+            )
+            counters[mac] = row
+            yield (mac, *row)
 
     def log_threadsafe(self, msg):
-        """Helper para enviar al callback."""
+        """Helper para enviar al callback (y al registro de eventos si está activo)."""
+        if self.event_log is not None:
+            self.event_log.log(msg)
         if self.log_callback:
             self.log_callback(msg)
@@ -0,0 +1,448 @@
+"""
+Transporte UDP multiplexado para sondear muchos agentes desde un solo socket.
+Las respuestas se demultiplexan por (peer, request-id), los timeouts se
+gestionan con una rueda de temporizadores de un único tick y los envíos se
+regulan con un token bucket y una ventana de peticiones en vuelo para no
+desbordar el buffer de recepción del socket.
+
+SnmpTransport ejecuta el bucle asyncio en un hilo propio, guarda en caché
+las direcciones de los agentes y ofrece sesiones con variantes síncronas
+(get/walk/set) y corrutinas (aget/awalk/aset).
+"""
+import asyncio
+import socket
+import threading
+import time
+from collections import deque
+
+import ber_codec as ber
+from ber_codec import BerError, VarbindException
+from metrics import REGISTRY
+from oid_table import INTEGER, OCTET_STRING, OBJECT_IDENTIFIER
+
+REQUESTS_SENT = REGISTRY.counter('snmp_requests_sent_total',
+                                 'Datagramas SNMP enviados (incluye reintentos)').labels()
+RETRANSMITS = REGISTRY.counter('snmp_retransmits_total', 'Reintentos por timeout').labels()
+REQUEST_TIMEOUTS = REGISTRY.counter('snmp_request_timeouts_total',
+                                    'Peticiones agotadas tras todos los reintentos').labels()
+UNMATCHED = REGISTRY.counter('snmp_unmatched_responses_total',
+                             'Respuestas tardías, duplicadas o mal formadas').labels()
+IN_FLIGHT = REGISTRY.gauge('snmp_requests_in_flight', 'Peticiones esperando respuesta').labels()
+SEND_QUEUE = REGISTRY.gauge('snmp_send_queue_depth', 'Peticiones retenidas por el pacing').labels()
+
+# Vigencia de las direcciones resueltas en la caché del transporte (s); los
+# nombres que no resuelven se reintentan antes
+DNS_TTL = 300.0
+DNS_NEGATIVE_TTL = 30.0
+
+# Estados de error de la PDU (RFC 3416)
+ERROR_NAMES = {
+    1: 'tooBig', 2: 'noSuchName', 3: 'badValue', 4: 'readOnly', 5: 'genErr',
+    6: 'noAccess', 7: 'wrongType', 8: 'wrongLength', 9: 'wrongEncoding',
+    10: 'wrongValue', 11: 'noCreation', 12: 'inconsistentValue',
+    13: 'resourceUnavailable', 14: 'commitFailed', 15: 'undoFailed',
+    16: 'authorizationError', 17: 'notWritable', 18: 'inconsistentName',
+}
+
+
+class SnmpError(Exception):
+    """El agente respondió con error-status distinto de cero."""
+
+    def __init__(self, status, index):
+        self.status = status
+        self.index = index
+        super().__init__(f"{ERROR_NAMES.get(status, status)} (varbind {index})")
+
+
+class TimerWheel:
+    """
+    Rueda de temporizadores: `slots` casillas de `tick` segundos.
+    Programar y vencer son O(1) por entrada; las entradas que caen más
+    allá de una vuelta permanecen en su casilla hasta su vuelta real.
+    """
+
+    def __init__(self, tick=0.02, slots=512):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self._cursor = None
+
+    def schedule(self, deadline, item):
+        slot = int(deadline / self.tick)
+        if self._cursor is not None and slot < self._cursor:
+            slot = self._cursor
+        self.slots[slot % len(self.slots)].append((deadline, item))
+
+    def advance(self, now):
+        """Devuelve las entradas vencidas hasta `now`."""
+        target = int(now / self.tick)
+        if self._cursor is None:
+            self._cursor = target
+        expired = []
+        # Como mucho una vuelta completa por llamada
+        start = max(self._cursor, target - len(self.slots) + 1)
+        for slot in range(start, target + 1):
+            bucket = self.slots[slot % len(self.slots)]
+            if not bucket:
+                continue
+            keep = []
+            for entry in bucket:
+                (expired if entry[0] <= now else keep).append(entry)
+            bucket[:] = keep
+        self._cursor = target
+        return [item for _, item in expired]
+
+
+class _Pending:
+    __slots__ = ('key', 'future', 'payload', 'timeout', 'retries', 'sent_at', 'attempt')
+
+    def __init__(self, key, future, payload, timeout, retries):
+        self.key = key
+        self.future = future
+        self.payload = payload
+        self.timeout = timeout
+        self.retries = retries
+        self.sent_at = None
+        self.attempt = 0
+
+
+class SnmpMultiplexer(asyncio.DatagramProtocol):
+    """
+    Protocolo asyncio que comparte un socket UDP entre todos los agentes.
+
+    Args:
+        rate: Datagramas por segundo como máximo (token bucket)
+        burst: Ráfaga máxima del token bucket
+        max_in_flight: Peticiones sin responder permitidas a la vez
+        tick: Resolución de la rueda de temporizadores (s)
+        rcvbuf: Tamaño solicitado para SO_RCVBUF
+    """
+
+    def __init__(self, rate=2000, burst=100, max_in_flight=256, tick=0.02, rcvbuf=4 * 1024 * 1024):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.rcvbuf = rcvbuf
+        self.ids = ber.RequestIdAllocator()
+        self.wheel = TimerWheel(tick)
+        self.transport = None
+        self._loop = None
+        self._pending = {}      # (peer, request-id) -> _Pending
+        self._queue = deque()   # pendientes de enviar por el pacing
+        self._tokens = float(burst)
+        self._last_refill = 0.0
+        self._ticker = None
+
+    async def start(self, local_addr=('0.0.0.0', 0)):
+        self._loop = asyncio.get_running_loop()
+        await self._loop.create_datagram_endpoint(lambda: self, local_addr=local_addr,
+                                                  family=socket.AF_INET)
+        sock = self.transport.get_extra_info('socket')
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        except OSError:
+            pass
+        self._last_refill = self._loop.time()
+        self._ticker = self._loop.call_later(self.wheel.tick, self._on_tick)
+        return self
+
+    def close(self):
+        if self._ticker:
+            self._ticker.cancel()
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.set_exception(ConnectionAbortedError("Transporte cerrado"))
+        self._pending.clear()
+        self._queue.clear()
+        IN_FLIGHT.set(0)
+        SEND_QUEUE.set(0)
+        if self.transport:
+            self.transport.close()
+
+    # --- asyncio.DatagramProtocol ---
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            request_id = ber.peek_request_id(data)
+        except (BerError, IndexError):
+            UNMATCHED.inc()
+            return
+        pending = self._pending.pop((addr[:2], request_id), None)
+        if pending is None or pending.future.done():
+            UNMATCHED.inc()
+            return
+        IN_FLIGHT.dec()
+        try:
+            response = ber.decode_response(data)
+        except (BerError, IndexError) as e:
+            pending.future.set_exception(BerError(f"Respuesta mal formada de {addr[0]}: {e}"))
+        else:
+            response.rtt = self._loop.time() - pending.sent_at
+            pending.future.set_result(response)
+        self._pump()
+
+    def error_received(self, exc):
+        # ICMP port unreachable y similares: el timeout se encarga de la petición
+        UNMATCHED.inc()
+
+    # --- Peticiones ---
+    def request(self, peer, build, timeout=1.0, retries=1):
+        """
+        Encola una petición y devuelve un Future con la Response decodificada
+        (con el atributo `rtt` del último intento).
+        `build(request_id)` produce el datagrama; `peer` es (ip, puerto).
+        """
+        future = self._loop.create_future()
+        request_id = self.ids.next()
+        key = (peer, request_id)
+        pending = _Pending(key, future, build(request_id), timeout, retries)
+        self._pending[key] = pending
+        IN_FLIGHT.inc()
+        self._queue.append(pending)
+        self._pump()
+        return future
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _pump(self):
+        """Envía lo encolado mientras haya tokens y hueco en la ventana."""
+        now = self._loop.time()
+        self._refill(now)
+        in_flight = len(self._pending) - len(self._queue)
+        while self._queue and self._tokens >= 1 and in_flight < self.max_in_flight:
+            pending = self._queue.popleft()
+            if pending.future.done():
+                # Cancelada antes de enviarse: libera su hueco en la ventana
+                if self._pending.get(pending.key) is pending:
+                    del self._pending[pending.key]
+                    IN_FLIGHT.dec()
+                continue
+            self._send(pending, now)
+            in_flight += 1
+        SEND_QUEUE.set(len(self._queue))
+
+    def _send(self, pending, now):
+        self._tokens -= 1
+        pending.sent_at = now
+        pending.attempt += 1
+        self.transport.sendto(pending.payload, pending.key[0])
+        REQUESTS_SENT.inc()
+        self.wheel.schedule(now + pending.timeout, (pending, pending.attempt))
+
+    def _on_tick(self):
+        now = self._loop.time()
+        for pending, attempt in self.wheel.advance(now):
+            if pending.attempt != attempt or self._pending.get(pending.key) is not pending:
+                continue  # ya respondida o reenviada después
+            if pending.future.done():
+                self._pending.pop(pending.key, None)
+                IN_FLIGHT.dec()
+            elif pending.retries > 0:
+                pending.retries -= 1
+                pending.timeout *= 2
+                RETRANSMITS.inc()
+                self._queue.appendleft(pending)
+            else:
+                self._pending.pop(pending.key, None)
+                IN_FLIGHT.dec()
+                REQUEST_TIMEOUTS.inc()
+                pending.future.set_exception(TimeoutError(f"Sin respuesta de {pending.key[0][0]}"))
+        self._pump()
+        self._ticker = self._loop.call_later(self.wheel.tick, self._on_tick)
+
+
+def _typed(value):
+    """Tipo SMI para un valor de SET a partir de su tipo Python."""
+    if isinstance(value, tuple):
+        return OBJECT_IDENTIFIER, value
+    if isinstance(value, int):
+        return INTEGER, value
+    if isinstance(value, (str, bytes)):
+        return OCTET_STRING, value
+    return value  # ya viene como (tag, valor)
+
+
+class SnmpTransport:
+    """
+    Dueño del bucle asyncio (en un hilo daemon) y del multiplexor.
+    Es seguro llamarlo desde cualquier hilo.
+    """
+
+    def __init__(self, **mux_options):
+        self._mux_options = mux_options
+        self.mux = None
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._addresses = {}  # nombre -> (IP o excepción de la resolución, caduca)
+
+    def start(self):
+        with self._lock:
+            if self.loop is not None:
+                return self
+            ready = threading.Event()
+            self.loop = asyncio.new_event_loop()
+
+            def run():
+                asyncio.set_event_loop(self.loop)
+                self.mux = self.loop.run_until_complete(SnmpMultiplexer(**self._mux_options).start())
+                ready.set()
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="snmp-transport", daemon=True)
+            self._thread.start()
+            ready.wait()
+        return self
+
+    def stop(self):
+        with self._lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.mux.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+            self.loop = None
+
+    def run(self, coro, timeout=None):
+        """Ejecuta una corrutina en el bucle del transporte y espera su resultado."""
+        return asyncio.run_coroutine_threadsafe(coro, self.start().loop).result(timeout)
+
+    def session(self, host, community='public', port=161, timeout=1.0, retries=1):
+        return SnmpSession(self, host, community, port, timeout, retries)
+
+    # --- Resolución de nombres ---
+    def _cached(self, host, now):
+        entry = self._addresses.get(host)
+        return entry if entry is not None and entry[1] > now else None
+
+    def _store(self, host, address, now):
+        ttl = DNS_NEGATIVE_TTL if isinstance(address, OSError) else DNS_TTL
+        self._addresses[host] = (address, now + ttl)
+
+    def resolve(self, host):
+        """
+        Dirección IPv4 de `host` desde la caché; si no está, la resuelve
+        (bloqueando) y la guarda. Lanza OSError si el nombre no resuelve.
+        """
+        now = time.monotonic()
+        entry = self._cached(host, now)
+        if entry is None:
+            try:
+                address = socket.gethostbyname(host)
+            except OSError as e:
+                address = e
+            self._store(host, address, now)
+        else:
+            address = entry[0]
+        if isinstance(address, OSError):
+            raise type(address)(*address.args)
+        return address
+
+    def resolve_many(self, hosts):
+        """
+        Resuelve a la vez, con getaddrinfo del bucle, los nombres que no estén
+        en la caché: un sondeo no espera a cada DNS en serie.
+        """
+        now = time.monotonic()
+        pending = [host for host in dict.fromkeys(hosts) if self._cached(host, now) is None]
+        if not pending:
+            return
+
+        async def lookup():
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(
+                *(loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+                  for host in pending), return_exceptions=True)
+        for host, result in zip(pending, self.run(lookup())):
+            if isinstance(result, OSError):
+                self._store(host, result, now)
+            elif not isinstance(result, BaseException) and result:
+                self._store(host, result[0][4][0], now)
+
+    def poll_many(self, sessions, oids):
+        """
+        GET de los mismos OIDs a muchos agentes a la vez con una plantilla
+        precodificada. Devuelve {sesión: Response o excepción}.
+        """
+        template = ber.RequestTemplate(oids)
+
+        async def gather():
+            futures = [s._request(lambda rid, c=s.community: template.render(rid, c), s.timeout)
+                       for s in sessions]
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            return dict(zip(sessions, results))
+        return self.run(gather())
+
+
+class SnmpSession:
+    """
+    Sesión SNMPv2c con un agente sobre el transporte compartido.
+    get/walk/set son síncronas (interfaz de rmon_history); las variantes
+    a* son corrutinas para usar dentro del bucle del transporte.
+    """
+
+    def __init__(self, transport, host, community='public', port=161, timeout=1.0, retries=1,
+                 max_repetitions=10):
+        self.transport = transport
+        self.peer = (transport.resolve(host), port)
+        self.community = community
+        self.timeout = timeout
+        self.retries = retries
+        self.max_repetitions = max_repetitions
+
+    def _request(self, build, timeout=None):
+        return self.transport.mux.request(self.peer, build, timeout or self.timeout, self.retries)
+
+    async def _checked(self, build):
+        response = await self._request(build)
+        if response.error_status:
+            raise SnmpError(response.error_status, response.error_index)
+        return response
+
+    async def aget_many(self, oids):
+        template = ber.RequestTemplate(oids)
+        response = await self._checked(lambda rid: template.render(rid, self.community))
+        return response.varbinds
+
+    async def aget(self, oid):
+        (_, value), = await self.aget_many([oid])
+        if isinstance(value, VarbindException):
+            raise KeyError(oid)
+        return value
+
+    async def awalk(self, prefix, start=None):
+        """Recorre con GETBULK todas las instancias bajo `prefix`."""
+        prefix = tuple(prefix)
+        current = tuple(start) if start else prefix
+        rows = []
+        while True:
+            response = await self._checked(lambda rid, oid=current: ber.encode_message(
+                ber.GETBULK, rid, [(oid, None)], self.community,
+                max_repetitions=self.max_repetitions))
+            if not response.varbinds:
+                return rows
+            for oid, value in response.varbinds:
+                if value is ber.END_OF_MIB_VIEW_VALUE or oid[:len(prefix)] != prefix or oid <= current:
+                    return rows
+                rows.append((oid, value))
+                current = oid
+
+    async def aset(self, pairs):
+        varbinds = [(tuple(oid), _typed(value)) for oid, value in pairs]
+        await self._checked(lambda rid: ber.encode_message(ber.SET, rid, varbinds, self.community))
+
+    # --- Interfaz síncrona ---
+    def get(self, oid):
+        return self.transport.run(self.aget(oid))
+
+    def get_many(self, oids):
+        return self.transport.run(self.aget_many(oids))
+
+    def walk(self, prefix, start=None):
+        return iter(self.transport.run(self.awalk(prefix, start)))
+
+    def set(self, pairs):
+        self.transport.run(self.aset(pairs))
@@ -0,0 +1,262 @@
+"""
+Recorrido de tablas SNMP con GETBULK (ifTable/ifXTable y etherStatsTable).
+Cada petición lleva un varbind por columna, solo de las columnas que usa el
+monitor, y el agente devuelve max-repetitions filas de todas a la vez: un
+switch de 500 puertos se lee en unas pocas idas y vueltas en lugar de
+miles de GET.
+
+max-repetitions se ajusta por agente a su límite de tamaño de respuesta
+(BulkSizer): se empieza con un presupuesto que cabe en una trama Ethernet,
+se dobla mientras las respuestas llegan completas, se fija al tamaño
+recibido si el agente trunca la respuesta y, si responde tooBig, se busca
+por bisección entre el último tamaño aceptado y el rechazado. Lo
+aprendido se conserva entre sondeos. Un timeout no prueba nada sobre el
+tamaño (el agente puede estar caído): se reintenta una vez con el
+presupuesto inicial, que cabe en una trama, sin fijar un límite, y si el
+recorrido falla se recupera el presupuesto previo.
+"""
+import asyncio
+import threading
+import time
+
+import ber_codec as ber
+from metrics import REGISTRY
+from oid_table import get_table, IF_ENTRY
+from snmp_transport import SnmpError
+
+_REQUESTS = REGISTRY.counter('snmp_bulk_requests_total', 'Peticiones GETBULK de recorrido de tablas')
+BULK_OK = _REQUESTS.labels(result='ok')
+BULK_TRUNCATED = _REQUESTS.labels(result='truncated')
+BULK_TOO_BIG = _REQUESTS.labels(result='too_big')
+BULK_TIMEOUT = _REQUESTS.labels(result='timeout')
+WALK_SECONDS = REGISTRY.histogram('snmp_table_walk_seconds', 'Duración del recorrido de tablas de un agente').labels()
+
+TOO_BIG = 1
+
+# Columnas pedidas: con ifXTable los contadores de 64 bits y la velocidad en Mbps;
+# sin ella, los de 32 bits de ifTable
+IF_COLUMNS_HC = ('ifName', 'ifOperStatus', 'ifHighSpeed', 'ifHCInOctets', 'ifHCOutOctets',
+                 'ifHCInUcastPkts', 'ifHCOutUcastPkts', 'ifInErrors', 'ifOutErrors')
+IF_COLUMNS_32 = ('ifDescr', 'ifOperStatus', 'ifSpeed', 'ifInOctets', 'ifOutOctets',
+                 'ifInUcastPkts', 'ifOutUcastPkts', 'ifInErrors', 'ifOutErrors')
+ETHER_STATS_COLUMNS = ('etherStatsDataSource', 'etherStatsDropEvents', 'etherStatsBroadcastPkts',
+                       'etherStatsMulticastPkts', 'etherStatsCRCAlignErrors', 'etherStatsCollisions')
+
+OPER_STATUS = {1: 'up', 2: 'down', 3: 'testing', 4: 'unknown', 5: 'dormant', 6: 'notPresent',
+               7: 'lowerLayerDown'}
+
+
+class BulkSizer:
+    """
+    max-repetitions adaptativo de un agente a partir de un presupuesto de
+    bytes por respuesta y del tamaño medio observado de cada varbind.
+    """
+    INITIAL_VARBIND_BYTES = 24
+
+    def __init__(self, initial_bytes=1400, max_bytes=16384, min_bytes=484, max_repetitions=255):
+        self.budget = self.initial_bytes = initial_bytes
+        self.max_bytes = max_bytes
+        self.min_bytes = min_bytes
+        self.max_repetitions = max_repetitions
+        self.varbind_bytes = None
+        self.limit = None  # tamaño máximo de respuesta del agente, si se ha observado
+        self.good = 0      # mayor presupuesto que el agente ha aceptado
+
+    def repetitions(self, columns):
+        per_varbind = self.varbind_bytes or self.INITIAL_VARBIND_BYTES
+        return max(1, min(self.max_repetitions, int(self.budget / (columns * per_varbind))))
+
+    def record(self, varbinds, size, truncated, more):
+        """
+        Incorpora una respuesta: `truncated` si trajo menos varbinds de los
+        pedidos, `more` si el recorrido continúa (solo entonces se crece).
+        """
+        if varbinds:
+            observed = size / varbinds
+            self.varbind_bytes = observed if self.varbind_bytes is None else \
+                0.7 * self.varbind_bytes + 0.3 * observed
+        if truncated:
+            # El agente llenó lo que admite: ese es su límite
+            self.limit = self.budget = max(self.min_bytes, size)
+            return
+        self.good = max(self.good, self.budget)
+        if more:
+            self.budget = min(self.limit or self.max_bytes, self.max_bytes, self.budget * 2)
+
+    def shrink(self, too_big=True):
+        """
+        tooBig: bisección entre el último presupuesto aceptado y el rechazado
+        (o la mitad si no hay ninguno), que pasa a ser el límite del agente.
+        Timeout (`too_big` False): volver al presupuesto inicial sin fijar
+        límite; si ya se estaba ahí, no hay nada más que probar.
+        """
+        if not too_big:
+            if self.budget <= self.initial_bytes:
+                return False
+            self.budget = self.initial_bytes
+            return True
+        if self.budget <= self.min_bytes:
+            return False
+        if self.good and self.good < self.budget:
+            # Dentro de un 10% del último aceptado: quedarse con él
+            middle = (self.good + self.budget) // 2
+            budget = middle if self.budget - self.good > self.good // 10 else self.good
+        elif self.good:
+            # Rechazado un presupuesto ya aceptado (la estimación por varbind varió): margen del 20%
+            budget = self.good = int(self.budget * 0.8)
+        else:
+            budget = self.budget // 2
+        self.limit = self.budget = max(self.min_bytes, budget)
+        return True
+
+
+class InterfaceTable:
+    """Resultado del recorrido de un agente: filas por ifIndex y coste del recorrido."""
+    __slots__ = ('rows', 'counter_bits', 'requests', 'varbinds', 'bytes', 'rtt', 'elapsed')
+
+    def __init__(self):
+        self.rows = {}
+        self.counter_bits = 64
+        self.requests = 0
+        self.varbinds = 0
+        self.bytes = 0
+        self.rtt = None
+        self.elapsed = 0.0
+
+
+class TableWalker:
+    """
+    Recorre tablas de muchos agentes a la vez sobre el transporte compartido.
+
+    Args:
+        transport: SnmpTransport
+        initial_bytes: Presupuesto inicial por respuesta (cabe en una trama Ethernet)
+        max_bytes: Presupuesto máximo (respuestas mayores se fragmentan en IP)
+    """
+
+    def __init__(self, transport, initial_bytes=1400, max_bytes=16384, log_callback=None):
+        self.transport = transport
+        self.initial_bytes = initial_bytes
+        self.max_bytes = max_bytes
+        self.log_callback = log_callback
+        self._sizers = {}
+        self._no_hc = set()  # agentes sin ifXTable
+        self._lock = threading.Lock()
+
+    def sizer(self, agent):
+        with self._lock:
+            sizer = self._sizers.get(agent)
+            if sizer is None:
+                sizer = self._sizers[agent] = BulkSizer(self.initial_bytes, self.max_bytes)
+            return sizer
+
+    async def awalk(self, session, columns, sizer, stats):
+        """
+        Recorre las columnas (OIDs de columna) en paralelo con GETBULK.
+        Retorna {columna: [(instancia, valor)]}.
+        """
+        cursors = {column: column for column in columns}
+        result = {column: [] for column in columns}
+        active = list(columns)
+        budget = sizer.budget
+        try:
+            return await self._awalk(session, sizer, stats, cursors, result, active)
+        except TimeoutError:
+            # Agente caído: lo reducido por los timeouts no dice nada de su límite
+            sizer.budget = budget
+            raise
+
+    async def _awalk(self, session, sizer, stats, cursors, result, active):
+        while active:
+            reps = sizer.repetitions(len(active))
+            varbinds = [(cursors[column], None) for column in active]
+            try:
+                response = await session._request(lambda rid, vbs=varbinds, r=reps: ber.encode_message(
+                    ber.GETBULK, rid, vbs, session.community, max_repetitions=r))
+            except TimeoutError:
+                # Quizá una respuesta grande que se pierde: probar con menos filas
+                BULK_TIMEOUT.inc()
+                if sizer.shrink(too_big=False):
+                    continue
+                raise
+            stats.requests += 1
+            stats.bytes += len(response.raw)
+            if stats.rtt is None:
+                stats.rtt = response.rtt
+            if response.error_status == TOO_BIG:
+                BULK_TOO_BIG.inc()
+                if reps > 1 and sizer.shrink():
+                    continue
+                raise SnmpError(response.error_status, response.error_index)
+            if response.error_status:
+                raise SnmpError(response.error_status, response.error_index)
+
+            n = len(active)
+            done = set()
+            for i, (oid, value) in enumerate(response.varbinds):
+                column = active[i % n]
+                if column in done:
+                    continue
+                if value is ber.END_OF_MIB_VIEW_VALUE or oid[:len(column)] != column or oid <= cursors[column]:
+                    done.add(column)
+                    continue
+                result[column].append((oid[len(column):], value))
+                cursors[column] = oid
+            stats.varbinds += len(response.varbinds)
+            if not response.varbinds:
+                break
+            truncated = len(response.varbinds) < reps * n
+            active = [column for column in active if column not in done]
+            (BULK_TRUNCATED if truncated else BULK_OK).inc()
+            sizer.record(len(response.varbinds), len(response.raw), truncated, bool(active))
+        return result
+
+    async def _walk_symbols(self, session, symbols, sizer, stats):
+        table = get_table()
+        objects = [table.symbol(name) for name in symbols]
+        columns = await self.awalk(session, [obj.oid for obj in objects], sizer, stats)
+        rows = {}
+        for obj in objects:
+            for instance, value in columns[obj.oid]:
+                rows.setdefault(instance, {})[obj.field] = obj.decode(value)
+        return rows
+
+    async def ainterfaces(self, session, agent, rmon=False):
+        """ifTable/ifXTable (y etherStatsTable si `rmon`) de un agente como InterfaceTable."""
+        start = time.perf_counter()
+        sizer = self.sizer(agent)
+        stats = InterfaceTable()
+        hc = agent not in self._no_hc
+        rows = await self._walk_symbols(session, IF_COLUMNS_HC if hc else IF_COLUMNS_32, sizer, stats)
+        if hc and rows and not any('IN_Octets' in row for row in rows.values()):
+            # Sin ifXTable: repetir con los contadores de 32 bits y recordarlo
+            with self._lock:
+                self._no_hc.add(agent)
+            hc = False
+            rows = await self._walk_symbols(session, IF_COLUMNS_32, sizer, stats)
+        stats.counter_bits = 64 if hc else 32
+        if rmon:
+            # etherStatsDataSource apunta a ifIndex.N: se añaden a esa interfaz
+            source = IF_ENTRY + (1,)
+            for row in (await self._walk_symbols(session, ETHER_STATS_COLUMNS, sizer, stats)).values():
+                data_source = row.pop('Data_Source', None)
+                if isinstance(data_source, tuple) and data_source[:-1] == source:
+                    target = rows.get((data_source[-1],))
+                    if target is not None:
+                        target.update(row)
+        stats.rows = {instance[0]: row for instance, row in rows.items() if len(instance) == 1}
+        stats.elapsed = time.perf_counter() - start
+        WALK_SECONDS.observe(stats.elapsed)
+        return stats
+
+    def walk_interfaces(self, sessions, rmon=False):
+        """
+        Interfaces de muchos agentes a la vez: {sesión: InterfaceTable o
+        excepción}. `sessions` es {sesión: nombre del agente}.
+        """
+        async def gather():
+            results = await asyncio.gather(*(self.ainterfaces(session, agent, rmon)
+                                              for session, agent in sessions.items()),
+                                           return_exceptions=True)
+            return dict(zip(sessions, results))
+        return self.transport.run(gather())
@@ -0,0 +1,217 @@
+"""
+Módulo de ejecución de operaciones en segundo plano.
+Las operaciones se ejecutan en un pool de hilos acotado con límites de
+concurrencia por tipo de operación y devuelven un TaskHandle que permite
+cancelarlas, seguir su progreso y reaccionar al terminar.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Estados de una tarea
+PENDING = "pendiente"
+RUNNING = "ejecutando"
+DONE = "completada"
+CANCELLED = "cancelada"
+FAILED = "fallida"
+
+
+class TaskCancelled(Exception):
+    """Se lanza dentro de una tarea cuando se solicitó su cancelación."""
+
+
+class TaskRejected(Exception):
+    """La cola de la operación está llena."""
+
+
+class TaskHandle:
+    """
+    Manejador de una operación lanzada en segundo plano.
+    Los callbacks se invocan desde el hilo de trabajo: quien toque Tkinter
+    debe reenviarlos con root.after().
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.status = PENDING
+        self.progress = (0, 0)
+        self.error = None
+        self._result = None
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._lock = threading.Lock()
+        self._done_callbacks = []
+        self._progress_callbacks = []
+
+    # --- Consulta ---
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self._done_event.is_set()
+
+    def wait(self, timeout=None):
+        """Espera a que termine. Retorna True si terminó."""
+        return self._done_event.wait(timeout)
+
+    def result(self, timeout=None):
+        """Resultado de la operación (relanza su excepción si falló)."""
+        if not self._done_event.wait(timeout):
+            raise TimeoutError(f"La tarea '{self.operation}' sigue en curso")
+        if self.status == FAILED:
+            raise self.error
+        if self.status == CANCELLED:
+            raise TaskCancelled(self.operation)
+        return self._result
+
+    # --- Control ---
+    def cancel(self):
+        """Solicita la cancelación; la tarea la atiende en su próximo punto de control."""
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """Punto de control cooperativo para el código de la tarea."""
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.operation)
+
+    def report_progress(self, done, total):
+        self.progress = (done, total)
+        for callback in list(self._progress_callbacks):
+            callback(self)
+
+    # --- Callbacks ---
+    def add_done_callback(self, fn):
+        """fn(handle) al terminar; inmediato si ya terminó."""
+        with self._lock:
+            if not self._done_event.is_set():
+                self._done_callbacks.append(fn)
+                return
+        fn(self)
+
+    def add_progress_callback(self, fn):
+        self._progress_callbacks.append(fn)
+
+    def _start(self):
+        """Pasa a RUNNING si no se canceló ni terminó antes de empezar."""
+        with self._lock:
+            if self._done_event.is_set() or self._cancel_event.is_set():
+                return False
+            self.status = RUNNING
+            return True
+
+    def _abandon(self):
+        """Termina como cancelada una tarea que ya no llegará a ejecutarse."""
+        with self._lock:
+            if self.status != PENDING:
+                return
+        self._finish(CANCELLED)
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            if self._done_event.is_set():
+                return  # ya terminada (p. ej. cancelada al cerrar el ejecutor)
+            self.status = status
+            self._result = result
+            self.error = error
+            self._done_event.set()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class TaskExecutor:
+    """
+    Pool de hilos compartido con límites por operación.
+
+    Args:
+        max_workers: Hilos totales del pool
+        limits: Dict operación -> ejecuciones simultáneas permitidas
+        max_pending: Tareas en espera por operación antes de rechazar
+    """
+
+    def __init__(self, max_workers=8, limits=None, max_pending=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="monitor")
+        self.limits = dict(limits or {})
+        self.max_pending = max_pending
+        self._running = {}
+        self._pending = {}
+        self._active = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, operation, fn, *args, **kwargs):
+        """
+        Encola fn(*args, task=handle, **kwargs) respetando el límite de la
+        operación. Lanza TaskRejected si su cola está llena.
+        """
+        handle = TaskHandle(operation)
+        with self._lock:
+            if self._closed:
+                raise TaskRejected(f"Ejecutor cerrado: no se admiten operaciones '{operation}'")
+            running = self._running.get(operation, 0)
+            pending = self._pending.setdefault(operation, deque())
+            if running < self.limits.get(operation, 1):
+                self._running[operation] = running + 1
+                self._active.add(handle)
+                self._dispatch(handle, fn, args, kwargs)
+            elif len(pending) < self.max_pending:
+                self._active.add(handle)
+                pending.append((handle, fn, args, kwargs))
+            else:
+                raise TaskRejected(f"Demasiadas operaciones '{operation}' en cola")
+        return handle
+
+    def _dispatch(self, handle, fn, args, kwargs):
+        self._pool.submit(self._run, handle, fn, args, kwargs)
+
+    def _run(self, handle, fn, args, kwargs):
+        try:
+            if not handle._start():
+                handle._finish(CANCELLED)
+                return
+            result = fn(*args, task=handle, **kwargs)
+            handle._finish(CANCELLED if handle.cancel_requested else DONE, result)
+        except TaskCancelled:
+            handle._finish(CANCELLED)
+        except Exception as e:
+            handle._finish(FAILED, error=e)
+        finally:
+            self._release(handle)
+
+    def _release(self, handle):
+        with self._lock:
+            self._active.discard(handle)
+            operation = handle.operation
+            pending = self._pending.get(operation)
+            if pending and not self._closed:
+                self._dispatch(*pending.popleft())
+            else:
+                self._running[operation] -= 1
+
+    def active(self, operation=None):
+        """Tareas pendientes o en curso (opcionalmente de una operación)."""
+        with self._lock:
+            return [h for h in self._active if operation is None or h.operation == operation]
+
+    def cancel_all(self):
+        for handle in self.active():
+            handle.cancel()
+
+    def shutdown(self, wait=False):
+        """
+        Cancela todo y cierra el pool. Las tareas que no llegaron a empezar
+        (en cola o descartadas por el pool) terminan como canceladas.
+        """
+        with self._lock:
+            self._closed = True
+            for pending in self._pending.values():
+                pending.clear()
+            handles = list(self._active)
+        for handle in handles:
+            handle.cancel()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        for handle in handles:
+            handle._abandon()
+        with self._lock:
+            self._active.difference_update(h for h in handles if h.done())
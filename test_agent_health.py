@@ -0,0 +1,141 @@
+"""
+Pruebas de la máquina de estados del circuit breaker y del registro de
+salud por agente.
+
+    python -m pytest test_agent_health.py
+"""
+import unittest
+
+from agent_health import (AgentHealthRegistry, CircuitBreaker, RttEstimator,
+                          CLOSED, OPEN, HALF_OPEN)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def opened(self, now=0.0):
+        breaker = CircuitBreaker(failure_threshold=3, open_interval=5.0,
+                                 max_open_interval=40.0, probe_timeout=10.0)
+        for _ in range(3):
+            breaker.record_failure(now)
+        self.assertEqual(breaker.state, OPEN)
+        return breaker
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3)
+        breaker.record_failure(0.0)
+        breaker.record_failure(0.0)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow_request(0.0))
+        breaker.record_failure(0.0)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow_request(1.0))
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3)
+        breaker.record_failure(0.0)
+        breaker.record_failure(0.0)
+        breaker.record_success()
+        breaker.record_failure(0.0)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_single_probe_when_open_interval_expires(self):
+        breaker = self.opened()
+        self.assertAlmostEqual(breaker.seconds_until_probe(2.0), 3.0)
+        self.assertTrue(breaker.allow_request(5.0))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        # Solo un sondeo de prueba a la vez
+        self.assertFalse(breaker.allow_request(5.1))
+
+    def test_probe_success_closes(self):
+        breaker = self.opened()
+        breaker.allow_request(5.0)
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.open_interval, 5.0)
+        self.assertTrue(breaker.allow_request(5.1))
+
+    def test_probe_failure_reopens_with_backoff(self):
+        breaker = self.opened()
+        breaker.allow_request(5.0)
+        breaker.record_failure(5.0)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.open_interval, 10.0)
+        self.assertFalse(breaker.allow_request(14.0))
+        self.assertTrue(breaker.allow_request(15.0))
+        breaker.record_failure(15.0)
+        breaker.allow_request(35.0)
+        breaker.record_failure(35.0)
+        breaker.allow_request(75.0)
+        breaker.record_failure(75.0)
+        self.assertEqual(breaker.open_interval, 40.0)
+
+    def test_release_returns_the_probe(self):
+        breaker = self.opened()
+        self.assertTrue(breaker.allow_request(5.0))
+        breaker.release()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.open_interval, 5.0)
+        self.assertTrue(breaker.allow_request(5.1))
+
+    def test_release_does_not_touch_recorded_result(self):
+        breaker = self.opened()
+        breaker.allow_request(5.0)
+        breaker.record_success()
+        breaker.release()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker = self.opened()
+        breaker.allow_request(5.0)
+        breaker.record_failure(5.0)
+        breaker.release()
+        self.assertFalse(breaker.allow_request(6.0))
+
+    def test_lost_probe_falls_back_to_open(self):
+        breaker = self.opened()
+        self.assertTrue(breaker.allow_request(5.0))
+        # Nadie registra el resultado del sondeo de prueba
+        self.assertFalse(breaker.allow_request(14.9))
+        self.assertFalse(breaker.allow_request(15.0))
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.open_interval, 10.0)
+        self.assertTrue(breaker.allow_request(25.0))
+        self.assertEqual(breaker.state, HALF_OPEN)
+
+
+class RttEstimatorTest(unittest.TestCase):
+
+    def test_timeout_follows_rtt_and_backoff(self):
+        rtt = RttEstimator(initial_timeout=1.0, min_timeout=0.2, max_timeout=5.0)
+        self.assertEqual(rtt.timeout(), 1.0)
+        rtt.update(0.1)
+        self.assertAlmostEqual(rtt.timeout(), 0.3)
+        rtt.backoff()
+        rtt.backoff()
+        self.assertAlmostEqual(rtt.timeout(), 1.2)
+        rtt.update(0.1)
+        self.assertEqual(rtt.backoff_factor, 1)
+        for _ in range(10):
+            rtt.backoff()
+        self.assertEqual(rtt.timeout(), 5.0)
+
+
+class AgentHealthRegistryTest(unittest.TestCase):
+
+    def test_unpolled_probe_is_released(self):
+        health = AgentHealthRegistry(failure_threshold=1, open_interval=0.0)
+        health.record_failure('a')
+        self.assertTrue(health.allow_request('a'))
+        health.release('a')
+        self.assertTrue(health.allow_request('a'))
+        health.record_success('a', 0.05)
+        self.assertEqual(health.snapshot()[0]['Circuit'], CLOSED)
+
+    def test_no_retries_while_failing(self):
+        health = AgentHealthRegistry(retries=2, max_attempt_budget=3.0)
+        self.assertEqual(health.retries_for('a'), 2)
+        health.record_failure('a')
+        self.assertEqual(health.retries_for('a'), 0)
+        self.assertLessEqual(health.attempt_budget('a'), 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
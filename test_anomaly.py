@@ -0,0 +1,82 @@
+"""
+Pruebas del detector de anomalías EWMA (picos, deriva y calentamiento).
+
+    python -m pytest test_anomaly.py
+"""
+import math
+import random
+import unittest
+
+from anomaly import AnomalyDetector
+
+
+def rows(cycle, agents=('a', 'b', 'c'), util=None, err=0.01, key='Agent'):
+    """Un sondeo con carga ~30 % y algo de ruido determinista por agente."""
+    util = util or {}
+    return [{key: agent, 'Utilization_%': util.get(agent, 30.0 + 2.0 * math.sin(cycle + i)),
+             'Error_Rate_%': err}
+            for i, agent in enumerate(agents)]
+
+
+class AnomalyDetectorTest(unittest.TestCase):
+
+    def test_no_flags_during_warmup(self):
+        detector = AnomalyDetector(warmup=10)
+        for cycle in range(9):
+            self.assertEqual(detector.annotate(rows(cycle, util={'a': 30.0 + 50 * (cycle % 2)})), 0)
+
+    def test_spike_is_flagged_on_its_series_only(self):
+        detector = AnomalyDetector()
+        for cycle in range(30):
+            self.assertEqual(detector.annotate(rows(cycle)), 0)
+        batch = rows(30, util={'b': 95.0})
+        self.assertEqual(detector.annotate(batch), 1)
+        flagged = {row['Agent']: row['Anomaly'] for row in batch}
+        self.assertEqual(flagged, {'a': '', 'b': 'Util↑', 'c': ''})
+        self.assertGreater(batch[1]['Anomaly_Score'], detector.threshold)
+
+    def test_steady_load_is_not_an_anomaly(self):
+        # Un enlace siempre al 90 % no alarma por su carga habitual
+        detector = AnomalyDetector()
+        flagged = sum(detector.annotate(rows(cycle, util={'a': 90.0})) for cycle in range(100))
+        self.assertEqual(flagged, 0)
+
+    def test_slow_drift_is_flagged(self):
+        detector = AnomalyDetector()
+        rng = random.Random(3)
+        marks = []
+        for cycle in range(300):
+            util = 30.0 + rng.uniform(-1, 1) + (0.2 * (cycle - 100) if cycle > 100 else 0.0)
+            batch = rows(cycle, agents=('a',), util={'a': util})
+            detector.annotate(batch)
+            marks.append(batch[0]['Anomaly'])
+        self.assertFalse(any(marks[:100]))
+        self.assertIn('Util↗', marks[100:])
+
+    def test_missing_values_do_not_update(self):
+        detector = AnomalyDetector(warmup=2)
+        detector.annotate([{'Agent': 'a', 'Utilization_%': 10.0, 'Error_Rate_%': 0.0}])
+        detector.annotate([{'Agent': 'a', 'Utilization_%': float('nan'), 'Error_Rate_%': float('nan')}])
+        self.assertEqual(detector.count[0], 1)
+
+    def test_custom_key_and_growth(self):
+        detector = AnomalyDetector(key='Interface', capacity=2)
+        agents = [f'10.0.0.1:161/{i}' for i in range(1, 6)]
+        for cycle in range(20):
+            detector.annotate(rows(cycle, agents=agents, key='Interface'))
+        self.assertEqual(len(detector), 5)
+        batch = rows(20, agents=agents, util={agents[4]: 99.0}, key='Interface')
+        self.assertEqual(detector.annotate(batch), 1)
+        self.assertEqual(batch[4]['Anomaly'], 'Util↑')
+
+    def test_reset_forgets_baselines(self):
+        detector = AnomalyDetector()
+        for cycle in range(30):
+            detector.annotate(rows(cycle))
+        detector.reset()
+        self.assertEqual(len(detector), 0)
+        self.assertEqual(detector.annotate(rows(0, util={'a': 99.0})), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Pruebas del códec BER rápido: ida y vuelta propia y, si pysnmp está
+instalado, la misma validación que `main.py bench-ber` contra pysnmp.
+
+    python -m pytest test_ber_codec.py
+"""
+import importlib.util
+import random
+import unittest
+
+import ber_codec as ber
+from oid_table import (INTEGER, OCTET_STRING, OBJECT_IDENTIFIER, IP_ADDRESS, COUNTER32,
+                       GAUGE32, TIMETICKS, COUNTER64, get_table)
+
+HAS_PYSNMP = importlib.util.find_spec('pysnmp') is not None
+
+SYS_UPTIME = (1, 3, 6, 1, 2, 1, 1, 3, 0)
+
+
+def request_oids(rng):
+    table = get_table()
+    return [table.symbol(name).oid + (rng.randint(1, 48),)
+            for name in ('ifInOctets', 'ifOutOctets', 'ifInUcastPkts', 'ifInErrors',
+                         'ifHCInOctets', 'sysUpTime', 'ifDescr', 'sysObjectID')]
+
+
+def plain(varbinds):
+    """Varbinds con los memoryview copiados a bytes, para comparar."""
+    return [(oid, bytes(v) if isinstance(v, memoryview) else v) for oid, v in varbinds]
+
+
+class RoundTripTest(unittest.TestCase):
+
+    def test_every_value_type(self):
+        varbinds = [
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 8, 1), (INTEGER, 1)),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 8, 2), (INTEGER, -2 ** 31)),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 10, 1), (COUNTER32, 2 ** 32 - 1)),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 5, 1), (GAUGE32, 128)),
+            (SYS_UPTIME, (TIMETICKS, 0)),
+            ((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6, 1), (COUNTER64, 2 ** 64 - 1)),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 2, 1), (OCTET_STRING, b'')),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 6, 1), (OCTET_STRING, bytes(range(256)) * 2)),
+            ((1, 3, 6, 1, 2, 1, 1, 2, 0), (OBJECT_IDENTIFIER, (1, 3, 6, 1, 4, 1, 2 ** 32 - 1, 0))),
+            ((1, 3, 6, 1, 2, 1, 4, 20, 1, 1, 10, 0, 0, 1), (IP_ADDRESS, '10.0.0.1')),
+        ]
+        response = ber.decode_response(ber.encode_message(ber.RESPONSE, 0x7FFFFFFF, varbinds, 'privada'))
+        self.assertEqual(response.request_id, 0x7FFFFFFF)
+        self.assertEqual(response.community, b'privada')
+        self.assertEqual((response.error_status, response.error_index), (0, 0))
+        self.assertEqual(plain(response.varbinds), [(oid, value) for oid, (_, value) in varbinds])
+        self.assertIsInstance(response.varbinds[7][1], memoryview)
+
+    def test_exceptions_and_numeric_only(self):
+        # encode_value no codifica excepciones: el agente las envía como TLV vacíos
+        varbinds = [
+            (SYS_UPTIME, ber.encode_value(TIMETICKS, 12345)),
+            ((1, 3, 6, 1, 2, 1, 1, 5, 0), ber.encode_value(OCTET_STRING, b'sw1')),
+            ((1, 3, 6, 1, 2, 1, 99, 0), ber._tlv(ber.NO_SUCH_INSTANCE, b'')),
+            ((1, 3, 6, 1, 2, 1, 99, 1), ber._tlv(ber.END_OF_MIB_VIEW, b'')),
+        ]
+        pdu = ber._tlv(ber.RESPONSE, ber._encode_int(42) + ber._encode_int(0) + ber._encode_int(0) +
+                       ber._tlv(ber.SEQUENCE, b''.join(ber._tlv(ber.SEQUENCE, ber.encode_oid(oid) + value)
+                                                       for oid, value in varbinds)))
+        data = ber._tlv(ber.SEQUENCE, ber._encode_int(1) + ber._tlv(OCTET_STRING, b'public') + pdu)
+        varbinds = ber.decode_response(data).varbinds
+        self.assertIs(varbinds[2][1], ber.NO_SUCH_INSTANCE_VALUE)
+        self.assertIs(varbinds[3][1], ber.END_OF_MIB_VIEW_VALUE)
+        self.assertFalse(varbinds[2][1])
+        self.assertEqual(ber.decode_response(data, numeric_only=True).varbinds, [(SYS_UPTIME, 12345)])
+        self.assertEqual(ber.peek_request_id(data), 42)
+
+    def test_template_matches_general_path(self):
+        rng = random.Random(7)
+        oids = request_oids(rng)
+        ids = ber.RequestIdAllocator(rng)
+        for pdu_type in (ber.GET, ber.GETNEXT, ber.GETBULK):
+            template = ber.RequestTemplate(oids, pdu_type, max_repetitions=25)
+            for community in ('public', 'otra-comunidad', 'public'):
+                rid = ids.next()
+                self.assertEqual(bytes(template.render(rid, community)),
+                                 ber.encode_message(pdu_type, rid, [(oid, None) for oid in oids],
+                                                    community, max_repetitions=25))
+
+    def test_request_ids_are_four_bytes(self):
+        ids = ber.RequestIdAllocator(random.Random(1))
+        for _ in range(1000):
+            self.assertTrue(ber.REQUEST_ID_MIN <= ids.next() <= ber.REQUEST_ID_MAX)
+
+    def test_malformed_datagrams(self):
+        data = ber.encode_message(ber.RESPONSE, 1, [(SYS_UPTIME, (TIMETICKS, 1))])
+        for broken in (data[:-1], data[:5], b'', b'\x04\x00'):
+            with self.assertRaises(ber.BerError):
+                ber.decode_response(broken)
+        with self.assertRaises(ber.BerError):
+            ber.decode_response(ber.encode_message(ber.GET, 1, [(SYS_UPTIME, None)]))
+
+
+@unittest.skipUnless(HAS_PYSNMP, "pysnmp no está instalado")
+class PysnmpCompatibilityTest(unittest.TestCase):
+    """Las comprobaciones 1) y 2) de `bench-ber` como prueba automática."""
+    checks = 50
+
+    def setUp(self):
+        from cli import _pysnmp_message
+        self.pysnmp_message = _pysnmp_message
+        self.rng = random.Random(1234)
+        self.oids = request_oids(self.rng)
+        self.ids = ber.RequestIdAllocator(self.rng)
+
+    def test_requests_match_pysnmp(self):
+        for pdu_type in (ber.GET, ber.GETBULK):
+            template = ber.RequestTemplate(self.oids, pdu_type, max_repetitions=20)
+            for _ in range(self.checks):
+                rid = self.ids.next()
+                reference, _, _ = self.pysnmp_message(pdu_type, rid, [(oid, None) for oid in self.oids],
+                                                      'public', 20)
+                self.assertEqual(bytes(template.render(rid, 'public')), reference)
+
+    def test_decodes_pysnmp_responses(self):
+        rng = self.rng
+        _, proto, rfc1905 = self.pysnmp_message(ber.GET, 1, [], 'public')
+        factories = [
+            lambda: (proto.Counter32, rng.randrange(2 ** 32)),
+            lambda: (proto.Counter64, rng.randrange(2 ** 64)),
+            lambda: (proto.Integer, rng.randint(-2 ** 31, 2 ** 31 - 1)),
+            lambda: (proto.TimeTicks, rng.randrange(2 ** 32)),
+            lambda: (proto.Gauge32, rng.randrange(2 ** 32)),
+            lambda: (proto.OctetString, bytes(rng.randrange(256) for _ in range(rng.randint(0, 40)))),
+            lambda: (proto.ObjectIdentifier, (1, 3, 6, 1, 4, 1, rng.randint(1, 70000), rng.randint(0, 300))),
+        ]
+        for _ in range(self.checks):
+            rid = self.ids.next()
+            expected, varbinds = [], []
+            for oid in self.oids:
+                cls, value = rng.choice(factories)()
+                expected.append((oid, value))
+                varbinds.append((oid, cls(value)))
+            varbinds.append(((1, 3, 6, 1, 2, 1, 99, 0), rfc1905.noSuchInstance))
+            expected.append(((1, 3, 6, 1, 2, 1, 99, 0), ber.NO_SUCH_INSTANCE_VALUE))
+            data, _, _ = self.pysnmp_message(ber.RESPONSE, rid, varbinds, 'public')
+            decoded = ber.decode_response(data)
+            self.assertEqual(decoded.request_id, rid)
+            self.assertEqual(plain(decoded.varbinds), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Pruebas de ida y vuelta de HistoryStore: lo que se guarda con append,
+append_many, save y load debe volver igual con rows().
+
+    python -m pytest test_history_store.py
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from history_store import HistoryStore, SNMP_SCHEMA
+
+START = datetime(2024, 3, 1, 12, 0, 0)
+
+
+def make_rows(agent, n, offset=0, name=None):
+    """Filas SNMP de `agent` cada 30 s, con contadores crecientes."""
+    rows = []
+    for i in range(offset, offset + n):
+        rows.append({
+            'Agent': agent,
+            'Device_Type': 'Switch HP',
+            'Device_Name': name or f'{agent}-sw',
+            'Speed_Mbps': 1000,
+            'Uptime_Days': 10 + i // 2880,
+            'IN_Octets': 1_000_000 + i * 12_345,
+            'OUT_Octets': 800_000 + i * 6_789,
+            'IN_Packets': 1_000 + i * 17,
+            'OUT_Packets': 900 + i * 13,
+            'IN_Errors': i // 7,
+            'OUT_Errors': i // 11,
+            'Total_Data_GB': round(i * 0.01, 2),
+            'Utilization_%': round((i * 7) % 100 + 0.25, 2),
+            'Error_Rate_%': round((i % 13) * 0.0001, 4),
+            'Status': 'OK' if i % 5 else 'WARNING',
+            'Anomaly': None,
+            'timestamp': (START + timedelta(seconds=30 * i)).isoformat(),
+        })
+    return rows
+
+
+class HistoryStoreRoundTripTest(unittest.TestCase):
+    chunk_samples = 8  # bloques pequeños para cruzar varios límites
+
+    def store(self):
+        return HistoryStore(SNMP_SCHEMA, chunk_samples=self.chunk_samples)
+
+    def assertRowsEqual(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for got, want in zip(actual, expected):
+            self.assertEqual(set(got), set(want))
+            for field, value in want.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(got[field], value, places=6, msg=field)
+                else:
+                    self.assertEqual(got[field], value, field)
+
+    def test_append(self):
+        store = self.store()
+        rows = make_rows('a', 30) + make_rows('b', 5)
+        for row in rows:
+            store.append([row])
+        self.assertEqual(len(store), 35)
+        self.assertRowsEqual(store.rows('a'), rows[:30])
+        self.assertRowsEqual(store.rows('b'), rows[30:])
+
+    def test_append_many(self):
+        store = self.store()
+        rows = make_rows('a', 30) + make_rows('b', 5)
+        store.append_many(rows)
+        self.assertRowsEqual(store.rows('a'), rows[:30])
+        self.assertRowsEqual(store.rows('b'), rows[30:])
+
+    def test_append_many_continues_open_chunk(self):
+        store = self.store()
+        rows = make_rows('a', 45)
+        store.append(rows[:3])
+        store.append_many(rows[3:20])
+        store.append_many(rows[20:21])
+        store.append(rows[21:22])
+        store.append_many(rows[22:])
+        self.assertRowsEqual(store.rows('a'), rows)
+
+    def test_append_many_seals_only_new_chunks(self):
+        store = self.store()
+        store.append_many(make_rows('a', 3 * self.chunk_samples + 2))
+        chunks = store._series['a'].chunks
+        earlier = [chunk.data for chunk in chunks[:-1]]
+        store.append_many(make_rows('a', 2 * self.chunk_samples, offset=3 * self.chunk_samples + 2))
+        chunks = store._series['a'].chunks
+        # Los bloques ya sellados no se vuelven a copiar
+        for before, chunk in zip(earlier, chunks):
+            self.assertIs(chunk.data, before)
+        for chunk in chunks[:-1]:
+            self.assertTrue(all(isinstance(buf, bytes) for buf in chunk.data))
+        self.assertTrue(all(isinstance(buf, bytearray) for buf in chunks[-1].data))
+
+    def test_counter_wrap(self):
+        rows = make_rows('a', 12)
+        for i, row in enumerate(rows):
+            # Contador de 32 bits que da la vuelta y uptime que se reinicia
+            row['IN_Octets'] = (2 ** 32 - 50_000 + i * 10_000) % 2 ** 32
+            row['Uptime_Days'] = 400 if i < 6 else 0
+        for append in ('append', 'append_many'):
+            store = self.store()
+            getattr(store, append)(rows)
+            self.assertRowsEqual(store.rows('a'), rows)
+
+    def test_none_values(self):
+        rows = make_rows('a', 10)
+        rows[3]['IN_Errors'] = None
+        rows[4]['Utilization_%'] = None
+        rows[5]['Status'] = None
+        rows[6]['Device_Name'] = None
+        expected = [dict(row) for row in rows]
+        expected[3]['IN_Errors'] = 0
+        expected[4]['Utilization_%'] = 0.0
+        for append in ('append', 'append_many'):
+            store = self.store()
+            getattr(store, append)(rows)
+            self.assertRowsEqual(store.rows('a'), expected)
+
+    def test_static_changes(self):
+        rows = make_rows('a', 20)
+        for row in rows[7:15]:
+            row['Device_Name'] = 'renombrado'
+            row['Speed_Mbps'] = 10000
+        for append in ('append', 'append_many'):
+            store = self.store()
+            getattr(store, append)(rows)
+            self.assertEqual(len(store._series['a'].statics), 3)
+            self.assertRowsEqual(store.rows('a'), rows)
+            # Un rango que empieza a mitad de serie conserva sus estáticos
+            self.assertRowsEqual(store.rows('a', start=rows[10]['timestamp']), rows[10:])
+
+    def test_range_bounds(self):
+        store = self.store()
+        rows = make_rows('a', 40)
+        store.append_many(rows)
+        self.assertRowsEqual(store.rows('a', rows[9]['timestamp'], rows[25]['timestamp']), rows[9:26])
+        self.assertEqual(store.rows('a', start=(START + timedelta(days=1)).isoformat()), [])
+        self.assertEqual(store.rows('desconocido'), [])
+
+    def test_save_load(self):
+        store = self.store()
+        rows = make_rows('a', 27) + make_rows('b', 3, name='otro')
+        rows[11]['Device_Name'] = 'cambio'
+        rows[12]['IN_Octets'] = 5
+        store.append_many(rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = store.save(os.path.join(tmp, 'sub', 'history.bin'))
+            loaded = HistoryStore.load(path)
+        self.assertEqual(loaded.chunk_samples, self.chunk_samples)
+        self.assertEqual(sorted(loaded.agents()), ['a', 'b'])
+        self.assertRowsEqual(loaded.rows('a'), rows[:27])
+        self.assertRowsEqual(loaded.rows('b'), rows[27:])
+        # El último bloque cargado sigue abierto para nuevas muestras
+        more = make_rows('a', 10, offset=27)
+        loaded.append(more[:4])
+        loaded.append_many(more[4:])
+        self.assertRowsEqual(loaded.rows('a'), rows[:27] + more)
+
+    def test_load_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'no-history.bin')
+            with open(path, 'wb') as f:
+                f.write(b'nada')
+            with self.assertRaises(ValueError):
+                HistoryStore.load(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
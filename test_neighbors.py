@@ -0,0 +1,64 @@
+"""
+Pruebas de la lectura de vecinos por SNMP (ipNetToMediaTable).
+
+    python -m pytest test_neighbors.py
+"""
+import unittest
+
+from ber_codec import RESPONSE, encode_message, decode_response
+from neighbors import snmp_neighbors
+from oid_table import INTEGER, OCTET_STRING, IP_ADDRESS, IP_NET_TO_MEDIA_ENTRY
+
+
+class FakeSession:
+    """
+    Sesión que recorre una ipNetToMediaTable con los valores tal como los
+    entrega el transporte: decodificados por ber_codec desde un datagrama,
+    de modo que los OCTET STRING llegan como memoryview.
+    """
+    peer = ('192.0.2.254', 161)
+
+    def __init__(self, entries):
+        varbinds = []
+        for column, tag in ((1, INTEGER), (2, OCTET_STRING), (3, IP_ADDRESS), (4, INTEGER)):
+            for if_index, ip, mac, media_type in entries:
+                instance = (if_index,) + tuple(int(p) for p in ip.split('.'))
+                value = {1: if_index, 2: mac, 3: ip, 4: media_type}[column]
+                varbinds.append((IP_NET_TO_MEDIA_ENTRY + (column,) + instance, (tag, value)))
+        self.varbinds = decode_response(encode_message(RESPONSE, 1, varbinds)).varbinds
+
+    def walk(self, prefix, start=None):
+        for oid, value in self.varbinds:
+            if oid[:len(prefix)] == prefix:
+                yield oid, value
+
+
+class SnmpNeighborsTest(unittest.TestCase):
+
+    def test_macs_from_memoryview_are_hex(self):
+        # Los bytes de estas MAC son UTF-8 válido: no deben leerse como texto
+        session = FakeSession([
+            (2, '192.0.2.10', bytes.fromhex('001a2b3c4d5e'), 3),
+            (2, '192.0.2.11', b'AAAAAA', 4),
+            (3, '192.0.2.12', bytes.fromhex('f0debc9a7856'), 3),
+        ])
+        self.assertIsInstance(session.varbinds[3][1], memoryview)
+        found = {n.ip: n for n in snmp_neighbors(session)}
+        self.assertEqual(found['192.0.2.10'].mac, '00:1a:2b:3c:4d:5e')
+        self.assertEqual(found['192.0.2.11'].mac, '41:41:41:41:41:41')
+        self.assertEqual(found['192.0.2.12'].mac, 'f0:de:bc:9a:78:56')
+        self.assertEqual(found['192.0.2.10'].iface, 2)
+        self.assertEqual(found['192.0.2.10'].source, 'snmp:192.0.2.254')
+
+    def test_media_type_sets_state(self):
+        session = FakeSession([
+            (1, '192.0.2.20', bytes(6), 3),   # dinámica: sin confirmar
+            (1, '192.0.2.21', bytes(6), 4),   # estática
+            (1, '192.0.2.22', bytes(6), 2),   # inválida: se descarta
+        ])
+        states = {n.ip: n.state for n in snmp_neighbors(session)}
+        self.assertEqual(states, {'192.0.2.20': 'STALE', '192.0.2.21': 'PERMANENT'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Pruebas del motor de diferencias entre snapshots, en memoria y sobre
+exportaciones CSV y JSON.
+
+    python -m pytest test_snapshot_diff.py
+"""
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from snapshot_diff import diff_files, diff_snapshots
+
+OLD = [
+    {'Agent': '10.0.0.1', 'Utilization_%': 10.0, 'IN_Errors': 5, 'Device_Name': 'sw1',
+     'Status': 'ÓPTIMO', 'timestamp': '2024-03-01T12:00:00'},
+    {'Agent': '10.0.0.2', 'Utilization_%': 50.0, 'IN_Errors': 0, 'Device_Name': 'sw2',
+     'Status': 'ÓPTIMO', 'timestamp': '2024-03-01T12:00:00'},
+    {'Agent': '10.0.0.3', 'Utilization_%': 20.0, 'IN_Errors': 1, 'Device_Name': 'sw3',
+     'Status': 'ÓPTIMO', 'timestamp': '2024-03-01T12:00:00'},
+]
+NEW = [
+    {'Agent': '10.0.0.1', 'Utilization_%': 12.5, 'IN_Errors': 5, 'Device_Name': 'sw1',
+     'Status': 'ÓPTIMO', 'timestamp': '2024-03-01T12:00:30'},
+    {'Agent': '10.0.0.2', 'Utilization_%': 95.0, 'IN_Errors': 40, 'Device_Name': 'core',
+     'Status': 'ALERTA', 'timestamp': '2024-03-01T12:00:30'},
+    {'Agent': '10.0.0.4', 'Utilization_%': 1.0, 'IN_Errors': 0, 'Device_Name': 'sw4',
+     'Status': 'ÓPTIMO', 'timestamp': '2024-03-01T12:00:30'},
+]
+
+
+class DiffSnapshotsTest(unittest.TestCase):
+
+    def check(self, result):
+        self.assertEqual(result.compared, 2)
+        self.assertEqual(result.changed, 2)
+        self.assertEqual(result.added, ['10.0.0.4'])
+        self.assertEqual(result.removed, ['10.0.0.3'])
+        self.assertEqual(result.transitions, [('10.0.0.2', 'ÓPTIMO', 'ALERTA')])
+        self.assertEqual(result.biggest('Utilization_%'),
+                         [('10.0.0.2', 50.0, 95.0, 45.0), ('10.0.0.1', 10.0, 12.5, 2.5)])
+        self.assertEqual(result.biggest('IN_Errors'), [('10.0.0.2', 0, 40, 40)])
+
+    def test_in_memory(self):
+        changes = []
+        result = diff_snapshots(OLD, NEW, on_change=changes.append)
+        self.check(result)
+        self.assertEqual(changes[1].changed, {'Device_Name': ('sw2', 'core')})
+        self.assertIn("⚠️ 10.0.0.2: ÓPTIMO -> ALERTA", result.report())
+
+    def test_top_keeps_biggest(self):
+        old = [{'Agent': str(i), 'Utilization_%': 0} for i in range(50)]
+        new = [{'Agent': str(i), 'Utilization_%': i} for i in range(50)]
+        result = diff_snapshots(old, new, top=3)
+        self.assertEqual([k for k, *_ in result.biggest('Utilization_%')], ['49', '48', '47'])
+
+
+class DiffFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, rows):
+        path = os.path.join(self.tmp, name)
+        if name.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'agents': rows}, f)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
+
+    def test_every_format_combination(self):
+        for old_ext in ('csv', 'json'):
+            for new_ext in ('csv', 'json'):
+                with self.subTest(old=old_ext, new=new_ext):
+                    old = self.write(f'old.{old_ext}', OLD)
+                    new = self.write(f'new.{new_ext}', NEW)
+                    result, written = diff_files(old, new)
+                    self.check_files(result)
+                    self.assertIsNone(written)
+
+    def check_files(self, result):
+        self.assertEqual((result.compared, result.added, result.removed), (2, ['10.0.0.4'], ['10.0.0.3']))
+        self.assertEqual(result.transitions, [('10.0.0.2', 'ÓPTIMO', 'ALERTA')])
+        self.assertEqual(result.biggest('Utilization_%')[0][3], 45.0)
+
+    def test_numeric_key_matches_across_formats(self):
+        old = [{'If_Index': i, 'Utilization_%': 10.0} for i in (1, 2)]
+        new = [{'If_Index': i, 'Utilization_%': 10.0 * i} for i in (1, 2)]
+        for old_path in (self.write('old.json', old), self.write('old.csv', old)):
+            for new_path in (self.write('new.json', new), self.write('new.csv', new)):
+                result, _ = diff_files(old_path, new_path, key='If_Index')
+                self.assertEqual((result.compared, result.added, result.removed), (2, [], []))
+                (key, *change), = result.biggest('Utilization_%')
+                self.assertEqual((str(key), change), ('2', [10.0, 20.0, 10.0]))
+
+    def test_output_csv(self):
+        output = os.path.join(self.tmp, 'diff.csv')
+        result, written = diff_files(self.write('old.csv', OLD), self.write('new.json', NEW), output=output)
+        self.assertEqual(written, output)
+        with open(output, newline='', encoding='utf-8') as f:
+            rows = {row['Agent']: row for row in csv.DictReader(f)}
+        self.assertEqual(set(rows), {'10.0.0.1', '10.0.0.2'})
+        self.assertEqual(rows['10.0.0.2']['Status_Change'], 'ÓPTIMO -> ALERTA')
+        self.assertEqual(rows['10.0.0.2']['IN_Errors_delta'], '40')
+        self.assertEqual(rows['10.0.0.2']['Device_Name_change'], 'sw2 -> core')
+
+    def test_missing_key_column(self):
+        for old_ext in ('csv', 'json'):
+            for new_ext in ('csv', 'json'):
+                with self.subTest(old=old_ext, new=new_ext):
+                    old = self.write(f'old.{old_ext}', OLD)
+                    new = self.write(f'new.{new_ext}', NEW)
+                    with self.assertRaisesRegex(ValueError, "no tiene la columna 'Interface'"):
+                        diff_files(old, new, key='Interface')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Pruebas del transporte SNMP multiplexado: demultiplexación por
+(peer, request-id) y reintentos contra agentes UDP locales, y caché de
+resolución de nombres.
+
+    python -m pytest test_snmp_transport.py
+"""
+import asyncio
+import socket
+import unittest
+from unittest import mock
+
+import ber_codec as ber
+import snmp_transport
+from oid_table import OCTET_STRING
+from snmp_transport import SnmpMultiplexer, SnmpTransport, TimerWheel
+
+SYS_NAME = (1, 3, 6, 1, 2, 1, 1, 5, 0)
+
+
+class Responder(asyncio.DatagramProtocol):
+    """
+    Agente UDP en 127.0.0.1 que responde su nombre a cada GET. Ignora las
+    `drop` primeras peticiones y retiene las respuestas hasta tener `hold`,
+    que envía en orden inverso.
+    """
+
+    def __init__(self, name, hold=1, drop=0):
+        self.name = name
+        self.hold = hold
+        self.drop = drop
+        self.received = []
+        self.held = []
+        self.transport = None
+
+    async def start(self):
+        await asyncio.get_running_loop().create_datagram_endpoint(lambda: self, local_addr=('127.0.0.1', 0))
+        return self
+
+    @property
+    def address(self):
+        return self.transport.get_extra_info('sockname')[:2]
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def reply(self, request_id):
+        return ber.encode_message(ber.RESPONSE, request_id, [(SYS_NAME, (OCTET_STRING, self.name))])
+
+    def datagram_received(self, data, addr):
+        self.received.append(ber.peek_request_id(data))
+        if self.drop:
+            self.drop -= 1
+            return
+        self.held.append((ber.peek_request_id(data), addr))
+        if len(self.held) >= self.hold:
+            for request_id, peer in reversed(self.held):
+                self.transport.sendto(self.reply(request_id), peer)
+            self.held = []
+
+
+def get_sys_name(request_id):
+    return ber.encode_message(ber.GET, request_id, [(SYS_NAME, None)])
+
+
+class MultiplexerTest(unittest.TestCase):
+
+    def run_with_mux(self, test):
+        async def main():
+            mux = await SnmpMultiplexer(tick=0.01).start(('127.0.0.1', 0))
+            try:
+                return await test(mux)
+            finally:
+                mux.close()
+        return asyncio.run(main())
+
+    def test_responses_reach_their_request(self):
+        async def test(mux):
+            a = await Responder(b'agente-a', hold=3).start()
+            b = await Responder(b'agente-b', hold=3).start()
+            futures = [mux.request(agent.address, get_sys_name, timeout=2.0)
+                       for _ in range(3) for agent in (a, b)]
+            responses = await asyncio.gather(*futures)
+            for agent in (a, b):
+                agent.transport.close()
+            return a, b, responses
+
+        a, b, responses = self.run_with_mux(test)
+        # Cada agente respondió en orden inverso, pero cada futuro recibe lo suyo
+        for i, response in enumerate(responses):
+            agent = (a, b)[i % 2]
+            self.assertEqual(response.request_id, agent.received[i // 2])
+            self.assertEqual(bytes(response.varbinds[0][1]), agent.name)
+            self.assertIsNotNone(response.rtt)
+
+    def test_same_request_id_from_another_peer_is_ignored(self):
+        async def test(mux):
+            a = await Responder(b'agente-a', hold=2).start()
+            b = await Responder(b'intruso').start()
+            future = mux.request(a.address, get_sys_name, timeout=2.0)
+            await asyncio.sleep(0.05)
+            request_id, peer = a.held[0]
+            b.transport.sendto(b.reply(request_id), peer)
+            await asyncio.sleep(0.05)
+            pending = not future.done()
+            a.transport.sendto(a.reply(request_id), peer)
+            response = await future
+            for agent in (a, b):
+                agent.transport.close()
+            return pending, response
+
+        pending, response = self.run_with_mux(test)
+        self.assertTrue(pending)
+        self.assertEqual(bytes(response.varbinds[0][1]), b'agente-a')
+
+    def test_retransmits_after_timeout(self):
+        async def test(mux):
+            agent = await Responder(b'agente', drop=1).start()
+            response = await mux.request(agent.address, get_sys_name, timeout=0.05, retries=1)
+            agent.transport.close()
+            return agent, response
+
+        agent, response = self.run_with_mux(test)
+        # El reintento reutiliza el mismo request-id
+        self.assertEqual(len(agent.received), 2)
+        self.assertEqual(agent.received[0], agent.received[1])
+        self.assertEqual(bytes(response.varbinds[0][1]), b'agente')
+
+    def test_times_out_and_frees_the_slot(self):
+        async def test(mux):
+            agent = await Responder(b'agente', drop=10).start()
+            with self.assertRaises(TimeoutError):
+                await mux.request(agent.address, get_sys_name, timeout=0.05, retries=1)
+            # Una respuesta tardía no se asigna a nadie
+            agent.transport.sendto(agent.reply(agent.received[0]), mux.transport.get_extra_info('sockname'))
+            await asyncio.sleep(0.05)
+            agent.transport.close()
+            return agent, dict(mux._pending)
+
+        agent, pending = self.run_with_mux(test)
+        self.assertEqual(len(agent.received), 2)
+        self.assertEqual(pending, {})
+
+
+class TimerWheelTest(unittest.TestCase):
+
+    def test_expires_in_order_across_laps(self):
+        wheel = TimerWheel(tick=0.1, slots=8)
+        wheel.advance(0.0)
+        wheel.schedule(0.25, 'pronto')
+        wheel.schedule(2.05, 'otra vuelta')
+        self.assertEqual(wheel.advance(0.2), [])
+        self.assertEqual(wheel.advance(0.3), ['pronto'])
+        self.assertEqual(wheel.advance(1.0), [])
+        self.assertEqual(wheel.advance(2.1), ['otra vuelta'])
+
+
+class ResolveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = SnmpTransport()
+
+    def tearDown(self):
+        self.transport.stop()
+
+    def test_resolve_many_fills_the_cache(self):
+        self.transport.resolve_many(['localhost', '127.0.0.1', 'nonexistent.invalid', 'localhost'])
+        with mock.patch('socket.gethostbyname', side_effect=AssertionError("DNS bloqueante")):
+            self.assertEqual(self.transport.session('localhost', port=1161).peer, ('127.0.0.1', 1161))
+            self.assertEqual(self.transport.resolve('127.0.0.1'), '127.0.0.1')
+            # El fallo también se guarda: no se vuelve a consultar en cada sondeo
+            with self.assertRaises(OSError):
+                self.transport.session('nonexistent.invalid')
+
+    def test_resolve_caches_until_ttl(self):
+        with mock.patch('socket.gethostbyname', return_value='192.0.2.1') as lookup, \
+                mock.patch('time.monotonic', return_value=1000.0):
+            self.assertEqual(self.transport.resolve('agente'), '192.0.2.1')
+            self.transport.resolve('agente')
+            self.assertEqual(lookup.call_count, 1)
+        with mock.patch('socket.gethostbyname', return_value='192.0.2.2') as lookup, \
+                mock.patch('time.monotonic', return_value=1000.0 + snmp_transport.DNS_TTL):
+            self.assertEqual(self.transport.resolve('agente'), '192.0.2.2')
+
+    def test_negative_entries_expire_sooner(self):
+        error = socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        with mock.patch('socket.gethostbyname', side_effect=error), \
+                mock.patch('time.monotonic', return_value=0.0):
+            with self.assertRaises(socket.gaierror):
+                self.transport.resolve('caido')
+        with mock.patch('socket.gethostbyname', return_value='192.0.2.3'), \
+                mock.patch('time.monotonic', return_value=snmp_transport.DNS_NEGATIVE_TTL):
+            self.assertEqual(self.transport.resolve('caido'), '192.0.2.3')
+
+
+if __name__ == '__main__':
+    unittest.main()
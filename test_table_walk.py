@@ -0,0 +1,192 @@
+"""
+Pruebas del recorrido GETBULK adaptativo (BulkSizer y TableWalker.awalk)
+contra un agente simulado en memoria.
+
+    python -m pytest test_table_walk.py
+"""
+import asyncio
+import unittest
+
+import ber_codec as ber
+from oid_table import IF_ENTRY, COUNTER32, OCTET_STRING
+from table_walk import BulkSizer, InterfaceTable, TableWalker, TOO_BIG
+
+COLUMNS = [IF_ENTRY + (2,), IF_ENTRY + (10,), IF_ENTRY + (16,)]
+
+
+class FakeBulkAgent:
+    """
+    Sesión con un agente de `ports` interfaces que responde GETBULK según
+    RFC 3416. Con `limit` responde tooBig a las respuestas mayores; con
+    `down` no responde (TimeoutError).
+    """
+    community = 'public'
+
+    def __init__(self, ports=500, limit=None):
+        self.limit = limit
+        self.down = False
+        self.requests = 0
+        self.rows = {}
+        for i in range(1, ports + 1):
+            self.rows[IF_ENTRY + (2, i)] = (OCTET_STRING, f'GigabitEthernet0/{i}')
+            self.rows[IF_ENTRY + (10, i)] = (COUNTER32, 1000 * i)
+            self.rows[IF_ENTRY + (16, i)] = (COUNTER32, 2000 * i)
+        self.keys = sorted(self.rows)
+
+    @staticmethod
+    def parse(data):
+        buf = memoryview(data)
+        _, pos, end = ber._read_tl(buf, 0, len(buf))
+        _, _, pos = ber._read_tl(buf, pos, end)        # versión
+        _, _, pos = ber._read_tl(buf, pos, end)        # comunidad
+        _, pos, pdu_end = ber._read_tl(buf, pos, end)
+        fields = []
+        for _ in range(3):
+            _, start, pos = ber._read_tl(buf, pos, pdu_end)
+            fields.append(ber._read_int(buf, start, pos))
+        _, pos, list_end = ber._read_tl(buf, pos, pdu_end)
+        oids = []
+        while pos < list_end:
+            _, vb_pos, vb_end = ber._read_tl(buf, pos, list_end)
+            _, start, stop = ber._read_tl(buf, vb_pos, vb_end)
+            oids.append(ber.decode_oid(buf, start, stop))
+            pos = vb_end
+        request_id, _, max_repetitions = fields
+        return request_id, max_repetitions, oids
+
+    def next_after(self, oid):
+        lo, hi = 0, len(self.keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.keys[mid] <= oid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.keys[lo] if lo < len(self.keys) else None
+
+    def respond(self, request_id, max_repetitions, oids):
+        varbinds = []
+        cursors = list(oids)
+        for _ in range(max_repetitions):
+            for i, cursor in enumerate(cursors):
+                oid = self.next_after(cursor)
+                if oid is None:
+                    varbinds.append(ber._tlv(ber.SEQUENCE, ber.encode_oid(cursor) + b'\x82\x00'))
+                    continue
+                cursors[i] = oid
+                varbinds.append(ber._tlv(ber.SEQUENCE, ber.encode_oid(oid) + ber.encode_value(*self.rows[oid])))
+        error = 0
+        if self.limit and sum(map(len, varbinds)) + 40 > self.limit:
+            varbinds, error = [], TOO_BIG
+        pdu = ber._tlv(ber.RESPONSE, ber._encode_int(request_id) + ber._encode_int(error) +
+                       ber._encode_int(0) + ber._tlv(ber.SEQUENCE, b''.join(varbinds)))
+        return ber._tlv(ber.SEQUENCE, ber._encode_int(1) + ber._tlv(ber.OCTET_STRING, b'public') + pdu)
+
+    async def _request(self, build):
+        self.requests += 1
+        if self.down:
+            raise TimeoutError("sin respuesta")
+        request_id, max_repetitions, oids = self.parse(build(12345678))
+        response = ber.decode_response(self.respond(request_id, max_repetitions, oids))
+        response.rtt = 0.001
+        return response
+
+
+def walk(walker, agent, sizer):
+    return asyncio.run(walker.awalk(agent, COLUMNS, sizer, InterfaceTable()))
+
+
+class BulkSizerTest(unittest.TestCase):
+
+    def test_grows_while_responses_are_complete(self):
+        sizer = BulkSizer(initial_bytes=1400, max_bytes=16384)
+        sizer.record(50, 1200, truncated=False, more=True)
+        self.assertEqual(sizer.budget, 2800)
+        for _ in range(5):
+            sizer.record(50, 1200, truncated=False, more=True)
+        self.assertEqual(sizer.budget, 16384)
+        self.assertIsNone(sizer.limit)
+
+    def test_truncated_response_sets_limit(self):
+        sizer = BulkSizer(initial_bytes=4000)
+        sizer.record(40, 3000, truncated=True, more=True)
+        self.assertEqual((sizer.limit, sizer.budget), (3000, 3000))
+        sizer.record(40, 3000, truncated=False, more=True)
+        self.assertEqual(sizer.budget, 3000)
+
+    def test_too_big_sets_limit(self):
+        sizer = BulkSizer(initial_bytes=4000)
+        self.assertTrue(sizer.shrink())
+        self.assertEqual((sizer.limit, sizer.budget), (2000, 2000))
+        sizer.record(10, 1800, truncated=False, more=True)
+        self.assertEqual(sizer.budget, 2000)
+
+    def test_timeout_does_not_set_limit(self):
+        sizer = BulkSizer(initial_bytes=1400)
+        sizer.budget = 8000
+        self.assertTrue(sizer.shrink(too_big=False))
+        self.assertIsNone(sizer.limit)
+        self.assertEqual(sizer.budget, 1400)
+        # Con el presupuesto inicial un timeout ya no se reintenta
+        self.assertFalse(sizer.shrink(too_big=False))
+        sizer.record(10, 1200, truncated=False, more=True)
+        self.assertEqual(sizer.budget, 2800)
+
+    def test_floor(self):
+        sizer = BulkSizer(initial_bytes=600, min_bytes=484)
+        self.assertTrue(sizer.shrink())
+        self.assertEqual(sizer.budget, 484)
+        self.assertFalse(sizer.shrink())
+
+
+class AwalkTest(unittest.TestCase):
+
+    def test_reads_every_row(self):
+        agent = FakeBulkAgent(ports=500)
+        walker = TableWalker(transport=None)
+        result = walk(walker, agent, walker.sizer('a'))
+        for column in COLUMNS:
+            self.assertEqual([instance for instance, _ in result[column]], [(i,) for i in range(1, 501)])
+        self.assertEqual(result[COLUMNS[1]][-1][1], 500000)
+        self.assertEqual(bytes(result[COLUMNS[0]][0][1]), b'GigabitEthernet0/1')
+
+    def test_outage_does_not_pin_the_agent(self):
+        agent = FakeBulkAgent(ports=500)
+        walker = TableWalker(transport=None)
+        sizer = walker.sizer('a')
+        walk(walker, agent, sizer)
+        agent.requests = 0
+        walk(walker, agent, sizer)
+        healthy = agent.requests
+
+        agent.down = True
+        for _ in range(2):
+            agent.requests = 0
+            with self.assertRaises(TimeoutError):
+                walk(walker, agent, sizer)
+            # Un intento y un reintento con el presupuesto inicial
+            self.assertEqual(agent.requests, 2)
+        self.assertIsNone(sizer.limit)
+
+        agent.down = False
+        agent.requests = 0
+        walk(walker, agent, sizer)
+        self.assertLessEqual(agent.requests, healthy)
+
+    def test_too_big_converges_below_agent_limit(self):
+        agent = FakeBulkAgent(ports=500, limit=3000)
+        walker = TableWalker(transport=None)
+        sizer = walker.sizer('a')
+        result = walk(walker, agent, sizer)
+        self.assertEqual(len(result[COLUMNS[2]]), 500)
+        self.assertIsNotNone(sizer.limit)
+        self.assertLessEqual(sizer.budget, 3000)
+        # Lo aprendido se conserva: el siguiente recorrido no recibe tooBig
+        first = agent.requests
+        agent.requests = 0
+        walk(walker, agent, sizer)
+        self.assertLess(agent.requests, first)
+
+
+if __name__ == '__main__':
+    unittest.main()
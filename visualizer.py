@@ -1,6 +1,8 @@
 """
 Módulo para visualización de datos con gráficos
 """
+from datetime import datetime
+
 import matplotlib
 matplotlib.use('TkAgg')  # Backend para Tkinter
 import matplotlib.pyplot as plt
@@ -34,7 +36,8 @@ class DataVisualizer:
         utilizations = []
         
         for entry in history_data:
-            timestamps.append(entry['timestamp'])
+            ts = entry['timestamp']
+            timestamps.append(datetime.fromisoformat(ts) if isinstance(ts, str) else ts)
             utilizations.append(entry['utilization'])
         
         # Crear gráfico de línea